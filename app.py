@@ -2,20 +2,45 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
+import plotly.io as pio
 import requests
+import json
+import functools
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import numpy as np
-from urllib.parse import quote
 import unicodedata
+import math
 import os
+from streamlit.errors import StreamlitAPIException
+from background_refresh import BackgroundRefresher, copiar_valor, resultado_valido
 
-# Tenta importar gspread para API do Google Sheets
-try:
-    import gspread
-    from google.oauth2.service_account import Credentials
-    GSPREAD_AVAILABLE = True
-except ImportError:
-    GSPREAD_AVAILABLE = False
+# Cliente do Google Sheets (gspread é opcional; sem ele usa export CSV)
+from sheets_client import GSPREAD_AVAILABLE, api_disponivel, obter_cliente_sheets
+from sheets_csv import (
+    ENCODINGS as ENCODINGS_CSV, cabecalho_em_cache, cabecalho_gviz, carregar_csv_projetado, carregar_csv_streaming, contar_linhas_gviz,
+    guardar_cabecalho, url_export_csv, url_gviz_csv,
+)
+from data_cleaning import COLUNAS_BASE_ATORES, limpar_dados_planilha, normalize_codigo_ibge
+from data_quality import gerar_relatorio_qualidade
+from geometry_store import GeometriaCompacta
+from map_geometry import (
+    FOLGA_ZOOM_DETALHE, MARGEM_RECORTE, RECUO_ZOOM_CONTORNO, IndiceEspacial, calcular_viewports, limites_visiveis,
+)
+from plotly_json import FiguraMapa
+import circuit_breaker
+import geometry_store
+import map_geometry
+import profiling
+import session_memory
+import shared_dataset
+import sheet_projection
+import single_flight
+from vector_tiles import CAMADA_MVT, ServidorTiles
+
+logger = logging.getLogger("dashboard.cargas")
 
 # Configuração da página
 st.set_page_config(
@@ -37,6 +62,91 @@ MAP_CONFIG = {
 MAP_STYLE = "carto-positron"  # Estilo claro - fundo será customizado via plot_bgcolor
 MAP_BASE_LAYER = None
 
+# Renderização sob demanda: cada seção em sua própria aba e apenas a aba aberta é executada.
+# Ative com DASHBOARD_LAZY_SECTIONS=1 (padrão: seções empilhadas, como antes).
+RENDERIZACAO_SOB_DEMANDA = os.getenv("DASHBOARD_LAZY_SECTIONS", "0").strip().lower() in ("1", "true", "sim", "yes")
+
+# Relatório de qualidade dos dados (IBGE sem GeoJSON, categorias, anos, duplicados) na sidebar.
+# Ative com DASHBOARD_DATA_QUALITY=1; também disponível via `python data_quality.py`.
+EXIBIR_QUALIDADE_DADOS = os.getenv("DASHBOARD_DATA_QUALITY", "0").strip().lower() in ("1", "true", "sim", "yes")
+
+# Modo vector tiles: a geometria dos municípios é servida por um servidor local de tiles (MVT)
+# e a figura leva só os valores por município. Ative com DASHBOARD_VECTOR_TILES=1.
+# DASHBOARD_TILE_URL: endereço dos tiles visto pelo navegador (padrão http://localhost:<porta>).
+# DASHBOARD_TILE_HOST: interface em que o servidor de tiles escuta (padrão 127.0.0.1, ou
+# 0.0.0.0 quando DASHBOARD_TILE_URL é informada: o navegador acessa de outra máquina).
+MODO_VECTOR_TILES = os.getenv("DASHBOARD_VECTOR_TILES", "0").strip().lower() in ("1", "true", "sim", "yes")
+try:
+    PORTA_TILES = int(os.getenv("DASHBOARD_TILE_PORT", "8765"))
+except ValueError:
+    PORTA_TILES = 8765
+URL_TILES = os.getenv("DASHBOARD_TILE_URL") or None
+HOST_TILES = os.getenv("DASHBOARD_TILE_HOST") or ("0.0.0.0" if URL_TILES else "127.0.0.1")
+
+# Fontes locais (opcionais) da geometria e das coordenadas dos municípios, usadas antes das
+# remotas: DASHBOARD_GEOJSON_PATH (GeoJSON) e DASHBOARD_COORDENADAS_PATH (CSV no formato do
+# kelvins/municipios-brasileiros). Úteis sem acesso à internet e nos benchmarks.
+CAMINHO_GEOJSON_LOCAL = os.getenv("DASHBOARD_GEOJSON_PATH") or None
+CAMINHO_COORDENADAS_LOCAL = os.getenv("DASHBOARD_COORDENADAS_PATH") or None
+
+# Perfil de render: tempo por função/seção, acertos de cache dos carregadores e tamanho do
+# payload de cada gráfico, num painel da sidebar e no log "dashboard.perfil" (uma linha JSON
+# por rerun). Ative com DASHBOARD_PROFILE=1; desligado, o custo é desprezível.
+PERFIL_ATIVO = os.getenv("DASHBOARD_PROFILE", "0").strip().lower() in ("1", "true", "sim", "yes")
+profiling.ativar(PERFIL_ATIVO)
+
+# Memória por sessão (ver session_memory.py): tamanho do session_state de cada sessão no
+# painel do perfil; DASHBOARD_MEMORY_TRACEMALLOC=1 mede também a memória retida por rerun
+# (tracemalloc, caro). DASHBOARD_SESSION_IDLE_SECONDS encerra sessões sem interação há mais
+# que isso e DASHBOARD_MEMORY_BUDGET_MB limpa os caches mais pesados quando o RSS do processo
+# passa do orçamento (0 desliga cada um).
+try:
+    OCIOSIDADE_SESSAO = max(0, int(os.getenv("DASHBOARD_SESSION_IDLE_SECONDS", "0")))
+except ValueError:
+    OCIOSIDADE_SESSAO = 0
+try:
+    ORCAMENTO_MEMORIA_MB = max(0, int(os.getenv("DASHBOARD_MEMORY_BUDGET_MB", "0")))
+except ValueError:
+    ORCAMENTO_MEMORIA_MB = 0
+session_memory.configurar(
+    contabilizar=PERFIL_ATIVO,
+    tracemalloc_ativo=os.getenv("DASHBOARD_MEMORY_TRACEMALLOC", "0").strip().lower() in ("1", "true", "sim", "yes"),
+    ociosidade_segundos=OCIOSIDADE_SESSAO,
+    orcamento_mb=ORCAMENTO_MEMORIA_MB,
+)
+
+# Atualização em segundo plano: cadência (segundos) das planilhas e dos dados geográficos.
+# Com DASHBOARD_REFRESH_SECONDS=0 o agendador fica desligado e vale só o cache do Streamlit.
+try:
+    INTERVALO_ATUALIZACAO = max(0, int(os.getenv("DASHBOARD_REFRESH_SECONDS", "300")))
+except ValueError:
+    INTERVALO_ATUALIZACAO = 300
+try:
+    INTERVALO_ATUALIZACAO_GEO = max(60, int(os.getenv("DASHBOARD_REFRESH_GEO_SECONDS", "86400")))
+except ValueError:
+    INTERVALO_ATUALIZACAO_GEO = 86400
+
+# Vários processos do app na mesma máquina: com DASHBOARD_SHARED_DATA_DIR (ex.: /dev/shm/dashboard)
+# um processo baixa as fontes e publica cada versão em Arrow IPC nesse diretório; os outros
+# mapeiam os arquivos em memória (uma cópia física para todos). Requer pyarrow e o agendador.
+DIRETORIO_DADOS_COMPARTILHADOS = os.getenv("DASHBOARD_SHARED_DATA_DIR") or None
+
+# Sessões que pedem uma fonte já em carga esperam por ela (single_flight) no máximo este
+# tempo (segundos); depois seguem sem os dados e avisam. 0 = sem limite.
+try:
+    ESPERA_MAXIMA_CARGA = max(0, int(os.getenv("DASHBOARD_LOAD_WAIT_SECONDS", "120")))
+except ValueError:
+    ESPERA_MAXIMA_CARGA = 120
+
+# Requisições por minuto às planilhas (API e export CSV), cada uma com o seu disjuntor
+# (circuit_breaker.py). O padrão segue a cota de leitura da API por usuário.
+try:
+    REQUISICOES_POR_MINUTO_PLANILHAS = max(1, int(os.getenv("DASHBOARD_SHEETS_REQUESTS_PER_MINUTE", "60")))
+except ValueError:
+    REQUISICOES_POR_MINUTO_PLANILHAS = 60
+for _fonte_planilhas in ("sheets_api", "sheets_csv"):
+    circuit_breaker.fonte(_fonte_planilhas).configurar(por_minuto=REQUISICOES_POR_MINUTO_PLANILHAS)
+
 # Cores oficiais do Sebrae
 SEBRAE_AZUL = "#0052A5"  # Azul principal Sebrae
 SEBRAE_AZUL_CLARO = "#0066CC"  # Azul claro Sebrae
@@ -117,20 +227,197 @@ def color_with_intensity(base_hex: str, intensity: float, min_alpha: float = 0.1
     return f"rgba({r},{g},{b},{alpha})"
 
 
-def normalize_codigo_ibge(series: pd.Series) -> pd.Series:
-    """Normaliza série com códigos IBGE para strings de sete dígitos."""
-    def _normalize(value):
-        if pd.isna(value):
-            return np.nan
+def fragmento(key=None):
+    """
+    Decorador que transforma a função em fragmento do Streamlit (rerun parcial).
+    Interações com widgets dentro do fragmento reexecutam apenas o fragmento.
+    Em versões do Streamlit sem suporte a fragmentos, a função roda normalmente.
+    """
+    st_fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None)
+
+    def decorator(func):
+        # Reruns parciais do fragmento aparecem no perfil como registros próprios
+        func = profiling.cronometrado(f"fragmento:{key or func.__name__}")(func)
+        # Reruns de fragmento também contam como atividade da sessão (memória e ociosidade)
+        func = session_memory.contabilizado(func)
+        if st_fragment is None:
+            return func
+        if key is not None:
+            try:
+                return st_fragment(func, key=key)
+            except TypeError:
+                # Versão sem fragmentos nomeados: sem a chave, os callbacks não conseguem
+                # reexecutar este fragmento a partir de outro, então roda como função normal
+                return func
+        return st_fragment(func)
+
+    return decorator
+
+
+def _verificar_interrupcao():
+    """Deixa o Streamlit parar/reexecutar o rerun da sessão que espera uma carga de outra."""
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+    except ImportError:
+        return
+    verificar = getattr(get_script_run_ctx(suppress_warning=True), "yield_check", None)
+    if verificar is not None:
+        verificar()
+
+
+def carga_unica(vazio=lambda: None):
+    """
+    Decorador dos carregadores (por fora do st.cache_data): chamadas concorrentes com os
+    mesmos argumentos, de sessões diferentes, fazem uma única carga e dividem o resultado
+    (ver single_flight.py). Quem desiste de esperar (ESPERA_MAXIMA_CARGA) recebe vazio(),
+    o mesmo valor que o carregador devolve quando falha.
+    """
+    def esgotada():
+        st.warning("⏳ Os dados ainda estão sendo carregados por outra sessão. Recarregue a página em instantes.")
+        return vazio()
+
+    return single_flight.coalescer(
+        espera_maxima=ESPERA_MAXIMA_CARGA or None,
+        copiar=copiar_valor,
+        ao_esperar=_verificar_interrupcao,
+        ao_esgotar=esgotada,
+    )
+
+
+@st.cache_resource(show_spinner=False)
+def _ultimas_versoes():
+    """Cópia da última carga válida de cada carregador (nome + argumentos -> valor), do processo."""
+    return {}
+
+
+def _planilhas_validas(planilhas):
+    return bool(planilhas) and all(resultado_valido(df) for df in planilhas.values())
+
+
+class _CargaInvalida(Exception):
+    """Carga que falhou (ver com_ultima_versao): levantada para o st.cache_data não guardá-la."""
+
+    def __init__(self, valor):
+        super().__init__("carregador retornou dados vazios")
+        self.valor = valor
+
+
+def com_ultima_versao(cache, valido=resultado_valido):
+    """
+    Decorador dos carregadores que aplica o decorador de cache `cache` (ex.: st.cache_data)
+    e guarda uma cópia da última carga válida. Quando a carga falha (ex.: disjuntor da fonte
+    aberto, ver circuit_breaker.py), a falha não fica no cache, que tenta de novo no próximo
+    rerun, e a última versão é devolvida por fora dele, com um aviso. Sem versão anterior,
+    devolve o resultado da carga como veio.
+
+        @com_ultima_versao(st.cache_data(ttl=300))
+        def load_data(...): ...
+
+    A função devolvida mantém __wrapped__ (função original, sem cache) e clear().
+    """
+    def decorar(funcao):
+        def chave(args, kwargs):
+            return (funcao.__name__, args, tuple(sorted(kwargs.items())))
+
+        @functools.wraps(funcao)
+        def carregar_valido(*args, **kwargs):
+            valor = funcao(*args, **kwargs)
+            if not valido(valor):
+                raise _CargaInvalida(valor)
+            _ultimas_versoes()[chave(args, kwargs)] = copiar_valor(valor)
+            return valor
+
+        cacheada = cache(carregar_valido)
+
+        @functools.wraps(funcao)
+        def carregar(*args, **kwargs):
+            try:
+                return cacheada(*args, **kwargs)
+            except _CargaInvalida as falha:
+                anterior = _ultimas_versoes().get(chave(args, kwargs))
+                if anterior is None:
+                    return falha.valor
+                st.warning("⚠️ Fonte de dados indisponível no momento: exibindo a última versão carregada.")
+                return copiar_valor(anterior)
+
+        carregar.__wrapped__ = funcao
+        carregar.clear = cacheada.clear
+        return carregar
+    return decorar
+
+# Fragmentos que dependem de cada chave de estado dos filtros.
+# Um callback que altera a chave reexecuta apenas esses fragmentos, na ordem listada
+# (o painel de filtros vem primeiro para validar região/município antes dos demais).
+DEPENDENCIAS_FILTROS = {
+    "filtro_regiao": ["painel_filtros", "painel_mapa", "secao_tabela"],
+    "filtro_municipio": ["painel_filtros", "painel_mapa", "secao_tabela"],
+    "categorias_ativas": ["painel_filtros", "painel_mapa", "secao_tabela"],
+    "filtro_segmentos": ["secao_tabela"],
+}
+
+def _rerun_dependentes(*chaves):
+    """
+    Reexecuta somente os fragmentos que dependem das chaves de estado alteradas.
+    Deve ser chamada dentro de callbacks (on_change/on_select).
+    """
+    alvos = []
+    for chave in chaves:
+        for alvo in DEPENDENCIAS_FILTROS.get(chave, []):
+            if alvo not in alvos:
+                alvos.append(alvo)
+    if not alvos:
+        return
+    try:
+        st.rerun(scope=alvos)
+    except StreamlitAPIException:
+        # Algum dependente ainda não foi renderizado (ex.: aba fechada) ou a versão
+        # não aceita lista de fragmentos: reexecuta o app inteiro
         try:
-            return f"{int(float(value)):07d}"
-        except (ValueError, TypeError):
-            value_str = str(value).strip()
-            if value_str == "":
-                return np.nan
-            value_str = value_str.split('.')[0]
-            return value_str.zfill(7)
-    return series.apply(_normalize)
+            st.rerun()
+        except StreamlitAPIException:
+            pass
+    except TypeError:
+        # Versão sem escopo no st.rerun: mantém o rerun padrão após o callback
+        pass
+
+def _ao_mudar_filtro_mapa(chave):
+    """Callback dos filtros do painel do mapa (região, município, segmentos)."""
+    _rerun_dependentes(chave)
+
+def _ao_alternar_categoria(category_name, checkbox_key, categorias_disponiveis):
+    """Callback da legenda de categorias: liga/desliga a categoria e atualiza o filtro."""
+    st.session_state.categorias_ativas[category_name] = st.session_state[checkbox_key]
+    st.session_state.filtro_categoria = [cat for cat, ativa in st.session_state.categorias_ativas.items()
+                                         if ativa and cat in categorias_disponiveis]
+    _rerun_dependentes("categorias_ativas")
+
+def _ao_selecionar_mapa():
+    """
+    Callback do clique no mapa: aplica região e município clicados aos filtros.
+    Substitui o antigo fluxo "seleção pendente + st.rerun()", que desenhava o app duas vezes.
+    """
+    estado = st.session_state.get("mapa_choropleth")
+    try:
+        pontos = estado["selection"]["points"]
+    except (KeyError, TypeError):
+        return
+    if not pontos:
+        return
+    customdata = pontos[0].get("customdata") or []
+    rotulos = st.session_state.get("rotulos_mapa")
+    if len(customdata) < 2 or not rotulos:
+        return
+    # customdata traz os índices de região e município nas tabelas de rótulos do mapa
+    try:
+        regiao = rotulos["regioes"][int(customdata[0])]
+        municipio = rotulos["municipios"][int(customdata[1])]
+    except (IndexError, KeyError, TypeError, ValueError):
+        return
+    # Ao clicar no mapa, filtra diretamente pelo município (e pela sua região,
+    # para que o dropdown de município mostre as opções corretas)
+    st.session_state.filtro_regiao = regiao
+    st.session_state.filtro_municipio = municipio
+    _rerun_dependentes("filtro_regiao", "filtro_municipio")
 
 # CSS personalizado - Identidade Visual Sebrae
 st.markdown(f"""
@@ -994,26 +1281,89 @@ st.markdown(f"""
 </script>
 """, unsafe_allow_html=True)
 
-@st.cache_data(ttl=300)  # Cache por 5 minutos para permitir atualizações
-def load_data_from_sheets(sheet_name, force_reload=False):
+def _sheet_id_candidates():
+    """
+    IDs candidatos da planilha SEBRAE MG.
+    Em produção já vimos variações/typos nesse ID; para não derrubar o app,
+    tentamos uma lista de candidatos (inclui override via env/secrets).
+    """
+    sheet_id_candidates = [
+        os.getenv("GOOGLE_SHEET_ID") or os.getenv("SHEET_ID"),
+        # candidato "AHXo..." (mais recente)
+        "104LamJgsPmwAldSBUOSsAHXo4m356by44VnGgk2avk",
+        # candidato "AHfXo..." (já apareceu funcionando em versões anteriores)
+        "104LamJgsPmwAldSBUOSsAHfXo4m356by44VnGgk2avk",
+    ]
+    return [s for s in sheet_id_candidates if isinstance(s, str) and s.strip()]
+
+
+def _dataframe_de_valores(valores, vazios_como_nan=False, exigir_primeira_coluna=True):
+    """
+    Monta o DataFrame a partir da matriz de valores da API do Google Sheets
+    (primeira linha = cabeçalho).
+    vazios_como_nan: trata células vazias como NaN e infere tipos, como faz o pd.read_csv.
+    exigir_primeira_coluna: remove linhas com a primeira coluna vazia.
+    """
+    # Primeira linha é o cabeçalho
+    headers = valores[0]
+    data_rows = valores[1:]
+
+    # Cria DataFrame
+    df = pd.DataFrame(data_rows, columns=headers)
+    if vazios_como_nan:
+        df = df.replace("", np.nan).infer_objects()
+
+    if exigir_primeira_coluna:
+        # Linhas com a primeira coluna vazia e cabeçalhos repetidos (mesma limpeza do CSV)
+        return limpar_dados_planilha(df)
+
+    # Remove linhas completamente vazias
+    df = df.dropna(how='all')
+
+    # Remove espaços dos nomes das colunas
+    df.columns = [str(col).strip() if col is not None else f'Coluna_{i}' for i, col in enumerate(df.columns)]
+    return df
+
+
+# Colunas da aba "Base | Atores MG" que cada visão usa: termos comparados com o cabeçalho
+# sem acentos e em minúsculas (a coluna entra se contém algum termo; ver sheet_projection.py).
+# Só essas colunas são baixadas; uma visão nova que use outra coluna precisa declará-la aqui.
+COLUNAS_VISOES_ATORES = {
+    "filtros, mapa e pesquisa": ['nome', 'name', 'ator', 'categoria', 'category', 'tipo', 'type',
+                                 'cidade', 'municipio', 'city', 'regiao', 'sebrae'],
+    "setores": ['setor', 'sector', 'segment'],
+    "temporal": ['fundacao', 'foundation', 'ano'],
+    "tabela": ['site', 'website', 'url', 'link', 'web', 'homepage'],
+}
+# Texto livre (pesado): fica fora da carga principal e é lido sob demanda (completar_colunas_pesadas)
+COLUNAS_PESADAS_ATORES = ['descri']
+
+PROJECAO_ATORES = (
+    tuple(dict.fromkeys(termo for termos in COLUNAS_VISOES_ATORES.values() for termo in termos)),
+    tuple(COLUNAS_PESADAS_ATORES),
+)
+
+
+def _projetar_colunas(df, projecao):
+    """Mantém só as colunas projetadas de um DataFrame já lido inteiro (ex.: export CSV)."""
+    if projecao is None or df.empty:
+        return df
+    indices = sheet_projection.colunas_projetadas(list(df.columns), *projecao)
+    return df.iloc[:, indices] if indices is not None else df
+
+
+@carga_unica(pd.DataFrame)
+@com_ultima_versao(profiling.cache_instrumentado(st.cache_data(ttl=300)))  # Cache por 5 minutos para permitir atualizações
+def load_data_from_sheets(sheet_name, force_reload=False, projecao=None):
     """
     Carrega dados do Google Sheets SEBRAE MG de uma aba específica
     Usa API do Google Sheets (gspread) se disponível, caso contrário usa export CSV
+    projecao=(termos, excluir): carrega só essas colunas (ver sheet_projection.py)
     """
     try:
-        # ID da planilha
-        # Em produção já vimos variações/typos nesse ID; para não derrubar o app,
-        # tentamos uma lista de candidatos (inclui override via env/secrets).
-        import os as os_module
-        sheet_id_env = os_module.getenv("GOOGLE_SHEET_ID") or os_module.getenv("SHEET_ID")
-        sheet_id_candidates = [
-            sheet_id_env,
-            # candidato "AHXo..." (mais recente)
-            "104LamJgsPmwAldSBUOSsAHXo4m356by44VnGgk2avk",
-            # candidato "AHfXo..." (já apareceu funcionando em versões anteriores)
-            "104LamJgsPmwAldSBUOSsAHfXo4m356by44VnGgk2avk",
-        ]
-        sheet_id_candidates = [s for s in sheet_id_candidates if isinstance(s, str) and s.strip()]
+        # ID da planilha (lista de candidatos, ver _sheet_id_candidates)
+        sheet_id_candidates = _sheet_id_candidates()
+        sheet_id_env = sheet_id_candidates[0] if sheet_id_candidates else None
 
         # Alguns ambientes/abas usam nomes sem acentos (ex.: "Municipios e Regioes").
         # Tentamos variações do nome da aba para evitar cair na aba errada.
@@ -1043,134 +1393,42 @@ def load_data_from_sheets(sheet_name, force_reload=False):
                 # Tenta carregar credenciais de variável de ambiente ou arquivo
                 credentials_path = os_module.getenv('GOOGLE_APPLICATION_CREDENTIALS', 'credentials.json')
                 
-                if os_module.path.exists(credentials_path):
-                    # Carrega credenciais do service account
-                    scope = [
-                        'https://spreadsheets.google.com/feeds',
-                        'https://www.googleapis.com/auth/drive'
-                    ]
-                    creds = Credentials.from_service_account_file(credentials_path, scopes=scope)
-                    client = gspread.authorize(creds)
-                    
-                    # Abre a planilha (tenta candidatos até funcionar)
-                    spreadsheet = None
-                    last_err = None
-                    for sid in sheet_id_candidates:
-                        try:
-                            spreadsheet = client.open_by_key(sid)
-                            # guarda qual id funcionou para o fallback CSV também
-                            sheet_id_env = sid
-                            break
-                        except Exception as e:
-                            last_err = e
-                    if spreadsheet is None:
-                        raise last_err if last_err else Exception("Não foi possível abrir a planilha por ID")
-                    
-                    # Abre a aba (tenta variações do nome, inclusive sem acentos)
-                    worksheet = None
-                    all_sheets = spreadsheet.worksheets()
-                    for candidate in sheet_name_candidates:
-                        try:
-                            worksheet = spreadsheet.worksheet(candidate)
-                            break
-                        except Exception:
-                            worksheet = None
-                    if worksheet is None:
-                        # fallback: compara normalizado (sem acentos)
-                        target_norm = _norm(sheet_name)
-                        for ws in all_sheets:
-                            if _norm(ws.title) == target_norm:
-                                worksheet = ws
-                                break
-                    if worksheet is None:
-                        raise Exception(f"Aba '{sheet_name}' não encontrada. Abas disponíveis: {[ws.title for ws in all_sheets]}")
-                    
-                    # Obtém TODOS os valores da planilha (sem limitação)
-                    # IMPORTANTE: usar valores calculados (não fórmulas), senão colunas como `qtd_startups`
-                    # podem vir como "=COUNTIFS(...)" e virarem 0 no pd.to_numeric(errors='coerce').
-                    #
-                    # `get_all_values` nem sempre suporta `value_render_option` dependendo da versão do gspread.
-                    # Preferimos `get_values` com `UNFORMATTED_VALUE` e fazemos fallback com segurança.
-                    try:
-                        all_values = worksheet.get_values(value_render_option="UNFORMATTED_VALUE")
-                    except TypeError:
-                        # Versão do gspread sem suporte ao parâmetro
-                        all_values = worksheet.get_all_values()
-                    except Exception:
-                        # Qualquer outro problema: tenta o método padrão
-                        all_values = worksheet.get_all_values()
+                if api_disponivel(credentials_path):
+                    # Cliente persistente: sessão autorizada, planilha e índice de abas ficam
+                    # em memória entre cargas, então aqui só é feita a requisição de valores
+                    cliente = obter_cliente_sheets(credentials_path, sheet_id_candidates)
+                    all_values = cliente.valores(sheet_name, sheet_name_candidates, projecao=projecao)
+                    # guarda qual id funcionou para o fallback CSV também
+                    sheet_id_env = cliente.sheet_id
                     
                     if len(all_values) == 0:
                         raise Exception("Planilha vazia")
-                    
-                    # Primeira linha é o cabeçalho
-                    headers = all_values[0]
-                    data_rows = all_values[1:]
-                    
-                    # Cria DataFrame
-                    df = pd.DataFrame(data_rows, columns=headers)
-                    
-                    # Remove linhas completamente vazias
-                    df = df.dropna(how='all')
-                    
-                    # Remove espaços dos nomes das colunas
-                    df.columns = [str(col).strip() if col is not None else f'Coluna_{i}' for i, col in enumerate(df.columns)]
-                    
-                    # Remove linhas onde a primeira coluna está vazia
-                    if len(df) > 0 and len(df.columns) > 0:
-                        primeira_col = df.columns[0]
-                        if primeira_col in df.columns:
-                            mask = df[primeira_col].notna() & (df[primeira_col].astype(str).str.strip() != '')
-                            df = df[mask]
-                    # (debug removido)
-                    return df
+
+                    return _projetar_colunas(_dataframe_de_valores(all_values), projecao)
                     
             except FileNotFoundError:
                 pass  # Silenciosamente usa fallback CSV
             except Exception:
                 pass  # Silenciosamente usa fallback CSV
         
-        # MÉTODO 2: Fallback para export CSV (pode ter limitação de ~2000 linhas)
-        # IMPORTANTE: Google Sheets CSV export pode ter limitações
-        # Tentamos múltiplos métodos para garantir que pegamos todos os dados
-        
+        # MÉTODO 2: Fallback para export CSV, lido em streaming (sem limite fixo de linhas)
+        # A completude é conferida pela contagem de linhas da própria aba (COUNT via gviz);
+        # só se o export vier truncado é que os endpoints de export alternativos são tentados.
         df = None
-        sheet_url_used = None
+        csv_completo = True
         
-        # Método 1: Tenta com a URL de export CSV direta usando o nome da aba
-        # Adiciona parâmetros para garantir que pega todos os dados
         try:
-            last_err = None
-            df = None
             last_err = None
             for sid in sheet_id_candidates:
                 for sh in sheet_name_candidates:
-                    encoded_sheet_name = quote(sh, safe="")
-                    # Tenta com range grande para pegar todas as linhas
-                    sheet_url = f"https://docs.google.com/spreadsheets/d/{sid}/gviz/tq?tqx=out:csv&sheet={encoded_sheet_name}&range=A1:Z10000"
-                    sheet_url_used = sheet_url
                     try:
-                        # IMPORTANTE: header=None inicialmente para não perder a primeira linha
-                        try:
-                            df_try = pd.read_csv(sheet_url, encoding='utf-8', header=None)
-                        except Exception:
-                            try:
-                                df_try = pd.read_csv(sheet_url, encoding='latin-1', header=None)
-                            except Exception:
-                                df_try = pd.read_csv(sheet_url, encoding='iso-8859-1', header=None)
-                        df = df_try
-
-                        # Se o método 1 funcionou mas tem poucas linhas, tenta sem range
-                        if df is not None and len(df) < 2000:
-                            sheet_url2 = f"https://docs.google.com/spreadsheets/d/{sid}/gviz/tq?tqx=out:csv&sheet={encoded_sheet_name}"
-                            try:
-                                df2 = pd.read_csv(sheet_url2, encoding='utf-8', header=None)
-                                if len(df2) > len(df):
-                                    df = df2
-                                    sheet_url_used = sheet_url2
-                            except Exception:
-                                pass
-
+                        linhas_esperadas = contar_linhas_gviz(sid, sh)
+                        # IMPORTANTE: header=None para não perder a primeira linha
+                        if projecao:
+                            # Só as colunas projetadas (SELECT A, B, ...) quando o cabeçalho já é conhecido
+                            df, csv_completo = carregar_csv_projetado(sid, sh, *projecao, linhas_esperadas)
+                        else:
+                            df, csv_completo = carregar_csv_streaming(url_gviz_csv(sid, sh), linhas_esperadas)
                         # sucesso — fixa o ID para os próximos métodos
                         sheet_id_env = sid
                         break
@@ -1186,193 +1444,37 @@ def load_data_from_sheets(sheet_name, force_reload=False):
             # Silencioso: métodos alternativos podem falhar (ex.: 400/404) e isso não deve poluir a UI.
             pass
         
-        # Método 2: Tenta com export direto (pode pegar a primeira aba)
-        if df is None or len(df) < 2000:
-            try:
-                sid = sheet_id_env or (sheet_id_candidates[0] if sheet_id_candidates else "")
-                sheet_url = f"https://docs.google.com/spreadsheets/d/{sid}/export?format=csv&gid=0"
-                sheet_url_used = sheet_url
+        # Export direto (com e sem gid): apenas se o gviz falhou ou veio truncado
+        if df is None or not csv_completo:
+            sid = sheet_id_env or (sheet_id_candidates[0] if sheet_id_candidates else "")
+            for sheet_url in (url_export_csv(sid, gid=0), url_export_csv(sid)):
                 try:
-                    df_temp = pd.read_csv(sheet_url, encoding='utf-8', header=None)
+                    df_temp, _ = carregar_csv_streaming(sheet_url)
                 except Exception:
-                    try:
-                        df_temp = pd.read_csv(sheet_url, encoding='latin-1', header=None)
-                    except Exception:
-                        df_temp = pd.read_csv(sheet_url, encoding='iso-8859-1', header=None)
-
-                if df is None or len(df_temp) > len(df):
+                    # Silencioso: métodos alternativos podem falhar (ex.: 400/404) e isso não deve poluir a UI.
+                    continue
+                # O export pode devolver outra aba (a primeira): só substitui se o cabeçalho for o mesmo
+                # (o do gviz pode ter só as colunas projetadas; células de cabeçalho vazias vêm como NaN)
+                cabecalho_export = df_temp.iloc[0].fillna("").tolist()
+                mesma_aba = df is None or all(nome in cabecalho_export for nome in df.iloc[0].fillna("").tolist())
+                if mesma_aba and (df is None or len(df_temp) > len(df)):
                     df = df_temp
-            except Exception:
-                # Silencioso: métodos alternativos podem falhar (ex.: 400/404) e isso não deve poluir a UI.
-                pass
-        
-        # Método 3: Tenta com export direto sem gid
-        if df is None or len(df) < 2000:
-            try:
-                sid = sheet_id_env or (sheet_id_candidates[0] if sheet_id_candidates else "")
-                sheet_url = f"https://docs.google.com/spreadsheets/d/{sid}/export?format=csv"
-                sheet_url_used = sheet_url
-                try:
-                    df_temp = pd.read_csv(sheet_url, encoding='utf-8', header=None)
-                    if df is None or len(df_temp) > len(df):
-                        df = df_temp
-                except:
-                    try:
-                        df_temp = pd.read_csv(sheet_url, encoding='latin-1', header=None)
-                        if df is None or len(df_temp) > len(df):
-                            df = df_temp
-                    except:
-                        pass
-            except Exception:
-                # Silencioso: métodos alternativos podem falhar (ex.: 400/404) e isso não deve poluir a UI.
-                pass
+                    csv_completo = True
+                    break
         
         # Verifica se conseguiu carregar dados
         if df is None:
             raise Exception("Não foi possível carregar dados de nenhum método")
         
-        # Avisa se parece que faltam dados (apenas para fallback CSV)
-        if len(df) < 2000 and not GSPREAD_AVAILABLE:
+        # Avisa se a contagem da planilha indica que faltam linhas (apenas para fallback CSV)
+        if not csv_completo:
             st.warning(f"⚠️ ATENÇÃO: CSV carregado tem apenas {len(df)} linhas. A planilha pode ter mais linhas. Configure a API do Google Sheets para carregar todos os dados.")
         
-        # CORREÇÃO: Detecta e remove linhas problemáticas (dados concatenados)
-        # O Google Sheets às vezes exporta com a primeira linha tendo todos os dados concatenados
-        linhas_removidas = 0
-        while len(df) > 0 and len(df.columns) > 0:
-            primeira_col_primeira_linha = str(df.iloc[0, 0]) if pd.notna(df.iloc[0, 0]) else ""
-            
-            # Se a primeira coluna tem mais de 200 caracteres e contém "Nome do Ator", está concatenada
-            if len(primeira_col_primeira_linha) > 200 and "Nome do Ator" in primeira_col_primeira_linha:
-                # PROBLEMA: O Google Sheets exportou tudo concatenado nesta linha
-                # Remove essa linha problemática
-                df = df.iloc[1:].reset_index(drop=True)
-                linhas_removidas += 1
-            else:
-                # Não é uma linha concatenada, para de remover
-                break
-        
-        # Agora verifica se as colunas são numéricas (não tinha header) e tenta detectar o header
-        if len(df) > 0:
-            primeira_col = df.columns[0] if len(df.columns) > 0 else None
-            is_numeric_columns = isinstance(primeira_col, (int, np.integer)) or (isinstance(primeira_col, str) and primeira_col.isdigit())
-            
-            if is_numeric_columns:
-                # Colunas são numéricas - precisa detectar o header
-                primeira_linha = df.iloc[0].astype(str).tolist() if len(df) > 0 else []
-                primeira_linha_str = ' '.join(primeira_linha).lower()
-                
-                # Se a primeira linha parece ser um cabeçalho (contém palavras-chave)
-                if any(palavra in primeira_linha_str for palavra in ['nome', 'name', 'categoria', 'category', 'ator', 'actor', 'cidade', 'city']):
-                    # A primeira linha é o cabeçalho - usa ela como nomes das colunas
-                    # Converte para string para evitar problemas com tipos não-string
-                    df.columns = [str(col).strip() if pd.notna(col) else f'Coluna_{i}' for i, col in enumerate(df.iloc[0])]
-                    df = df.iloc[1:].reset_index(drop=True)
-                else:
-                    # Se não parece ser cabeçalho, define nomes padrão
-                    if sheet_name == "Base | Atores MG":
-                        num_cols = len(df.columns)
-                        expected_cols = ['Nome do Ator', 'Categoria', 'Cidade', 'Regiao Sebrae', 'Site', 
-                                       'Descrição Resumida', 'Setor', 'Tags', 'Ano de Fundação', 
-                                       'Tamanho da Equipe', 'Marco Legal', 'Relação com Beta-i']
-                        while len(expected_cols) < num_cols:
-                            expected_cols.append(f'Coluna {len(expected_cols) + 1}')
-                        expected_cols = expected_cols[:num_cols]
-                        df.columns = expected_cols
-        
-        # CORREÇÃO: Verifica se os nomes das colunas estão concatenados com dados
-        # Se a primeira coluna tem um nome muito longo (mais de 50 caracteres), provavelmente está concatenado
-        primeira_col = df.columns[0] if len(df.columns) > 0 else None
-        if primeira_col and len(str(primeira_col)) > 50:
-            # Os nomes das colunas estão concatenados com dados
-            # Para "Base | Atores MG", define os nomes das colunas manualmente
-            if sheet_name == "Base | Atores MG":
-                # Conta quantas colunas temos
-                num_cols = len(df.columns)
-                # Define nomes padrão baseado no número de colunas conhecidas
-                expected_cols = ['Nome do Ator', 'Categoria', 'Cidade', 'Regiao Sebrae', 'Site', 
-                               'Descrição Resumida', 'Setor', 'Tags', 'Ano de Fundação', 
-                               'Tamanho da Equipe', 'Marco Legal', 'Relação com Beta-i']
-                # Se temos mais colunas, adiciona "Coluna X" para as extras
-                while len(expected_cols) < num_cols:
-                    expected_cols.append(f'Coluna {len(expected_cols) + 1}')
-                # Pega apenas as colunas necessárias
-                expected_cols = expected_cols[:num_cols]
-                # Renomeia as colunas
-                df.columns = expected_cols
-                
-                # IMPORTANTE: Verifica se a primeira linha é um cabeçalho duplicado
-                # Mas NÃO remove linhas de dados válidos
-                if len(df) > 0:
-                    primeira_linha = str(df.iloc[0, 0]).lower().strip() if pd.notna(df.iloc[0, 0]) else ""
-                    
-                    # Remove APENAS se for claramente um cabeçalho duplicado
-                    # Critérios muito restritivos para não remover dados válidos
-                    is_cabecalho = (
-                        len(primeira_linha) < 30 and  # Cabeçalhos são curtos
-                        any(palavra in primeira_linha for palavra in ['nome do ator', 'name', 'categoria', 'category']) and
-                        not any(char.isdigit() for char in primeira_linha) and  # Não tem números
-                        len(primeira_linha.split()) <= 3  # Muito poucas palavras
-                    )
-                    
-                    if is_cabecalho:
-                        # Remove apenas a primeira linha (cabeçalho duplicado)
-                        df = df.iloc[1:].reset_index(drop=True)
-        
-        # Remove linhas completamente vazias
-        df = df.dropna(how='all')
-        
-        # Remove espaços dos nomes das colunas (importante!)
-        # IMPORTANTE: Verifica se as colunas ainda são numéricas (não foram nomeadas)
-        if len(df.columns) > 0:
-            primeira_col = df.columns[0]
-            is_numeric_columns = isinstance(primeira_col, (int, np.integer)) or (isinstance(primeira_col, str) and primeira_col.isdigit())
-            
-            if is_numeric_columns:
-                # Colunas ainda são numéricas - define nomes padrão
-                if sheet_name == "Base | Atores MG":
-                    num_cols = len(df.columns)
-                    expected_cols = ['Nome do Ator', 'Categoria', 'Cidade', 'Regiao Sebrae', 'Site', 
-                                   'Descrição Resumida', 'Setor', 'Tags', 'Ano de Fundação', 
-                                   'Tamanho da Equipe', 'Marco Legal', 'Relação com Beta-i']
-                    while len(expected_cols) < num_cols:
-                        expected_cols.append(f'Coluna {len(expected_cols) + 1}')
-                    expected_cols = expected_cols[:num_cols]
-                    df.columns = expected_cols
-                else:
-                    # Para outras abas, apenas converte para string
-                    df.columns = [str(col) if col is not None else f'Coluna_{i}' for i, col in enumerate(df.columns)]
-            else:
-                # Colunas já têm nomes - apenas remove espaços
-                try:
-                    df.columns = [str(col).strip() if col is not None else f'Coluna_{i}' for i, col in enumerate(df.columns)]
-                except Exception:
-                    # Se houver erro, apenas converte para string sem strip
-                    df.columns = [str(col) if col is not None else f'Coluna_{i}' for i, col in enumerate(df.columns)]
-        
-        # Remove linhas onde a primeira coluna está vazia (NaN ou string vazia)
-        # IMPORTANTE: Seja conservador - só remove se realmente estiver vazio
-        if len(df) > 0 and len(df.columns) > 0:
-            primeira_col = df.columns[0]
-            if primeira_col in df.columns:
-                # Remove APENAS linhas onde a primeira coluna é NaN OU string completamente vazia
-                mask = df[primeira_col].notna() & (df[primeira_col].astype(str).str.strip() != '')
-                df = df[mask]
-                
-                # Remove APENAS linhas que são claramente cabeçalhos duplicados (match exato)
-                # Não remove se tiver qualquer outro conteúdo
-                df = df[~df[primeira_col].astype(str).str.strip().str.lower().isin([
-                    'name', 'nome', 'nome do ator', 'categoria', 'category'
-                ])]
-                
-                # NÃO remove linhas longas - podem ser nomes válidos de empresas/atores
-                # Apenas remove se for claramente dados concatenados (muito longo E sem espaços)
-                # Mas isso é raro, então vamos ser muito conservadores
-                # df = df[
-                #     (df[primeira_col].astype(str).str.len() < 200) | 
-                #     (df[primeira_col].astype(str).str.contains(r'\s', na=False, regex=True))  # Tem espaços = provavelmente válido
-                # ]
-        
-        return df
+        # Cabeçalho e linhas-lixo (dados concatenados, cabeçalhos repetidos, linhas vazias)
+        # tratados em uma única passada vetorizada (ver data_cleaning.py)
+        # Projeção depois da limpeza: o export (e o cabeçalho recuperado) traz a aba inteira
+        nomes_padrao = COLUNAS_BASE_ATORES if sheet_name == "Base | Atores MG" else None
+        return _projetar_colunas(limpar_dados_planilha(df, nomes_padrao), projecao)
     except Exception as e:
         st.error(f"Erro ao carregar dados: {str(e)}")
         import traceback
@@ -1380,7 +1482,8 @@ def load_data_from_sheets(sheet_name, force_reload=False):
         return pd.DataFrame()
 
 
-@st.cache_data(ttl=300)  # Cache por 5 minutos para permitir atualizações
+@carga_unica(pd.DataFrame)
+@com_ultima_versao(profiling.cache_instrumentado(st.cache_data(ttl=300)))  # Cache por 5 minutos para permitir atualizações
 def load_data_municipios_regioes(force_reload=False):
     """
     Carrega dados da aba "Municipios e Regioes" para o mapa.
@@ -1388,23 +1491,48 @@ def load_data_municipios_regioes(force_reload=False):
     """
     try:
         import os as os_module
-        from urllib.parse import quote as _quote
 
         sheet_id = os_module.getenv("GOOGLE_SHEET_ID") or os_module.getenv("SHEET_ID") or "104LamJgsPmwAldSBUOSsAHfXo4m356by44VnGgk2avk"
         sheet_name = "Municipios e Regioes"
-        encoded_sheet_name = _quote(sheet_name, safe="")
 
-        # CSV direto da aba (valores calculados já vêm no CSV)
-        sheet_url = f"https://docs.google.com/spreadsheets/d/{sheet_id}/gviz/tq?tqx=out:csv&sheet={encoded_sheet_name}&range=A1:Z5000"
+        # Com o disjuntor aberto, falha sem ir à rede
+        csv = circuit_breaker.fonte("sheets_csv")
 
-        # Tenta diferentes encodings (Windows/acentos)
-        try:
-            df = pd.read_csv(sheet_url, encoding="utf-8")
-        except Exception:
-            try:
-                df = pd.read_csv(sheet_url, encoding="latin-1")
-            except Exception:
-                df = pd.read_csv(sheet_url, encoding="iso-8859-1")
+        def ler(largura):
+            # CSV direto da aba (valores calculados já vêm no CSV), colunas A até a de índice largura-1
+            sheet_url = url_gviz_csv(sheet_id, sheet_name, intervalo=f"A1:{sheet_projection.letra_coluna(largura - 1)}5000")
+            # Outro encoding (Windows/acentos) só se o conteúdo não decodificou: erros de rede,
+            # HTTP e do disjuntor saem na primeira tentativa (cada uma gasta cota e conta falha)
+            for encoding in ENCODINGS_CSV:
+                try:
+                    return csv.chamar(pd.read_csv, sheet_url, encoding=encoding)
+                except (UnicodeDecodeError, pd.errors.ParserError) as e:
+                    ultimo_erro = e
+            raise ultimo_erro
+
+        # Com o cabeçalho já conhecido (guardado na carga anterior), só até a última coluna dele
+        # mais uma, para perceber uma coluna nova no fim
+        cabecalho = cabecalho_em_cache(sheet_id, sheet_name) or None
+        df = ler(len(cabecalho) + 1 if cabecalho else 26)
+        if cabecalho is not None:
+            extras = df.columns[len(cabecalho):]
+            mudou = (
+                len(df.columns) < len(cabecalho)
+                or any(not str(col).startswith("Unnamed:") for col in extras)
+                or any(str(nome).strip() and str(nome).strip() != str(col).strip() for nome, col in zip(cabecalho, df.columns))
+            )
+            if mudou:
+                # A aba mudou (ex.: coluna nova): relê a aba até Z
+                df = ler(26)
+            else:
+                df = df.iloc[:, :len(cabecalho)]
+        if cabecalho is None or mudou:
+            # Cabeçalho lido agora: guarda (a validade conta a partir desta leitura).
+            # Colunas sem nome no fim (vazias, vindas do intervalo até Z) não contam na largura
+            nomes = [str(c).strip() if not str(c).startswith("Unnamed:") else "" for c in df.columns]
+            while nomes and not nomes[-1]:
+                nomes.pop()
+            guardar_cabecalho(sheet_id, sheet_name, nomes)
 
         # Remove linhas completamente vazias
         df = df.dropna(how="all")
@@ -1416,25 +1544,171 @@ def load_data_municipios_regioes(force_reload=False):
         return pd.DataFrame()
 
 
-@st.cache_data(ttl=300)  # Cache por 5 minutos para permitir atualizações
+@carga_unica(pd.DataFrame)
+@profiling.cache_instrumentado(st.cache_data(ttl=300))  # Cache por 5 minutos para permitir atualizações
 def load_data_base_atores(force_reload=False):
     """
     Carrega dados da aba "Base | Atores MG" para a tabela de startups
+    (só as colunas usadas pelas visões, ver COLUNAS_VISOES_ATORES)
+    """
+    return load_data_from_sheets("Base | Atores MG", force_reload, PROJECAO_ATORES)
+
+
+# Abas usadas pelo dashboard (chave interna -> nome da aba na planilha)
+ABAS_DASHBOARD = {
+    "municipios_regioes": "Municipios e Regioes",
+    "base_atores": "Base | Atores MG",
+}
+
+# Nomes (exatos) da coluna de descrição que a tabela exibe, se a aba tiver (create_data_table)
+COLUNAS_DESCRICAO_TABELA = ['description', 'descrição', 'descricao']
+
+
+@st.cache_data(ttl=300, show_spinner=False)
+def load_cabecalho_atores():
+    """
+    Nomes das colunas da aba de atores. Depois da carga principal o cabeçalho já está
+    em memória (cliente da API ou sheets_csv), sem nova requisição.
     """
-    return load_data_from_sheets("Base | Atores MG", force_reload)
+    sheet_name = ABAS_DASHBOARD["base_atores"]
+    credentials_path = os.getenv('GOOGLE_APPLICATION_CREDENTIALS', 'credentials.json')
+    if GSPREAD_AVAILABLE and api_disponivel(credentials_path):
+        try:
+            return obter_cliente_sheets(credentials_path, _sheet_id_candidates()).cabecalho(sheet_name)
+        except Exception:
+            pass  # Silenciosamente usa o gviz
+    for sheet_id in _sheet_id_candidates():
+        cabecalho = cabecalho_gviz(sheet_id, sheet_name)
+        if cabecalho:
+            return cabecalho
+    return []
+
+
+@carga_unica(pd.DataFrame)
+@profiling.cache_instrumentado(st.cache_data(ttl=300))  # Cache por 5 minutos para permitir atualizações
+def load_colunas_pesadas_atores(colunas, force_reload=False):
+    """Primeira coluna (nome do ator) e as colunas pesadas `colunas` da aba de atores."""
+    return load_data_from_sheets.__wrapped__(ABAS_DASHBOARD["base_atores"], projecao=(tuple(colunas), ()))
 
 
-@st.cache_data
+def completar_colunas_pesadas(df_atores, nomes):
+    """
+    Acrescenta a df_atores as colunas pesadas (COLUNAS_PESADAS_ATORES, fora da carga
+    principal) cujo nome está em `nomes`. Elas são lidas na primeira vez que uma visão
+    pede e ficam no cache; se a aba não tem nenhuma, nada é requisitado.
+    """
+    if df_atores.empty:
+        return df_atores
+    nomes = {sheet_projection.normalizar(nome) for nome in nomes}
+    pesadas = tuple(
+        col for col in load_cabecalho_atores()
+        if sheet_projection.normalizar(col) in nomes and col not in df_atores.columns
+        and any(termo in sheet_projection.normalizar(col) for termo in COLUNAS_PESADAS_ATORES)
+    )
+    if not pesadas:
+        return df_atores
+    df_pesadas = load_colunas_pesadas_atores(pesadas)
+    if df_pesadas.empty or not all(col in df_pesadas.columns for col in pesadas):
+        return df_atores
+
+    # Mesmas linhas na mesma ordem (caso comum): junta por posição; senão, pelo nome do ator
+    chave_atores, chave_pesadas = df_atores.iloc[:, 0], df_pesadas.iloc[:, 0]
+    if len(df_pesadas) == len(df_atores) and (chave_pesadas.to_numpy() == chave_atores.to_numpy()).all():
+        extra = df_pesadas[list(pesadas)]
+    else:
+        extra = (
+            df_pesadas.drop_duplicates(subset=df_pesadas.columns[0])
+            .set_index(df_pesadas.columns[0])[list(pesadas)]
+            .reindex(chave_atores.to_numpy())
+        )
+    return pd.concat([df_atores, extra.set_axis(df_atores.index)], axis=1)
+
+
+def _em_paralelo(*funcoes):
+    """
+    Executa as funções (sem argumentos) ao mesmo tempo, uma por thread, e devolve os
+    resultados na ordem. As threads usam o contexto do rerun atual (se houver), para os
+    avisos e erros dos carregadores aparecerem na página como na thread do script.
+    """
+    try:
+        from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+        ctx = get_script_run_ctx(suppress_warning=True)
+    except ImportError:
+        ctx = None
+
+    def executar(funcao):
+        if ctx is not None:
+            add_script_run_ctx(threading.current_thread(), ctx)
+        return funcao()
+
+    with ThreadPoolExecutor(max_workers=len(funcoes), thread_name_prefix="carga") as pool:
+        futuros = [pool.submit(executar, funcao) for funcao in funcoes]
+        return [futuro.result() for futuro in futuros]
+
+
+@carga_unica(dict)
+@com_ultima_versao(profiling.cache_instrumentado(st.cache_data(ttl=300)), valido=_planilhas_validas)  # Cache por 5 minutos para permitir atualizações
+def load_planilhas_dashboard(force_reload=False):
+    """
+    Carrega todas as abas do dashboard (ABAS_DASHBOARD) de uma vez.
+    Com a API do Google Sheets configurada, faz uma única requisição values:batchGet
+    (UNFORMATTED_VALUE) e separa a resposta por aba; sem a API, ou se ela falhar,
+    carrega cada aba pelo caminho de sempre (CSV), as duas em paralelo. Da aba de atores
+    vêm só as colunas usadas pelas visões (PROJECAO_ATORES).
+    Retorna {chave: DataFrame}.
+    """
+    if GSPREAD_AVAILABLE:
+        credentials_path = os.getenv('GOOGLE_APPLICATION_CREDENTIALS', 'credentials.json')
+        if api_disponivel(credentials_path):
+            try:
+                cliente = obter_cliente_sheets(credentials_path, _sheet_id_candidates())
+                matrizes = cliente.valores_em_lote(
+                    list(ABAS_DASHBOARD.values()), {ABAS_DASHBOARD["base_atores"]: PROJECAO_ATORES}
+                )
+                planilhas = {}
+                for chave, valores in zip(ABAS_DASHBOARD, matrizes):
+                    if len(valores) == 0:
+                        raise Exception(f"Aba '{ABAS_DASHBOARD[chave]}' vazia")
+                    if chave == "municipios_regioes":
+                        # Mesmo formato do CSV usado pelo mapa (vazios = NaN, colunas numéricas)
+                        planilhas[chave] = _dataframe_de_valores(valores, vazios_como_nan=True, exigir_primeira_coluna=False)
+                    else:
+                        planilhas[chave] = _dataframe_de_valores(valores)
+                return planilhas
+            except Exception:
+                pass  # Silenciosamente usa o carregamento por aba
+
+    # Fallback por aba: funções originais sem o cache delas (este carregador já é cacheado),
+    # as duas abas ao mesmo tempo
+    df_municipios, df_atores = _em_paralelo(
+        load_data_municipios_regioes.__wrapped__,
+        lambda: load_data_from_sheets.__wrapped__(ABAS_DASHBOARD["base_atores"], projecao=PROJECAO_ATORES),
+    )
+    return {"municipios_regioes": df_municipios, "base_atores": df_atores}
+
+
+@carga_unica()
+@com_ultima_versao(profiling.cache_instrumentado(st.cache_data))
 def load_geojson_mg():
     """
-    Carrega GeoJSON dos municípios de Minas Gerais.
+    Carrega GeoJSON dos municípios de Minas Gerais no armazenamento compacto
+    (geometry_store.GeometriaCompacta): códigos IBGE, limites e vértices quantizados
+    são preparados aqui, na carga; o GeoJSON é reconstruído só sob demanda.
     """
+    # Fonte local (DASHBOARD_GEOJSON_PATH)
+    if CAMINHO_GEOJSON_LOCAL:
+        try:
+            with open(CAMINHO_GEOJSON_LOCAL, encoding="utf-8") as arquivo:
+                return GeometriaCompacta.de_geojson(json.load(arquivo))
+        except Exception:
+            pass
+
     # Fonte principal (repositório geodata-br)
     try:
         url_geojson = "https://raw.githubusercontent.com/tbrugz/geodata-br/master/geojson/geojs-31-mun.json"
-        response = requests.get(url_geojson, timeout=30)
+        response = circuit_breaker.fonte("geojson").chamar(requests.get, url_geojson, timeout=30)
         if response.status_code == 200:
-            return response.json()
+            return GeometriaCompacta.de_geojson(response.json())
     except Exception:
         pass
 
@@ -1444,24 +1718,28 @@ def load_geojson_mg():
             "https://servicodados.ibge.gov.br/api/v3/malhas/municipios/31"
             "?formato=application/vnd.geo+json&qualidade=intermediaria"
         )
-        response = requests.get(url_geojson, timeout=30)
+        response = circuit_breaker.fonte("geojson_ibge").chamar(requests.get, url_geojson, timeout=30)
         if response.status_code == 200:
-            return response.json()
+            return GeometriaCompacta.de_geojson(response.json())
     except Exception:
         pass
 
     return None
 
 
-@st.cache_data(ttl=3600)  # Cache por 1 hora (dados raramente mudam)
+@carga_unica(lambda: pd.DataFrame(columns=['codigo_ibge', 'nome', 'latitude', 'longitude']))
+@com_ultima_versao(profiling.cache_instrumentado(st.cache_data(ttl=3600)))  # Cache por 1 hora (dados raramente mudam)
 def load_municipios_com_coordenadas():
     """
     Carrega dados de municípios de MG com latitude e longitude de fonte pública.
     """
     try:
-        # Fonte: repositório kelvins/municipios-brasileiros no GitHub
+        # Fonte: repositório kelvins/municipios-brasileiros no GitHub (ou cópia local)
         url_municipios = "https://raw.githubusercontent.com/kelvins/municipios-brasileiros/main/csv/municipios.csv"
-        df_municipios = pd.read_csv(url_municipios)
+        if CAMINHO_COORDENADAS_LOCAL:
+            df_municipios = pd.read_csv(CAMINHO_COORDENADAS_LOCAL)
+        else:
+            df_municipios = circuit_breaker.fonte("coordenadas").chamar(pd.read_csv, url_municipios)
         
         # Filtra apenas Minas Gerais (código UF = 31)
         df_mg = df_municipios[df_municipios['codigo_uf'] == 31].copy()
@@ -1508,6 +1786,286 @@ def load_municipios_com_coordenadas():
         # Retorna DataFrame vazio se não conseguir carregar
         return pd.DataFrame(columns=['codigo_ibge', 'nome', 'latitude', 'longitude'])
 
+
+@st.cache_resource(show_spinner=False)
+def obter_agendador_atualizacao():
+    """
+    Agendador único por processo (compartilhado entre sessões) que recarrega as planilhas,
+    o GeoJSON e as coordenadas em segundo plano. Usa as funções originais, sem o st.cache_data.
+    """
+    compartilhado = obter_dados_compartilhados()
+
+    def publicar_compartilhado(nome, valor):
+        # Só o processo publicador grava; se outro assumiu, este apenas serve a sua versão
+        if compartilhado is not None and compartilhado.publicador():
+            compartilhado.publicar(nome, valor)
+
+    agendador = BackgroundRefresher(ao_publicar=publicar_compartilhado)
+    agendador.registrar(
+        "planilhas",
+        load_planilhas_dashboard.__wrapped__,
+        INTERVALO_ATUALIZACAO,
+        valido=_planilhas_validas,
+    )
+    agendador.registrar("geojson_mg", load_geojson_mg.__wrapped__, INTERVALO_ATUALIZACAO_GEO)
+    agendador.registrar("municipios_coordenadas", load_municipios_com_coordenadas.__wrapped__, INTERVALO_ATUALIZACAO_GEO)
+    agendador.iniciar()
+    return agendador
+
+
+@st.cache_resource(show_spinner=False)
+def obter_dados_compartilhados():
+    """
+    Dados compartilhados entre os processos do app (shared_dataset.DatasetCompartilhado), um
+    por processo. None se DASHBOARD_SHARED_DATA_DIR não foi definido, sem o agendador ou sem pyarrow.
+    """
+    if not DIRETORIO_DADOS_COMPARTILHADOS or INTERVALO_ATUALIZACAO <= 0 or not shared_dataset.disponivel():
+        return None
+    try:
+        return shared_dataset.DatasetCompartilhado(DIRETORIO_DADOS_COMPARTILHADOS)
+    except OSError:
+        return None
+
+
+def _processo_leitor():
+    """Dados compartilhados do processo, se ele só lê o que outro processo publica; senão None."""
+    compartilhado = obter_dados_compartilhados()
+    if compartilhado is None or compartilhado.publicador():
+        return None
+    return compartilhado
+
+
+def obter_dados(nome, carregador_cacheado):
+    """
+    Retorna a versão mais recente da fonte publicada pelo agendador, sem esperar pela rede
+    (só a primeira carga do processo bloqueia). Com o agendador desligado, usa o carregador
+    com st.cache_data. Num processo leitor dos dados compartilhados, usa a versão mapeada do
+    diretório compartilhado (ou o carregador com cache, enquanto nada foi publicado).
+    """
+    if INTERVALO_ATUALIZACAO <= 0:
+        return carregador_cacheado()
+    compartilhado = _processo_leitor()
+    if compartilhado is not None:
+        with profiling.medir(f"compartilhado:{nome}"):
+            valor = compartilhado.obter(nome)
+        return valor if valor is not None else carregador_cacheado()
+    with profiling.medir(f"agendador:{nome}"):
+        return obter_agendador_atualizacao().obter(nome)
+
+
+@st.cache_resource(show_spinner=False)
+def _cargas_antecipadas():
+    """Pool e cargas antecipadas do processo (fonte -> Future), ver antecipar_cargas()."""
+    return {
+        "pool": ThreadPoolExecutor(max_workers=4, thread_name_prefix="carga-antecipada"),
+        "cargas": {},
+        "lock": threading.Lock(),
+    }
+
+
+def antecipar_cargas(*fontes):
+    """
+    Dispara em segundo plano, uma vez por processo, a carga de fontes (nome, carregador) que
+    o rerun só vai usar mais adiante, para que corram junto com a das planilhas em vez de
+    uma depois da outra. Quem pede a fonte depois (obter_dados) espera pela carga em
+    andamento (agendador ou carga_unica) em vez de repeti-la. Uma carga antecipada que
+    falha (exceção ou dados vazios) é descartada, e o próximo rerun a antecipa de novo.
+    """
+    estado = _cargas_antecipadas()
+
+    def ao_terminar(nome, carga):
+        erro = carga.exception()
+        if erro is None and resultado_valido(carga.result()):
+            return
+        with estado["lock"]:
+            if estado["cargas"].get(nome) is carga:
+                del estado["cargas"][nome]
+        if erro is not None:
+            logger.warning("carga antecipada de %s falhou: %s", nome, erro)
+
+    novas = {}
+    with estado["lock"]:
+        for nome, carregador in fontes:
+            if nome not in estado["cargas"]:
+                novas[nome] = estado["cargas"][nome] = estado["pool"].submit(obter_dados, nome, carregador)
+    # Fora do lock: se a carga já terminou, o callback roda aqui mesmo e precisa dele
+    for nome, carga in novas.items():
+        carga.add_done_callback(functools.partial(ao_terminar, nome))
+
+
+def versoes_dados(*nomes):
+    """Versões atuais das fontes (agendador ou dados compartilhados); None com o agendador desligado."""
+    if INTERVALO_ATUALIZACAO <= 0:
+        return None
+    compartilhado = _processo_leitor()
+    if compartilhado is not None:
+        return tuple(compartilhado.versao(nome) for nome in nomes)
+    status = obter_agendador_atualizacao().status()
+    return tuple(status[nome]["versao"] for nome in nomes)
+
+
+def obter_planilha(chave):
+    """DataFrame de uma das abas do dashboard (chaves de ABAS_DASHBOARD)."""
+    return obter_dados("planilhas", load_planilhas_dashboard).get(chave, pd.DataFrame())
+
+
+def exibir_grafico(nome, fig, **kwargs):
+    """
+    st.plotly_chart com perfil: mede o envio (serialização incluída) e, com o perfil
+    ligado, registra o tamanho do JSON da figura em bytes com o nome do gráfico.
+    """
+    with profiling.medir(f"plotly_chart:{nome}"):
+        resultado = st.plotly_chart(fig, **kwargs)
+    if profiling.ativo():
+        # Serializa de novo só para medir (fora do tempo do gráfico)
+        profiling.registrar_payload(nome, len(pio.to_json(fig, validate=False)))
+    return resultado
+
+
+@st.cache_data(ttl=300, max_entries=4, show_spinner=False)
+def _relatorio_qualidade_cacheado(versoes, _planilhas, _geojson):
+    """
+    Relatório de qualidade calculado uma vez por versão dos dados: `versoes` (versões
+    publicadas pelo agendador) é a chave do cache; os dados (prefixo _) não são hasheados.
+    Com o agendador desligado, `versoes` é None e o relatório segue o TTL das planilhas.
+    """
+    return gerar_relatorio_qualidade(
+        _planilhas.get("municipios_regioes"),
+        _planilhas.get("base_atores"),
+        _geojson,
+        categorias_conhecidas=list(CATEGORIA_COLORS),
+    )
+
+
+def obter_relatorio_qualidade():
+    """Relatório de qualidade da versão atual das planilhas e do GeoJSON (ver data_quality.py)."""
+    planilhas = obter_dados("planilhas", load_planilhas_dashboard)
+    geojson = obter_dados("geojson_mg", load_geojson_mg)
+    return _relatorio_qualidade_cacheado(versoes_dados("planilhas", "geojson_mg"), planilhas, geojson)
+
+
+def render_relatorio_qualidade():
+    """Resumo do relatório de qualidade na sidebar (apenas leitura do relatório em cache)."""
+    relatorio = obter_relatorio_qualidade()
+    rotulos = {
+        "codigos_ibge_sem_geojson": "Códigos IBGE sem município no GeoJSON",
+        "categorias_desconhecidas": "Categorias desconhecidas",
+        "anos_invalidos": "Anos de fundação inválidos",
+        "atores_duplicados": "Atores duplicados",
+    }
+    with st.sidebar.expander("🩺 Qualidade dos dados"):
+        st.caption(f"Gerado em {relatorio['gerado_em']}")
+        for problema, rotulo in rotulos.items():
+            total = relatorio["resumo"].get(problema, 0)
+            st.markdown(f"**{rotulo}:** {total}")
+            if relatorio.get(problema):
+                st.dataframe(pd.DataFrame(relatorio[problema]), hide_index=True, use_container_width=True)
+        for aviso in relatorio["avisos"]:
+            st.caption(f"⚠️ {aviso}")
+
+
+def render_painel_perfil(registro):
+    """
+    Painel "⏱️ Perfil do rerun" na sidebar: tempos do rerun atual (até este ponto),
+    acertos de cache dos carregadores, payload dos gráficos e os últimos reruns
+    registrados (inclusive de fragmentos).
+    """
+    dados = registro.como_dict()
+    with st.sidebar.expander("⏱️ Perfil do rerun"):
+        st.caption(f"Rerun de {dados['quando']}: {dados['total_ms']:.0f} ms até o painel")
+        if dados["tempos"]:
+            tempos = pd.DataFrame(
+                [(nome, t["ms"], t["chamadas"]) for nome, t in dados["tempos"].items()],
+                columns=["Trecho", "ms", "Chamadas"],
+            ).sort_values("ms", ascending=False)
+            st.dataframe(tempos, hide_index=True, use_container_width=True)
+        cache = profiling.resumo_cache()
+        if cache:
+            st.markdown("**Cache dos carregadores** (rerun / processo)")
+            st.dataframe(pd.DataFrame([
+                {
+                    "Carregador": nome,
+                    "Acertos": f"{dados['cache'].get(nome, {}).get('acertos', 0)} / {total['acertos']}",
+                    "Falhas": f"{dados['cache'].get(nome, {}).get('falhas', 0)} / {total['falhas']}",
+                }
+                for nome, total in cache.items()
+            ]), hide_index=True, use_container_width=True)
+        cargas = single_flight.status()
+        if cargas:
+            st.markdown("**Cargas coalescidas** (processo)")
+            st.dataframe(pd.DataFrame([
+                {
+                    "Carregador": nome,
+                    "Execuções": c["execucoes"],
+                    "Compartilhadas": c["compartilhadas"],
+                    "Erros": c["erros"],
+                    "Esgotadas": c["esgotadas"],
+                    "Em andamento": c["em_andamento"],
+                }
+                for nome, c in cargas.items()
+            ]), hide_index=True, use_container_width=True)
+        fontes = circuit_breaker.status()
+        if fontes:
+            st.markdown("**Fontes externas** (limite e disjuntor)")
+            st.dataframe(pd.DataFrame([
+                {
+                    "Fonte": nome,
+                    "Estado": f["estado"] + (f" ({f['reabre_em_s']:.0f} s)" if f["reabre_em_s"] else ""),
+                    "Requisições": f["requisicoes"],
+                    "Falhas": f["falhas"],
+                    "Barradas": f["rejeitadas_circuito"] + f["rejeitadas_limite"],
+                    "Espera (s)": f["espera_limite_s"],
+                    "Último erro": f["ultimo_erro"] or "",
+                }
+                for nome, f in fontes.items()
+            ]), hide_index=True, use_container_width=True)
+        if dados["payloads"]:
+            st.markdown("**Payload por gráfico/tabela**")
+            st.dataframe(pd.DataFrame(
+                [(nome, round(n_bytes / 1024, 1)) for nome, n_bytes in dados["payloads"].items()],
+                columns=["Elemento", "KB"],
+            ), hide_index=True, use_container_width=True)
+        if session_memory.ativo():
+            render_memoria_sessoes()
+        anteriores = profiling.historico()[-10:]
+        if anteriores:
+            st.markdown("**Reruns anteriores**")
+            st.dataframe(pd.DataFrame(
+                [(r["quando"], r["tipo"], r["total_ms"]) for r in reversed(anteriores)],
+                columns=["Quando", "Tipo", "ms"],
+            ), hide_index=True, use_container_width=True)
+
+
+def render_memoria_sessoes():
+    """Memória do processo, da sessão atual (até o rerun anterior) e dos caches, no painel do perfil."""
+    memoria = session_memory.resumo()
+    st.markdown("**Memória**")
+    linhas = [f"{len(memoria['sessoes'])} sessão(ões) contabilizada(s)"]
+    if memoria["rss_mb"] is not None:
+        orcamento = f" de {memoria['orcamento_mb']} MB" if memoria["orcamento_mb"] else ""
+        linhas.append(f"RSS {memoria['rss_mb']:.0f} MB{orcamento}")
+    if memoria["tracemalloc_mb"] is not None:
+        linhas.append(f"tracemalloc {memoria['tracemalloc_mb']:.1f} MB")
+    eventos = memoria["eventos"]
+    if eventos["sessoes_despejadas"] or eventos["caches_descartados"]:
+        linhas.append(f"{eventos['sessoes_despejadas']} sessões despejadas, {eventos['caches_descartados']} caches descartados")
+    st.caption(" · ".join(linhas))
+    sessao = session_memory.sessao_atual()
+    if sessao:
+        retido = f", retido no rerun: {sessao['retido_rerun'] / 1024:.0f} KB" if "retido_rerun" in sessao else ""
+        st.caption(f"Esta sessão: session_state {sessao['bytes_estado'] / 1024:.0f} KB{retido}")
+        st.dataframe(pd.DataFrame(
+            [(chave, round(n_bytes / 1024, 1)) for chave, n_bytes in sessao["chaves"]],
+            columns=["Chave", "KB"],
+        ), hide_index=True, use_container_width=True)
+    caches = {nome: n_bytes for nome, n_bytes in memoria["caches"].items() if n_bytes}
+    if caches:
+        st.dataframe(pd.DataFrame(
+            sorted(((nome, round(n_bytes / 1024, 1)) for nome, n_bytes in caches.items()), key=lambda item: -item[1]),
+            columns=["Cache", "KB"],
+        ), hide_index=True, use_container_width=True)
+
+
 def create_overview_metrics(df):
     """
     Cria métricas principais do dashboard em formato de cards
@@ -1616,6 +2174,47 @@ def create_overview_metrics(df):
         </div>
         """, unsafe_allow_html=True)
 
+@st.cache_data(show_spinner=False)
+def _build_sector_figures(sector_series):
+    """
+    Monta os gráficos da análise por setores.
+    Cacheado pelo conteúdo da coluna de setor: só recalcula quando os dados mudam.
+    """
+    # Top setores (remove NaN)
+    sector_counts = sector_series.dropna().value_counts().head(10)
+    
+    fig_top = px.bar(
+        x=sector_counts.values,
+        y=sector_counts.index,
+        orientation='h',
+        title="Top 10 Setores",
+        color=sector_counts.values,
+        color_continuous_scale=[[0, SEBRAE_AZUL_CLARO], [1, SEBRAE_AZUL]]
+    )
+    fig_top.update_layout(
+        plot_bgcolor='white',
+        paper_bgcolor='white',
+        font=dict(color=SEBRAE_CINZA_ESCURO)
+    )
+    fig_top.update_layout(yaxis={'categoryorder':'total ascending'})
+    
+    # Distribuição por setores (remove NaN)
+    sector_counts_all = sector_series.dropna().value_counts()
+    
+    fig_pizza = px.pie(
+        values=sector_counts_all.values,
+        names=sector_counts_all.index,
+        title="Distribuição por Setores",
+        color_discrete_sequence=SEBRAE_COLOR_PALETTE
+    )
+    fig_pizza.update_traces(textposition='inside', textinfo='percent+label')
+    fig_pizza.update_layout(
+        plot_bgcolor='white',
+        paper_bgcolor='white',
+        font=dict(color=SEBRAE_CINZA_ESCURO)
+    )
+    return fig_top, fig_pizza
+
 def create_sector_analysis(df):
     """
     Cria análise por setores
@@ -1624,49 +2223,67 @@ def create_sector_analysis(df):
     
     if 'sector' in df.columns:
         col1, col2 = st.columns(2)
+        fig_top, fig_pizza = _build_sector_figures(df['sector'])
         
         with col1:
-            # Top setores (remove NaN)
-            sector_counts = df['sector'].dropna().value_counts().head(10)
-            
-            # Cores Sebrae para o gráfico
-            colors_sebrae = [SEBRAE_AZUL, SEBRAE_AZUL_CLARO, SEBRAE_VERDE, SEBRAE_LARANJA, SEBRAE_AMARELO]
-            fig = px.bar(
-                x=sector_counts.values,
-                y=sector_counts.index,
-                orientation='h',
-                title="Top 10 Setores",
-                color=sector_counts.values,
-                color_continuous_scale=[[0, SEBRAE_AZUL_CLARO], [1, SEBRAE_AZUL]]
-            )
-            fig.update_layout(
-                plot_bgcolor='white',
-                paper_bgcolor='white',
-                font=dict(color=SEBRAE_CINZA_ESCURO)
-            )
-            fig.update_layout(yaxis={'categoryorder':'total ascending'})
-            st.plotly_chart(fig, use_container_width=True)
+            exibir_grafico("setores_top", fig_top, use_container_width=True)
         
         with col2:
-            # Distribuição por setores (remove NaN)
-            sector_counts_all = df['sector'].dropna().value_counts()
-            
-            fig = px.pie(
-                values=sector_counts_all.values,
-                names=sector_counts_all.index,
-                title="Distribuição por Setores",
-                color_discrete_sequence=SEBRAE_COLOR_PALETTE
-            )
-            fig.update_traces(textposition='inside', textinfo='percent+label')
-            fig.update_layout(
-                plot_bgcolor='white',
-                paper_bgcolor='white',
-                font=dict(color=SEBRAE_CINZA_ESCURO)
-            )
-            st.plotly_chart(fig, use_container_width=True)
+            exibir_grafico("setores_pizza", fig_pizza, use_container_width=True)
     else:
         st.info("Coluna 'sector' não encontrada nos dados")
 
+@st.cache_data(show_spinner=False)
+def _build_temporal_figures(foundation_years):
+    """
+    Monta os gráficos da análise temporal.
+    Cacheado pelo conteúdo da coluna de ano de fundação: só recalcula quando os dados mudam.
+    """
+    # Limpa dados de ano de fundação
+    anos = pd.to_numeric(foundation_years, errors='coerce')
+    anos = anos[anos.notna()]
+    anos = anos[anos >= 2000]  # Filtra anos razoáveis
+    
+    # Startups por ano
+    yearly_counts = anos.value_counts().sort_index()
+    
+    fig_anual = px.line(
+        x=yearly_counts.index,
+        y=yearly_counts.values,
+        title="Startups Fundadas por Ano",
+        markers=True,
+        color_discrete_sequence=[SEBRAE_AZUL]
+    )
+    fig_anual.update_layout(
+        xaxis_title="Ano", 
+        yaxis_title="Número de Startups",
+        plot_bgcolor='white',
+        paper_bgcolor='white',
+        font=dict(color=SEBRAE_CINZA_ESCURO)
+    )
+    fig_anual.update_traces(line=dict(width=3), marker=dict(size=8, color=SEBRAE_AZUL))
+    
+    # Acumulado por ano
+    yearly_counts_sorted = yearly_counts.sort_index()
+    cumulative = yearly_counts_sorted.cumsum()
+    
+    fig_acumulado = px.line(
+        x=cumulative.index,
+        y=cumulative.values,
+        title="Acumulado de Startups por Ano",
+        markers=True,
+        color_discrete_sequence=[SEBRAE_VERDE]
+    )
+    fig_acumulado.update_layout(
+        xaxis_title="Ano", 
+        yaxis_title="Total Acumulado",
+        plot_bgcolor='white',
+        paper_bgcolor='white',
+        font=dict(color=SEBRAE_CINZA_ESCURO)
+    )
+    fig_acumulado.update_traces(line=dict(width=3), marker=dict(size=8, color=SEBRAE_VERDE))
+    return fig_anual, fig_acumulado
+
 def create_temporal_analysis(df):
     """
     Cria análise temporal
@@ -1674,56 +2291,14 @@ def create_temporal_analysis(df):
     st.header("📈 Análise Temporal")
     
     if 'foundationYear' in df.columns:
-        # Limpa dados de ano de fundação
-        df_clean = df.copy()
-        df_clean['foundationYear'] = pd.to_numeric(df_clean['foundationYear'], errors='coerce')
-        df_clean = df_clean[df_clean['foundationYear'].notna()]
-        df_clean = df_clean[df_clean['foundationYear'] >= 2000]  # Filtra anos razoáveis
-        
         col1, col2 = st.columns(2)
+        fig_anual, fig_acumulado = _build_temporal_figures(df['foundationYear'])
         
         with col1:
-            # Startups por ano
-            yearly_counts = df_clean['foundationYear'].value_counts().sort_index()
-            
-            fig = px.line(
-                x=yearly_counts.index,
-                y=yearly_counts.values,
-                title="Startups Fundadas por Ano",
-                markers=True,
-                color_discrete_sequence=[SEBRAE_AZUL]
-            )
-            fig.update_layout(
-                xaxis_title="Ano", 
-                yaxis_title="Número de Startups",
-                plot_bgcolor='white',
-                paper_bgcolor='white',
-                font=dict(color=SEBRAE_CINZA_ESCURO)
-            )
-            fig.update_traces(line=dict(width=3), marker=dict(size=8, color=SEBRAE_AZUL))
-            st.plotly_chart(fig, use_container_width=True)
+            exibir_grafico("temporal_anual", fig_anual, use_container_width=True)
         
         with col2:
-            # Acumulado por ano
-            yearly_counts_sorted = yearly_counts.sort_index()
-            cumulative = yearly_counts_sorted.cumsum()
-            
-            fig = px.line(
-                x=cumulative.index,
-                y=cumulative.values,
-                title="Acumulado de Startups por Ano",
-                markers=True,
-                color_discrete_sequence=[SEBRAE_VERDE]
-            )
-            fig.update_layout(
-                xaxis_title="Ano", 
-                yaxis_title="Total Acumulado",
-                plot_bgcolor='white',
-                paper_bgcolor='white',
-                font=dict(color=SEBRAE_CINZA_ESCURO)
-            )
-            fig.update_traces(line=dict(width=3), marker=dict(size=8, color=SEBRAE_VERDE))
-            st.plotly_chart(fig, use_container_width=True)
+            exibir_grafico("temporal_acumulado", fig_acumulado, use_container_width=True)
     else:
         st.info("Coluna 'foundationYear' não encontrada nos dados")
 
@@ -1823,7 +2398,7 @@ def create_interactive_map(df):
     
     try:
         # Carrega dados de municípios com coordenadas
-        df_municipios = load_municipios_com_coordenadas()
+        df_municipios = obter_dados("municipios_coordenadas", load_municipios_com_coordenadas)
         
         if df_municipios.empty:
             st.error("❌ Não foi possível carregar os dados de municípios.")
@@ -1875,11 +2450,11 @@ def create_interactive_map(df):
         df_choropleth = df_merged.copy()
         df_choropleth['codigo_ibge'] = normalize_codigo_ibge(df_choropleth['codigo_ibge'])
 
-        geojson_mg = load_geojson_mg()
+        geojson_mg = obter_dados("geojson_mg", load_geojson_mg)
 
         fig = px.choropleth_mapbox(
             df_choropleth,
-            geojson=geojson_mg,
+            geojson=geojson_mg.geojson() if geojson_mg else None,
             locations='codigo_ibge',
             featureidkey="properties.codigo_ibge",
             color=coluna_regiao,
@@ -1923,7 +2498,7 @@ def create_interactive_map(df):
             customdata=df_choropleth[[coluna_regiao, coluna_municipio, coluna_qtd_startups]].values
         )
         
-        st.plotly_chart(fig, use_container_width=True, config=MAP_CONFIG)
+        exibir_grafico("mapa_interativo", fig, use_container_width=True, config=MAP_CONFIG)
         
         # Estatísticas
         col1, col2, col3 = st.columns(3)
@@ -2014,21 +2589,14 @@ def render_category_legend(categorias_data, title=""):
         
         with col_check:
             # Checkbox centralizado verticalmente
-            checkbox_value = st.checkbox(
+            st.checkbox(
                 "",
                 value=is_active,
                 key=checkbox_key,
-                label_visibility="collapsed"
+                label_visibility="collapsed",
+                on_change=_ao_alternar_categoria,
+                args=(category_name, checkbox_key, list(card_to_category.values()))
             )
-            
-            if checkbox_value != is_active:
-                # Estado mudou, atualiza
-                st.session_state.categorias_ativas[category_name] = checkbox_value
-                categorias_disponiveis = list(card_to_category.values())
-                categorias_ativas_list = [cat for cat, ativa in st.session_state.categorias_ativas.items() 
-                                          if ativa and cat in categorias_disponiveis]
-                st.session_state.filtro_categoria = categorias_ativas_list
-                st.rerun()
         
         with col_name:
             # Nome da categoria
@@ -2074,6 +2642,7 @@ def render_category_legend(categorias_data, title=""):
     )
 
 
+@profiling.cronometrado()
 def create_choropleth_map(df, df_atores=None):
     """
     Cria o mapa choropleth principal colorindo todos os municípios pelas regiões.
@@ -2197,13 +2766,13 @@ def create_choropleth_map(df, df_atores=None):
 
     try:
         with st.spinner("Carregando dados geográficos de Minas Gerais..."):
-            geojson_mg = load_geojson_mg()
+            geojson_mg = obter_dados("geojson_mg", load_geojson_mg)
     except Exception as e:
         st.error(f"❌ Falha ao carregar GeoJSON: {e}")
         return
 
     # Carrega dados de municípios para obter códigos IBGE se necessário
-    df_municipios = load_municipios_com_coordenadas()
+    df_municipios = obter_dados("municipios_coordenadas", load_municipios_com_coordenadas)
     
     if df_municipios.empty:
         st.error("❌ Não foi possível carregar dados de municípios. O mapa não pode ser exibido.")
@@ -2466,577 +3035,576 @@ def create_choropleth_map(df, df_atores=None):
         else:
             base_colors[regiao] = REGION_COLOR_PALETTE[i % len(REGION_COLOR_PALETTE)]
 
-    # Inicializa variáveis de filtro
-    categorias_selecionadas = []
+    # Prepara dados para determinar categorias disponíveis (antes dos filtros)
     categorias_disponiveis = []
-    
-    # IMPORTANTE: Processa seleção do mapa ANTES de criar os widgets
-    # Esta seleção foi armazenada na renderização anterior quando o usuário clicou
-    # Verifica se há uma seleção pendente do mapa e se é diferente da última processada
-    # Esta seleção foi armazenada na renderização anterior quando o usuário clicou no mapa
-    if "mapa_selecao_pendente" in st.session_state and st.session_state.mapa_selecao_pendente:
-        selecao = st.session_state.mapa_selecao_pendente
-        
-        # Cria um hash da seleção para comparar com a última processada
-        selecao_hash = None
-        if selecao and 'points' in selecao and len(selecao['points']) > 0:
-            point = selecao['points'][0]
-            if 'customdata' in point and len(point['customdata']) >= 2:
-                selecao_hash = str(point['customdata'][0]) + "|" + str(point['customdata'][1])
-        
-        # Verifica se é uma seleção nova (diferente da última processada)
-        ultima_selecao_hash = st.session_state.get("ultima_selecao_processada", None)
-        
-        if selecao_hash and selecao_hash != ultima_selecao_hash:
-            if selecao and 'points' in selecao and len(selecao['points']) > 0:
-                point = selecao['points'][0]
-                if 'customdata' in point and len(point['customdata']) >= 2:
-                    regiao_clicada = point['customdata'][0]
-                    municipio_clicado = point['customdata'][1]
-                    
-                    # Ao clicar no mapa, sempre filtra diretamente pelo município
-                    # Também atualiza a região para garantir que o dropdown de município mostre os municípios corretos
-                    st.session_state.filtro_regiao = regiao_clicada
-                    st.session_state.filtro_municipio = municipio_clicado
-                    
-                    # Marca esta seleção como processada
-                    st.session_state.ultima_selecao_processada = selecao_hash
-                    # Limpa a seleção pendente para evitar reprocessamento
-                    st.session_state.mapa_selecao_pendente = None
-                    # O on_select="rerun" já fez rerun na renderização anterior quando o usuário clicou
-                    # Esta renderização já está aplicando os filtros atualizados, então não precisa fazer rerun novamente
-    
-    # Cria layout com filtros à esquerda e mapa à direita
+    if df_atores is not None and not df_atores.empty:
+        # Procura por coluna de categoria (pode ter vários nomes)
+        coluna_categoria = None
+        possiveis_nomes = ['categoria', 'tipo', 'tipo_ator', 'categoria_ator', 'actor_type', 'type']
+        for nome in possiveis_nomes:
+            if nome in df_atores.columns:
+                coluna_categoria = nome
+                break
+
+        if coluna_categoria:
+            categorias_disponiveis = sorted(df_atores[coluna_categoria].dropna().unique().tolist())
+
+    # Se não encontrou categoria nos atores, usa valores padrão baseado nas colunas disponíveis
+    if not categorias_disponiveis:
+        # Constrói lista de categorias baseada nas colunas disponíveis
+        categorias_base = []
+        if coluna_qtd_startups in df.columns:
+            categorias_base.append("Startup")
+        if coluna_qtd_empresas_ancora in df.columns:
+            categorias_base.append("Empresa Âncora")
+        if coluna_qtd_fundos_e_investidores in df.columns:
+            categorias_base.append("Fundos e Investidores")
+        if coluna_qtd_universidades_icts in df.columns:
+            categorias_base.append("Universidades e ICTs")
+        if coluna_qtd_orgaos in df.columns:
+            categorias_base.append("Órgãos Públicos e Apoio")
+        if coluna_qtd_hubs_incubadoras_parquestecnologicos in df.columns:
+            categorias_base.append("Hubs, Incubadoras e Parques Tecnológicos")
+        categorias_disponiveis = categorias_base
+
+    # Inicializa estado das categorias ativas (todas ativas por padrão)
+    if "categorias_ativas" not in st.session_state:
+        st.session_state.categorias_ativas = {
+            "Startup": True,
+            "Empresa Âncora": True,
+            "Fundos e Investidores": True,
+            "Universidades e ICTs": True,
+            "Órgãos Públicos e Apoio": True,
+            "Hubs, Incubadoras e Parques Tecnológicos": True  # Agora tem dados
+        }
+
+    # Enquadramento (centro/zoom) de cada região e município, calculado uma vez por versão dos dados
+    viewports = obter_viewports_mapa(df_regions[['codigo_ibge', 'regiao_final', coluna_municipio]], geojson_mg)
+    indice_espacial = obter_indice_espacial(geojson_mg)
+    servidor_tiles = obter_servidor_tiles(indice_espacial)
+
+    # Contexto compartilhado pelos fragmentos do painel de filtros e do mapa.
+    # Cada fragmento guarda este dicionário e o reutiliza nos reruns parciais.
+    contexto_mapa = {
+        "df_regions": df_regions,
+        "geojson_mg": geojson_mg,
+        "base_colors": base_colors,
+        "categorias_disponiveis": categorias_disponiveis,
+        "coluna_municipio": coluna_municipio,
+        "viewports": viewports,
+        "indice_espacial": indice_espacial,
+        "servidor_tiles": servidor_tiles,
+        "coluna_qtd_startups": coluna_qtd_startups,
+        "coluna_qtd_empresas_ancora": coluna_qtd_empresas_ancora,
+        "coluna_qtd_fundos_e_investidores": coluna_qtd_fundos_e_investidores,
+        "coluna_qtd_universidades_icts": coluna_qtd_universidades_icts,
+        "coluna_qtd_orgaos": coluna_qtd_orgaos,
+        "coluna_qtd_hubs_incubadoras_parquestecnologicos": coluna_qtd_hubs_incubadoras_parquestecnologicos,
+    }
+
+    # Cria layout com filtros à esquerda e mapa à direita.
+    # Cada lado é um fragmento: uma interação reexecuta apenas os fragmentos
+    # que dependem do estado alterado (ver DEPENDENCIAS_FILTROS).
     col_filters, col_map = st.columns([0.35, 0.65])
-    
+
     with col_filters:
-        # Prepara dados para determinar categorias disponíveis (antes dos filtros)
-        categorias_disponiveis = []
-        if df_atores is not None and not df_atores.empty:
-            # Procura por coluna de categoria (pode ter vários nomes)
-            coluna_categoria = None
-            possiveis_nomes = ['categoria', 'tipo', 'tipo_ator', 'categoria_ator', 'actor_type', 'type']
-            for nome in possiveis_nomes:
-                if nome in df_atores.columns:
-                    coluna_categoria = nome
-                    break
-            
-            if coluna_categoria:
-                categorias_disponiveis = sorted(df_atores[coluna_categoria].dropna().unique().tolist())
-        
-        # Se não encontrou categoria nos atores, usa valores padrão baseado nas colunas disponíveis
-        if not categorias_disponiveis:
-            # Constrói lista de categorias baseada nas colunas disponíveis
-            categorias_base = []
-            if coluna_qtd_startups in df.columns:
-                categorias_base.append("Startup")
-            if coluna_qtd_empresas_ancora in df.columns:
-                categorias_base.append("Empresa Âncora")
-            if coluna_qtd_fundos_e_investidores in df.columns:
-                categorias_base.append("Fundos e Investidores")
-            if coluna_qtd_universidades_icts in df.columns:
-                categorias_base.append("Universidades e ICTs")
-            if coluna_qtd_orgaos in df.columns:
-                categorias_base.append("Órgãos Públicos e Apoio")
-            if coluna_qtd_hubs_incubadoras_parquestecnologicos in df.columns:
-                categorias_base.append("Hubs, Incubadoras e Parques Tecnológicos")
-            categorias_disponiveis = categorias_base
-        
-        # Inicializa estado das categorias ativas (todas ativas por padrão)
-        if "categorias_ativas" not in st.session_state:
-            st.session_state.categorias_ativas = {
-                "Startup": True,
-                "Empresa Âncora": True,
-                "Fundos e Investidores": True,
-                "Universidades e ICTs": True,
-                "Órgãos Públicos e Apoio": True,
-                "Hubs, Incubadoras e Parques Tecnológicos": True  # Agora tem dados
-            }
-        
-        # Mapeia nomes dos cards para nomes das categorias no filtro
-        card_to_category = {
-            "Startups": "Startup",
-            "Grandes Empresas Âncoras": "Empresa Âncora",
-            "Fundos e Investidores": "Fundos e Investidores",
-            "Universidades e ICTs": "Universidades e ICTs",
-            "Órgãos Públicos e Apoio": "Órgãos Públicos e Apoio",
-            "Hubs, Incubadoras e Parques Tecnológicos": "Hubs, Incubadoras e Parques Tecnológicos"
+        render_painel_filtros_mapa(contexto_mapa)
+
+    with col_map:
+        render_painel_mapa(contexto_mapa)
+
+
+
+@st.cache_data(max_entries=4, show_spinner=False)
+def _viewports_cacheados(df_chaves, assinatura, _geojson_mg):
+    """Tabela de viewports cacheada pelo conteúdo de df_chaves (código, região, município) e pela geometria."""
+    return calcular_viewports(_geojson_mg, df_chaves, coluna_municipio=df_chaves.columns[2])
+
+
+def obter_viewports_mapa(df_chaves, geojson_mg):
+    """
+    Tabela {"regioes": {...}, "municipios": {...}} de viewports do mapa (ver map_geometry.py).
+    Sem GeoJSON, devolve a tabela vazia (o mapa usa o enquadramento padrão).
+    """
+    if not geojson_mg:
+        return {"regioes": {}, "municipios": {}}
+    return _viewports_cacheados(df_chaves, geojson_mg.assinatura, geojson_mg)
+
+
+@st.cache_resource(max_entries=2, show_spinner=False)
+def _indice_espacial_cacheado(assinatura, _geojson_mg):
+    """
+    Índice espacial compartilhado pelo processo (cache_resource: sem cópia por sessão,
+    e as geometrias simplificadas guardadas nele valem para todos).
+    """
+    return IndiceEspacial(_geojson_mg)
+
+
+def obter_indice_espacial(geojson_mg):
+    """Índice espacial das features do GeoJSON (ver map_geometry.IndiceEspacial)."""
+    return _indice_espacial_cacheado(geojson_mg.assinatura if geojson_mg else None, geojson_mg)
+
+
+@st.cache_resource(show_spinner=False)
+def _servidor_tiles_processo():
+    """Servidor local de vector tiles, um por processo. None se a porta estiver ocupada."""
+    servidor = ServidorTiles(host=HOST_TILES, porta=PORTA_TILES, url_base=URL_TILES)
+    try:
+        servidor.iniciar()
+    except OSError:
+        return None
+    return servidor
+
+
+def obter_servidor_tiles(indice_espacial):
+    """Servidor de tiles servindo a geometria do índice atual (None fora do modo vector tiles)."""
+    if not MODO_VECTOR_TILES or not indice_espacial.limites:
+        return None
+    servidor = _servidor_tiles_processo()
+    if servidor is not None:
+        servidor.atualizar_indice(indice_espacial)
+    return servidor
+
+
+def _contagem_categoria(df, coluna):
+    """Contagens inteiras de uma coluna de categoria (zeros se a coluna não existir)."""
+    if coluna not in df.columns:
+        return np.zeros(len(df), dtype=np.int32)
+    return pd.to_numeric(df[coluna], errors='coerce').fillna(0).astype(np.int32).values
+
+
+def _camadas_vector_tiles(servidor, codigos, intensidades, cor_base):
+    """
+    Camadas do mapa (layout.mapbox.layers) para os municípios de uma região no modo
+    vector tiles: uma camada de preenchimento por faixa de intensidade, com a mesma
+    transparência da colorscale do choropleth, e uma de contorno.
+    """
+    escala = build_colorscale(cor_base)
+    posicoes = [pos for pos, _ in escala]
+    alfas = [float(cor.rsplit(",", 1)[1].rstrip(")")) for _, cor in escala]
+    codigos = np.asarray(codigos)
+    faixas = np.round(np.asarray(intensidades, dtype=float) * 4) / 4
+    camadas = []
+    for faixa in np.unique(faixas):
+        camadas.append(dict(
+            sourcetype="vector",
+            source=[servidor.url_tiles(codigos[faixas == faixa])],
+            sourcelayer=CAMADA_MVT,
+            type="fill",
+            color=cor_base,
+            opacity=float(np.interp(faixa, posicoes, alfas)) * 0.98,
+            below="traces",
+        ))
+    camadas.append(dict(
+        sourcetype="vector",
+        source=[servidor.url_tiles(codigos)],
+        sourcelayer=CAMADA_MVT,
+        type="line",
+        color="rgba(60,60,60,0.25)",
+        line=dict(width=0.3),
+        below="traces",
+    ))
+    return camadas
+
+
+@profiling.cronometrado()
+def _filtrar_regioes_mapa(contexto):
+    """
+    Aplica ao df_regions os filtros de região, município e categorias guardados no session_state.
+    Usada pelos dois fragmentos do mapa, que assim leem sempre o mesmo estado.
+    Retorna (df_regions_filtrado, categorias_selecionadas).
+    """
+    df_regions = contexto["df_regions"]
+    coluna_municipio = contexto["coluna_municipio"]
+    categorias_disponiveis = contexto["categorias_disponiveis"]
+    coluna_qtd_startups = contexto["coluna_qtd_startups"]
+    coluna_qtd_empresas_ancora = contexto["coluna_qtd_empresas_ancora"]
+    coluna_qtd_fundos_e_investidores = contexto["coluna_qtd_fundos_e_investidores"]
+    coluna_qtd_universidades_icts = contexto["coluna_qtd_universidades_icts"]
+    coluna_qtd_orgaos = contexto["coluna_qtd_orgaos"]
+    coluna_qtd_hubs_incubadoras_parquestecnologicos = contexto["coluna_qtd_hubs_incubadoras_parquestecnologicos"]
+
+    regiao_selecionada = st.session_state.get("filtro_regiao", "Todas")
+    municipio_selecionado = st.session_state.get("filtro_municipio", "Todos")
+
+    # Usa as categorias ativas na legenda como categorias selecionadas
+    categorias_selecionadas = [cat for cat, ativa in st.session_state.categorias_ativas.items() 
+                               if ativa and cat in categorias_disponiveis]
+
+    # Aplica filtros aos dados
+    df_regions_filtrado = df_regions.copy()
+
+    if regiao_selecionada != "Todas":
+        df_regions_filtrado = df_regions_filtrado[
+            df_regions_filtrado['regiao_final'] == regiao_selecionada
+        ]
+
+    if municipio_selecionado != "Todos":
+        df_regions_filtrado = df_regions_filtrado[
+            df_regions_filtrado[coluna_municipio] == municipio_selecionado
+        ]
+
+    # Aplica filtro de categoria - calcula count baseado nas categorias selecionadas
+    # USA APENAS AS COLUNAS DA PLANILHA: qtd_startups, qtd_empresas_ancora, qtd_fundos_e_investidores,
+    # qtd_universidades_icts, qtd_orgaos, qtd_hubs_incubadoras_parquestecnologicos
+    if categorias_selecionadas:
+        df_regions_filtrado = df_regions_filtrado.copy()
+        # Calcula count somando as colunas de quantidade da planilha baseado nas categorias selecionadas
+        count_filtrado = pd.Series(0, index=df_regions_filtrado.index)
+
+        # Usa as colunas exatas da planilha encontradas no mapeamento
+        if "Startup" in categorias_selecionadas:
+            # Se há filtro de segmentos, usa a coluna temporária filtrada, senão usa a original da planilha
+            if 'qtd_startups_temp_filtrado' in df_regions_filtrado.columns:
+                col_qtd_startups_uso = 'qtd_startups_temp_filtrado'
+            else:
+                col_qtd_startups_uso = coluna_qtd_startups if coluna_qtd_startups in df_regions_filtrado.columns else 'qtd_startups'
+            if col_qtd_startups_uso in df_regions_filtrado.columns:
+                count_filtrado += pd.to_numeric(df_regions_filtrado[col_qtd_startups_uso], errors='coerce').fillna(0)
+
+        if "Empresa Âncora" in categorias_selecionadas:
+            col_qtd_empresas_ancora_uso = coluna_qtd_empresas_ancora if coluna_qtd_empresas_ancora in df_regions_filtrado.columns else 'qtd_empresas_ancora'
+            if col_qtd_empresas_ancora_uso in df_regions_filtrado.columns:
+                count_filtrado += pd.to_numeric(df_regions_filtrado[col_qtd_empresas_ancora_uso], errors='coerce').fillna(0)
+
+        if "Fundos e Investidores" in categorias_selecionadas:
+            col_qtd_fundos_uso = coluna_qtd_fundos_e_investidores if coluna_qtd_fundos_e_investidores in df_regions_filtrado.columns else 'qtd_fundos_e_investidores'
+            if col_qtd_fundos_uso in df_regions_filtrado.columns:
+                count_filtrado += pd.to_numeric(df_regions_filtrado[col_qtd_fundos_uso], errors='coerce').fillna(0)
+
+        if "Universidades e ICTs" in categorias_selecionadas:
+            col_qtd_universidades_uso = coluna_qtd_universidades_icts if coluna_qtd_universidades_icts in df_regions_filtrado.columns else 'qtd_universidades_icts'
+            if col_qtd_universidades_uso in df_regions_filtrado.columns:
+                count_filtrado += pd.to_numeric(df_regions_filtrado[col_qtd_universidades_uso], errors='coerce').fillna(0)
+
+        if "Órgãos Públicos e Apoio" in categorias_selecionadas:
+            col_qtd_orgaos_uso = coluna_qtd_orgaos if coluna_qtd_orgaos in df_regions_filtrado.columns else 'qtd_orgaos'
+            if col_qtd_orgaos_uso in df_regions_filtrado.columns:
+                count_filtrado += pd.to_numeric(df_regions_filtrado[col_qtd_orgaos_uso], errors='coerce').fillna(0)
+
+        if "Hubs, Incubadoras e Parques Tecnológicos" in categorias_selecionadas:
+            col_qtd_hubs_uso = coluna_qtd_hubs_incubadoras_parquestecnologicos if coluna_qtd_hubs_incubadoras_parquestecnologicos in df_regions_filtrado.columns else 'qtd_hubs_incubadoras_parquestecnologicos'
+            if col_qtd_hubs_uso in df_regions_filtrado.columns:
+                count_filtrado += pd.to_numeric(df_regions_filtrado[col_qtd_hubs_uso], errors='coerce').fillna(0)
+
+        # Atualiza count com a soma das colunas de quantidade da planilha
+        df_regions_filtrado['count'] = count_filtrado.astype(int)
+    elif categorias_disponiveis:
+        # Se nenhuma categoria selecionada mas há categorias disponíveis, não mostra nada
+        df_regions_filtrado = df_regions_filtrado.copy()
+        df_regions_filtrado['count'] = 0
+    else:
+        # Se não há categorias disponíveis, usa o comportamento padrão (todas as categorias)
+        categorias_selecionadas = categorias_disponiveis if categorias_disponiveis else []
+
+    return df_regions_filtrado, categorias_selecionadas
+
+
+@fragmento(key="painel_filtros")
+def render_painel_filtros_mapa(contexto):
+    """
+    Painel à esquerda do mapa: logo, filtros de região/município/segmentos e legenda de categorias.
+    As mudanças chegam por callbacks, que reexecutam só os fragmentos dependentes.
+    """
+    df_regions = contexto["df_regions"]
+    coluna_municipio = contexto["coluna_municipio"]
+    categorias_disponiveis = contexto["categorias_disponiveis"]
+
+    # Cabeçalho com logo Sebrae + Beta-i
+    # Exibe logo Sebrae + Beta-i reduzido em 30% e próximo ao mapa
+    st.markdown("""
+    <style>
+        .logo-container {
+            margin-top: -80px !important;
+            margin-bottom: -20px !important;
+            padding-top: 0 !important;
+            padding-bottom: 0 !important;
         }
-        
-        # Cabeçalho com logo Sebrae + Beta-i
-        # Exibe logo Sebrae + Beta-i reduzido em 30% e próximo ao mapa
-        st.markdown("""
-        <style>
-            .logo-container {
-                margin-top: -80px !important;
-                margin-bottom: -20px !important;
-                padding-top: 0 !important;
-                padding-bottom: 0 !important;
-            }
-            .logo-container img {
-                margin-bottom: 0 !important;
-                padding-bottom: 0 !important;
-            }
-            div[data-testid="stImage"] {
-                margin-top: -80px !important;
-                margin-bottom: -20px !important;
-                padding-top: 0 !important;
-                padding-bottom: 0 !important;
-            }
-            /* Ajusta espaçamento mínimo entre filtros */
-            div[data-testid="stSelectbox"],
-            div[data-testid="stMultiSelect"] {
-                margin-top: 0 !important;
-                margin-bottom: 0 !important;
-                padding-top: 0 !important;
-                padding-bottom: 0 !important;
-            }
-            /* Espaçamento mínimo entre filtros adjacentes */
-            div[data-testid="stSelectbox"] + div[data-testid="stSelectbox"],
-            div[data-testid="stSelectbox"] + div[data-testid="stMultiSelect"],
-            div[data-testid="stMultiSelect"] + div[data-testid="stSelectbox"],
-            div[data-testid="stMultiSelect"] + div[data-testid="stMultiSelect"] {
-                margin-top: 0.2rem !important;
-            }
-        </style>
-        """, unsafe_allow_html=True)
-        
-        col_img, col_empty = st.columns([0.7, 0.3])
-        with col_img:
-            st.markdown('<div class="logo-container">', unsafe_allow_html=True)
-            st.image("Sebrae + Beta-i.png", use_container_width=True)
-            st.markdown('</div>', unsafe_allow_html=True)
-        with col_empty:
-            st.empty()
-        
-        # Filtro de Região
-        regioes_disponiveis = sorted(df_regions['regiao_final'].unique())
-        opcoes_regiao = ["Todas"] + regioes_disponiveis
-        
-        # Inicializa com "Todas" se não estiver definido
-        if "filtro_regiao" not in st.session_state:
-            st.session_state.filtro_regiao = "Todas"
-        
-        # Garante que o valor no session_state seja válido
-        if st.session_state.filtro_regiao not in opcoes_regiao:
-            st.session_state.filtro_regiao = "Todas"
-        
-        # Usa o selectbox sem index, deixando o Streamlit usar o valor do session_state via key
-        regiao_selecionada = st.selectbox(
-            "Região",
-            options=opcoes_regiao,
-            key="filtro_regiao"
-        )
-        
-        # Filtro de Município (depende da região selecionada)
-        if regiao_selecionada != "Todas":
-            municipios_disponiveis = sorted(
-                df_regions[df_regions['regiao_final'] == regiao_selecionada][coluna_municipio].unique()
-            )
-        else:
-            municipios_disponiveis = sorted(df_regions[coluna_municipio].unique())
-        
-        # Inicializa com "Todos" se não estiver definido
-        if "filtro_municipio" not in st.session_state:
-            st.session_state.filtro_municipio = "Todos"
-        
-        # Garante que o valor no session_state seja válido
-        opcoes_municipio = ["Todos"] + municipios_disponiveis
-        if st.session_state.filtro_municipio not in opcoes_municipio:
-            st.session_state.filtro_municipio = "Todos"
-        
-        municipio_selecionado = st.selectbox(
-            "Município",
-            options=opcoes_municipio,
-            key="filtro_municipio"
-        )
-        
-        # Filtro de Segmentos (Startups) - apenas se Startup estiver selecionada
-        segmentos_selecionados = []
-        if "Startup" in categorias_disponiveis:
-            # Verifica se há dados de atores para obter segmentos
-            df_atores_para_segmentos = None
-            try:
-                df_atores_para_segmentos = load_data_base_atores(force_reload=False)
-            except:
-                pass
-            
-            if df_atores_para_segmentos is not None and not df_atores_para_segmentos.empty:
-                # Procura coluna de setor/segmento
-                coluna_setor = None
-                possiveis_nomes_setor = ['setor', 'sector', 'segmento', 'segment', 'segmentos', 'setores']
-                for col in df_atores_para_segmentos.columns:
-                    col_lower = str(col).lower().strip()
-                    if any(nome in col_lower for nome in possiveis_nomes_setor):
-                        coluna_setor = col
-                        break
-                
-                if coluna_setor:
-                    # Filtra apenas startups para obter segmentos únicos
-                    coluna_categoria_atores = None
-                    possiveis_nomes_categoria = ['categoria', 'category', 'tipo', 'type']
-                    for col in df_atores_para_segmentos.columns:
-                        col_lower = str(col).lower().strip()
-                        if any(nome in col_lower for nome in possiveis_nomes_categoria):
-                            coluna_categoria_atores = col
-                            break
-                    
-                    # Filtra apenas startups
-                    df_startups_para_segmentos = df_atores_para_segmentos.copy()
-                    if coluna_categoria_atores:
-                        df_startups_para_segmentos = df_startups_para_segmentos[
-                            df_startups_para_segmentos[coluna_categoria_atores].astype(str).str.strip().str.lower() == 'startup'
-                        ]
-                    
-                    # Obtém segmentos únicos (não vazios)
-                    segmentos_disponiveis = df_startups_para_segmentos[coluna_setor].dropna()
-                    segmentos_disponiveis = segmentos_disponiveis[segmentos_disponiveis.astype(str).str.strip() != '']
-                    segmentos_disponiveis = sorted(segmentos_disponiveis.unique().tolist())
-                    
-                    if segmentos_disponiveis:
-                        # Só mostra o filtro se Startup estiver nas categorias selecionadas
-                        # Verifica tanto no estado dos cards quanto no filtro de categoria
-                        categorias_ativas_list = [cat for cat, ativa in st.session_state.categorias_ativas.items() 
-                                                  if ativa and cat in categorias_disponiveis]
-                        filtro_categoria_atual = st.session_state.get("filtro_categoria", categorias_ativas_list)
-                        
-                        # Inicializa com lista vazia se não estiver definido
-                        if "filtro_segmentos" not in st.session_state:
-                            st.session_state.filtro_segmentos = []
-                        
-                        # Garante que os valores no session_state sejam válidos (ANTES de criar o widget)
-                        segmentos_validos = [s for s in st.session_state.filtro_segmentos if s in segmentos_disponiveis]
-                        if len(segmentos_validos) != len(st.session_state.filtro_segmentos):
-                            st.session_state.filtro_segmentos = segmentos_validos
-                        
-                        # Se Startup não está selecionada, limpa o filtro de segmentos (ANTES de criar o widget)
-                        if "Startup" not in categorias_ativas_list and "Startup" not in filtro_categoria_atual:
-                            if st.session_state.filtro_segmentos:
-                                st.session_state.filtro_segmentos = []
-                        
-                        # Mostra o filtro se Startup estiver selecionada
-                        if "Startup" in categorias_ativas_list or "Startup" in filtro_categoria_atual:
-                            segmentos_selecionados = st.multiselect(
-                                "Segmentos (Startups)",
-                                options=segmentos_disponiveis,
-                                default=st.session_state.filtro_segmentos,
-                                key="filtro_segmentos",
-                                help="Filtra apenas startups por segmento. Não afeta outros atores."
-                            )
-                            # Não modificar st.session_state.filtro_segmentos aqui - o Streamlit já atualiza automaticamente via key
-        
-        # Processa cliques nos cards ANTES de criar o multiselect (para evitar erro de modificação do session_state)
-        # Mapeia nomes dos cards para nomes das categorias no filtro
-        card_to_category = {
-            "Startups": "Startup",
-            "Grandes Empresas Âncoras": "Empresa Âncora",
-            "Fundos e Investidores": "Fundos e Investidores",
-            "Universidades e ICTs": "Universidades e ICTs",
-            "Órgãos Públicos e Apoio": "Órgãos Públicos e Apoio",
-            "Hubs, Incubadoras e Parques Tecnológicos": "Hubs, Incubadoras e Parques Tecnológicos"
+        .logo-container img {
+            margin-bottom: 0 !important;
+            padding-bottom: 0 !important;
         }
-        
-        # Processa cliques nos cards (verifica flags de botões clicados)
-        for card_name, category_name in card_to_category.items():
-            click_flag_key = f"card_clicked_{category_name}"
-            # Verifica se o card foi clicado (flag foi setada na renderização anterior)
-            if click_flag_key in st.session_state and st.session_state[click_flag_key]:
-                # Alterna o estado da categoria
-                if category_name in st.session_state.categorias_ativas:
-                    st.session_state.categorias_ativas[category_name] = not st.session_state.categorias_ativas[category_name]
-                    # Limpa a flag
-                    st.session_state[click_flag_key] = False
-                    # Atualiza o filtro de categorias ANTES de criar o multiselect
-                    categorias_ativas_list = [cat for cat, ativa in st.session_state.categorias_ativas.items() 
-                                              if ativa and cat in categorias_disponiveis]
-                    st.session_state.filtro_categoria = categorias_ativas_list
-                    st.rerun()
-        
-        # Filtro de Categoria do Ator (seleção múltipla)
-        # Sincroniza com o estado das categorias ativas dos cards
-        categorias_ativas_list = [cat for cat, ativa in st.session_state.categorias_ativas.items() 
-                                  if ativa and cat in categorias_disponiveis]
-        
-        # Atualiza o filtro baseado nas categorias ativas (usado internamente para filtrar dados)
-        st.session_state.filtro_categoria = categorias_ativas_list.copy()
-        
-        # Filtro multiselect removido - agora usa apenas a legenda de categorias
-        # Usa as categorias ativas como categorias selecionadas
-        categorias_selecionadas = categorias_ativas_list
-        
-        # Aplica filtro de segmentos aos dados de atores ANTES de agregar
-        segmentos_filtro = st.session_state.get("filtro_segmentos", [])
-        df_atores_filtrado = df_atores.copy() if df_atores is not None and not df_atores.empty else None
-        
-        # Se há filtro de segmentos e há dados de atores, filtra apenas startups por segmento
-        if segmentos_filtro and len(segmentos_filtro) > 0 and df_atores_filtrado is not None:
+        div[data-testid="stImage"] {
+            margin-top: -80px !important;
+            margin-bottom: -20px !important;
+            padding-top: 0 !important;
+            padding-bottom: 0 !important;
+        }
+        /* Ajusta espaçamento mínimo entre filtros */
+        div[data-testid="stSelectbox"],
+        div[data-testid="stMultiSelect"] {
+            margin-top: 0 !important;
+            margin-bottom: 0 !important;
+            padding-top: 0 !important;
+            padding-bottom: 0 !important;
+        }
+        /* Espaçamento mínimo entre filtros adjacentes */
+        div[data-testid="stSelectbox"] + div[data-testid="stSelectbox"],
+        div[data-testid="stSelectbox"] + div[data-testid="stMultiSelect"],
+        div[data-testid="stMultiSelect"] + div[data-testid="stSelectbox"],
+        div[data-testid="stMultiSelect"] + div[data-testid="stMultiSelect"] {
+            margin-top: 0.2rem !important;
+        }
+    </style>
+    """, unsafe_allow_html=True)
+
+    col_img, col_empty = st.columns([0.7, 0.3])
+    with col_img:
+        st.markdown('<div class="logo-container">', unsafe_allow_html=True)
+        st.image("Sebrae + Beta-i.png", use_container_width=True)
+        st.markdown('</div>', unsafe_allow_html=True)
+    with col_empty:
+        st.empty()
+
+    # Filtro de Região
+    regioes_disponiveis = sorted(df_regions['regiao_final'].unique())
+    opcoes_regiao = ["Todas"] + regioes_disponiveis
+
+    # Inicializa com "Todas" se não estiver definido
+    if "filtro_regiao" not in st.session_state:
+        st.session_state.filtro_regiao = "Todas"
+
+    # Garante que o valor no session_state seja válido
+    if st.session_state.filtro_regiao not in opcoes_regiao:
+        st.session_state.filtro_regiao = "Todas"
+
+    # Usa o selectbox sem index, deixando o Streamlit usar o valor do session_state via key
+    regiao_selecionada = st.selectbox(
+        "Região",
+        options=opcoes_regiao,
+        key="filtro_regiao",
+        on_change=_ao_mudar_filtro_mapa,
+        args=("filtro_regiao",)
+    )
+
+    # Filtro de Município (depende da região selecionada)
+    if regiao_selecionada != "Todas":
+        municipios_disponiveis = sorted(
+            df_regions[df_regions['regiao_final'] == regiao_selecionada][coluna_municipio].unique()
+        )
+    else:
+        municipios_disponiveis = sorted(df_regions[coluna_municipio].unique())
+
+    # Inicializa com "Todos" se não estiver definido
+    if "filtro_municipio" not in st.session_state:
+        st.session_state.filtro_municipio = "Todos"
+
+    # Garante que o valor no session_state seja válido
+    opcoes_municipio = ["Todos"] + municipios_disponiveis
+    if st.session_state.filtro_municipio not in opcoes_municipio:
+        st.session_state.filtro_municipio = "Todos"
+
+    st.selectbox(
+        "Município",
+        options=opcoes_municipio,
+        key="filtro_municipio",
+        on_change=_ao_mudar_filtro_mapa,
+        args=("filtro_municipio",)
+    )
+
+    # Filtro de Segmentos (Startups) - apenas se Startup estiver selecionada
+    segmentos_selecionados = []
+    if "Startup" in categorias_disponiveis:
+        # Verifica se há dados de atores para obter segmentos
+        df_atores_para_segmentos = None
+        try:
+            df_atores_para_segmentos = obter_planilha("base_atores")
+        except:
+            pass
+
+        if df_atores_para_segmentos is not None and not df_atores_para_segmentos.empty:
             # Procura coluna de setor/segmento
-            coluna_setor_atores = None
+            coluna_setor = None
             possiveis_nomes_setor = ['setor', 'sector', 'segmento', 'segment', 'segmentos', 'setores']
-            for col in df_atores_filtrado.columns:
+            for col in df_atores_para_segmentos.columns:
                 col_lower = str(col).lower().strip()
                 if any(nome in col_lower for nome in possiveis_nomes_setor):
-                    coluna_setor_atores = col
+                    coluna_setor = col
                     break
-            
-            # Procura coluna de categoria
-            coluna_categoria_atores = None
-            possiveis_nomes_categoria = ['categoria', 'category', 'tipo', 'type', 'tipo_ator', 'actor_type']
-            for col in df_atores_filtrado.columns:
-                col_lower = str(col).lower().strip()
-                if any(nome in col_lower for nome in possiveis_nomes_categoria):
-                    coluna_categoria_atores = col
-                    break
-            
-            if coluna_setor_atores and coluna_categoria_atores:
-                # Separa startups e outros atores
-                mask_startup = df_atores_filtrado[coluna_categoria_atores].astype(str).str.strip().str.lower() == 'startup'
-                df_startups_filtrado = df_atores_filtrado[mask_startup].copy()
-                df_outros_atores = df_atores_filtrado[~mask_startup].copy()
-                
-                # Aplica filtro de segmentos apenas nas startups
-                df_startups_filtrado = df_startups_filtrado[
-                    df_startups_filtrado[coluna_setor_atores].astype(str).str.strip().isin(
-                        [str(seg).strip() for seg in segmentos_filtro]
-                    )
-                ]
-                
-                # Combina startups filtradas com outros atores
-                df_atores_filtrado = pd.concat([df_startups_filtrado, df_outros_atores], ignore_index=True)
-        
-        # Reagrega dados se houver filtro de segmentos e dados de atores
-        if segmentos_filtro and len(segmentos_filtro) > 0 and df_atores_filtrado is not None and not df_atores_filtrado.empty:
-            # Procura colunas de localização para reagregar
-            coluna_cidade_atores = None
-            possiveis_nomes_cidade = ['cidade', 'municipio', 'cidade_max', 'município']
-            for col in df_atores_filtrado.columns:
-                col_lower = str(col).lower().strip()
-                if any(nome in col_lower for nome in possiveis_nomes_cidade):
-                    coluna_cidade_atores = col
-                    break
-            
-            coluna_regiao_atores = None
-            possiveis_nomes_regiao = ['região sebrae', 'regiao sebrae', 'região_sebrae', 'regiao_sebrae', 
-                                     'nome_mesorregiao', 'mesorregiao', 'regiao', 'região']
-            for col in df_atores_filtrado.columns:
-                col_lower = str(col).lower().strip()
-                if any(nome in col_lower for nome in possiveis_nomes_regiao):
-                    coluna_regiao_atores = col
-                    break
-            
-            if coluna_categoria_atores and coluna_cidade_atores:
-                # Filtra apenas startups para contar E que têm cidade preenchida (não vazia)
-                df_startups_para_contar = df_atores_filtrado[
-                    (df_atores_filtrado[coluna_categoria_atores].astype(str).str.strip().str.lower() == 'startup') &
-                    (df_atores_filtrado[coluna_cidade_atores].notna()) &
-                    (df_atores_filtrado[coluna_cidade_atores].astype(str).str.strip() != '') &
-                    (df_atores_filtrado[coluna_cidade_atores].astype(str).str.strip() != 'nan')
-                ].copy()
-                
-                # Reagrega contagens de startups por município/região
-                if coluna_regiao_atores:
-                    df_agregado = df_startups_para_contar.groupby([coluna_regiao_atores, coluna_cidade_atores]).size().reset_index(name='qtd_startups_filtrado')
-                else:
-                    df_agregado = df_startups_para_contar.groupby([coluna_cidade_atores]).size().reset_index(name='qtd_startups_filtrado')
-                
-                # NÃO atualiza df_regions - os valores da planilha devem ser preservados
-                # O filtro de segmentos será aplicado apenas na visualização, não nos dados originais
-        
-        # Aplica filtros aos dados
-        df_regions_filtrado = df_regions.copy()
-        
-        if regiao_selecionada != "Todas":
-            df_regions_filtrado = df_regions_filtrado[
-                df_regions_filtrado['regiao_final'] == regiao_selecionada
-            ]
-        
-        if municipio_selecionado != "Todos":
-            df_regions_filtrado = df_regions_filtrado[
-                df_regions_filtrado[coluna_municipio] == municipio_selecionado
-            ]
-        
-        # Aplica filtro de categoria - calcula count baseado nas categorias selecionadas
-        # USA APENAS AS COLUNAS DA PLANILHA: qtd_startups, qtd_empresas_ancora, qtd_fundos_e_investidores,
-        # qtd_universidades_icts, qtd_orgaos, qtd_hubs_incubadoras_parquestecnologicos
-        if categorias_selecionadas:
-            df_regions_filtrado = df_regions_filtrado.copy()
-            # Calcula count somando as colunas de quantidade da planilha baseado nas categorias selecionadas
-            count_filtrado = pd.Series(0, index=df_regions_filtrado.index)
-            
-            # Usa as colunas exatas da planilha encontradas no mapeamento
-            if "Startup" in categorias_selecionadas:
-                # Se há filtro de segmentos, usa a coluna temporária filtrada, senão usa a original da planilha
-                if 'qtd_startups_temp_filtrado' in df_regions_filtrado.columns:
-                    col_qtd_startups_uso = 'qtd_startups_temp_filtrado'
-                else:
-                    col_qtd_startups_uso = coluna_qtd_startups if coluna_qtd_startups in df_regions_filtrado.columns else 'qtd_startups'
-                if col_qtd_startups_uso in df_regions_filtrado.columns:
-                    count_filtrado += pd.to_numeric(df_regions_filtrado[col_qtd_startups_uso], errors='coerce').fillna(0)
-            
-            if "Empresa Âncora" in categorias_selecionadas:
-                col_qtd_empresas_ancora_uso = coluna_qtd_empresas_ancora if coluna_qtd_empresas_ancora in df_regions_filtrado.columns else 'qtd_empresas_ancora'
-                if col_qtd_empresas_ancora_uso in df_regions_filtrado.columns:
-                    count_filtrado += pd.to_numeric(df_regions_filtrado[col_qtd_empresas_ancora_uso], errors='coerce').fillna(0)
-            
-            if "Fundos e Investidores" in categorias_selecionadas:
-                col_qtd_fundos_uso = coluna_qtd_fundos_e_investidores if coluna_qtd_fundos_e_investidores in df_regions_filtrado.columns else 'qtd_fundos_e_investidores'
-                if col_qtd_fundos_uso in df_regions_filtrado.columns:
-                    count_filtrado += pd.to_numeric(df_regions_filtrado[col_qtd_fundos_uso], errors='coerce').fillna(0)
-            
-            if "Universidades e ICTs" in categorias_selecionadas:
-                col_qtd_universidades_uso = coluna_qtd_universidades_icts if coluna_qtd_universidades_icts in df_regions_filtrado.columns else 'qtd_universidades_icts'
-                if col_qtd_universidades_uso in df_regions_filtrado.columns:
-                    count_filtrado += pd.to_numeric(df_regions_filtrado[col_qtd_universidades_uso], errors='coerce').fillna(0)
-            
-            if "Órgãos Públicos e Apoio" in categorias_selecionadas:
-                col_qtd_orgaos_uso = coluna_qtd_orgaos if coluna_qtd_orgaos in df_regions_filtrado.columns else 'qtd_orgaos'
-                if col_qtd_orgaos_uso in df_regions_filtrado.columns:
-                    count_filtrado += pd.to_numeric(df_regions_filtrado[col_qtd_orgaos_uso], errors='coerce').fillna(0)
-            
-            if "Hubs, Incubadoras e Parques Tecnológicos" in categorias_selecionadas:
-                col_qtd_hubs_uso = coluna_qtd_hubs_incubadoras_parquestecnologicos if coluna_qtd_hubs_incubadoras_parquestecnologicos in df_regions_filtrado.columns else 'qtd_hubs_incubadoras_parquestecnologicos'
-                if col_qtd_hubs_uso in df_regions_filtrado.columns:
-                    count_filtrado += pd.to_numeric(df_regions_filtrado[col_qtd_hubs_uso], errors='coerce').fillna(0)
-            
-            # Atualiza count com a soma das colunas de quantidade da planilha
-            df_regions_filtrado['count'] = count_filtrado.astype(int)
-        elif categorias_disponiveis:
-            # Se nenhuma categoria selecionada mas há categorias disponíveis, não mostra nada
-            df_regions_filtrado = df_regions_filtrado.copy()
-            df_regions_filtrado['count'] = 0
-        else:
-            # Se não há categorias disponíveis, usa o comportamento padrão (todas as categorias)
-            categorias_selecionadas = categorias_disponiveis if categorias_disponiveis else []
-        
-        # Mostra cards com totais por categoria
-        st.markdown("---")
-        
-        # Calcula totais baseado nos dados filtrados do mapa (que já têm filtros de região e município aplicados)
-        contadores = {}
-        
-        # Startups - usa dados agregados do mapa (RESPEITA filtros de região/município/segmentos)
-        # (mantém consistência com as outras categorias)
-        if 'qtd_startups_temp_filtrado' in df_regions_filtrado.columns:
-            col_startups_total = 'qtd_startups_temp_filtrado'
-        else:
-            col_startups_total = coluna_qtd_startups
 
-        if col_startups_total in df_regions_filtrado.columns:
-            total_startups = pd.to_numeric(df_regions_filtrado[col_startups_total], errors='coerce').fillna(0).sum()
-            contadores["Startups"] = int(total_startups)
-        else:
-            contadores["Startups"] = 0
-        
-        # Empresas Âncoras - usa dados agregados do mapa (soma a coluna qtd_empresas_ancora dos municípios filtrados)
-        if coluna_qtd_empresas_ancora in df_regions_filtrado.columns:
-            total_empresas_ancora = pd.to_numeric(df_regions_filtrado[coluna_qtd_empresas_ancora], errors='coerce').fillna(0).sum()
-            contadores["Grandes Empresas Âncoras"] = int(total_empresas_ancora)
-        else:
-            contadores["Grandes Empresas Âncoras"] = 0
-        
-        # Fundos e Investidores - usa dados agregados do mapa
-        if coluna_qtd_fundos_e_investidores in df_regions_filtrado.columns:
-            total_fundos = pd.to_numeric(df_regions_filtrado[coluna_qtd_fundos_e_investidores], errors='coerce').fillna(0).sum()
-            contadores["Fundos e Investidores"] = int(total_fundos)
-        else:
-            contadores["Fundos e Investidores"] = 0
-        
-        # Universidades e ICTs - usa dados agregados do mapa
-        if coluna_qtd_universidades_icts in df_regions_filtrado.columns:
-            total_universidades = pd.to_numeric(df_regions_filtrado[coluna_qtd_universidades_icts], errors='coerce').fillna(0).sum()
-            contadores["Universidades e ICTs"] = int(total_universidades)
-        else:
-            contadores["Universidades e ICTs"] = 0
-        
-        # Órgãos Públicos e Apoio - usa dados agregados do mapa
-        if coluna_qtd_orgaos in df_regions_filtrado.columns:
-            total_orgaos = pd.to_numeric(df_regions_filtrado[coluna_qtd_orgaos], errors='coerce').fillna(0).sum()
-            contadores["Órgãos Públicos e Apoio"] = int(total_orgaos)
-        else:
-            contadores["Órgãos Públicos e Apoio"] = 0
-        
-        # Hubs, Incubadoras e Parques Tecnológicos - usa dados agregados do mapa
-        if coluna_qtd_hubs_incubadoras_parquestecnologicos in df_regions_filtrado.columns:
-            total_hubs = pd.to_numeric(df_regions_filtrado[coluna_qtd_hubs_incubadoras_parquestecnologicos], errors='coerce').fillna(0).sum()
-            contadores["Hubs, Incubadoras e Parques Tecnológicos"] = int(total_hubs)
-        else:
-            contadores["Hubs, Incubadoras e Parques Tecnológicos"] = 0
-        
-        # Prepara dados para a legenda de categorias
-        categorias_legend_data = {}
-        card_to_category = {
-            "Startups": "Startup",
-            "Grandes Empresas Âncoras": "Empresa Âncora",
-            "Fundos e Investidores": "Fundos e Investidores",
-            "Universidades e ICTs": "Universidades e ICTs",
-            "Hubs, Incubadoras e Parques Tecnológicos": "Hubs, Incubadoras e Parques Tecnológicos",
-            "Órgãos Públicos e Apoio": "Órgãos Públicos e Apoio"
+            if coluna_setor:
+                # Filtra apenas startups para obter segmentos únicos
+                coluna_categoria_atores = None
+                possiveis_nomes_categoria = ['categoria', 'category', 'tipo', 'type']
+                for col in df_atores_para_segmentos.columns:
+                    col_lower = str(col).lower().strip()
+                    if any(nome in col_lower for nome in possiveis_nomes_categoria):
+                        coluna_categoria_atores = col
+                        break
+
+                # Filtra apenas startups
+                df_startups_para_segmentos = df_atores_para_segmentos.copy()
+                if coluna_categoria_atores:
+                    df_startups_para_segmentos = df_startups_para_segmentos[
+                        df_startups_para_segmentos[coluna_categoria_atores].astype(str).str.strip().str.lower() == 'startup'
+                    ]
+
+                # Obtém segmentos únicos (não vazios)
+                segmentos_disponiveis = df_startups_para_segmentos[coluna_setor].dropna()
+                segmentos_disponiveis = segmentos_disponiveis[segmentos_disponiveis.astype(str).str.strip() != '']
+                segmentos_disponiveis = sorted(segmentos_disponiveis.unique().tolist())
+
+                if segmentos_disponiveis:
+                    # Só mostra o filtro se Startup estiver nas categorias selecionadas
+                    # Verifica tanto no estado dos cards quanto no filtro de categoria
+                    categorias_ativas_list = [cat for cat, ativa in st.session_state.categorias_ativas.items() 
+                                              if ativa and cat in categorias_disponiveis]
+                    filtro_categoria_atual = st.session_state.get("filtro_categoria", categorias_ativas_list)
+
+                    # Inicializa com lista vazia se não estiver definido
+                    if "filtro_segmentos" not in st.session_state:
+                        st.session_state.filtro_segmentos = []
+
+                    # Garante que os valores no session_state sejam válidos (ANTES de criar o widget)
+                    segmentos_validos = [s for s in st.session_state.filtro_segmentos if s in segmentos_disponiveis]
+                    if len(segmentos_validos) != len(st.session_state.filtro_segmentos):
+                        st.session_state.filtro_segmentos = segmentos_validos
+
+                    # Se Startup não está selecionada, limpa o filtro de segmentos (ANTES de criar o widget)
+                    if "Startup" not in categorias_ativas_list and "Startup" not in filtro_categoria_atual:
+                        if st.session_state.filtro_segmentos:
+                            st.session_state.filtro_segmentos = []
+
+                    # Mostra o filtro se Startup estiver selecionada
+                    if "Startup" in categorias_ativas_list or "Startup" in filtro_categoria_atual:
+                        segmentos_selecionados = st.multiselect(
+                            "Segmentos (Startups)",
+                            options=segmentos_disponiveis,
+                            default=st.session_state.filtro_segmentos,
+                            key="filtro_segmentos",
+                            on_change=_ao_mudar_filtro_mapa,
+                            args=("filtro_segmentos",),
+                            help="Filtra apenas startups por segmento. Não afeta outros atores."
+                        )
+                        # Não modificar st.session_state.filtro_segmentos aqui - o Streamlit já atualiza automaticamente via key
+
+    # Sincroniza o filtro de categorias (usado pela tabela) com a legenda
+    categorias_ativas_list = [cat for cat, ativa in st.session_state.categorias_ativas.items() 
+                              if ativa and cat in categorias_disponiveis]
+    st.session_state.filtro_categoria = categorias_ativas_list.copy()
+
+    df_regions_filtrado, _ = _filtrar_regioes_mapa(contexto)
+    coluna_qtd_startups = contexto["coluna_qtd_startups"]
+    coluna_qtd_empresas_ancora = contexto["coluna_qtd_empresas_ancora"]
+    coluna_qtd_fundos_e_investidores = contexto["coluna_qtd_fundos_e_investidores"]
+    coluna_qtd_universidades_icts = contexto["coluna_qtd_universidades_icts"]
+    coluna_qtd_orgaos = contexto["coluna_qtd_orgaos"]
+    coluna_qtd_hubs_incubadoras_parquestecnologicos = contexto["coluna_qtd_hubs_incubadoras_parquestecnologicos"]
+
+    # Mostra cards com totais por categoria
+    st.markdown("---")
+
+    # Calcula totais baseado nos dados filtrados do mapa (que já têm filtros de região e município aplicados)
+    contadores = {}
+
+    # Startups - usa dados agregados do mapa (RESPEITA filtros de região/município/segmentos)
+    # (mantém consistência com as outras categorias)
+    if 'qtd_startups_temp_filtrado' in df_regions_filtrado.columns:
+        col_startups_total = 'qtd_startups_temp_filtrado'
+    else:
+        col_startups_total = coluna_qtd_startups
+
+    if col_startups_total in df_regions_filtrado.columns:
+        total_startups = pd.to_numeric(df_regions_filtrado[col_startups_total], errors='coerce').fillna(0).sum()
+        contadores["Startups"] = int(total_startups)
+    else:
+        contadores["Startups"] = 0
+
+    # Empresas Âncoras - usa dados agregados do mapa (soma a coluna qtd_empresas_ancora dos municípios filtrados)
+    if coluna_qtd_empresas_ancora in df_regions_filtrado.columns:
+        total_empresas_ancora = pd.to_numeric(df_regions_filtrado[coluna_qtd_empresas_ancora], errors='coerce').fillna(0).sum()
+        contadores["Grandes Empresas Âncoras"] = int(total_empresas_ancora)
+    else:
+        contadores["Grandes Empresas Âncoras"] = 0
+
+    # Fundos e Investidores - usa dados agregados do mapa
+    if coluna_qtd_fundos_e_investidores in df_regions_filtrado.columns:
+        total_fundos = pd.to_numeric(df_regions_filtrado[coluna_qtd_fundos_e_investidores], errors='coerce').fillna(0).sum()
+        contadores["Fundos e Investidores"] = int(total_fundos)
+    else:
+        contadores["Fundos e Investidores"] = 0
+
+    # Universidades e ICTs - usa dados agregados do mapa
+    if coluna_qtd_universidades_icts in df_regions_filtrado.columns:
+        total_universidades = pd.to_numeric(df_regions_filtrado[coluna_qtd_universidades_icts], errors='coerce').fillna(0).sum()
+        contadores["Universidades e ICTs"] = int(total_universidades)
+    else:
+        contadores["Universidades e ICTs"] = 0
+
+    # Órgãos Públicos e Apoio - usa dados agregados do mapa
+    if coluna_qtd_orgaos in df_regions_filtrado.columns:
+        total_orgaos = pd.to_numeric(df_regions_filtrado[coluna_qtd_orgaos], errors='coerce').fillna(0).sum()
+        contadores["Órgãos Públicos e Apoio"] = int(total_orgaos)
+    else:
+        contadores["Órgãos Públicos e Apoio"] = 0
+
+    # Hubs, Incubadoras e Parques Tecnológicos - usa dados agregados do mapa
+    if coluna_qtd_hubs_incubadoras_parquestecnologicos in df_regions_filtrado.columns:
+        total_hubs = pd.to_numeric(df_regions_filtrado[coluna_qtd_hubs_incubadoras_parquestecnologicos], errors='coerce').fillna(0).sum()
+        contadores["Hubs, Incubadoras e Parques Tecnológicos"] = int(total_hubs)
+    else:
+        contadores["Hubs, Incubadoras e Parques Tecnológicos"] = 0
+
+    # Prepara dados para a legenda de categorias
+    categorias_legend_data = {}
+    card_to_category = {
+        "Startups": "Startup",
+        "Grandes Empresas Âncoras": "Empresa Âncora",
+        "Fundos e Investidores": "Fundos e Investidores",
+        "Universidades e ICTs": "Universidades e ICTs",
+        "Hubs, Incubadoras e Parques Tecnológicos": "Hubs, Incubadoras e Parques Tecnológicos",
+        "Órgãos Públicos e Apoio": "Órgãos Públicos e Apoio"
+    }
+
+    for display_name, category_name in card_to_category.items():
+        # Obtém a cor da categoria
+        color = CATEGORIA_COLORS.get(category_name, "#cccccc")
+        # Obtém o total (usa o nome de exibição para buscar no contadores)
+        total = contadores.get(display_name, 0)
+
+        categorias_legend_data[category_name] = {
+            "color": color,
+            "total": total,
+            "display_name": display_name
         }
-        
-        for display_name, category_name in card_to_category.items():
-            # Obtém a cor da categoria
-            color = CATEGORIA_COLORS.get(category_name, "#cccccc")
-            # Obtém o total (usa o nome de exibição para buscar no contadores)
-            total = contadores.get(display_name, 0)
-            
-            categorias_legend_data[category_name] = {
-                "color": color,
-                "total": total,
-                "display_name": display_name
-            }
-        
-        # Renderiza a legenda de categorias
-        render_category_legend(categorias_legend_data, title="")
-    
-    # Atualiza df_regions com os dados filtrados
-    df_regions = df_regions_filtrado
-    
-    # Calcula centro e zoom baseado na região selecionada
+
+    # Renderiza a legenda de categorias
+    render_category_legend(categorias_legend_data, title="")
+
+
+@fragmento(key="painel_mapa")
+def render_painel_mapa(contexto):
+    """
+    Mapa choropleth (lado direito). O clique em um município atualiza os filtros no
+    callback de seleção, então o mapa é desenhado uma única vez por clique.
+    """
+    geojson_mg = contexto["geojson_mg"]
+    base_colors = contexto["base_colors"]
+    coluna_municipio = contexto["coluna_municipio"]
+    categorias_disponiveis = contexto["categorias_disponiveis"]
+    coluna_qtd_startups = contexto["coluna_qtd_startups"]
+    coluna_qtd_empresas_ancora = contexto["coluna_qtd_empresas_ancora"]
+    coluna_qtd_fundos_e_investidores = contexto["coluna_qtd_fundos_e_investidores"]
+    coluna_qtd_universidades_icts = contexto["coluna_qtd_universidades_icts"]
+    coluna_qtd_orgaos = contexto["coluna_qtd_orgaos"]
+    coluna_qtd_hubs_incubadoras_parquestecnologicos = contexto["coluna_qtd_hubs_incubadoras_parquestecnologicos"]
+
+    regiao_selecionada = st.session_state.get("filtro_regiao", "Todas")
+    df_regions, categorias_selecionadas = _filtrar_regioes_mapa(contexto)
+
+    # Centro e zoom: consulta à tabela de viewports calculada na carga (geometria real)
     map_center = MAP_CENTER
     map_zoom = MAP_ZOOM
-    
-    if regiao_selecionada != "Todas" and not df_regions.empty:
-        # Filtra dados da região selecionada para calcular bounding box
-        df_regiao_zoom = df_regions[df_regions['regiao_final'] == regiao_selecionada].copy()
-        df_regiao_zoom = df_regiao_zoom.dropna(subset=['latitude', 'longitude'])
-        
-        if not df_regiao_zoom.empty:
-            # Calcula bounding box
-            min_lat = df_regiao_zoom['latitude'].min()
-            max_lat = df_regiao_zoom['latitude'].max()
-            min_lon = df_regiao_zoom['longitude'].min()
-            max_lon = df_regiao_zoom['longitude'].max()
-            
-            # Calcula centro
-            center_lat = (min_lat + max_lat) / 2
-            center_lon = (min_lon + max_lon) / 2
-            
-            # Calcula extensão geográfica
-            lat_range = max_lat - min_lat
-            lon_range = max_lon - min_lon
-            max_range = max(lat_range, lon_range)
-            
-            # Ajusta zoom baseado na extensão
-            if max_range > 5:
-                zoom = 5.5
-            elif max_range > 2:
-                zoom = 6.5
-            elif max_range > 1:
-                zoom = 7.5
-            elif max_range > 0.5:
-                zoom = 8.5
-            else:
-                zoom = 9.5
-            
-            # Regiões específicas que precisam de menos zoom (mais afastado)
-            if regiao_selecionada in ["Norte", "Noroalto"]:
-                zoom = max(zoom - 1.0, 4.5)  # Reduz o zoom em 1.0, mas não menos que 4.5
-            else:
-                # Adiciona padding (aumenta um pouco o zoom para dar espaço)
-                zoom = min(zoom + 0.3, 10.0)
-            
-            map_center = {"lat": center_lat, "lon": center_lon}
-            map_zoom = zoom
+    viewports = contexto["viewports"]
+    municipio_selecionado = st.session_state.get("filtro_municipio", "Todos")
+    viewport = None
+    if municipio_selecionado != "Todos":
+        viewport = viewports["municipios"].get(municipio_selecionado)
+    if viewport is None and regiao_selecionada != "Todas":
+        viewport = viewports["regioes"].get(regiao_selecionada)
+    if viewport is not None:
+        map_center = viewport["center"]
+        map_zoom = viewport["zoom"]
 
     # Se não temos GeoJSON, usa fallback com scatter
     if not geojson_mg:
@@ -3044,35 +3612,49 @@ def create_choropleth_map(df, df_atores=None):
         create_alternative_choropleth(df_regions)
         return
 
-    # Garante que todos os features tenham código IBGE (texto) normalizado
-    for feature in geojson_mg.get('features', []):
-        props = feature.get('properties', {})
-        codigo = props.get('codigo_ibge') or props.get('id') or feature.get('id') or props.get('CD_MUN') or props.get('codigo')
-        if codigo is not None:
-            try:
-                codigo_normalizado = normalize_codigo_ibge(pd.Series([codigo])).iloc[0]
-                if pd.notna(codigo_normalizado):
-                    props['codigo_ibge'] = codigo_normalizado
-            except:
-                pass
-        feature['properties'] = props
-
     # Usa as regiões filtradas, mas mantém as cores originais já definidas
     regioes = sorted(df_regions['regiao_final'].unique())
 
-    fig = go.Figure()
+    # Geometria de cada trace entra como bytes já serializados (ver plotly_json.py)
+    fig = FiguraMapa()
 
-    # Cria dicionário de features por código IBGE (apenas códigos válidos)
-    features_by_code = {}
-    for feature in geojson_mg.get('features', []):
-        codigo = feature['properties'].get('codigo_ibge')
-        if codigo and pd.notna(codigo):
-            features_by_code[str(codigo)] = feature
+    # Recorte pela área visível, só ao aproximar numa região ou num município: as features
+    # que intersectam o enquadramento (com margem) vão com contornos que aguentam alguns
+    # níveis de zoom do cliente; as demais, só como contorno grosseiro. Na visão do estado
+    # todas vão com o nível de detalhe (ver map_geometry.py)
+    indice_espacial = contexto["indice_espacial"]
+    nivel_zoom = int(math.floor(map_zoom))
+    nivel_detalhe = nivel_zoom + FOLGA_ZOOM_DETALHE
+    nivel_contorno = nivel_zoom - RECUO_ZOOM_CONTORNO
+    codigos_visiveis = None
+    if viewport is not None:
+        codigos_visiveis = indice_espacial.consultar(limites_visiveis(map_center, map_zoom, margem=MARGEM_RECORTE))
 
-    # Debug: identifica municípios sem match no GeoJSON
-    municipios_sem_match = []
-    
-    for regiao in regioes:
+    # No modo vector tiles a geometria vem do servidor local: a figura leva só as camadas
+    # (URLs dos tiles) e um ponto por município com os valores (hover e clique)
+    servidor_tiles = contexto["servidor_tiles"]
+    camadas_tiles = []
+
+    # Categorias do hover (se nenhuma selecionada, todas as disponíveis), na ordem fixa:
+    # startups, empresas âncora, fundos, universidades, órgãos, hubs
+    categorias_para_mostrar = categorias_selecionadas if categorias_selecionadas else categorias_disponiveis
+    colunas_categorias = [
+        ("Startup", coluna_qtd_startups, "Total de Startups"),
+        ("Empresa Âncora", coluna_qtd_empresas_ancora, "Total de Empresas Âncora"),
+        ("Fundos e Investidores", coluna_qtd_fundos_e_investidores, "Total de Fundos e Investidores"),
+        ("Universidades e ICTs", coluna_qtd_universidades_icts, "Total de Universidades e ICTs"),
+        ("Órgãos Públicos e Apoio", coluna_qtd_orgaos, "Total de Órgãos Públicos e Apoio"),
+        ("Hubs, Incubadoras e Parques Tecnológicos", coluna_qtd_hubs_incubadoras_parquestecnologicos, "Total de Hubs, Incubadoras e Parques Tecnológicos"),
+    ]
+    colunas_categorias = [(coluna, rotulo) for categoria, coluna, rotulo in colunas_categorias if categoria in categorias_para_mostrar]
+    colunas_hover = [coluna for coluna, _ in colunas_categorias]
+    # customdata[0] e [1] são os índices de região e município; as contagens vêm depois
+    hovertemplate_categorias = "".join(
+        f"<b>{rotulo}:</b> %{{customdata[{i + 2}]}}<br>" for i, (_, rotulo) in enumerate(colunas_categorias)
+    )
+    rotulos_municipios = []
+
+    for indice_regiao, regiao in enumerate(regioes):
         # Inclui todos os municípios da região (incluindo 0 startups)
         df_regiao = df_regions[df_regions['regiao_final'] == regiao].copy()
         if df_regiao.empty:
@@ -3096,72 +3678,70 @@ def create_choropleth_map(df, df_atores=None):
                 lambda x: 0.05 if x == 0 or pd.isna(x) else 0.25 + (x / max_count) * 0.75
             )
 
-        # Identifica municípios com match no GeoJSON (garante que código seja string)
+        # Identifica municípios com geometria no GeoJSON (garante que código seja string).
+        # Com vector tiles os tiles já selecionam a geometria por (z, x, y)
         df_regiao['codigo_ibge_str'] = df_regiao['codigo_ibge'].astype(str)
-        df_regiao['tem_match'] = df_regiao['codigo_ibge_str'].apply(lambda x: x in features_by_code)
-        
-        # Coleta municípios sem match (para logging interno)
-        sem_match = df_regiao[~df_regiao['tem_match']]
-        if not sem_match.empty:
-            municipios_sem_match.extend(sem_match[[coluna_municipio, 'codigo_ibge']].values.tolist())
+        df_regiao['tem_match'] = df_regiao['codigo_ibge_str'].isin(indice_espacial.limites)
         
         # Filtra apenas municípios com match no GeoJSON
         df_regiao_com_match = df_regiao[df_regiao['tem_match']].copy()
         if df_regiao_com_match.empty:
             continue
 
-        features_region = [features_by_code.get(str(code)) for code in df_regiao_com_match['codigo_ibge']]
-        features_region = [feat for feat in features_region if feat is not None]
-        if not features_region:
-            continue
-
-        geojson_regiao = {"type": "FeatureCollection", "features": features_region}
+        if servidor_tiles is None:
+            # Bytes em cache por (códigos, zoom): repetir o recorte não recodifica os polígonos
+            codigos_regiao = df_regiao_com_match['codigo_ibge_str']
+            if codigos_visiveis is None:
+                geojson_regiao = indice_espacial.geojson_bytes(codigos_regiao, nivel_detalhe)
+            else:
+                visivel = codigos_regiao.isin(codigos_visiveis)
+                geojson_regiao = indice_espacial.geojson_bytes(
+                    codigos_regiao[visivel], nivel_detalhe, codigos_regiao[~visivel], nivel_contorno
+                )
 
-        # Prepara valores individuais para cada categoria (antes de criar o trace)
-        qtd_startups_vals = pd.to_numeric(df_regiao_com_match[coluna_qtd_startups], errors='coerce').fillna(0).astype(int).values if coluna_qtd_startups in df_regiao_com_match.columns else np.zeros(len(df_regiao_com_match))
-        qtd_empresas_ancora_vals = pd.to_numeric(df_regiao_com_match[coluna_qtd_empresas_ancora], errors='coerce').fillna(0).astype(int).values if coluna_qtd_empresas_ancora in df_regiao_com_match.columns else np.zeros(len(df_regiao_com_match))
-        qtd_fundos_e_investidores_vals = pd.to_numeric(df_regiao_com_match[coluna_qtd_fundos_e_investidores], errors='coerce').fillna(0).astype(int).values if coluna_qtd_fundos_e_investidores in df_regiao_com_match.columns else np.zeros(len(df_regiao_com_match))
-        qtd_universidades_icts_vals = pd.to_numeric(df_regiao_com_match[coluna_qtd_universidades_icts], errors='coerce').fillna(0).astype(int).values if coluna_qtd_universidades_icts in df_regiao_com_match.columns else np.zeros(len(df_regiao_com_match))
-        qtd_orgaos_vals = pd.to_numeric(df_regiao_com_match[coluna_qtd_orgaos], errors='coerce').fillna(0).astype(int).values if coluna_qtd_orgaos in df_regiao_com_match.columns else np.zeros(len(df_regiao_com_match))
-        qtd_hubs_incubadoras_parquestecnologicos_vals = pd.to_numeric(df_regiao_com_match[coluna_qtd_hubs_incubadoras_parquestecnologicos], errors='coerce').fillna(0).astype(int).values if coluna_qtd_hubs_incubadoras_parquestecnologicos in df_regiao_com_match.columns else np.zeros(len(df_regiao_com_match))
+        # Hover compacto: a região vai fixa no template, o nome do município em `text` e o
+        # customdata leva só inteiros: índices nas tabelas de rótulos (usadas pelo clique)
+        # e as contagens das categorias exibidas
+        n_municipios = len(df_regiao_com_match)
+        nomes_municipios = df_regiao_com_match[coluna_municipio].astype(str).values
+        customdata = np.column_stack(
+            [
+                np.full(n_municipios, indice_regiao),
+                np.arange(len(rotulos_municipios), len(rotulos_municipios) + n_municipios),
+            ]
+            + [_contagem_categoria(df_regiao_com_match, coluna) for coluna in colunas_hover]
+        ).astype(np.int32)
+        rotulos_municipios.extend(nomes_municipios.tolist())
+        hovertemplate_str = (
+            f"<b>Região:</b> {regiao}<br>"
+            "<b>Município:</b> %{text}<br>"
+            f"{hovertemplate_categorias}<extra></extra>"
+        )
 
-        # Constrói hovertemplate dinamicamente baseado nas categorias selecionadas
-        hovertemplate_parts = [
-            "<b>Região:</b> %{customdata[0]}<br>",
-            "<b>Município:</b> %{customdata[1]}<br>"
-        ]
-        
-        # Se nenhuma categoria selecionada, mostra todas as disponíveis
-        categorias_para_mostrar = categorias_selecionadas if categorias_selecionadas else categorias_disponiveis
-        
-        # Adiciona todas as categorias no customdata na ordem fixa: startups, empresas âncora, fundos, universidades, órgãos, hubs
-        # Índices: 0=região, 1=município, 2=startups, 3=empresas âncora, 4=fundos e investidores, 5=universidades e ICTs, 6=órgãos, 7=hubs
-        
-        # Adiciona apenas as categorias que devem ser mostradas no hovertemplate
-        if "Startup" in categorias_para_mostrar:
-            hovertemplate_parts.append("<b>Total de Startups:</b> %{customdata[2]}<br>")
-        
-        if "Empresa Âncora" in categorias_para_mostrar:
-            hovertemplate_parts.append("<b>Total de Empresas Âncora:</b> %{customdata[3]}<br>")
-        
-        if "Fundos e Investidores" in categorias_para_mostrar:
-            hovertemplate_parts.append("<b>Total de Fundos e Investidores:</b> %{customdata[4]}<br>")
-        
-        if "Universidades e ICTs" in categorias_para_mostrar:
-            hovertemplate_parts.append("<b>Total de Universidades e ICTs:</b> %{customdata[5]}<br>")
-        
-        if "Órgãos Públicos e Apoio" in categorias_para_mostrar:
-            hovertemplate_parts.append("<b>Total de Órgãos Públicos e Apoio:</b> %{customdata[6]}<br>")
-        
-        if "Hubs, Incubadoras e Parques Tecnológicos" in categorias_para_mostrar:
-            hovertemplate_parts.append("<b>Total de Hubs, Incubadoras e Parques Tecnológicos:</b> %{customdata[7]}<br>")
-        
-        hovertemplate_parts.append("<extra></extra>")
-        hovertemplate_str = "".join(hovertemplate_parts)
+        if servidor_tiles is not None:
+            # Polígonos pelas camadas de tiles; o trace é só um ponto por município (centro do bbox)
+            codigos_regiao = df_regiao_com_match['codigo_ibge_str'].tolist()
+            camadas_tiles.extend(_camadas_vector_tiles(
+                servidor_tiles, codigos_regiao, df_regiao_com_match['intensidade'], base_colors[regiao]
+            ))
+            centros = np.array([indice_espacial.limites[c] for c in codigos_regiao])
+            fig.add_trace(
+                go.Scattermapbox(
+                    lon=(centros[:, 0] + centros[:, 2]) / 2,
+                    lat=(centros[:, 1] + centros[:, 3]) / 2,
+                    mode="markers",
+                    marker=dict(size=9, color=base_colors[regiao], opacity=0.35),
+                    customdata=customdata,
+                    text=nomes_municipios,
+                    hovertemplate=hovertemplate_str,
+                    name=regiao,
+                    showlegend=True,
+                )
+            )
+            continue
 
         fig.add_trace(
             go.Choroplethmapbox(
-                geojson=geojson_regiao,
                 locations=df_regiao_com_match['codigo_ibge_str'],
                 z=df_regiao_com_match['intensidade'],
                 zmin=0,  # Mantém 0 para incluir todos os valores
@@ -3171,31 +3751,25 @@ def create_choropleth_map(df, df_atores=None):
                 marker_opacity=0.98,
                 marker_line_width=0.3,
                 marker_line_color="rgba(60,60,60,0.25)",
-                customdata=np.stack(
-                    (
-                        np.full(len(df_regiao_com_match), regiao),
-                        df_regiao_com_match[coluna_municipio].values,
-                        qtd_startups_vals,
-                        qtd_empresas_ancora_vals,
-                        qtd_fundos_e_investidores_vals,
-                        qtd_universidades_icts_vals,
-                        qtd_orgaos_vals,
-                        qtd_hubs_incubadoras_parquestecnologicos_vals,
-                    ),
-                    axis=-1,
-                ),
+                customdata=customdata,
+                text=nomes_municipios,
                 hovertemplate=hovertemplate_str,
                 name=regiao,
                 showscale=False,
                 showlegend=True,
             )
         )
+        fig.definir_geojson(len(fig.data) - 1, geojson_regiao)
+
+    # Tabelas de rótulos do clique (_ao_selecionar_mapa): índices do customdata -> nomes
+    st.session_state.rotulos_mapa = {"regioes": regioes, "municipios": rotulos_municipios}
     
-    map_layers = [MAP_BASE_LAYER] if MAP_BASE_LAYER else []
+    map_layers = ([MAP_BASE_LAYER] if MAP_BASE_LAYER else []) + camadas_tiles
 
     fig.update_layout(
         mapbox=dict(
-            style=MAP_STYLE,
+            # Com vector tiles, fundo sem mapa base externo (tudo servido localmente)
+            style="white-bg" if servidor_tiles is not None else MAP_STYLE,
             center=map_center,
             zoom=map_zoom,
             layers=map_layers,
@@ -3230,53 +3804,28 @@ def create_choropleth_map(df, df_atores=None):
         paper_bgcolor=SEBRAE_AZUL_CLARO,  # Fundo azul Sebrae
     )
 
-    # Mostra o mapa no lado direito (legenda está dentro do mapa)
-    with col_map:
-        # Habilita seleção no mapa para capturar cliques
-        fig.update_layout(
-            clickmode='event+select'
+    # Habilita seleção no mapa para capturar cliques
+    fig.update_layout(
+        clickmode='event+select'
+    )
+    
+    # Configura o mapa para permitir seleção
+    map_config = MAP_CONFIG.copy()
+    map_config['displayModeBar'] = True
+    
+    # Renderiza o mapa; o clique é tratado no callback _ao_selecionar_mapa
+    try:
+        exibir_grafico(
+            "mapa",
+            fig,
+            use_container_width=True,
+            config=map_config,
+            on_select=_ao_selecionar_mapa,
+            key="mapa_choropleth"
         )
-        
-        # Configura o mapa para permitir seleção
-        map_config = MAP_CONFIG.copy()
-        map_config['displayModeBar'] = True
-        
-        # Obtém o estado atual dos filtros para decidir o comportamento
-        regiao_atual = st.session_state.get("filtro_regiao", "Todas")
-        
-        # Renderiza o mapa e captura seleções usando on_select (Streamlit 1.28+)
-        try:
-            selected_data = st.plotly_chart(
-                fig, 
-                use_container_width=True, 
-                config=map_config,
-                on_select="rerun",
-                key="mapa_choropleth"
-            )
-            
-            # Quando há uma seleção, armazena para processar na próxima renderização
-            # IMPORTANTE: O on_select="rerun" faz rerun automaticamente quando há seleção
-            # Na próxima renderização (que acontece imediatamente após o clique), 
-            # a seleção será processada ANTES dos widgets serem criados
-            if selected_data and isinstance(selected_data, dict):
-                if 'selection' in selected_data:
-                    selection = selected_data['selection']
-                    if selection and 'points' in selection and len(selection['points']) > 0:
-                        point = selection['points'][0]
-                        if 'customdata' in point and len(point['customdata']) >= 2:
-                            # Cria hash da seleção para verificar se é nova
-                            selecao_hash = str(point['customdata'][0]) + "|" + str(point['customdata'][1])
-                            ultima_hash = st.session_state.get("ultima_selecao_processada", None)
-                            
-                            # Se é uma seleção nova, armazena e força rerun para processar imediatamente
-                            if selecao_hash != ultima_hash:
-                                st.session_state.mapa_selecao_pendente = selection
-                                # Força rerun para processar a seleção na próxima renderização
-                                # (antes dos widgets serem criados)
-                                st.rerun()
-        except TypeError:
-            # Fallback para versões antigas do Streamlit que não suportam on_select
-            st.plotly_chart(fig, use_container_width=True, config=map_config)
+    except TypeError:
+        # Fallback para versões antigas do Streamlit que não suportam on_select
+        exibir_grafico("mapa", fig, use_container_width=True, config=map_config)
 
 
 def create_alternative_choropleth(df_regions):
@@ -3366,7 +3915,7 @@ def create_alternative_choropleth(df_regions):
     )
 
     # Mostra o mapa ocupando toda a largura (legenda está dentro do mapa)
-    st.plotly_chart(fig, use_container_width=True, config=MAP_CONFIG)
+    exibir_grafico("mapa_alternativo", fig, use_container_width=True, config=MAP_CONFIG)
 
 def _render_custom_html_table(df_display, styled_df, is_multiindex, categoria_col_for_style,
                              regiao_col_for_style, regioes_cores, coluna_site, format_dict):
@@ -3384,6 +3933,8 @@ def _render_custom_html_table(df_display, styled_df, is_multiindex, categoria_co
         coluna_site,
         format_dict
     )
+    if profiling.ativo():
+        profiling.registrar_payload("tabela_atores", len(html_table.encode("utf-8")))
     # Separa o CSS do HTML para injetar corretamente
     if html_table.startswith('<style>'):
         # Extrai o CSS e o HTML
@@ -3397,6 +3948,7 @@ def _render_custom_html_table(df_display, styled_df, is_multiindex, categoria_co
     else:
         st.markdown(html_table, unsafe_allow_html=True)
 
+@profiling.cronometrado()
 def _build_custom_html_table(df_display, styled_df, is_multiindex, categoria_col_for_style, 
                              regiao_col_for_style, regioes_cores, coluna_site, format_dict):
     """
@@ -3804,7 +4356,7 @@ def create_data_table(df, df_regions_map=None):
     buscar_coluna(['foundationyear', 'foundation_year', 'ano de fundação', 'ano'])
     
     # 8. Descrição
-    buscar_coluna(['description', 'descrição', 'descricao'])
+    buscar_coluna(COLUNAS_DESCRICAO_TABELA)
     
     # Se não encontrou nenhuma coluna específica, usa todas as colunas disponíveis
     if not colunas_disponiveis:
@@ -4603,286 +5155,397 @@ def create_data_table(df, df_regions_map=None):
     else:
         st.warning("Nenhuma coluna encontrada nos dados.")
 
-def main():
+@fragmento(key="secao_setores")
+def render_secao_setores(df_startups):
     """
-    Função principal do dashboard
+    Seção de análise por setores (fragmento: recalcula apenas quando seus dados mudam).
+    """
+    if not df_startups.empty and 'sector' in df_startups.columns:
+        create_sector_analysis(df_startups)
+
+
+@fragmento(key="secao_temporal")
+def render_secao_temporal(df_startups):
+    """
+    Seção de análise temporal (fragmento: recalcula apenas quando seus dados mudam).
+    """
+    if not df_startups.empty and 'foundationYear' in df_startups.columns:
+        create_temporal_analysis(df_startups)
+
+
+@profiling.cronometrado()
+def render_secao_mapa(df_mapa, df_startups):
+    """
+    Seção do mapa choropleth (usa dados de "Municípios e Regiões").
+    O painel de filtros e o mapa são fragmentos próprios; seus callbacks reexecutam
+    apenas os fragmentos dependentes (incluindo a tabela), sem rerun do app inteiro.
+    """
+    create_choropleth_map(df_mapa, df_startups if not df_startups.empty else None)
+
+
+@fragmento(key="secao_tabela")
+def render_secao_tabela(df_startups):
+    """
+    Seção da tabela de atores: aplica os filtros do mapa, a pesquisa por nome e renderiza a tabela.
+    Roda como fragmento — digitar na pesquisa não reconstrói o mapa nem os gráficos.
     """
-    # Carrega dados do mapa (aba "Municípios e Regiões")
-    with st.spinner("Carregando dados do mapa..."):
-        df_mapa = load_data_municipios_regioes(force_reload=False)
-    
-    # Carrega dados da tabela (aba "Base | Atores MG")
-    with st.spinner("Carregando dados das startups..."):
-        df_startups = load_data_base_atores(force_reload=False)
-    
-    if df_mapa.empty:
-        st.error("Não foi possível carregar os dados do mapa.")
-        return
-    
     if df_startups.empty:
-        st.warning("Não foi possível carregar os dados das startups. A tabela não será exibida.")
-    
-    # Usa os dados sem filtros do sidebar (sidebar removido)
-    df_mapa_filtered = df_mapa
+        return
     
-    # Usa os dados sem filtros do sidebar (sidebar removido)
-    df_startups_filtered = df_startups if not df_startups.empty else df_startups
+    # Descrição fica fora da carga principal: lida aqui, só se a tabela for exibi-la
+    df_startups = completar_colunas_pesadas(df_startups, COLUNAS_DESCRICAO_TABELA)
     
-    # Cria visualizações
-    # Análise por setores (apenas se a coluna existir)
-    if not df_startups_filtered.empty and 'sector' in df_startups_filtered.columns:
-        create_sector_analysis(df_startups_filtered)
+    # Aplica os mesmos filtros do mapa aos dados das startups
+    df_startups_para_tabela = df_startups.copy()
     
-    # Mapa político choropleth (usa dados de "Municípios e Regiões")
-    create_choropleth_map(df_mapa_filtered, df_startups if not df_startups.empty else None)
+    # Obtém os valores dos filtros do session_state (definidos no mapa)
+    regiao_filtro_tabela = st.session_state.get("filtro_regiao", "Todas")
+    municipio_filtro_tabela = st.session_state.get("filtro_municipio", "Todos")
+    categorias_filtro_tabela = st.session_state.get("filtro_categoria", [])
+    segmentos_filtro_tabela = st.session_state.get("filtro_segmentos", [])
     
-    # Análise temporal (apenas se a coluna existir)
-    if not df_startups_filtered.empty and 'foundationYear' in df_startups_filtered.columns:
-        create_temporal_analysis(df_startups_filtered)
+    # Aplica filtro de região
+    if regiao_filtro_tabela != "Todas":
+            # Procura coluna de região nas startups (com várias variações)
+            coluna_regiao_startups = None
+            possiveis_nomes_regiao = ['região sebrae', 'regiao sebrae', 'região_sebrae', 'regiao_sebrae', 
+                                     'nome_mesorregiao', 'mesorregiao', 'regiao', 'região']
+            for col in df_startups_para_tabela.columns:
+                col_lower = col.lower().strip()
+                if any(nome in col_lower for nome in possiveis_nomes_regiao):
+                    coluna_regiao_startups = col
+                    break
+            
+            if coluna_regiao_startups:
+                df_startups_para_tabela = df_startups_para_tabela[
+                    df_startups_para_tabela[coluna_regiao_startups].astype(str).str.strip() == regiao_filtro_tabela
+                ]
     
-    # Linha separadora antes da tabela
-    st.markdown("---")
+    # Aplica filtro de município
+    if municipio_filtro_tabela != "Todos":
+            # Procura coluna de município/cidade nas startups
+            coluna_municipio_startups = None
+            possiveis_nomes_municipio = ['cidade', 'municipio', 'cidade_max', 'município']
+            for col in df_startups_para_tabela.columns:
+                col_lower = col.lower().strip()
+                if any(nome in col_lower for nome in possiveis_nomes_municipio):
+                    coluna_municipio_startups = col
+                    break
+            
+            if coluna_municipio_startups:
+                df_startups_para_tabela = df_startups_para_tabela[
+                    df_startups_para_tabela[coluna_municipio_startups].astype(str).str.strip() == municipio_filtro_tabela
+                ]
     
-    # Campo de pesquisa acima da tabela
-    if not df_startups_filtered.empty:
-        # Aplica os mesmos filtros do mapa aos dados das startups
-        df_startups_para_tabela = df_startups_filtered.copy()
-        
-        # Obtém os valores dos filtros do session_state (definidos no mapa)
-        regiao_filtro_tabela = st.session_state.get("filtro_regiao", "Todas")
-        municipio_filtro_tabela = st.session_state.get("filtro_municipio", "Todos")
-        categorias_filtro_tabela = st.session_state.get("filtro_categoria", [])
-        segmentos_filtro_tabela = st.session_state.get("filtro_segmentos", [])
-        
-        # Aplica filtro de região
-        if regiao_filtro_tabela != "Todas":
-                # Procura coluna de região nas startups (com várias variações)
-                coluna_regiao_startups = None
-                possiveis_nomes_regiao = ['região sebrae', 'regiao sebrae', 'região_sebrae', 'regiao_sebrae', 
-                                         'nome_mesorregiao', 'mesorregiao', 'regiao', 'região']
-                for col in df_startups_para_tabela.columns:
-                    col_lower = col.lower().strip()
-                    if any(nome in col_lower for nome in possiveis_nomes_regiao):
-                        coluna_regiao_startups = col
-                        break
-                
-                if coluna_regiao_startups:
-                    df_startups_para_tabela = df_startups_para_tabela[
-                        df_startups_para_tabela[coluna_regiao_startups].astype(str).str.strip() == regiao_filtro_tabela
-                    ]
-        
-        # Aplica filtro de município
-        if municipio_filtro_tabela != "Todos":
-                # Procura coluna de município/cidade nas startups
-                coluna_municipio_startups = None
-                possiveis_nomes_municipio = ['cidade', 'municipio', 'cidade_max', 'município']
-                for col in df_startups_para_tabela.columns:
-                    col_lower = col.lower().strip()
-                    if any(nome in col_lower for nome in possiveis_nomes_municipio):
-                        coluna_municipio_startups = col
-                        break
-                
-                if coluna_municipio_startups:
-                    df_startups_para_tabela = df_startups_para_tabela[
-                        df_startups_para_tabela[coluna_municipio_startups].astype(str).str.strip() == municipio_filtro_tabela
-                    ]
-        
-        # Aplica filtro de categoria
-        # IMPORTANTE: Se não há filtros de categoria selecionados, mostra TODOS os dados (não aplica filtro)
-        if categorias_filtro_tabela and len(categorias_filtro_tabela) > 0:
-            # Há filtros de categoria selecionados - aplica o filtro
-                # Procura coluna de categoria nas startups
-                coluna_categoria_startups = None
-                possiveis_nomes_categoria = ['categoria', 'category', 'tipo', 'type', 'tipo_ator', 'actor_type']
-                for col in df_startups_para_tabela.columns:
-                    col_lower = col.lower().strip()
-                    if any(nome == col_lower or nome in col_lower for nome in possiveis_nomes_categoria):
-                        coluna_categoria_startups = col
-                        break
-                
-                if coluna_categoria_startups:
-                    # Mapeia nomes do filtro do mapa para valores reais na planilha
-                    # Cada filtro do mapa mapeia para as categorias específicas que devem aparecer na tabela
-                    mapeamento_categorias = {
-                        # Startup
-                        "startup": ["startup", "startups"],
-                        "startups": ["startup", "startups"],
-                        
-                        # Grandes Empresas Âncoras → mostra "Empresa Âncora" E "Empresa Estatal"
-                        "grandes empresas âncoras": ["empresa âncora", "empresa ancora", "empresa estatal"],
-                        "grandes empresas ancora": ["empresa âncora", "empresa ancora", "empresa estatal"],
-                        "empresa âncora": ["empresa âncora", "empresa ancora"],  # Se selecionar diretamente, só mostra essa
-                        "empresa ancora": ["empresa âncora", "empresa ancora"],
-                        "empresa estatal": ["empresa estatal"],  # Se selecionar diretamente, só mostra essa
-                        
-                        # Fundos e Investidores → mostra "Fundos e Investidores"
-                        "fundos e investidores": ["fundos e investidores", "fundo e investidor", "fundos e investidor", "fundo e investidores"],
-                        "fundo e investidor": ["fundos e investidores", "fundo e investidor", "fundos e investidor", "fundo e investidores"],
-                        
-                        # Universidades e ICTs → mostra "ICT", "Universidade" E "Universidade/ICT"
-                        "universidades e icts": ["ict", "universidade", "universidade/ict", "universidade / ict"],
-                        "universidade e ict": ["ict", "universidade", "universidade/ict", "universidade / ict"],
-                        "ict": ["ict"],  # Se selecionar diretamente, só mostra essa
-                        "universidade": ["universidade"],  # Se selecionar diretamente, só mostra essa
-                        "universidade/ict": ["universidade/ict", "universidade / ict"],  # Se selecionar diretamente, só mostra essa
-                        
-                        # Hubs, Incubadoras e Parques Tecnológicos → mostra "Aceleradora", "Ecossistema", "Hub", "Incubadora" E "Parque Tecnológico"
-                        "hubs, incubadoras e parques tecnológicos": ["aceleradora", "ecossistema", "hub", "incubadora", "parque tecnológico", "parque tecnologico"],
-                        "hubs incubadoras e parques tecnologicos": ["aceleradora", "ecossistema", "hub", "incubadora", "parque tecnológico", "parque tecnologico"],
-                        "aceleradora": ["aceleradora"],  # Se selecionar diretamente, só mostra essa
-                        "ecossistema": ["ecossistema"],  # Se selecionar diretamente, só mostra essa
-                        "hub": ["hub"],  # Se selecionar diretamente, só mostra essa
-                        "incubadora": ["incubadora"],  # Se selecionar diretamente, só mostra essa
-                        "parque tecnológico": ["parque tecnológico", "parque tecnologico"],  # Se selecionar diretamente, só mostra essa
-                        "parque tecnologico": ["parque tecnológico", "parque tecnologico"],
-                        
-                        # Órgãos Públicos e Apoio → mostra "Órgão Público" E "Órgão de Apoio"
-                        "órgãos públicos e apoio": ["órgão público", "orgao publico", "órgão de apoio", "orgao de apoio"],
-                        "orgaos publicos e apoio": ["órgão público", "orgao publico", "órgão de apoio", "orgao de apoio"],
-                        "órgão público": ["órgão público", "orgao publico"],  # Se selecionar diretamente, só mostra essa
-                        "orgao publico": ["órgão público", "orgao publico"],
-                        "órgão de apoio": ["órgão de apoio", "orgao de apoio"],  # Se selecionar diretamente, só mostra essa
-                        "orgao de apoio": ["órgão de apoio", "orgao de apoio"]
-                    }
+    # Aplica filtro de categoria
+    # IMPORTANTE: Se não há filtros de categoria selecionados, mostra TODOS os dados (não aplica filtro)
+    if categorias_filtro_tabela and len(categorias_filtro_tabela) > 0:
+        # Há filtros de categoria selecionados - aplica o filtro
+            # Procura coluna de categoria nas startups
+            coluna_categoria_startups = None
+            possiveis_nomes_categoria = ['categoria', 'category', 'tipo', 'type', 'tipo_ator', 'actor_type']
+            for col in df_startups_para_tabela.columns:
+                col_lower = col.lower().strip()
+                if any(nome == col_lower or nome in col_lower for nome in possiveis_nomes_categoria):
+                    coluna_categoria_startups = col
+                    break
+            
+            if coluna_categoria_startups:
+                # Mapeia nomes do filtro do mapa para valores reais na planilha
+                # Cada filtro do mapa mapeia para as categorias específicas que devem aparecer na tabela
+                mapeamento_categorias = {
+                    # Startup
+                    "startup": ["startup", "startups"],
+                    "startups": ["startup", "startups"],
                     
-                    # Normaliza valores para comparação case-insensitive
-                    coluna_categoria_normalizada = df_startups_para_tabela[coluna_categoria_startups].astype(str).str.strip().str.lower()
+                    # Grandes Empresas Âncoras → mostra "Empresa Âncora" E "Empresa Estatal"
+                    "grandes empresas âncoras": ["empresa âncora", "empresa ancora", "empresa estatal"],
+                    "grandes empresas ancora": ["empresa âncora", "empresa ancora", "empresa estatal"],
+                    "empresa âncora": ["empresa âncora", "empresa ancora"],  # Se selecionar diretamente, só mostra essa
+                    "empresa ancora": ["empresa âncora", "empresa ancora"],
+                    "empresa estatal": ["empresa estatal"],  # Se selecionar diretamente, só mostra essa
                     
-                    # Cria lista de valores possíveis baseado no mapeamento
-                    valores_possiveis = set()
-                    for cat_filtro in categorias_filtro_tabela:
-                        cat_filtro_str = str(cat_filtro).strip().lower()
-                        
-                        # Adiciona valores mapeados se existirem
-                        if cat_filtro_str in mapeamento_categorias:
-                            valores_possiveis.update(mapeamento_categorias[cat_filtro_str])
-                        else:
-                            # Se não encontrou no mapeamento, tenta busca parcial
-                            # Verifica se alguma chave do mapeamento contém o filtro ou vice-versa
-                            encontrou_mapeamento = False
-                            for chave_mapeamento, valores_mapeados in mapeamento_categorias.items():
-                                # Se o filtro contém a chave ou a chave contém o filtro
-                                if cat_filtro_str in chave_mapeamento or chave_mapeamento in cat_filtro_str:
-                                    valores_possiveis.update(valores_mapeados)
-                                    encontrou_mapeamento = True
-                            
-                            # Se não encontrou nenhum mapeamento, adiciona o valor exato como fallback
-                            if not encontrou_mapeamento:
-                                valores_possiveis.add(cat_filtro_str)
+                    # Fundos e Investidores → mostra "Fundos e Investidores"
+                    "fundos e investidores": ["fundos e investidores", "fundo e investidor", "fundos e investidor", "fundo e investidores"],
+                    "fundo e investidor": ["fundos e investidores", "fundo e investidor", "fundos e investidor", "fundo e investidores"],
+                    
+                    # Universidades e ICTs → mostra "ICT", "Universidade" E "Universidade/ICT"
+                    "universidades e icts": ["ict", "universidade", "universidade/ict", "universidade / ict"],
+                    "universidade e ict": ["ict", "universidade", "universidade/ict", "universidade / ict"],
+                    "ict": ["ict"],  # Se selecionar diretamente, só mostra essa
+                    "universidade": ["universidade"],  # Se selecionar diretamente, só mostra essa
+                    "universidade/ict": ["universidade/ict", "universidade / ict"],  # Se selecionar diretamente, só mostra essa
                     
-                    # Cria máscara: registros cuja categoria normalizada está na lista de valores possíveis
-                    mask = coluna_categoria_normalizada.isin(list(valores_possiveis))
+                    # Hubs, Incubadoras e Parques Tecnológicos → mostra "Aceleradora", "Ecossistema", "Hub", "Incubadora" E "Parque Tecnológico"
+                    "hubs, incubadoras e parques tecnológicos": ["aceleradora", "ecossistema", "hub", "incubadora", "parque tecnológico", "parque tecnologico"],
+                    "hubs incubadoras e parques tecnologicos": ["aceleradora", "ecossistema", "hub", "incubadora", "parque tecnológico", "parque tecnologico"],
+                    "aceleradora": ["aceleradora"],  # Se selecionar diretamente, só mostra essa
+                    "ecossistema": ["ecossistema"],  # Se selecionar diretamente, só mostra essa
+                    "hub": ["hub"],  # Se selecionar diretamente, só mostra essa
+                    "incubadora": ["incubadora"],  # Se selecionar diretamente, só mostra essa
+                    "parque tecnológico": ["parque tecnológico", "parque tecnologico"],  # Se selecionar diretamente, só mostra essa
+                    "parque tecnologico": ["parque tecnológico", "parque tecnologico"],
                     
-                    # Aplica o filtro - usa .loc para garantir alinhamento correto do índice
-                    df_startups_para_tabela = df_startups_para_tabela.loc[mask].copy()
+                    # Órgãos Públicos e Apoio → mostra "Órgão Público" E "Órgão de Apoio"
+                    "órgãos públicos e apoio": ["órgão público", "orgao publico", "órgão de apoio", "orgao de apoio"],
+                    "orgaos publicos e apoio": ["órgão público", "orgao publico", "órgão de apoio", "orgao de apoio"],
+                    "órgão público": ["órgão público", "orgao publico"],  # Se selecionar diretamente, só mostra essa
+                    "orgao publico": ["órgão público", "orgao publico"],
+                    "órgão de apoio": ["órgão de apoio", "orgao de apoio"],  # Se selecionar diretamente, só mostra essa
+                    "orgao de apoio": ["órgão de apoio", "orgao de apoio"]
+                }
+                
+                # Normaliza valores para comparação case-insensitive
+                coluna_categoria_normalizada = df_startups_para_tabela[coluna_categoria_startups].astype(str).str.strip().str.lower()
+                
+                # Cria lista de valores possíveis baseado no mapeamento
+                valores_possiveis = set()
+                for cat_filtro in categorias_filtro_tabela:
+                    cat_filtro_str = str(cat_filtro).strip().lower()
+                    
+                    # Adiciona valores mapeados se existirem
+                    if cat_filtro_str in mapeamento_categorias:
+                        valores_possiveis.update(mapeamento_categorias[cat_filtro_str])
+                    else:
+                        # Se não encontrou no mapeamento, tenta busca parcial
+                        # Verifica se alguma chave do mapeamento contém o filtro ou vice-versa
+                        encontrou_mapeamento = False
+                        for chave_mapeamento, valores_mapeados in mapeamento_categorias.items():
+                            # Se o filtro contém a chave ou a chave contém o filtro
+                            if cat_filtro_str in chave_mapeamento or chave_mapeamento in cat_filtro_str:
+                                valores_possiveis.update(valores_mapeados)
+                                encontrou_mapeamento = True
+                        
+                        # Se não encontrou nenhum mapeamento, adiciona o valor exato como fallback
+                        if not encontrou_mapeamento:
+                            valores_possiveis.add(cat_filtro_str)
+                
+                # Cria máscara: registros cuja categoria normalizada está na lista de valores possíveis
+                mask = coluna_categoria_normalizada.isin(list(valores_possiveis))
+                
+                # Aplica o filtro - usa .loc para garantir alinhamento correto do índice
+                df_startups_para_tabela = df_startups_para_tabela.loc[mask].copy()
+    
+    # Aplica filtro de segmentos (apenas para startups)
+    if segmentos_filtro_tabela and len(segmentos_filtro_tabela) > 0:
+        # Procura coluna de setor/segmento nas startups
+        coluna_setor_startups = None
+        possiveis_nomes_setor = ['setor', 'sector', 'segmento', 'segment', 'segmentos', 'setores']
+        for col in df_startups_para_tabela.columns:
+            col_lower = str(col).lower().strip()
+            if any(nome in col_lower for nome in possiveis_nomes_setor):
+                coluna_setor_startups = col
+                break
         
-        # Aplica filtro de segmentos (apenas para startups)
-        if segmentos_filtro_tabela and len(segmentos_filtro_tabela) > 0:
-            # Procura coluna de setor/segmento nas startups
-            coluna_setor_startups = None
-            possiveis_nomes_setor = ['setor', 'sector', 'segmento', 'segment', 'segmentos', 'setores']
+        if coluna_setor_startups:
+            # Procura coluna de categoria para filtrar apenas startups
+            coluna_categoria_startups = None
+            possiveis_nomes_categoria = ['categoria', 'category', 'tipo', 'type', 'tipo_ator', 'actor_type']
             for col in df_startups_para_tabela.columns:
                 col_lower = str(col).lower().strip()
-                if any(nome in col_lower for nome in possiveis_nomes_setor):
-                    coluna_setor_startups = col
+                if any(nome == col_lower or nome in col_lower for nome in possiveis_nomes_categoria):
+                    coluna_categoria_startups = col
                     break
             
-            if coluna_setor_startups:
-                # Procura coluna de categoria para filtrar apenas startups
-                coluna_categoria_startups = None
-                possiveis_nomes_categoria = ['categoria', 'category', 'tipo', 'type', 'tipo_ator', 'actor_type']
-                for col in df_startups_para_tabela.columns:
-                    col_lower = str(col).lower().strip()
-                    if any(nome == col_lower or nome in col_lower for nome in possiveis_nomes_categoria):
-                        coluna_categoria_startups = col
-                        break
+            if coluna_categoria_startups:
+                # Separa startups e outros atores
+                mask_startup = df_startups_para_tabela[coluna_categoria_startups].astype(str).str.strip().str.lower() == 'startup'
+                df_startups_filtrado = df_startups_para_tabela[mask_startup].copy()
+                df_outros_atores = df_startups_para_tabela[~mask_startup].copy()
                 
-                if coluna_categoria_startups:
-                    # Separa startups e outros atores
-                    mask_startup = df_startups_para_tabela[coluna_categoria_startups].astype(str).str.strip().str.lower() == 'startup'
-                    df_startups_filtrado = df_startups_para_tabela[mask_startup].copy()
-                    df_outros_atores = df_startups_para_tabela[~mask_startup].copy()
-                    
-                    # Aplica filtro de segmentos apenas nas startups
-                    df_startups_filtrado = df_startups_filtrado[
-                        df_startups_filtrado[coluna_setor_startups].astype(str).str.strip().isin(
-                            [str(seg).strip() for seg in segmentos_filtro_tabela]
-                        )
-                    ]
-                    
-                    # Combina startups filtradas com outros atores (não afetados)
-                    df_startups_para_tabela = pd.concat([df_startups_filtrado, df_outros_atores], ignore_index=True)
-                else:
-                    # Se não encontrou coluna de categoria, aplica filtro em todos (menos ideal)
-                    df_startups_para_tabela = df_startups_para_tabela[
-                        df_startups_para_tabela[coluna_setor_startups].astype(str).str.strip().isin(
-                            [str(seg).strip() for seg in segmentos_filtro_tabela]
-                        )
-                    ]
+                # Aplica filtro de segmentos apenas nas startups
+                df_startups_filtrado = df_startups_filtrado[
+                    df_startups_filtrado[coluna_setor_startups].astype(str).str.strip().isin(
+                        [str(seg).strip() for seg in segmentos_filtro_tabela]
+                    )
+                ]
+                
+                # Combina startups filtradas com outros atores (não afetados)
+                df_startups_para_tabela = pd.concat([df_startups_filtrado, df_outros_atores], ignore_index=True)
+            else:
+                # Se não encontrou coluna de categoria, aplica filtro em todos (menos ideal)
+                df_startups_para_tabela = df_startups_para_tabela[
+                    df_startups_para_tabela[coluna_setor_startups].astype(str).str.strip().isin(
+                        [str(seg).strip() for seg in segmentos_filtro_tabela]
+                    )
+                ]
+    
+    # Campo de pesquisa (fora do bloco if/else para funcionar em ambos os casos)
+    texto_pesquisa = st.text_input(
+        "🔍 Pesquisar por nome",
+        value="",
+        placeholder="Digite o nome do ator...",
+        key="campo_pesquisa_tabela"
+    )
+    
+    # Filtra os dados baseado na pesquisa
+    df_tabela_filtrado = df_startups_para_tabela.copy()
+    
+    if texto_pesquisa and texto_pesquisa.strip():
+        texto_busca = texto_pesquisa.strip()
         
-        # Campo de pesquisa (fora do bloco if/else para funcionar em ambos os casos)
-        texto_pesquisa = st.text_input(
-            "🔍 Pesquisar por nome",
-            value="",
-            placeholder="Digite o nome do ator...",
-            key="campo_pesquisa_tabela"
-        )
+        # Procura na coluna de nome (pode ter diferentes nomes)
+        coluna_nome = None
+        possiveis_colunas_nome = ['name', 'nome', 'nome_ator', 'nome_atore', 'actor_name', 'nome_empresa', 'nome do ator']
         
-        # Filtra os dados baseado na pesquisa
-        df_tabela_filtrado = df_startups_para_tabela.copy()
+        # Primeiro tenta busca exata (case-insensitive)
+        for col in possiveis_colunas_nome:
+            if col in df_tabela_filtrado.columns:
+                coluna_nome = col
+                break
         
-        if texto_pesquisa and texto_pesquisa.strip():
-            texto_busca = texto_pesquisa.strip()
-            
-            # Procura na coluna de nome (pode ter diferentes nomes)
-            coluna_nome = None
-            possiveis_colunas_nome = ['name', 'nome', 'nome_ator', 'nome_atore', 'actor_name', 'nome_empresa', 'nome do ator']
-            
-            # Primeiro tenta busca exata (case-insensitive)
-            for col in possiveis_colunas_nome:
-                if col in df_tabela_filtrado.columns:
-                    coluna_nome = col
-                    break
-            
-            # Se não encontrou, tenta busca case-insensitive nos nomes das colunas
-            if not coluna_nome:
-                for col in df_tabela_filtrado.columns:
-                    col_lower = str(col).lower().strip()
-                    for possivel in possiveis_colunas_nome:
-                        if possivel.lower() in col_lower or col_lower in possivel.lower():
-                            coluna_nome = col
-                            break
-                    if coluna_nome:
+        # Se não encontrou, tenta busca case-insensitive nos nomes das colunas
+        if not coluna_nome:
+            for col in df_tabela_filtrado.columns:
+                col_lower = str(col).lower().strip()
+                for possivel in possiveis_colunas_nome:
+                    if possivel.lower() in col_lower or col_lower in possivel.lower():
+                        coluna_nome = col
                         break
-            
-            if coluna_nome:
-                # Busca case-insensitive e parcial (contém)
-                mask = df_tabela_filtrado[coluna_nome].astype(str).str.contains(
-                    texto_busca,
-                    case=False,
-                    na=False,
-                    regex=False
-                )
-                df_tabela_filtrado = df_tabela_filtrado[mask]
-            else:
-                # Se não encontrou coluna de nome, tenta buscar em todas as colunas de texto
-                mask = pd.Series([False] * len(df_tabela_filtrado))
-                for col in df_tabela_filtrado.columns:
-                    if df_tabela_filtrado[col].dtype == 'object':  # Colunas de texto
-                        mask |= df_tabela_filtrado[col].astype(str).str.contains(
-                            texto_busca,
-                            case=False,
-                            na=False,
-                            regex=False
-                        )
-                df_tabela_filtrado = df_tabela_filtrado[mask]
+                if coluna_nome:
+                    break
         
-        # Tabela de dados (usa dados filtrados)
-        create_data_table(df_tabela_filtrado)
+        if coluna_nome:
+            # Busca case-insensitive e parcial (contém)
+            mask = df_tabela_filtrado[coluna_nome].astype(str).str.contains(
+                texto_busca,
+                case=False,
+                na=False,
+                regex=False
+            )
+            df_tabela_filtrado = df_tabela_filtrado[mask]
+        else:
+            # Se não encontrou coluna de nome, tenta buscar em todas as colunas de texto
+            mask = pd.Series([False] * len(df_tabela_filtrado))
+            for col in df_tabela_filtrado.columns:
+                if df_tabela_filtrado[col].dtype == 'object':  # Colunas de texto
+                    mask |= df_tabela_filtrado[col].astype(str).str.contains(
+                        texto_busca,
+                        case=False,
+                        na=False,
+                        regex=False
+                    )
+            df_tabela_filtrado = df_tabela_filtrado[mask]
+    
+    # Tabela de dados (usa dados filtrados)
+    create_data_table(df_tabela_filtrado)
+
+
+def _abas_sob_demanda(rotulos, padrao=None):
+    """
+    Cria abas em que apenas a aba aberta executa seu conteúdo.
+    Retorna lista de (aba, aberta). Em versões do Streamlit sem abas sob demanda,
+    todas as abas são consideradas abertas (comportamento anterior).
+    """
+    try:
+        abas = st.tabs(rotulos, default=padrao, key="secao_ativa", on_change="rerun")
+    except TypeError:
+        return [(aba, True) for aba in st.tabs(rotulos)]
+    resultado = []
+    for aba in abas:
+        aberta = getattr(aba, "open", None)
+        resultado.append((aba, True if aberta is None else bool(aberta)))
+    return resultado
+
+
+# Caches que o orçamento de memória pode descartar (o mais pesado primeiro); todos se
+# recompõem na próxima chamada
+for _cache_descartavel in (
+    load_data_from_sheets,
+    load_data_municipios_regioes,
+    load_data_base_atores,
+    load_colunas_pesadas_atores,
+    load_planilhas_dashboard,
+    load_geojson_mg,
+    load_municipios_com_coordenadas,
+    _relatorio_qualidade_cacheado,
+    _build_sector_figures,
+    _build_temporal_figures,
+    _viewports_cacheados,
+):
+    session_memory.registrar_cache(_cache_descartavel)
+
+# Caches do processo fora do st.cache_data (os maiores com o agendador ligado, quando os
+# carregadores acima quase não guardam nada): medidos pelos próprios objetos
+session_memory.registrar_descartavel(
+    "geojson_serializado", geometry_store.limpar_caches, geometry_store.bytes_em_cache
+)
+session_memory.registrar_descartavel(
+    "_indice_espacial_cacheado", map_geometry.limpar_caches, map_geometry.bytes_em_cache
+)
+if MODO_VECTOR_TILES:
+    def _limpar_tiles():
+        servidor = _servidor_tiles_processo()
+        if servidor is not None:
+            servidor.limpar_cache()
+
+    def _bytes_tiles():
+        servidor = _servidor_tiles_processo()
+        return servidor.bytes_em_cache if servidor is not None else 0
+
+    session_memory.registrar_descartavel("vector_tiles", _limpar_tiles, _bytes_tiles)
+
+
+def main():
+    """
+    Função principal do dashboard
+    """
+    # GeoJSON e coordenadas (só usados pelo mapa) carregam em segundo plano enquanto as
+    # planilhas carregam; as seções que só dependem das planilhas aparecem sem esperar por eles
+    antecipar_cargas(
+        ("geojson_mg", load_geojson_mg),
+        ("municipios_coordenadas", load_municipios_com_coordenadas),
+    )
+    
+    # Carrega as abas "Municípios e Regiões" (mapa) e "Base | Atores MG" (tabela) juntas
+    with st.spinner("Carregando dados das planilhas..."):
+        planilhas = obter_dados("planilhas", load_planilhas_dashboard)
+    df_mapa = planilhas.get("municipios_regioes", pd.DataFrame())
+    df_startups = planilhas.get("base_atores", pd.DataFrame())
+    
+    if df_mapa.empty:
+        st.error("Não foi possível carregar os dados do mapa.")
+        return
+    
+    if df_startups.empty:
+        st.warning("Não foi possível carregar os dados das startups. A tabela não será exibida.")
+    
+    if EXIBIR_QUALIDADE_DADOS:
+        render_relatorio_qualidade()
+    
+    # Cada seção é um fragmento independente: interações numa seção não reconstroem as outras
+    secoes = [
+        ("🏢 Setores", lambda: render_secao_setores(df_startups)),
+        ("🗺️ Mapa", lambda: render_secao_mapa(df_mapa, df_startups)),
+        ("📈 Temporal", lambda: render_secao_temporal(df_startups)),
+        ("📋 Atores", lambda: render_secao_tabela(df_startups)),
+    ]
+    
+    if RENDERIZACAO_SOB_DEMANDA:
+        # Modo sob demanda: cada seção em uma aba, apenas a aba aberta é executada
+        rotulos = [rotulo for rotulo, _ in secoes]
+        for (aba, aberta), (_, render) in zip(_abas_sob_demanda(rotulos, padrao="🗺️ Mapa"), secoes):
+            if aberta:
+                with aba:
+                    render()
+        return
+    
+    # Modo padrão: todas as seções empilhadas
+    render_secao_setores(df_startups)
+    render_secao_mapa(df_mapa, df_startups)
+    render_secao_temporal(df_startups)
+    
+    # Linha separadora antes da tabela
+    st.markdown("---")
+    
+    render_secao_tabela(df_startups)
     
     
     # Footer
 
 if __name__ == "__main__":
-    main()
+    with session_memory.rerun_sessao(), profiling.rerun() as registro_perfil:
+        main()
+        if registro_perfil is not None:
+            render_painel_perfil(registro_perfil)
 
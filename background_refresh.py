@@ -0,0 +1,187 @@
+"""
+Agendador de atualização em segundo plano para as fontes de dados do dashboard.
+
+Uma thread daemon recarrega cada fonte (planilhas, GeoJSON, coordenadas) na sua
+cadência e publica a nova versão de forma atômica. Depois da primeira carga as
+leituras nunca esperam pela rede (stale-while-revalidate): enquanto a atualização
+roda, a versão anterior continua sendo servida. Se a fonte falhar, a versão
+anterior é mantida e as novas tentativas seguem um backoff exponencial.
+"""
+
+import random
+import threading
+import time
+from collections import namedtuple
+
+import pandas as pd
+
+# Versão publicada de uma fonte (tupla imutável: trocada inteira a cada atualização)
+VersaoFonte = namedtuple("VersaoFonte", ["valor", "versao", "atualizado_em"])
+
+
+def resultado_valido(valor):
+    """Os carregadores do app sinalizam falha retornando None ou DataFrame vazio."""
+    if valor is None:
+        return False
+    if isinstance(valor, pd.DataFrame):
+        return not valor.empty
+    return True
+
+
+def copiar_valor(valor):
+    """
+    DataFrames são copiados porque o app altera colunas no lugar (como fazia com
+    as cópias do st.cache_data). Outros objetos são compartilhados entre sessões.
+    """
+    if isinstance(valor, pd.DataFrame):
+        return valor.copy()
+    if isinstance(valor, dict):
+        # Cópia rasa do dicionário, copiando os DataFrames que ele contém
+        return {chave: copiar_valor(item) for chave, item in valor.items()}
+    return valor
+
+
+class _Fonte:
+    def __init__(self, nome, carregador, intervalo, valido):
+        self.nome = nome
+        self.carregador = carregador
+        self.intervalo = intervalo
+        self.valido = valido
+        # Serializa cargas da mesma fonte (thread de fundo x primeira requisição)
+        self.lock = threading.Lock()
+        self.atual = None
+        self.proxima_execucao = 0.0
+        self.falhas = 0
+        self.ultimo_erro = None
+        # Resultado da última carga que falhou (None/vazio), servido durante o backoff
+        self.resultado_falho = None
+
+
+class BackgroundRefresher:
+    """
+    Mantém a última versão válida de cada fonte registrada e a atualiza em uma
+    thread daemon. Uso:
+
+        agendador = BackgroundRefresher()
+        agendador.registrar("base_atores", carregar_base, intervalo=300)
+        agendador.iniciar()
+        df = agendador.obter("base_atores")
+    """
+
+    def __init__(self, backoff_base=15, backoff_max=1800, ao_publicar=None):
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        # ao_publicar(nome, valor): chamado a cada nova versão (ex.: compartilhar com outros processos)
+        self.ao_publicar = ao_publicar
+        self._fontes = {}
+        self._thread = None
+        self._evento_parar = threading.Event()
+
+    def registrar(self, nome, carregador, intervalo, valido=resultado_valido):
+        """Registra uma fonte: carregador() sem argumentos, recarregado a cada `intervalo` segundos."""
+        self._fontes[nome] = _Fonte(nome, carregador, intervalo, valido)
+
+    def iniciar(self):
+        """Inicia a thread de atualização (idempotente)."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._evento_parar.clear()
+        self._thread = threading.Thread(target=self._loop, name="background-refresh", daemon=True)
+        self._thread.start()
+
+    def parar(self):
+        """Sinaliza a thread para terminar após a atualização em andamento."""
+        self._evento_parar.set()
+
+    def obter(self, nome):
+        """
+        Retorna a versão mais recente publicada da fonte, sem esperar pela rede.
+        Só bloqueia na primeira carga, quando ainda não há versão para servir. Se essa
+        carga falhou, até o fim do backoff devolve o resultado falho sem tentar de novo:
+        as novas tentativas ficam com a thread de fundo.
+        """
+        fonte = self._fontes[nome]
+        versao = fonte.atual
+        if versao is None:
+            if self._em_backoff(fonte):
+                return copiar_valor(fonte.resultado_falho)
+            with fonte.lock:
+                versao = fonte.atual
+                if versao is None:
+                    if self._em_backoff(fonte):
+                        # Outra requisição (ou a thread de fundo) acabou de falhar
+                        return copiar_valor(fonte.resultado_falho)
+                    valor = self._executar(fonte)
+                    versao = fonte.atual
+                    if versao is None:
+                        # Falhou e não há versão anterior: devolve o resultado como veio
+                        return copiar_valor(valor)
+        return copiar_valor(versao.valor)
+
+    @staticmethod
+    def _em_backoff(fonte):
+        return fonte.falhas > 0 and time.monotonic() < fonte.proxima_execucao
+
+    def status(self):
+        """Resumo por fonte: versão, idade (s), falhas seguidas e último erro."""
+        agora = time.time()
+        resumo = {}
+        for nome, fonte in self._fontes.items():
+            versao = fonte.atual
+            resumo[nome] = {
+                "versao": versao.versao if versao else 0,
+                "idade_segundos": round(agora - versao.atualizado_em, 1) if versao else None,
+                "falhas_seguidas": fonte.falhas,
+                "ultimo_erro": fonte.ultimo_erro,
+            }
+        return resumo
+
+    def _executar(self, fonte):
+        """Carrega a fonte e publica a nova versão. O chamador deve segurar fonte.lock."""
+        valor = None
+        try:
+            valor = fonte.carregador()
+            if not fonte.valido(valor):
+                raise ValueError("carregador retornou dados vazios")
+        except Exception as e:
+            fonte.falhas += 1
+            fonte.ultimo_erro = str(e)
+            fonte.resultado_falho = valor
+            atraso = min(self.backoff_max, self.backoff_base * 2 ** (fonte.falhas - 1))
+            # Jitter evita que vários processos voltem a consultar a fonte ao mesmo tempo
+            fonte.proxima_execucao = time.monotonic() + atraso * random.uniform(0.8, 1.2)
+            return valor
+
+        versao_anterior = fonte.atual.versao if fonte.atual else 0
+        # Publicação atômica: leitores veem a versão antiga ou a nova, nunca um meio-termo
+        fonte.atual = VersaoFonte(valor, versao_anterior + 1, time.time())
+        fonte.falhas = 0
+        fonte.ultimo_erro = None
+        fonte.resultado_falho = None
+        fonte.proxima_execucao = time.monotonic() + fonte.intervalo
+        if self.ao_publicar is not None:
+            try:
+                self.ao_publicar(fonte.nome, valor)
+            except Exception as e:
+                # A versão já está publicada neste processo; só o repasse falhou
+                fonte.ultimo_erro = f"ao_publicar: {e}"
+        return valor
+
+    def _loop(self):
+        while not self._evento_parar.is_set():
+            for fonte in list(self._fontes.values()):
+                if self._evento_parar.is_set():
+                    return
+                if time.monotonic() < fonte.proxima_execucao:
+                    continue
+                # Se uma requisição já está carregando a fonte, não duplica o trabalho
+                if not fonte.lock.acquire(blocking=False):
+                    continue
+                try:
+                    self._executar(fonte)
+                finally:
+                    fonte.lock.release()
+
+            proximas = [f.proxima_execucao for f in self._fontes.values()]
+            espera = min(proximas) - time.monotonic() if proximas else 60
+            self._evento_parar.wait(min(max(espera, 0.5), 60))
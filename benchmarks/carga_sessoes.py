@@ -0,0 +1,494 @@
+"""
+Gerador de carga com sessões concorrentes do dashboard, para dimensionar os workers.
+
+Sobe o app de verdade (`streamlit run app.py`) sobre o ecossistema sintético: GeoJSON e
+coordenadas locais (gerador.py) e as planilhas servidas pelo ServidorPlanilhas
+(planilhas_locais.py). Depois abre N sessões simultâneas pelo mesmo websocket que o
+navegador usa (/_stcore/stream, mensagens protobuf BackMsg/ForwardMsg) e cada uma repete
+uma sequência típica:
+- carga da página;
+- drill-down de região: escolhe uma região e depois um município dela;
+- desliga e religa uma categoria na legenda;
+- pesquisa por nome na tabela;
+- volta para "Todas" as regiões.
+
+Os widgets são os que o servidor enviou (ids pelos deltas, a chave fica no fim do id) e o
+estado de todos eles vai em cada rerun, como o navegador faz; widgets dentro de
+fragmentos pedem o rerun só do fragmento. A latência de uma interação vai do envio até o
+fim do rerun (script_finished; reruns encadeados pelos callbacks entram na conta).
+
+No fim informa:
+- percentis (p50/p90/p99) da latência por interação;
+- RSS do processo do servidor: após o aquecimento, pico, com as N sessões abertas e depois
+  que elas fecham, e o crescimento por sessão;
+- taxa de acerto do cache de cada carregador load_* (contadores do perfil do app, que o
+  servidor registra no log "dashboard.perfil").
+
+    python benchmarks/carga_sessoes.py --sessoes 20 --ciclos 3 [--atores 10000] [--rampa 10]
+    python benchmarks/carga_sessoes.py --url http://localhost:8501 --pid <pid do streamlit>
+
+Com --url a carga vai para uma instância já rodando: o RSS exige --pid e a taxa de acerto
+do cache fica de fora (o log do perfil é do outro processo).
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from executar import metadados, preparar_ambiente  # noqa: E402
+from planilhas_locais import ServidorPlanilhas, abas_sinteticas  # noqa: E402
+
+# Tipos de elemento que são widgets com estado enviado pelo navegador
+TIPOS_WIDGET = ("selectbox", "checkbox", "text_input", "multiselect")
+
+CHAVE_REGIAO = "filtro_regiao"
+CHAVE_MUNICIPIO = "filtro_municipio"
+CHAVE_LEGENDA = "legend_check_Startup"
+CHAVE_PESQUISA = "campo_pesquisa_tabela"
+
+PREFIXO_PERFIL = "dashboard.perfil "
+
+
+def percentil(valores, p):
+    """Percentil `p` (0-100) por posição mais próxima; None sem valores."""
+    if not valores:
+        return None
+    ordenados = sorted(valores)
+    posicao = max(0, min(len(ordenados) - 1, round(p / 100 * len(ordenados) + 0.5) - 1))
+    return ordenados[posicao]
+
+
+def rss_kb(pid):
+    """RSS atual (kB) do processo, lido de /proc (None fora do Linux ou sem o processo)."""
+    try:
+        with open(f"/proc/{pid}/status", encoding="ascii") as arquivo:
+            for linha in arquivo:
+                if linha.startswith("VmRSS:"):
+                    return int(linha.split()[1])
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+class Sessao:
+    """Uma sessão do dashboard pelo websocket, com o estado dos widgets como no navegador."""
+
+    def __init__(self, indice, url_ws, tempo_limite=120):
+        self.indice = indice
+        self.url_ws = url_ws
+        self.tempo_limite = tempo_limite
+        self.conexao = None
+        self.leitor = None
+        self.hash_pagina = ""
+        self.widgets = {}  # id -> (tipo, proto do elemento, fragment_id)
+        self.estados = {}  # id -> WidgetState enviado nos reruns
+        self.fim_rerun = None
+        self.erros = []
+        self.bytes_recebidos = 0
+
+    async def conectar(self):
+        import websockets
+
+        self.conexao = await websockets.connect(
+            self.url_ws, subprotocols=["streamlit"], max_size=None, open_timeout=self.tempo_limite
+        )
+        self.leitor = asyncio.create_task(self._ler())
+
+    async def fechar(self):
+        if self.conexao is not None:
+            await self.conexao.close()
+        if self.leitor is not None:
+            await asyncio.gather(self.leitor, return_exceptions=True)
+
+    async def _ler(self):
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+        async for dados in self.conexao:
+            self.bytes_recebidos += len(dados)
+            mensagem = ForwardMsg()
+            mensagem.ParseFromString(dados)
+            tipo = mensagem.WhichOneof("type")
+            if tipo == "new_session":
+                self.hash_pagina = mensagem.new_session.page_script_hash
+            elif tipo == "delta" and mensagem.delta.WhichOneof("type") == "new_element":
+                self._registrar_elemento(mensagem.delta.new_element, mensagem.delta.fragment_id)
+            elif tipo == "script_finished" and mensagem.script_finished != ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                if self.fim_rerun is not None and not self.fim_rerun.done():
+                    self.fim_rerun.set_result(mensagem.script_finished)
+
+    def _registrar_elemento(self, elemento, fragment_id):
+        tipo = elemento.WhichOneof("type")
+        if tipo == "exception":
+            self.erros.append(elemento.exception.message)
+            return
+        if tipo not in TIPOS_WIDGET:
+            return
+        proto = getattr(elemento, tipo)
+        self.widgets[proto.id] = (tipo, proto, fragment_id)
+        # Valor definido pelo servidor (ex.: região aplicada pelo clique no mapa): o
+        # navegador passa a enviar esse valor
+        if proto.id in self.estados and proto.set_value:
+            estado = self.estados[proto.id]
+            if tipo == "selectbox" and proto.HasField("raw_value"):
+                estado.string_value = proto.raw_value
+            elif tipo == "checkbox":
+                estado.bool_value = proto.value
+            elif tipo == "text_input" and proto.HasField("value"):
+                estado.string_value = proto.value
+
+    def widget(self, chave):
+        """(id, tipo, proto, fragment_id) do widget cuja chave termina o id; None se ausente."""
+        for id_widget, (tipo, proto, fragment_id) in self.widgets.items():
+            if id_widget.endswith(chave):
+                return id_widget, tipo, proto, fragment_id
+        return None
+
+    async def rerun(self, chave=None, **valor):
+        """
+        Envia um rerun (com `chave`, altera antes o valor do widget: string_value=...,
+        bool_value=...) e espera o fim. Devolve (ms, bytes recebidos).
+        """
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+        fragment_id = ""
+        if chave is not None:
+            encontrado = self.widget(chave)
+            if encontrado is None:
+                raise LookupError(f"sessão {self.indice}: widget '{chave}' não foi renderizado")
+            id_widget, _, _, fragment_id = encontrado
+            estado = WidgetState(id=id_widget, **valor)
+            self.estados[id_widget] = estado
+
+        mensagem = BackMsg()
+        estado_cliente = mensagem.rerun_script
+        estado_cliente.query_string = ""
+        estado_cliente.page_script_hash = self.hash_pagina
+        if fragment_id:
+            estado_cliente.fragment_id = fragment_id
+        estado_cliente.widget_states.widgets.extend(self.estados.values())
+
+        self.fim_rerun = asyncio.get_running_loop().create_future()
+        bytes_antes = self.bytes_recebidos
+        inicio = time.perf_counter()
+        await self.conexao.send(mensagem.SerializeToString())
+        await asyncio.wait_for(self.fim_rerun, self.tempo_limite)
+        return (time.perf_counter() - inicio) * 1000, self.bytes_recebidos - bytes_antes
+
+
+async def roteiro(sessao, ciclos, pausa, aleatorio, medicoes):
+    """Sequência típica de um usuário; cada interação vira (nome, ms, bytes) em `medicoes`."""
+
+    async def interagir(nome, chave=None, **valor):
+        ms, n_bytes = await sessao.rerun(chave, **valor)
+        medicoes.append({"sessao": sessao.indice, "interacao": nome, "ms": ms, "bytes": n_bytes})
+        if pausa:
+            await asyncio.sleep(pausa * aleatorio.uniform(0.5, 1.5))
+
+    await interagir("carga")
+    for _ in range(ciclos):
+        _, _, regioes, _ = sessao.widget(CHAVE_REGIAO)
+        regiao = aleatorio.choice([opcao for opcao in regioes.options if opcao != "Todas"])
+        await interagir("regiao", CHAVE_REGIAO, string_value=regiao)
+
+        _, _, municipios, _ = sessao.widget(CHAVE_MUNICIPIO)
+        opcoes = [opcao for opcao in municipios.options if opcao != "Todos"]
+        if opcoes:
+            await interagir("municipio", CHAVE_MUNICIPIO, string_value=aleatorio.choice(opcoes))
+
+        await interagir("categoria_desligar", CHAVE_LEGENDA, bool_value=False)
+        await interagir("categoria_religar", CHAVE_LEGENDA, bool_value=True)
+        await interagir("pesquisa", CHAVE_PESQUISA, string_value=f"Ator {aleatorio.randrange(100):04d}")
+        await interagir("pesquisa_limpar", CHAVE_PESQUISA, string_value="")
+        await interagir("regiao_todas", CHAVE_REGIAO, string_value="Todas")
+
+
+async def executar_sessao(indice, url_ws, atraso, args, medicoes, concluidas, abertas):
+    """
+    Abre a sessão após `atraso` segundos e roda o roteiro; ao terminar (ou falhar) avisa em
+    `concluidas` e mantém a conexão aberta até `abertas` ser liberado.
+    """
+    await asyncio.sleep(atraso)
+    sessao = Sessao(indice, url_ws, args.timeout)
+    try:
+        await sessao.conectar()
+        await roteiro(sessao, args.ciclos, args.pausa, random.Random(args.semente * 1000 + indice), medicoes)
+    except Exception as erro:  # noqa: BLE001 - a carga continua nas outras sessões
+        sessao.erros.append(f"{type(erro).__name__}: {erro}")
+    concluidas.release()
+    try:
+        await abertas.wait()
+    finally:
+        await sessao.fechar()
+    return sessao.erros
+
+
+class MonitorServidor:
+    """RSS do servidor amostrado em segundo plano e registros do perfil lidos do stderr."""
+
+    def __init__(self, pid=None, stderr=None, intervalo=0.2):
+        self.pid = pid
+        self.intervalo = intervalo
+        self.pico_kb = None
+        self.registros = []
+        self._parar = threading.Event()
+        self._threads = [threading.Thread(target=self._amostrar, daemon=True)]
+        if stderr is not None:
+            self._threads.append(threading.Thread(target=self._ler_log, args=(stderr,), daemon=True))
+        for thread in self._threads:
+            thread.start()
+
+    def _amostrar(self):
+        while self.pid and not self._parar.wait(self.intervalo):
+            atual = rss_kb(self.pid)
+            if atual is not None:
+                self.pico_kb = max(self.pico_kb or 0, atual)
+
+    def _ler_log(self, stderr):
+        for linha in stderr:
+            posicao = linha.find(PREFIXO_PERFIL)
+            if posicao < 0:
+                continue
+            try:
+                self.registros.append(json.loads(linha[posicao + len(PREFIXO_PERFIL):]))
+            except ValueError:
+                continue
+
+    def rss_kb(self):
+        return rss_kb(self.pid) if self.pid else None
+
+    def zerar_pico(self):
+        self.pico_kb = self.rss_kb()
+
+    def parar(self):
+        self._parar.set()
+
+
+def acertos_cache(registros):
+    """{carregador load_*: {acertos, falhas, taxa_acerto}} somando os registros do perfil."""
+    totais = {}
+    for registro in registros:
+        for nome, contagem in registro.get("cache", {}).items():
+            if not nome.startswith("load_"):
+                continue
+            total = totais.setdefault(nome, {"acertos": 0, "falhas": 0})
+            total["acertos"] += contagem.get("acertos", 0)
+            total["falhas"] += contagem.get("falhas", 0)
+    for total in totais.values():
+        chamadas = total["acertos"] + total["falhas"]
+        total["taxa_acerto"] = round(total["acertos"] / chamadas, 4) if chamadas else None
+    return totais
+
+
+def iniciar_servidor(args):
+    """
+    Ambiente sintético + planilhas locais + `streamlit run app.py` num subprocesso.
+    Devolve (processo, servidor de planilhas, url http do app).
+    """
+    municipios, _ = preparar_ambiente(args.municipios, args.vertices, args.semente)
+    planilhas = ServidorPlanilhas(abas_sinteticas(args.atores, len(municipios), args.semente), porta=args.porta_planilhas)
+    planilhas.iniciar()
+
+    ambiente = dict(os.environ)
+    ambiente.update({
+        "DASHBOARD_SHEETS_URL": planilhas.url_base,
+        "DASHBOARD_SHEETS_API_URL": planilhas.url_api,
+        "DASHBOARD_REFRESH_SECONDS": str(args.refresh),
+        "PYTHONUNBUFFERED": "1",
+    })
+    processo = subprocess.Popen(
+        [
+            sys.executable, "-m", "streamlit", "run", os.path.join(RAIZ, "app.py"),
+            "--server.headless", "true",
+            "--server.port", str(args.porta),
+            "--server.fileWatcherType", "none",
+            "--browser.gatherUsageStats", "false",
+        ],
+        cwd=RAIZ,
+        env=ambiente,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+        encoding="utf-8",
+        errors="replace",
+    )
+    url = f"http://127.0.0.1:{args.porta}"
+    limite = time.monotonic() + args.timeout
+    while time.monotonic() < limite:
+        if processo.poll() is not None:
+            raise RuntimeError(f"o streamlit terminou na inicialização (código {processo.returncode})")
+        try:
+            with urllib.request.urlopen(f"{url}/_stcore/health", timeout=1) as resposta:
+                if resposta.status == 200:
+                    return processo, planilhas, url
+        except OSError:
+            time.sleep(0.2)
+    processo.terminate()
+    raise TimeoutError(f"o streamlit não respondeu em {url} após {args.timeout}s")
+
+
+async def carga(url_ws, args, monitor):
+    """Aquecimento (uma sessão) e depois as N sessões concorrentes; devolve o resultado."""
+    liberado = asyncio.Event()
+    liberado.set()
+    erros_aquecimento = await executar_sessao(-1, url_ws, 0, args, [], asyncio.Semaphore(0), liberado)
+    if erros_aquecimento:
+        raise RuntimeError(f"falha na sessão de aquecimento: {erros_aquecimento[0]}")
+    inicio_registros = len(monitor.registros)
+    await asyncio.sleep(1)
+    rss_aquecido = monitor.rss_kb()
+    monitor.zerar_pico()
+
+    medicoes = []
+    concluidas = asyncio.Semaphore(0)
+    abertas = asyncio.Event()
+    inicio = time.perf_counter()
+    tarefas = [
+        asyncio.create_task(
+            executar_sessao(i, url_ws, i * args.rampa / args.sessoes, args, medicoes, concluidas, abertas)
+        )
+        for i in range(args.sessoes)
+    ]
+    for _ in tarefas:
+        await concluidas.acquire()
+    duracao = time.perf_counter() - inicio
+    await asyncio.sleep(1)
+    rss_abertas = monitor.rss_kb()
+    pico = monitor.pico_kb
+    abertas.set()
+    erros = [erro for lista in await asyncio.gather(*tarefas) for erro in lista]
+    await asyncio.sleep(args.espera_fechamento)
+    rss_fechadas = monitor.rss_kb()
+
+    return {
+        "medicoes": medicoes,
+        "erros": erros,
+        "duracao_s": duracao,
+        "rss_kb": {
+            "aquecido": rss_aquecido,
+            "pico": pico,
+            "sessoes_abertas": rss_abertas,
+            "sessoes_fechadas": rss_fechadas,
+        },
+        "registros": monitor.registros[inicio_registros:],
+    }
+
+
+def resumir(resultado, args):
+    por_interacao = {}
+    for medicao in resultado["medicoes"]:
+        por_interacao.setdefault(medicao["interacao"], []).append(medicao)
+    interacoes = {}
+    for nome, lista in por_interacao.items():
+        tempos = [m["ms"] for m in lista]
+        interacoes[nome] = {
+            "n": len(tempos),
+            "p50_ms": round(percentil(tempos, 50), 1),
+            "p90_ms": round(percentil(tempos, 90), 1),
+            "p99_ms": round(percentil(tempos, 99), 1),
+            "max_ms": round(max(tempos), 1),
+            "kb_medio": round(statistics.mean(m["bytes"] for m in lista) / 1024, 1),
+        }
+    rss = resultado["rss_kb"]
+    por_sessao = None
+    if rss["aquecido"] is not None and rss["sessoes_abertas"] is not None:
+        por_sessao = round((rss["sessoes_abertas"] - rss["aquecido"]) / args.sessoes / 1024, 2)
+    return {
+        "interacoes": interacoes,
+        "reruns_por_s": round(len(resultado["medicoes"]) / resultado["duracao_s"], 2),
+        "rss_mb": {nome: round(kb / 1024, 1) if kb is not None else None for nome, kb in rss.items()},
+        "rss_mb_por_sessao": por_sessao,
+        "cache": acertos_cache(resultado["registros"]),
+        "erros": resultado["erros"],
+    }
+
+
+def imprimir(resumo, args):
+    print(f"{args.sessoes} sessões concorrentes x {args.ciclos} ciclo(s), {resumo['reruns_por_s']} reruns/s")
+    print(f"  {'interação':<20} {'n':>5} {'p50':>9} {'p90':>9} {'p99':>9} {'máx':>9} {'kB':>8}")
+    for nome, medida in resumo["interacoes"].items():
+        print(
+            f"  {nome:<20} {medida['n']:5d} {medida['p50_ms']:7.1f}ms {medida['p90_ms']:7.1f}ms "
+            f"{medida['p99_ms']:7.1f}ms {medida['max_ms']:7.1f}ms {medida['kb_medio']:8.1f}"
+        )
+    rss = resumo["rss_mb"]
+    if rss["aquecido"] is not None:
+        print(
+            f"RSS do servidor: {rss['aquecido']} MB aquecido, pico {rss['pico']} MB, "
+            f"{rss['sessoes_abertas']} MB com as sessões abertas, {rss['sessoes_fechadas']} MB após fechá-las "
+            f"({resumo['rss_mb_por_sessao']} MB por sessão)"
+        )
+        if args.memoria_worker and resumo["rss_mb_por_sessao"]:
+            capacidade = (args.memoria_worker - rss["aquecido"]) / resumo["rss_mb_por_sessao"]
+            print(f"  ~{max(0, int(capacidade))} sessões por worker de {args.memoria_worker} MB")
+    for nome, contagem in sorted(resumo["cache"].items()):
+        taxa = f"{contagem['taxa_acerto']:.1%}" if contagem["taxa_acerto"] is not None else "-"
+        print(f"  cache {nome:<32} {taxa:>7} ({contagem['acertos']} acertos, {contagem['falhas']} falhas)")
+    if resumo["erros"]:
+        print(f"{len(resumo['erros'])} erro(s) nas sessões, ex.: {resumo['erros'][0]}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Carga com sessões concorrentes do dashboard")
+    parser.add_argument("--sessoes", type=int, default=10)
+    parser.add_argument("--ciclos", type=int, default=2, help="Repetições do roteiro por sessão")
+    parser.add_argument("--rampa", type=float, default=5.0, help="Segundos para abrir todas as sessões")
+    parser.add_argument("--pausa", type=float, default=0.5, help="Tempo médio de leitura entre interações (s)")
+    parser.add_argument("--atores", type=int, default=1000)
+    parser.add_argument("--municipios", type=int, default=853)
+    parser.add_argument("--vertices", type=int, default=60)
+    parser.add_argument("--semente", type=int, default=0)
+    parser.add_argument("--refresh", type=int, default=0, help="DASHBOARD_REFRESH_SECONDS do servidor")
+    parser.add_argument("--porta", type=int, default=8599)
+    parser.add_argument("--porta-planilhas", type=int, default=8766)
+    parser.add_argument("--url", help="Instância já rodando (não sobe servidor próprio)")
+    parser.add_argument("--pid", type=int, help="PID do servidor em --url, para o RSS")
+    parser.add_argument("--timeout", type=float, default=120, help="Tempo máximo por rerun (s)")
+    parser.add_argument("--espera-fechamento", type=float, default=3.0, help="Segundos antes do RSS final")
+    parser.add_argument("--memoria-worker", type=float, help="MB por worker, para estimar a capacidade")
+    parser.add_argument("--saida", help="JSON com o resumo e as medições")
+    args = parser.parse_args(argv)
+
+    saida = os.path.abspath(args.saida) if args.saida else None
+    processo = planilhas = None
+    if args.url:
+        url, monitor = args.url.rstrip("/"), MonitorServidor(pid=args.pid)
+    else:
+        processo, planilhas, url = iniciar_servidor(args)
+        monitor = MonitorServidor(pid=processo.pid, stderr=processo.stderr)
+    url_ws = url.replace("http", "ws", 1) + "/_stcore/stream"
+
+    try:
+        resultado = asyncio.run(carga(url_ws, args, monitor))
+    finally:
+        monitor.parar()
+        if processo is not None:
+            processo.terminate()
+            processo.wait(timeout=30)
+        if planilhas is not None:
+            planilhas.parar()
+
+    resumo = resumir(resultado, args)
+    imprimir(resumo, args)
+    if saida:
+        with open(saida, "w", encoding="utf-8") as arquivo:
+            json.dump(
+                {"metadados": metadados(args), "parametros": vars(args), "resumo": resumo, "medicoes": resultado["medicoes"]},
+                arquivo, ensure_ascii=False, indent=2,
+            )
+
+
+if __name__ == "__main__":
+    main()
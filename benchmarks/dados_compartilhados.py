@@ -0,0 +1,149 @@
+"""
+Memória de N processos com os dados compartilhados (shared_dataset.py) x uma cópia por processo.
+
+Gera o ecossistema sintético (gerador.py), publica as três fontes do app (planilhas,
+GeoJSON compacto e coordenadas) num diretório e sobe N processos que ficam com os dados
+em memória ao mesmo tempo, de dois jeitos:
+- "copia": cada processo lê os CSVs e o GeoJSON e monta os seus objetos (como hoje);
+- "compartilhado": cada processo mapeia a versão publicada (DatasetCompartilhado.obter).
+
+Para cada modo informa o tempo de carga por processo e a memória somada dos N processos
+em PSS (memória proporcional: uma página compartilhada por N processos conta 1/N em cada
+um, de /proc/<pid>/smaps_rollup), além do RSS médio. Só Linux.
+
+    python benchmarks/dados_compartilhados.py --processos 4 --atores 100000 [--diretorio /dev/shm/bench]
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import gerador  # noqa: E402
+
+
+def memoria_kb():
+    """(PSS, RSS) do processo atual em kB."""
+    valores = {}
+    with open("/proc/self/smaps_rollup", encoding="ascii") as arquivo:
+        for linha in arquivo:
+            partes = linha.split()
+            if partes and partes[0] in ("Pss:", "Rss:"):
+                valores[partes[0][:-1]] = int(partes[1])
+    return valores.get("Pss"), valores.get("Rss")
+
+
+def _carregar_copia(caminhos):
+    import pandas as pd
+
+    from geometry_store import GeometriaCompacta
+
+    with open(caminhos["geojson"], encoding="utf-8") as arquivo:
+        geometria = GeometriaCompacta.de_geojson(json.load(arquivo))
+    return {
+        "planilhas": {
+            "municipios_regioes": pd.read_csv(caminhos["municipios"]),
+            "base_atores": pd.read_csv(caminhos["atores"]),
+        },
+        "geojson_mg": geometria,
+        "municipios_coordenadas": pd.read_csv(caminhos["coordenadas"]),
+    }
+
+
+def _carregar_compartilhado(diretorio):
+    import shared_dataset
+
+    dados = shared_dataset.DatasetCompartilhado(diretorio)
+    return {fonte: dados.obter(fonte) for fonte in ("planilhas", "geojson_mg", "municipios_coordenadas")}
+
+
+def _processo(modo, origem, barreira, fila):
+    """Carrega os dados, espera todos os processos carregarem e informa (ms, PSS, RSS)."""
+    import pandas as pd
+
+    inicio = time.perf_counter()
+    dados = _carregar_copia(origem) if modo == "copia" else _carregar_compartilhado(origem)
+    ms = (time.perf_counter() - inicio) * 1000
+    # Lê todas as colunas (páginas mapeadas só entram na conta quando lidas), sem copiá-las
+    for df in list(dados["planilhas"].values()) + [dados["municipios_coordenadas"]]:
+        for coluna in df.columns:
+            serie = df[coluna]
+            serie.sum() if pd.api.types.is_numeric_dtype(serie) else serie.str.len().sum()
+    dados["geojson_mg"].deltas.sum()
+    barreira.wait()
+    pss, rss = memoria_kb()
+    fila.put((ms, pss, rss))
+    barreira.wait()
+
+
+def medir(modo, origem, n_processos):
+    contexto = multiprocessing.get_context("spawn")
+    barreira = contexto.Barrier(n_processos + 1)
+    fila = contexto.Queue()
+    processos = [contexto.Process(target=_processo, args=(modo, origem, barreira, fila)) for _ in range(n_processos)]
+    for processo in processos:
+        processo.start()
+    barreira.wait()
+    resultados = [fila.get() for _ in processos]
+    barreira.wait()
+    for processo in processos:
+        processo.join()
+    tempos = [r[0] for r in resultados]
+    return {
+        "modo": modo,
+        "processos": n_processos,
+        "carga_mediana_ms": round(statistics.median(tempos), 1),
+        "pss_total_mb": round(sum(r[1] for r in resultados) / 1024, 1),
+        "rss_medio_mb": round(statistics.mean(r[2] for r in resultados) / 1024, 1),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Memória de N processos: dados compartilhados x cópia por processo")
+    parser.add_argument("--processos", type=int, default=4)
+    parser.add_argument("--atores", type=int, default=100000)
+    parser.add_argument("--municipios", type=int, default=853)
+    parser.add_argument("--vertices", type=int, default=120)
+    parser.add_argument("--semente", type=int, default=0)
+    parser.add_argument("--diretorio", help="Diretório dos dados publicados (padrão: temporário; /dev/shm é o indicado)")
+    parser.add_argument("--saida", help="JSON com os resultados")
+    args = parser.parse_args(argv)
+
+    import shared_dataset
+    from geometry_store import GeometriaCompacta
+
+    if not shared_dataset.disponivel():
+        sys.exit("pyarrow não está instalado")
+
+    ecossistema = gerador.gerar_ecossistema(args.atores, args.municipios, args.vertices, args.semente)
+    caminhos = gerador.salvar_ecossistema(ecossistema, tempfile.mkdtemp(prefix="bench_copia_"))
+    diretorio = args.diretorio or tempfile.mkdtemp(prefix="bench_compartilhado_")
+    dados = shared_dataset.DatasetCompartilhado(diretorio)
+    inicio = time.perf_counter()
+    dados.publicar("planilhas", {"municipios_regioes": ecossistema["municipios"], "base_atores": ecossistema["atores"]})
+    dados.publicar("geojson_mg", GeometriaCompacta.de_geojson(ecossistema["geojson"]))
+    dados.publicar("municipios_coordenadas", ecossistema["coordenadas"])
+    publicacao_ms = (time.perf_counter() - inicio) * 1000
+
+    resultados = [medir("copia", caminhos, args.processos), medir("compartilhado", diretorio, args.processos)]
+    print(f"{args.atores} atores, {args.municipios} municípios, {args.processos} processos (publicação: {publicacao_ms:.0f} ms)")
+    for r in resultados:
+        print(
+            f"  {r['modo']:<14} carga {r['carga_mediana_ms']:8.1f} ms  PSS somado {r['pss_total_mb']:8.1f} MB  "
+            f"RSS médio {r['rss_medio_mb']:8.1f} MB"
+        )
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as arquivo:
+            json.dump({"parametros": vars(args), "publicacao_ms": publicacao_ms, "resultados": resultados}, arquivo, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,290 @@
+"""
+Suíte reprodutível de benchmarks do dashboard sobre o ecossistema sintético (gerador.py).
+
+Para cada escala (número de atores; municípios fixos por execução) mede:
+- limpeza da aba de atores como o load_data_from_sheets faz (limpar_dados_planilha
+  sobre a aba crua, com cabeçalho na primeira linha, cabeçalho repetido e linhas vazias);
+- normalize_codigo_ibge sobre códigos numéricos e textuais;
+- o render do mapa (create_choropleth_map) e da tabela (cadeia de filtros de
+  render_secao_tabela e _build_custom_html_table) num AppTest do Streamlit, com o
+  perfil do app (DASHBOARD_PROFILE) ligado: primeiro render com caches vazios ("frio"),
+  reruns seguintes ("quente") e rerun com filtro de região.
+
+O GeoJSON e as coordenadas são lidos de arquivos locais (DASHBOARD_GEOJSON_PATH e
+DASHBOARD_COORDENADAS_PATH), então nada vai para a rede. Os resultados (mediana e
+mínimo em ms por cenário/medida, mais versões e commit) vão para um JSON; --comparar
+mostra a razão contra um arquivo de uma execução anterior.
+
+    python benchmarks/executar.py --atores 1000,10000 --municipios 853 --saida resultados.json
+    python benchmarks/executar.py --atores 1000,10000 --comparar resultados.json
+"""
+
+import argparse
+import json
+import os
+import pickle
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import gerador  # noqa: E402
+from data_cleaning import COLUNAS_BASE_ATORES, limpar_dados_planilha, normalize_codigo_ibge  # noqa: E402
+
+# Início dos scripts do AppTest: importa o app (o bloco __main__ não roda) e troca a
+# leitura das planilhas pelas abas sintéticas de BENCH_DADOS (com st.cache_data, como o
+# carregador original)
+PREAMBULO_APP = """
+import functools
+import os
+import pickle
+import sys
+
+import streamlit as st
+
+sys.path.insert(0, os.environ["BENCH_RAIZ"])
+
+import app
+import profiling
+
+
+@profiling.cache_instrumentado(st.cache_data)
+def planilhas_sinteticas(caminho, force_reload=False):
+    with open(caminho, "rb") as arquivo:
+        df_mapa, df_atores = pickle.load(arquivo)
+    return {"municipios_regioes": df_mapa, "base_atores": df_atores}
+
+
+app.load_planilhas_dashboard = functools.partial(planilhas_sinteticas, os.environ["BENCH_DADOS"])
+"""
+
+# Mapa e tabela dentro de um registro de perfil próprio
+SCRIPT_APP = PREAMBULO_APP + """
+planilhas = app.obter_dados("planilhas", app.load_planilhas_dashboard)
+
+with profiling.rerun("benchmark"):
+    app.render_secao_mapa(planilhas["municipios_regioes"], planilhas["base_atores"])
+    app.render_secao_tabela(planilhas["base_atores"])
+"""
+
+
+def medir(funcao, repeticoes):
+    """Tempos (ms) de `repeticoes` chamadas de funcao()."""
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    return tempos
+
+
+def _resultado(cenario, medida, tempos, **extras):
+    return {
+        "cenario": cenario,
+        "medida": medida,
+        "mediana_ms": round(statistics.median(tempos), 3),
+        "min_ms": round(min(tempos), 3),
+        "repeticoes": len(tempos),
+        **extras,
+    }
+
+
+def benchmarks_dados(ecossistema, repeticoes, cenario):
+    """Limpeza da aba crua de atores e normalização dos códigos IBGE."""
+    bruta = gerador.planilha_bruta(ecossistema["atores"])
+    codigos = ecossistema["municipios"]["codigo_ibge"]
+    # Como chegam do Sheets: ora float (CSV com vazios), ora texto
+    codigos_mistos = pd.concat([codigos.astype(float), codigos.astype(str) + ".0", pd.Series([np.nan, ""])], ignore_index=True)
+    n_atores = len(ecossistema["atores"])
+    codigos_atores = pd.Series(np.resize(codigos_mistos.to_numpy(), n_atores))
+
+    return [
+        _resultado(cenario, "limpar_dados_planilha", medir(lambda: limpar_dados_planilha(bruta, COLUNAS_BASE_ATORES), repeticoes), linhas=len(bruta)),
+        _resultado(cenario, "normalize_codigo_ibge:municipios", medir(lambda: normalize_codigo_ibge(codigos_mistos), repeticoes), linhas=len(codigos_mistos)),
+        _resultado(cenario, "normalize_codigo_ibge:atores", medir(lambda: normalize_codigo_ibge(codigos_atores), repeticoes), linhas=n_atores),
+    ]
+
+
+def _rodar_medindo(at, profiling):
+    """
+    at.run() e soma dos registros de perfil que ele gerou: o rerun inteiro ("benchmark")
+    ou, numa mudança de filtro, os reruns parciais dos fragmentos dependentes.
+    """
+    anteriores = {id(r) for r in profiling.historico()}
+    at.run()
+    if at.exception:
+        raise RuntimeError(f"Erro no render: {at.exception[0].value}")
+    tempos = {"total": 0.0}
+    for registro in profiling.historico():
+        if id(registro) in anteriores:
+            continue
+        tempos["total"] += registro["total_ms"]
+        for nome, valor in registro["tempos"].items():
+            tempos[nome] = tempos.get(nome, 0.0) + valor["ms"]
+    return tempos
+
+
+def benchmarks_render(caminho_dados, repeticoes, cenario, regiao):
+    """Render de mapa + tabela no AppTest: frio, quente e com filtro de região."""
+    import streamlit as st
+    from streamlit.testing.v1 import AppTest
+
+    import profiling
+
+    os.environ["BENCH_DADOS"] = caminho_dados
+    medicoes = {"frio": {}, "quente": {}, "filtro_regiao": {}}
+
+    def acumular(fase, tempos):
+        for medida, ms in tempos.items():
+            medicoes[fase].setdefault(medida, []).append(ms)
+
+    for _ in range(repeticoes):
+        st.cache_data.clear()
+        st.cache_resource.clear()
+        at = AppTest.from_string(SCRIPT_APP, default_timeout=600)
+        acumular("frio", _rodar_medindo(at, profiling))
+        acumular("quente", _rodar_medindo(at, profiling))
+        at.selectbox(key="filtro_regiao").select(regiao)
+        acumular("filtro_regiao", _rodar_medindo(at, profiling))
+
+    return [
+        _resultado(f"{cenario}:{fase}", medida, tempos)
+        for fase, por_medida in medicoes.items()
+        for medida, tempos in sorted(por_medida.items())
+    ]
+
+
+def preparar_ambiente(n_municipios, vertices, semente):
+    """
+    Gera municípios, GeoJSON e coordenadas num diretório temporário e configura o app
+    (lido na importação, dentro do AppTest) para usá-los: arquivos locais, perfil ligado
+    e sem o agendador em segundo plano (as leituras passam pelo st.cache_data). Muda o
+    diretório atual para a raiz do repositório (o app usa caminhos relativos a ela).
+    Devolve (df_municipios, diretório).
+    """
+    destino = tempfile.mkdtemp(prefix="bench_dashboard_")
+    municipios = gerador.gerar_municipios(n_municipios, semente)
+    geojson = gerador.gerar_geojson(municipios, vertices, semente)
+    caminhos = gerador.salvar_ecossistema(
+        {
+            "municipios": municipios,
+            "atores": pd.DataFrame(columns=COLUNAS_BASE_ATORES),
+            "geojson": geojson,
+            "coordenadas": gerador.gerar_coordenadas(municipios, geojson),
+        },
+        destino,
+    )
+    os.environ["DASHBOARD_GEOJSON_PATH"] = caminhos["geojson"]
+    os.environ["DASHBOARD_COORDENADAS_PATH"] = caminhos["coordenadas"]
+    os.environ["DASHBOARD_PROFILE"] = "1"
+    os.environ["DASHBOARD_REFRESH_SECONDS"] = "0"
+    os.environ["BENCH_RAIZ"] = RAIZ
+    os.chdir(RAIZ)
+    return municipios, destino
+
+
+def salvar_planilhas(destino, df_municipios, df_atores):
+    """Grava as abas (municípios com as contagens dos atores) para o script do AppTest."""
+    caminho = os.path.join(destino, f"dados_{len(df_atores)}.pkl")
+    with open(caminho, "wb") as arquivo:
+        pickle.dump((gerador.contar_atores_por_municipio(df_municipios, df_atores), df_atores), arquivo)
+    return caminho
+
+
+def metadados(args):
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        commit = None
+    import plotly
+    import streamlit
+
+    return {
+        "quando": datetime.now().isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "versoes": {
+            "pandas": pd.__version__,
+            "numpy": np.__version__,
+            "plotly": plotly.__version__,
+            "streamlit": streamlit.__version__,
+        },
+        "parametros": {
+            "atores": args.atores,
+            "municipios": args.municipios,
+            "vertices": args.vertices,
+            "repeticoes": args.repeticoes,
+            "semente": args.semente,
+        },
+    }
+
+
+def comparar(resultados, caminho_anterior):
+    """Imprime mediana anterior, atual e a razão (anterior / atual: > 1 = mais rápido)."""
+    with open(caminho_anterior, encoding="utf-8") as arquivo:
+        anteriores = {(r["cenario"], r["medida"]): r for r in json.load(arquivo)["resultados"]}
+    print(f"\nComparação com {caminho_anterior} (razão > 1 = mais rápido agora)")
+    for r in resultados:
+        anterior = anteriores.get((r["cenario"], r["medida"]))
+        if anterior is None:
+            continue
+        razao = anterior["mediana_ms"] / r["mediana_ms"] if r["mediana_ms"] else float("inf")
+        print(f"  {r['cenario']:<40} {r['medida']:<40} {anterior['mediana_ms']:10.1f} {r['mediana_ms']:10.1f} ms  {razao:5.2f}x")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks do dashboard sobre dados sintéticos")
+    parser.add_argument("--atores", default="1000,10000", help="Escalas de atores, separadas por vírgula (ex.: 1000,10000,100000)")
+    parser.add_argument("--municipios", type=int, default=853, help="Municípios (853 em MG; até 5570)")
+    parser.add_argument("--vertices", type=int, default=120, help="Vértices por polígono de município")
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--semente", type=int, default=0)
+    parser.add_argument("--sem-render", action="store_true", help="Mede só limpeza e normalização (sem AppTest)")
+    parser.add_argument("--saida", help="Arquivo JSON de resultados")
+    parser.add_argument("--comparar", help="JSON de uma execução anterior para comparar")
+    args = parser.parse_args(argv)
+    args.atores = [int(n) for n in args.atores.split(",") if n.strip()]
+
+    saida = os.path.abspath(args.saida) if args.saida else None
+    anterior = os.path.abspath(args.comparar) if args.comparar else None
+    # Geometria e coordenadas são as mesmas para todas as escalas de atores
+    municipios, destino = preparar_ambiente(args.municipios, args.vertices, args.semente)
+
+    resultados = []
+    for n_atores in args.atores:
+        cenario = f"{n_atores}_atores/{args.municipios}_municipios"
+        print(f"{cenario}...", flush=True)
+        df_atores = gerador.gerar_atores(n_atores, municipios, args.semente)
+        ecossistema = {"municipios": gerador.contar_atores_por_municipio(municipios, df_atores), "atores": df_atores}
+
+        resultados += benchmarks_dados(ecossistema, args.repeticoes, cenario)
+        if not args.sem_render:
+            caminho_dados = salvar_planilhas(destino, municipios, df_atores)
+            resultados += benchmarks_render(caminho_dados, args.repeticoes, cenario, gerador.REGIOES[0])
+
+    for r in resultados:
+        print(f"  {r['cenario']:<40} {r['medida']:<40} {r['mediana_ms']:10.1f} ms (mín. {r['min_ms']:.1f})")
+
+    if saida:
+        with open(saida, "w", encoding="utf-8") as arquivo:
+            json.dump({"metadados": metadados(args), "resultados": resultados}, arquivo, ensure_ascii=False, indent=2)
+        print(f"\nResultados em {saida}")
+    if anterior:
+        comparar(resultados, anterior)
+
+
+if __name__ == "__main__":
+    main()
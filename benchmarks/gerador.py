@@ -0,0 +1,238 @@
+"""
+Gerador de um ecossistema sintético para os benchmarks.
+
+Produz, de forma determinística (semente), as mesmas estruturas que o dashboard lê:
+- aba "Municipios e Regioes": código IBGE, município, região e as contagens qtd_* por
+  categoria (coerentes com os atores gerados);
+- aba "Base | Atores MG": as colunas de data_cleaning.COLUNAS_BASE_ATORES, com cidades
+  em distribuição de cauda longa (poucas cidades concentram a maioria dos atores),
+  textos de tamanhos variados e alguns anos de fundação vazios ou malformados;
+- GeoJSON dos municípios (polígonos irregulares numa grade sobre a extensão de MG) e o
+  CSV de coordenadas no formato do kelvins/municipios-brasileiros;
+- a versão "crua" de uma aba, com os artefatos do export do Sheets que a limpeza trata
+  (cabeçalho como primeira linha, linha concatenada no início, cabeçalho repetido no
+  meio e linhas vazias no fim).
+
+Escala configurável: de ~1 mil atores e 853 municípios (hoje) até 100 mil atores e os
+5.570 municípios do Brasil (códigos sintéticos 31xxxxx).
+
+    python benchmarks/gerador.py --atores 10000 --municipios 853 --destino /tmp/ecossistema
+"""
+
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_cleaning import COLUNAS_BASE_ATORES  # noqa: E402
+
+# Extensão aproximada de MG (min_lon, min_lat, max_lon, max_lat)
+EXTENSAO_MG = (-51.1, -22.9, -39.8, -14.2)
+
+REGIOES = [
+    "Centro", "Norte", "Noroeste", "Jequitinhonha e Mucuri", "Rio Doce",
+    "Zona da Mata", "Sul de Minas", "Centro-Oeste", "Triângulo", "Alto Paranaíba",
+]
+
+# Categorias e participação aproximada na base
+CATEGORIAS = {
+    "Startup": 0.62,
+    "Empresa Âncora": 0.10,
+    "Fundos e Investidores": 0.04,
+    "Hubs, Incubadoras e Parques Tecnológicos": 0.08,
+    "Universidades e ICTs": 0.09,
+    "Órgãos Públicos e Apoio": 0.07,
+}
+
+# Coluna qtd_* da aba de municípios para cada categoria
+COLUNAS_QUANTIDADE = {
+    "Startup": "qtd_startups",
+    "Empresa Âncora": "qtd_empresas_ancora",
+    "Fundos e Investidores": "qtd_fundos_e_investidores",
+    "Hubs, Incubadoras e Parques Tecnológicos": "qtd_hubs_incubadoras_parquestecnologicos",
+    "Universidades e ICTs": "qtd_universidades_icts",
+    "Órgãos Públicos e Apoio": "qtd_orgaos",
+}
+
+SETORES = [
+    "Agronegócio", "Saúde", "Educação", "Fintech", "Varejo", "Indústria 4.0", "Energia",
+    "Mineração", "Logística", "Govtech", "Construção", "Turismo", "Biotecnologia", "Mídia",
+]
+TAMANHOS_EQUIPE = ["1-5", "6-10", "11-50", "51-200", "200+"]
+PREFIXOS = ["São", "Santa", "Bom Jesus do", "Nova", "Conceição do", "Santo Antônio do", "Rio", "Monte", "Serra do", "Campo"]
+RAIZES = [
+    "Alegre", "Belo", "Verde", "Claro", "Paraíso", "Horizonte", "Pedra", "Cachoeira", "Vale",
+    "Ouro", "Prata", "Jardim", "Palmital", "Bonito", "Sossego", "Formoso", "Campestre", "Lagoa",
+]
+PALAVRAS = (
+    "plataforma solução digital inovação dados clientes mercado tecnologia gestão produção "
+    "serviços rede parceiros sustentabilidade pesquisa desenvolvimento regional automação"
+).split()
+
+
+def gerar_municipios(n_municipios=853, semente=0):
+    """Aba "Municipios e Regioes" sem as contagens (ver gerar_ecossistema)."""
+    rng = np.random.default_rng(semente)
+    nomes, vistos = [], set()
+    for i in range(n_municipios):
+        nome = f"{PREFIXOS[rng.integers(len(PREFIXOS))]} {RAIZES[rng.integers(len(RAIZES))]}"
+        if nome in vistos:
+            nome = f"{nome} {i}"
+        vistos.add(nome)
+        nomes.append(nome)
+    codigos = 3100000 + np.arange(n_municipios) * (99999 // max(n_municipios, 1))
+    # Regiões em faixas contíguas da grade, como as regiões reais
+    regioes = [REGIOES[i * len(REGIOES) // n_municipios] for i in range(n_municipios)]
+    return pd.DataFrame({"codigo_ibge": codigos, "nome_municipio": nomes, "nome_mesorregiao": regioes})
+
+
+def _texto(rng, min_palavras, max_palavras):
+    return " ".join(rng.choice(PALAVRAS, rng.integers(min_palavras, max_palavras + 1))).capitalize()
+
+
+def gerar_atores(n_atores, df_municipios, semente=0):
+    """Aba "Base | Atores MG" com n_atores linhas distribuídas pelos municípios."""
+    rng = np.random.default_rng(semente + 1)
+    # Cauda longa: pesos de Zipf sobre os municípios (o primeiro faz o papel da capital)
+    pesos = 1.0 / np.arange(1, len(df_municipios) + 1) ** 1.1
+    cidades = rng.choice(len(df_municipios), n_atores, p=pesos / pesos.sum())
+    categorias = rng.choice(list(CATEGORIAS), n_atores, p=np.array(list(CATEGORIAS.values())))
+
+    anos = rng.integers(1950, 2025, n_atores).astype(object)
+    anos[rng.random(n_atores) < 0.08] = ""
+    anos[rng.random(n_atores) < 0.01] = "s/d"
+
+    df = pd.DataFrame({
+        "Nome do Ator": [f"Ator {i:06d} {RAIZES[i % len(RAIZES)]}" for i in range(n_atores)],
+        "Categoria": categorias,
+        "Cidade": df_municipios["nome_municipio"].to_numpy()[cidades],
+        "Regiao Sebrae": df_municipios["nome_mesorregiao"].to_numpy()[cidades],
+        "Site": [f"https://ator{i}.com.br" if i % 5 else "" for i in range(n_atores)],
+        "Descrição Resumida": [_texto(rng, 8, 80) for _ in range(n_atores)],
+        "Setor": rng.choice(SETORES, n_atores),
+        "Tags": [", ".join(rng.choice(SETORES, 3, replace=False)) for _ in range(n_atores)],
+        "Ano de Fundação": anos,
+        "Tamanho da Equipe": rng.choice(TAMANHOS_EQUIPE, n_atores),
+        "Marco Legal": np.where(rng.random(n_atores) < 0.2, "Sim", ""),
+        "Relação com Beta-i": np.where(rng.random(n_atores) < 0.1, "Parceiro", ""),
+    })
+    return df[COLUNAS_BASE_ATORES]
+
+
+def contar_atores_por_municipio(df_municipios, df_atores):
+    """Aba de municípios com as colunas qtd_* contadas a partir dos atores."""
+    contagem = pd.crosstab(df_atores["Cidade"], df_atores["Categoria"])
+    df = df_municipios.copy()
+    for categoria, coluna in COLUNAS_QUANTIDADE.items():
+        valores = contagem[categoria] if categoria in contagem.columns else pd.Series(dtype=int)
+        df[coluna] = df["nome_municipio"].map(valores).fillna(0).astype(int)
+    return df
+
+
+def gerar_geojson(df_municipios, vertices=120, semente=0):
+    """Um polígono irregular por município, cada um na sua célula de uma grade sobre MG."""
+    rng = np.random.default_rng(semente + 2)
+    n = len(df_municipios)
+    min_lon, min_lat, max_lon, max_lat = EXTENSAO_MG
+    colunas = int(np.ceil(np.sqrt(n * (max_lon - min_lon) / (max_lat - min_lat))))
+    linhas = int(np.ceil(n / colunas))
+    largura, altura = (max_lon - min_lon) / colunas, (max_lat - min_lat) / linhas
+    angulos = np.linspace(0, 2 * np.pi, vertices, endpoint=False)
+
+    features = []
+    for i, (codigo, nome) in enumerate(zip(df_municipios["codigo_ibge"], df_municipios["nome_municipio"])):
+        cx = min_lon + (i % colunas + 0.5) * largura
+        cy = min_lat + (i // colunas + 0.5) * altura
+        raio = 0.5 * (0.75 + 0.25 * rng.random(vertices))
+        anel = np.column_stack((cx + raio * largura * np.cos(angulos), cy + raio * altura * np.sin(angulos)))
+        anel = np.round(anel, 6).tolist()
+        anel.append(anel[0])
+        features.append({
+            "type": "Feature",
+            "properties": {"id": str(codigo), "name": nome},
+            "geometry": {"type": "Polygon", "coordinates": [anel]},
+        })
+    return {"type": "FeatureCollection", "features": features}
+
+
+def gerar_coordenadas(df_municipios, geojson):
+    """CSV de coordenadas (formato kelvins/municipios-brasileiros) a partir dos polígonos."""
+    centros = [np.asarray(f["geometry"]["coordinates"][0]).mean(axis=0) for f in geojson["features"]]
+    return pd.DataFrame({
+        "codigo_ibge": df_municipios["codigo_ibge"],
+        "nome": df_municipios["nome_municipio"],
+        "latitude": [c[1] for c in centros],
+        "longitude": [c[0] for c in centros],
+        "capital": [1] + [0] * (len(df_municipios) - 1),
+        "codigo_uf": 31,
+    })
+
+
+def planilha_bruta(df, linhas_vazias=0.2):
+    """
+    A aba como chega do export do Sheets lido sem cabeçalho: colunas 0..N, o cabeçalho
+    como primeira linha, uma linha com tudo concatenado antes dele, o cabeçalho repetido
+    no meio dos dados e `linhas_vazias` (fração) de linhas em branco no fim.
+    """
+    cabecalho = pd.DataFrame([list(df.columns)], columns=df.columns)
+    concatenada = pd.DataFrame([[" ".join(map(str, df.columns)) + " " + "x" * 200] + [""] * (len(df.columns) - 1)], columns=df.columns)
+    meio = len(df) // 2
+    vazias = pd.DataFrame(np.nan, index=range(int(len(df) * linhas_vazias)), columns=df.columns)
+    bruta = pd.concat([concatenada, cabecalho, df.iloc[:meio], cabecalho, df.iloc[meio:], vazias], ignore_index=True)
+    bruta.columns = range(len(df.columns))
+    return bruta
+
+
+def gerar_ecossistema(n_atores=1000, n_municipios=853, vertices=120, semente=0):
+    """{"municipios", "atores", "geojson", "coordenadas"} coerentes entre si."""
+    df_municipios = gerar_municipios(n_municipios, semente)
+    df_atores = gerar_atores(n_atores, df_municipios, semente)
+    geojson = gerar_geojson(df_municipios, vertices, semente)
+    return {
+        "municipios": contar_atores_por_municipio(df_municipios, df_atores),
+        "atores": df_atores,
+        "geojson": geojson,
+        "coordenadas": gerar_coordenadas(df_municipios, geojson),
+    }
+
+
+def salvar_ecossistema(ecossistema, destino):
+    """Grava os CSVs das abas, o GeoJSON e as coordenadas; devolve {nome: caminho}."""
+    os.makedirs(destino, exist_ok=True)
+    caminhos = {
+        "municipios": os.path.join(destino, "municipios_regioes.csv"),
+        "atores": os.path.join(destino, "base_atores_mg.csv"),
+        "geojson": os.path.join(destino, "municipios_mg.geojson"),
+        "coordenadas": os.path.join(destino, "municipios_coordenadas.csv"),
+    }
+    ecossistema["municipios"].to_csv(caminhos["municipios"], index=False)
+    ecossistema["atores"].to_csv(caminhos["atores"], index=False)
+    ecossistema["coordenadas"].to_csv(caminhos["coordenadas"], index=False)
+    with open(caminhos["geojson"], "w", encoding="utf-8") as arquivo:
+        json.dump(ecossistema["geojson"], arquivo, ensure_ascii=False)
+    return caminhos
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gera um ecossistema sintético para os benchmarks")
+    parser.add_argument("--atores", type=int, default=1000)
+    parser.add_argument("--municipios", type=int, default=853)
+    parser.add_argument("--vertices", type=int, default=120, help="Vértices por polígono de município")
+    parser.add_argument("--semente", type=int, default=0)
+    parser.add_argument("--destino", required=True, help="Diretório de saída")
+    args = parser.parse_args(argv)
+
+    caminhos = salvar_ecossistema(
+        gerar_ecossistema(args.atores, args.municipios, args.vertices, args.semente), args.destino
+    )
+    for nome, caminho in caminhos.items():
+        print(f"{nome}: {caminho}")
+
+
+if __name__ == "__main__":
+    main()
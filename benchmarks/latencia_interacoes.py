@@ -0,0 +1,238 @@
+"""
+Latência de rerun das interações do dashboard, sem navegador (AppTest do Streamlit).
+
+Roda o main() do app sobre o ecossistema sintético (gerador.py, mesmos arquivos locais
+da suíte executar.py) e reproduz as interações de um usuário:
+- carga da página;
+- clique num município do mapa (seleção enviada como o navegador faz, tratada por
+  _ao_selecionar_mapa);
+- desligar e religar uma categoria na legenda (render_category_legend);
+- escolher um segmento no multiselect "Segmentos (Startups)";
+- digitar na pesquisa da tabela (campo_pesquisa_tabela).
+
+Para cada uma registra o tempo de parede do rerun, quantos reruns ele gerou (o app
+inteiro ou só os fragmentos dependentes, contados pelo perfil do app) e quantos
+elementos foram emitidos (num rerun de fragmentos, só os dos fragmentos). Os orçamentos
+são verificados no fim: tempo mediano acima do orçamento ou mais reruns que o esperado
+fazem o script falhar (AssertionError, código de saída 1). Os orçamentos absolutos
+(ORCAMENTOS) ficam em cerca de 2x as medianas da escala padrão numa máquina de
+desenvolvimento, para que uma interação 3x mais lenta falhe sem linha de base. Em outra
+máquina (ex.: CI mais lenta) ou para pegar regressões menores, grave uma linha de base
+nela e compare:
+
+    python benchmarks/latencia_interacoes.py --gravar-base base_latencia.json
+    python benchmarks/latencia_interacoes.py --base base_latencia.json [--fator 2]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import gerador  # noqa: E402
+from executar import PREAMBULO_APP, preparar_ambiente, salvar_planilhas  # noqa: E402
+
+# O app completo, como no `streamlit run app.py`
+SCRIPT_APP = PREAMBULO_APP + """
+with profiling.rerun():
+    app.main()
+"""
+
+# Orçamento por interação: tempo mediano do rerun (ms) e máximo de reruns gerados.
+# Medianas de referência na escala padrão: carga ~870 ms, clique no mapa ~180 ms,
+# categoria ~140/175 ms (desligar/religar), segmentos ~50 ms, pesquisa ~200 ms
+ORCAMENTOS = {
+    "carga": {"ms": 1800, "reruns": 1},
+    "clique_mapa": {"ms": 375, "reruns": 3},
+    "categoria_desligar": {"ms": 300, "reruns": 3},
+    "categoria_religar": {"ms": 350, "reruns": 3},
+    "segmentos": {"ms": 100, "reruns": 1},
+    "pesquisa": {"ms": 400, "reruns": 1},
+}
+
+CATEGORIA_LEGENDA = "Startup"
+
+
+def _selecao_mapa(at):
+    """
+    Widget que envia ao próximo rerun a seleção de um ponto do mapa, como o navegador faz
+    (o AppTest não tem interação para gráficos). O ponto é o município com mais atores
+    (soma das contagens por categoria no customdata). Devolve (widget, nome do município).
+    """
+    from streamlit.proto.WidgetStates_pb2 import WidgetState
+    from streamlit.testing.v1.element_tree import Widget
+
+    class SelecaoMapa(Widget):
+        def __init__(self, elemento, pontos):
+            self.proto = elemento.proto
+            self.root = elemento.root
+            self.type = elemento.type
+            self.id = elemento.proto.id
+            self.key = elemento.key
+            self.disabled = False
+            self._value = json.dumps({"selection": {"points": pontos, "point_indices": [p["point_index"] for p in pontos], "box": [], "lasso": []}})
+
+        @property
+        def value(self):
+            return self._value
+
+        @property
+        def _widget_state(self):
+            estado = WidgetState()
+            estado.id = self.id
+            estado.string_value = self._value
+            return estado
+
+    elemento = next(e for e in at.get("plotly_chart") if e.key == "mapa_choropleth")
+    spec = json.loads(elemento.proto.spec)
+    traces = [t for t in spec["data"] if t.get("type") == "choroplethmapbox" and t.get("customdata")]
+    indice_trace, indice_ponto = max(
+        ((i, j) for i, trace in enumerate(traces) for j in range(len(trace["customdata"]))),
+        key=lambda par: sum(traces[par[0]]["customdata"][par[1]][2:]),
+    )
+    trace = traces[indice_trace]
+    ponto = {
+        "curve_number": indice_trace,
+        "point_number": indice_ponto,
+        "point_index": indice_ponto,
+        "location": trace["locations"][indice_ponto],
+        "customdata": trace["customdata"][indice_ponto],
+    }
+    widget = SelecaoMapa(elemento, [ponto])
+    _substituir_no_arvore(at._tree, elemento, widget)
+    return widget, trace["text"][indice_ponto]
+
+
+def _substituir_no_arvore(bloco, antigo, novo):
+    from streamlit.testing.v1.element_tree import Block
+
+    for indice, filho in bloco.children.items():
+        if filho is antigo:
+            bloco.children[indice] = novo
+            return True
+        if isinstance(filho, Block) and _substituir_no_arvore(filho, antigo, novo):
+            return True
+    return False
+
+
+def _contar_elementos(at):
+    from streamlit.testing.v1.element_tree import Block
+
+    return sum(1 for no in at._tree if not isinstance(no, Block))
+
+
+def _rodar(at, profiling):
+    """at.run() medido: (ms de parede, reruns gerados, elementos emitidos)."""
+    anteriores = {id(r) for r in profiling.historico()}
+    inicio = time.perf_counter()
+    at.run()
+    ms = (time.perf_counter() - inicio) * 1000
+    if at.exception:
+        raise RuntimeError(f"Erro no app: {at.exception[0].value}")
+    reruns = sum(1 for r in profiling.historico() if id(r) not in anteriores)
+    return {"ms": ms, "reruns": reruns, "elementos": _contar_elementos(at)}
+
+
+def sequencia_interacoes(profiling):
+    """Uma sessão nova passando por todas as interações; {interação: medição}."""
+    from streamlit.testing.v1 import AppTest
+
+    medicoes = {}
+    at = AppTest.from_string(SCRIPT_APP, default_timeout=600)
+    medicoes["carga"] = _rodar(at, profiling)
+
+    _, municipio = _selecao_mapa(at)
+    medicoes["clique_mapa"] = _rodar(at, profiling)
+    assert at.session_state["filtro_municipio"] == municipio, "o clique no mapa não filtrou o município"
+
+    chave_legenda = f"legend_check_{CATEGORIA_LEGENDA}"
+    at.checkbox(key=chave_legenda).uncheck()
+    medicoes["categoria_desligar"] = _rodar(at, profiling)
+    at.checkbox(key=chave_legenda).check()
+    medicoes["categoria_religar"] = _rodar(at, profiling)
+
+    segmentos = at.multiselect(key="filtro_segmentos")
+    segmentos.select(segmentos.options[0])
+    medicoes["segmentos"] = _rodar(at, profiling)
+
+    at.text_input(key="campo_pesquisa_tabela").input("Ator 0000")
+    medicoes["pesquisa"] = _rodar(at, profiling)
+    return medicoes
+
+
+def verificar_orcamentos(resumo, base=None, fator=2.0):
+    """Lista de violações: orçamentos absolutos e, com `base`, `fator` x a linha de base."""
+    violacoes = []
+    for interacao, medida in resumo.items():
+        orcamento = ORCAMENTOS.get(interacao, {})
+        if "ms" in orcamento and medida["mediana_ms"] > orcamento["ms"]:
+            violacoes.append(f"{interacao}: {medida['mediana_ms']:.0f} ms > orçamento de {orcamento['ms']} ms")
+        if "reruns" in orcamento and medida["reruns"] > orcamento["reruns"]:
+            violacoes.append(f"{interacao}: {medida['reruns']} reruns > {orcamento['reruns']} esperados")
+        referencia = (base or {}).get(interacao)
+        if referencia and medida["mediana_ms"] > fator * referencia["mediana_ms"]:
+            violacoes.append(
+                f"{interacao}: {medida['mediana_ms']:.0f} ms > {fator:g} x linha de base ({referencia['mediana_ms']:.0f} ms)"
+            )
+    return violacoes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Latência das interações do dashboard (AppTest)")
+    parser.add_argument("--atores", type=int, default=1000)
+    parser.add_argument("--municipios", type=int, default=853)
+    parser.add_argument("--vertices", type=int, default=60)
+    parser.add_argument("--repeticoes", type=int, default=3, help="Sessões medidas (após uma de aquecimento)")
+    parser.add_argument("--semente", type=int, default=0)
+    parser.add_argument("--base", help="JSON de linha de base (--gravar-base) para o orçamento relativo")
+    parser.add_argument("--fator", type=float, default=2.0, help="Tolerância sobre a linha de base")
+    parser.add_argument("--gravar-base", help="Grava as medianas desta execução como linha de base")
+    args = parser.parse_args(argv)
+
+    base = None
+    if args.base:
+        with open(args.base, encoding="utf-8") as arquivo:
+            base = json.load(arquivo)["interacoes"]
+    gravar_base = os.path.abspath(args.gravar_base) if args.gravar_base else None
+
+    municipios, destino = preparar_ambiente(args.municipios, args.vertices, args.semente)
+    df_atores = gerador.gerar_atores(args.atores, municipios, args.semente)
+    os.environ["BENCH_DADOS"] = salvar_planilhas(destino, municipios, df_atores)
+
+    import profiling
+
+    # Aquecimento: caches do processo (planilhas, GeoJSON, índice espacial) já preenchidos
+    sequencia_interacoes(profiling)
+    sessoes = [sequencia_interacoes(profiling) for _ in range(args.repeticoes)]
+
+    resumo = {}
+    print(f"{args.atores} atores, {args.municipios} municípios, mediana de {args.repeticoes} sessões")
+    for interacao in sessoes[0]:
+        tempos = [sessao[interacao]["ms"] for sessao in sessoes]
+        resumo[interacao] = {
+            "mediana_ms": round(statistics.median(tempos), 1),
+            "min_ms": round(min(tempos), 1),
+            "reruns": max(sessao[interacao]["reruns"] for sessao in sessoes),
+            "elementos": sessoes[-1][interacao]["elementos"],
+        }
+        medida = resumo[interacao]
+        print(f"  {interacao:<20} {medida['mediana_ms']:8.1f} ms  {medida['reruns']} rerun(s)  {medida['elementos']:5d} elementos")
+
+    if gravar_base:
+        with open(gravar_base, "w", encoding="utf-8") as arquivo:
+            json.dump({"parametros": vars(args), "interacoes": resumo}, arquivo, ensure_ascii=False, indent=2)
+        print(f"Linha de base gravada em {gravar_base}")
+
+    violacoes = verificar_orcamentos(resumo, base, args.fator)
+    assert not violacoes, "Orçamentos de latência estourados:\n  " + "\n  ".join(violacoes)
+    print("Orçamentos respeitados.")
+
+
+if __name__ == "__main__":
+    main()
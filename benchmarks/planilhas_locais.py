@@ -0,0 +1,446 @@
+"""
+Servidor local que imita o Google Sheets, para medir e ajustar o carregamento das abas
+(load_data_from_sheets e load_data_municipios_regioes) sem a rede.
+
+Serve abas de fixture (por padrão o ecossistema sintético do gerador.py) nas mesmas
+rotas que o app usa:
+- /spreadsheets/d/<id>/gviz/tq?tqx=out:csv&sheet=<aba>[&range=A1:Z5000][&tq=SELECT COUNT(A)]
+  e tq=SELECT <colunas|*> [LIMIT n] (projeção de colunas, ex.: "SELECT A, C, E")
+  (aba desconhecida devolve a primeira, como o Google faz);
+- /spreadsheets/d/<id>/export?format=csv[&gid=<n>];
+- API de valores mínima, para o gspread: /v4/spreadsheets/<id> (metadados),
+  /v4/spreadsheets/<id>/values/<intervalo> e /v4/spreadsheets/<id>/values:batchGet.
+
+O app passa a usá-lo com DASHBOARD_SHEETS_URL=<url base> (gviz/export) e
+DASHBOARD_SHEETS_API_URL=<url base>/v4/spreadsheets (API de valores, sem credenciais).
+
+Falhas injetáveis (ServidorPlanilhas.configurar ou opções da linha de comando), por
+rota ("gviz", "contagem", "export", "api"): latência, status de erro (400, 404, 429,
+503...), encoding do CSV (latin-1, utf-8-sig), a linha com o cabeçalho concatenado no
+início da aba, linhas em branco no fim do export e gviz truncado (a contagem continua
+informando o total). /__estatisticas devolve as requisições recebidas por rota.
+
+    python benchmarks/planilhas_locais.py servir --atores 10000 --porta 8766
+    python benchmarks/planilhas_locais.py medir --atores 10000 [--repeticoes 3] [--saida cadeia.json]
+
+O modo "medir" roda os carregadores do app contra o servidor em cada cenário de falha
+e informa tempo, linhas carregadas e requisições por rota.
+"""
+
+import argparse
+import csv
+import io
+import json
+import os
+import re
+import statistics
+import sys
+import threading
+import time
+from collections import Counter, OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import gerador  # noqa: E402
+
+ABA_ATORES = "Base | Atores MG"
+ABA_MUNICIPIOS = "Municipios e Regioes"
+
+_ROTA_GVIZ = re.compile(r"^/spreadsheets/d/(?P<id>[^/]+)/gviz/tq$")
+_ROTA_EXPORT = re.compile(r"^/spreadsheets/d/(?P<id>[^/]+)/export$")
+_ROTA_API = re.compile(r"^/v4/spreadsheets/(?P<id>[^/]+?)(?P<resto>/values:batchGet|/values/.+)?$")
+_CONSULTA_SELECT = re.compile(r"^\s*SELECT\s+(?P<colunas>\*|[A-Z]+(?:\s*,\s*[A-Z]+)*)(?:\s+LIMIT\s+(?P<limite>\d+))?\s*$", re.I)
+_INTERVALO_A1 = re.compile(r"^(?P<col0>[A-Z]+)?(?P<lin0>\d+)?(?::(?P<col1>[A-Z]+)?(?P<lin1>\d+)?)?$")
+
+
+def abas_sinteticas(n_atores=1000, n_municipios=853, semente=0):
+    """{nome da aba: DataFrame} com as duas abas do dashboard, geradas pelo gerador.py."""
+    ecossistema = gerador.gerar_ecossistema(n_atores, n_municipios, vertices=4, semente=semente)
+    return OrderedDict([(ABA_ATORES, ecossistema["atores"]), (ABA_MUNICIPIOS, ecossistema["municipios"])])
+
+
+def _indice_coluna(letras):
+    indice = 0
+    for letra in letras:
+        indice = indice * 26 + ord(letra) - ord("A") + 1
+    return indice - 1
+
+
+def _letra_coluna(indice):
+    letras = ""
+    indice += 1
+    while indice:
+        indice, resto = divmod(indice - 1, 26)
+        letras = chr(ord("A") + resto) + letras
+    return letras
+
+
+def separar_intervalo(intervalo):
+    """
+    "'Aba'!A1:E" -> ("Aba", (col0, lin0, col1, lin1)) com índices 0-based e fim exclusivo
+    (None = sem limite). Sem "!" o intervalo é a aba inteira.
+    """
+    if "!" in intervalo:
+        aba, celulas = intervalo.rsplit("!", 1)
+    else:
+        aba, celulas = intervalo, ""
+    if aba.startswith("'") and aba.endswith("'"):
+        aba = aba[1:-1].replace("''", "'")
+    partes = _INTERVALO_A1.match(celulas.upper()) if celulas else None
+    if partes is None:
+        return aba, (0, 0, None, None)
+    col0 = _indice_coluna(partes["col0"]) if partes["col0"] else 0
+    lin0 = int(partes["lin0"]) - 1 if partes["lin0"] else 0
+    if ":" in celulas:
+        col1 = _indice_coluna(partes["col1"]) + 1 if partes["col1"] else None
+        lin1 = int(partes["lin1"]) if partes["lin1"] else None
+    else:
+        col1 = col0 + 1 if partes["col0"] else None
+        lin1 = lin0 + 1 if partes["lin0"] else None
+    return aba, (col0, lin0, col1, lin1)
+
+
+class ServidorPlanilhas:
+    """
+    Servidor HTTP local com as rotas do Google Sheets usadas pelo app. Uso:
+
+        servidor = ServidorPlanilhas(abas_sinteticas(10000), porta=8766)
+        servidor.iniciar()
+        servidor.configurar(latencia={"gviz": 0.3}, erros={"export": 404})
+        ...
+        servidor.estatisticas()  # {"gviz": 2, "contagem": 1, ...}
+    """
+
+    def __init__(self, abas, host="127.0.0.1", porta=8766):
+        self.host = host
+        self.porta = porta
+        self.abas = OrderedDict(abas)
+        self._falhas = {}
+        self._requisicoes = Counter()
+        self._lock = threading.Lock()
+        self._http = None
+
+    @property
+    def url_base(self):
+        return f"http://{self.host}:{self.porta}"
+
+    @property
+    def url_api(self):
+        return f"{self.url_base}/v4/spreadsheets"
+
+    def configurar(self, latencia=None, erros=None, encoding="utf-8", cabecalho_concatenado=False,
+                   linhas_vazias=0, limite_linhas_gviz=None):
+        """
+        Falhas injetadas nas próximas requisições (substitui a configuração anterior):
+        - latencia: segundos por requisição (número) ou {rota: segundos};
+        - erros: {rota: status HTTP};
+        - encoding: encoding dos CSVs;
+        - cabecalho_concatenado: linha com cabeçalho e dados concatenados no início do CSV;
+        - linhas_vazias: linhas em branco no fim do export CSV;
+        - limite_linhas_gviz: corta o CSV do gviz nessa quantidade de linhas de dados.
+        """
+        if latencia is not None and not isinstance(latencia, dict):
+            latencia = {rota: latencia for rota in ("gviz", "contagem", "export", "api")}
+        with self._lock:
+            self._falhas = {
+                "latencia": latencia or {},
+                "erros": erros or {},
+                "encoding": encoding,
+                "cabecalho_concatenado": cabecalho_concatenado,
+                "linhas_vazias": linhas_vazias,
+                "limite_linhas_gviz": limite_linhas_gviz,
+            }
+
+    def estatisticas(self, zerar=False):
+        """Requisições recebidas por rota (e zera os contadores, se pedido)."""
+        with self._lock:
+            contagem = dict(self._requisicoes)
+            if zerar:
+                self._requisicoes.clear()
+        return contagem
+
+    def _aba(self, nome):
+        if nome in self.abas:
+            return self.abas[nome]
+        # Como o gviz do Google: aba desconhecida devolve a primeira
+        return next(iter(self.abas.values()))
+
+    def _csv(self, df, falhas, limite_linhas=None, colunas=None):
+        if colunas is not None:
+            df = df.iloc[:, :colunas]
+        if limite_linhas is not None:
+            df = df.iloc[:limite_linhas]
+        saida = io.StringIO()
+        if falhas.get("cabecalho_concatenado"):
+            primeira = " ".join(map(str, df.columns)) + " " + " ".join(map(str, df.iloc[0].tolist())) if len(df) else ""
+            csv.writer(saida).writerow([primeira.ljust(250, " ")] + [""] * (len(df.columns) - 1))
+        df.to_csv(saida, index=False, quoting=csv.QUOTE_ALL)
+        saida.write(("," * (len(df.columns) - 1) + "\n") * int(falhas.get("linhas_vazias") or 0))
+        return saida.getvalue().encode(falhas.get("encoding") or "utf-8", errors="replace")
+
+    def _contagem(self, df):
+        primeira = df.iloc[:, 0]
+        preenchidas = int((primeira.notna() & (primeira.astype(str).str.strip() != "")).sum())
+        return f'"count {df.columns[0]}"\n"{preenchidas}"\n'.encode("utf-8")
+
+    def _valores(self, intervalo):
+        aba, (col0, lin0, col1, lin1) = separar_intervalo(intervalo)
+        if aba not in self.abas:
+            return None
+        df = self.abas[aba]
+        # Só o recorte pedido é convertido (linha 0 = cabeçalho)
+        recorte = df.iloc[max(lin0 - 1, 0):(lin1 - 1 if lin1 is not None else None), col0:col1]
+        linhas = recorte.astype(object).where(recorte.notna(), "").values.tolist()
+        if lin0 == 0:
+            linhas = [list(df.columns[col0:col1])] + (linhas if lin1 != 1 else [])
+        # Como a API: células vazias no fim das linhas e linhas vazias no fim são omitidas
+        for linha in linhas:
+            while linha and linha[-1] == "":
+                linha.pop()
+        while linhas and not linhas[-1]:
+            linhas.pop()
+        fim = _letra_coluna((col1 or len(df.columns)) - 1)
+        return {
+            "range": f"'{aba}'!{_letra_coluna(col0)}{lin0 + 1}:{fim}{lin1 or len(df) + 1}",
+            "majorDimension": "ROWS",
+            "values": linhas,
+        }
+
+    def _metadados(self, sheet_id):
+        return {
+            "spreadsheetId": sheet_id,
+            "properties": {"title": "Planilha local"},
+            "sheets": [
+                {"properties": {
+                    "sheetId": gid,
+                    "title": nome,
+                    "index": gid,
+                    "sheetType": "GRID",
+                    "gridProperties": {"rowCount": len(df) + 1, "columnCount": len(df.columns)},
+                }}
+                for gid, (nome, df) in enumerate(self.abas.items())
+            ],
+        }
+
+    def responder(self, caminho, parametros):
+        """(rota, status, content-type, corpo) de uma requisição GET."""
+        if caminho == "/__estatisticas":
+            return None, 200, "application/json", json.dumps(self.estatisticas()).encode("utf-8")
+        with self._lock:
+            falhas = dict(self._falhas)
+
+        rota_gviz = _ROTA_GVIZ.match(caminho)
+        rota_export = _ROTA_EXPORT.match(caminho)
+        rota_api = _ROTA_API.match(caminho)
+        if rota_gviz:
+            rota = "contagem" if "COUNT(" in parametros.get("tq", [""])[0].upper() else "gviz"
+        elif rota_export:
+            rota = "export"
+        elif rota_api:
+            rota = "api"
+        else:
+            return None, 404, "text/plain", b"rota desconhecida"
+
+        with self._lock:
+            self._requisicoes[rota] += 1
+        atraso = falhas.get("latencia", {}).get(rota)
+        if atraso:
+            time.sleep(atraso)
+        status = falhas.get("erros", {}).get(rota)
+        if status:
+            return rota, status, "text/plain", f"erro injetado ({status})".encode("utf-8")
+
+        tipo_csv = f"text/csv; charset={falhas.get('encoding') or 'utf-8'}"
+        if rota == "contagem":
+            return rota, 200, "text/csv", self._contagem(self._aba(parametros.get("sheet", [""])[0]))
+        if rota == "gviz":
+            df = self._aba(parametros.get("sheet", [""])[0])
+            _, (_, _, col1, lin1) = separar_intervalo("!" + parametros["range"][0]) if "range" in parametros else ("", (0, 0, None, None))
+            limite = falhas.get("limite_linhas_gviz")
+            if lin1 is not None:
+                limite = min(limite or lin1, lin1 - 1)
+            if "tq" in parametros:
+                consulta = _CONSULTA_SELECT.match(parametros["tq"][0])
+                if consulta is None:
+                    return rota, 400, "text/plain", b"consulta nao suportada"
+                if consulta["colunas"] != "*":
+                    indices = [_indice_coluna(c.strip().upper()) for c in consulta["colunas"].split(",")]
+                    if max(indices) >= len(df.columns):
+                        return rota, 400, "text/plain", b"coluna invalida"
+                    df = df.iloc[:, indices]
+                if consulta["limite"] is not None:
+                    limite = min(limite if limite is not None else int(consulta["limite"]), int(consulta["limite"]))
+            return rota, 200, tipo_csv, self._csv(df, falhas, limite, col1)
+        if rota == "export":
+            gid = int(parametros.get("gid", ["0"])[0])
+            if gid >= len(self.abas):
+                return rota, 400, "text/plain", b"gid invalido"
+            return rota, 200, tipo_csv, self._csv(list(self.abas.values())[gid], {**falhas, "cabecalho_concatenado": False})
+
+        sheet_id, resto = rota_api["id"], rota_api["resto"]
+        if not resto:
+            corpo = self._metadados(sheet_id)
+        elif resto == "/values:batchGet":
+            intervalos = [self._valores(intervalo) for intervalo in parametros.get("ranges", [])]
+            if any(intervalo is None for intervalo in intervalos):
+                return rota, 400, "application/json", b'{"error": {"code": 400, "message": "Unable to parse range"}}'
+            corpo = {"spreadsheetId": sheet_id, "valueRanges": intervalos}
+        else:
+            corpo = self._valores(unquote(resto[len("/values/"):]))
+            if corpo is None:
+                return rota, 400, "application/json", b'{"error": {"code": 400, "message": "Unable to parse range"}}'
+        return rota, 200, "application/json", json.dumps(corpo, ensure_ascii=False).encode("utf-8")
+
+    def iniciar(self):
+        """Sobe o servidor HTTP numa thread daemon (idempotente)."""
+        if self._http is not None:
+            return
+        servidor = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                partes = urlsplit(self.path)
+                _, status, tipo, corpo = servidor.responder(partes.path, parse_qs(partes.query))
+                self.send_response(status)
+                self.send_header("Content-Type", tipo)
+                self.send_header("Content-Length", str(len(corpo)))
+                self.end_headers()
+                self.wfile.write(corpo)
+
+            def log_message(self, *args):
+                pass  # Sem log por requisição
+
+        self._http = ThreadingHTTPServer((self.host, self.porta), _Handler)
+        self._http.daemon_threads = True
+        threading.Thread(target=self._http.serve_forever, name="planilhas-locais", daemon=True).start()
+
+    def parar(self):
+        if self._http is not None:
+            self._http.shutdown()
+            self._http.server_close()
+            self._http = None
+
+
+# Cenários do modo "medir": (nome, usa a API de valores, falhas injetadas)
+CENARIOS = [
+    ("api", True, {}),
+    ("api_latencia_300ms", True, {"latencia": {"api": 0.3}}),
+    ("api_503_csv", True, {"erros": {"api": 503}}),
+    ("gviz", False, {}),
+    ("gviz_latencia_200ms", False, {"latencia": 0.2}),
+    ("gviz_400_export", False, {"erros": {"gviz": 400}}),
+    ("gviz_truncado_export", False, {"limite_linhas_gviz": 500}),
+    ("gviz_latin1", False, {"encoding": "latin-1"}),
+    ("cabecalho_concatenado", False, {"cabecalho_concatenado": True, "linhas_vazias": 2000}),
+    ("tudo_fora", False, {"erros": {"gviz": 400, "contagem": 400, "export": 404}}),
+]
+
+
+def medir_cadeia(servidor, repeticoes=3, cenarios=CENARIOS):
+    """
+    Roda load_data_from_sheets (aba de atores) e load_data_municipios_regioes (sem o
+    cache do Streamlit) em cada cenário. Exige DASHBOARD_SHEETS_URL e
+    DASHBOARD_SHEETS_API_URL apontando para o servidor antes de importar o app.
+    """
+    import app
+    import circuit_breaker
+    import sheets_client
+    import sheets_csv
+
+    url_api = sheets_client.URL_API_SHEETS
+    esperado = {ABA_ATORES: len(servidor.abas[ABA_ATORES]), ABA_MUNICIPIOS: len(servidor.abas[ABA_MUNICIPIOS])}
+    carregadores = {
+        ABA_ATORES: lambda: app.load_data_from_sheets.__wrapped__(ABA_ATORES, projecao=app.PROJECAO_ATORES),
+        ABA_MUNICIPIOS: lambda: app.load_data_municipios_regioes.__wrapped__(),
+    }
+    resultados = []
+    for nome, usa_api, falhas in cenarios:
+        # A API de valores só é tentada com URL configurada (sem credenciais locais)
+        sheets_client.URL_API_SHEETS = url_api if usa_api else None
+        servidor.configurar(**falhas)
+        # Disjuntores novos a cada cenário e sem limite de requisições por minuto (mede a cadeia, não a cota)
+        circuit_breaker._fontes.clear()
+        for fonte in ("sheets_api", "sheets_csv"):
+            circuit_breaker.fonte(fonte).configurar(por_minuto=10 ** 6, rajada=10 ** 6)
+        for aba, carregar in carregadores.items():
+            tempos, requisicoes, linhas, colunas = [], Counter(), 0, 0
+            # Sem planilha/abas/cabeçalhos em memória de outro cenário: a primeira carga é fria
+            # (lê as abas inteiras); as seguintes, como no app, leem só as colunas projetadas
+            sheets_client._clientes.clear()
+            sheets_csv._cabecalhos.clear()
+            for _ in range(repeticoes):
+                servidor.estatisticas(zerar=True)
+                inicio = time.perf_counter()
+                df = carregar()
+                tempos.append((time.perf_counter() - inicio) * 1000)
+                requisicoes.update(servidor.estatisticas())
+                linhas, colunas = len(df), len(df.columns)
+            resultados.append({
+                "cenario": nome,
+                "aba": aba,
+                "mediana_ms": round(statistics.median(tempos), 1),
+                "linhas": linhas,
+                "colunas": colunas,
+                "completo": linhas == esperado[aba],
+                "requisicoes": {rota: n / repeticoes for rota, n in sorted(requisicoes.items())},
+            })
+    sheets_client.URL_API_SHEETS = url_api
+    servidor.configurar()
+    return resultados
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Servidor local que imita o Google Sheets")
+    parser.add_argument("modo", choices=("servir", "medir"))
+    parser.add_argument("--atores", type=int, default=1000)
+    parser.add_argument("--municipios", type=int, default=853)
+    parser.add_argument("--semente", type=int, default=0)
+    parser.add_argument("--porta", type=int, default=8766)
+    parser.add_argument("--latencia", type=float, help="Segundos por requisição (servir)")
+    parser.add_argument("--erro", action="append", default=[], metavar="ROTA=STATUS", help="Ex.: gviz=400 (servir)")
+    parser.add_argument("--encoding", default="utf-8", help="Encoding dos CSVs (servir)")
+    parser.add_argument("--cabecalho-concatenado", action="store_true", help="Artefato do cabeçalho concatenado (servir)")
+    parser.add_argument("--repeticoes", type=int, default=3, help="Cargas por cenário (medir)")
+    parser.add_argument("--saida", help="JSON com os resultados (medir)")
+    args = parser.parse_args(argv)
+
+    servidor = ServidorPlanilhas(abas_sinteticas(args.atores, args.municipios, args.semente), porta=args.porta)
+    servidor.iniciar()
+
+    if args.modo == "servir":
+        servidor.configurar(
+            latencia=args.latencia,
+            erros={rota: int(status) for rota, status in (erro.split("=") for erro in args.erro)},
+            encoding=args.encoding,
+            cabecalho_concatenado=args.cabecalho_concatenado,
+        )
+        print(f"Planilhas locais em {servidor.url_base} ({', '.join(servidor.abas)})")
+        print(f"  DASHBOARD_SHEETS_URL={servidor.url_base} DASHBOARD_SHEETS_API_URL={servidor.url_api} streamlit run app.py")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            servidor.parar()
+        return
+
+    os.environ["DASHBOARD_SHEETS_URL"] = servidor.url_base
+    os.environ["DASHBOARD_SHEETS_API_URL"] = servidor.url_api
+    saida = os.path.abspath(args.saida) if args.saida else None
+    os.chdir(RAIZ)
+    resultados = medir_cadeia(servidor, args.repeticoes)
+    print(f"{args.atores} atores, {args.municipios} municípios, mediana de {args.repeticoes} cargas")
+    for r in resultados:
+        requisicoes = " ".join(f"{rota}={n:g}" for rota, n in r["requisicoes"].items())
+        situacao = "ok" if r["completo"] else "INCOMPLETO"
+        print(f"  {r['cenario']:<24} {r['aba']:<22} {r['mediana_ms']:8.1f} ms  {r['linhas']:6d} linhas {r['colunas']:3d} colunas {situacao:<10} {requisicoes}")
+    if saida:
+        with open(saida, "w", encoding="utf-8") as arquivo:
+            json.dump({"parametros": vars(args), "resultados": resultados}, arquivo, ensure_ascii=False, indent=2)
+    servidor.parar()
+
+
+if __name__ == "__main__":
+    main()
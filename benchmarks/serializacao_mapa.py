@@ -0,0 +1,167 @@
+"""
+Mede a serialização da figura do mapa (choropleth) como o st.plotly_chart faz:
+plotly.tools.return_figure_from_figure_or_data + plotly.io.to_json.
+
+Compara o caminho antigo (GeoJSON como dicionário dentro de cada trace, motor "json"
+e "orjson") com a FiguraMapa (geometria em bytes cacheados, ver plotly_json.py) e o
+customdata antigo (array de objetos com região e município em cada linha) com o
+compacto (inteiros + nome em `text`), numa geometria sintética com o tamanho
+aproximado da malha de MG.
+
+    python benchmarks/serializacao_mapa.py [--municipios 853] [--vertices 350] [--repeticoes 5]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+import plotly.graph_objects as go
+import plotly.io as pio
+import plotly.tools
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from geometry_store import GeometriaCompacta  # noqa: E402
+from map_geometry import IndiceEspacial  # noqa: E402
+from plotly_json import FiguraMapa  # noqa: E402
+
+N_REGIOES = 10
+
+
+def geojson_sintetico(n_municipios, n_vertices, semente=0):
+    """Polígonos irregulares espalhados pela extensão de MG, com códigos IBGE 31xxxxx."""
+    rng = np.random.default_rng(semente)
+    angulos = np.linspace(0, 2 * np.pi, n_vertices)
+    features = []
+    for i in range(n_municipios):
+        cx, cy = -51 + rng.random() * 12, -23 + rng.random() * 8
+        raio = 0.1 + 0.02 * rng.random(n_vertices)
+        anel = np.round(np.column_stack((cx + raio * np.cos(angulos), cy + raio * np.sin(angulos))), 7).tolist()
+        anel.append(anel[0])
+        features.append({
+            "type": "Feature",
+            "properties": {"id": str(3100000 + i), "name": f"Município {i}"},
+            "geometry": {"type": "Polygon", "coordinates": [anel]},
+        })
+    return {"type": "FeatureCollection", "features": features}
+
+
+def _trace(codigos, valores, regiao, indice_regiao, geojson=None, compacto=False):
+    nomes = np.array([f"Município {c}" for c in codigos])
+    contagens = [valores.astype(int)] * 6
+    if compacto:
+        # Como no app: índices e contagens inteiras no customdata, nome em `text`
+        dados = dict(
+            customdata=np.column_stack([np.full(len(codigos), indice_regiao), np.arange(len(codigos))] + contagens).astype(np.int32),
+            text=nomes,
+            hovertemplate=f"{regiao}<br>%{{text}}<br>%{{customdata[2]}}<extra></extra>",
+        )
+    else:
+        dados = dict(
+            customdata=np.stack([np.full(len(codigos), regiao), nomes] + contagens, axis=-1),
+            hovertemplate="%{customdata[0]}<br>%{customdata[1]}<br>%{customdata[2]}<extra></extra>",
+        )
+    return go.Choroplethmapbox(
+        geojson=geojson,
+        locations=codigos,
+        z=valores / max(valores.max(), 1),
+        zmin=0,
+        zmax=1,
+        featureidkey="properties.codigo_ibge",
+        name=regiao,
+        **dados,
+    )
+
+
+def figura(indice, grupos, valores, nivel_zoom, rapida, compacto=False):
+    fig = FiguraMapa() if rapida else go.Figure()
+    for indice_regiao, (regiao, codigos) in enumerate(grupos.items()):
+        if rapida:
+            fig.add_trace(_trace(codigos, valores[regiao], regiao, indice_regiao, compacto=compacto))
+            fig.definir_geojson(len(fig.data) - 1, indice.geojson_bytes(codigos, nivel_zoom))
+        else:
+            features = [indice.feature(c, nivel_zoom) for c in codigos]
+            geojson = {"type": "FeatureCollection", "features": features}
+            fig.add_trace(_trace(codigos, valores[regiao], regiao, indice_regiao, geojson, compacto=compacto))
+    fig.update_layout(mapbox=dict(style="carto-positron", zoom=nivel_zoom), height=680)
+    return fig
+
+
+def figura_sem_geometria(grupos, valores, compacto):
+    fig = go.Figure()
+    for indice_regiao, (regiao, codigos) in enumerate(grupos.items()):
+        fig.add_trace(_trace(codigos, valores[regiao], regiao, indice_regiao, compacto=compacto))
+    return fig
+
+
+def serializar(fig):
+    """O que o st.plotly_chart faz com a figura."""
+    return plotly.io.to_json(plotly.tools.return_figure_from_figure_or_data(fig, validate_figure=True), validate=False)
+
+
+def medir(funcao, repeticoes):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return statistics.median(tempos), resultado
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serialização da figura do mapa")
+    parser.add_argument("--municipios", type=int, default=853)
+    parser.add_argument("--vertices", type=int, default=350)
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--zoom", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    indice = IndiceEspacial(GeometriaCompacta.de_geojson(geojson_sintetico(args.municipios, args.vertices)))
+    codigos = sorted(indice.limites)
+    grupos = {f"Região {r}": codigos[r::N_REGIOES] for r in range(N_REGIOES)}
+    rng = np.random.default_rng(1)
+    # A cada render os valores mudam (filtros); a geometria não
+    novos_valores = lambda: {regiao: rng.integers(0, 50, len(c)).astype(float) for regiao, c in grupos.items()}  # noqa: E731
+
+    # Aquece os caches de features simplificadas (o app já os tem após o primeiro render)
+    serializar(figura(indice, grupos, novos_valores(), args.zoom, rapida=False))
+
+    resultados = {}
+    motor_original = pio.json.config.default_engine
+    for motor in ("json", "orjson"):
+        pio.json.config.default_engine = motor
+        resultados[f"dict + {motor}"] = medir(
+            lambda: serializar(figura(indice, grupos, novos_valores(), args.zoom, rapida=False)), args.repeticoes
+        )
+    pio.json.config.default_engine = motor_original
+
+    indice.geometria._serializacoes.clear()
+    resultados["FiguraMapa (bytes frios)"] = medir(
+        lambda: (indice.geometria._serializacoes.clear(), serializar(figura(indice, grupos, novos_valores(), args.zoom, rapida=True)))[1],
+        args.repeticoes,
+    )
+    resultados["FiguraMapa (bytes em cache)"] = medir(
+        lambda: serializar(figura(indice, grupos, novos_valores(), args.zoom, rapida=True)), args.repeticoes
+    )
+
+    resultados["FiguraMapa + customdata int"] = medir(
+        lambda: serializar(figura(indice, grupos, novos_valores(), args.zoom, rapida=True, compacto=True)), args.repeticoes
+    )
+
+    # Só a parte de valores (sem geometria): o que muda a cada render
+    for nome, compacto in (("valores, customdata objeto", False), ("valores, customdata int", True)):
+        resultados[nome] = medir(
+            lambda: serializar(figura_sem_geometria(grupos, novos_valores(), compacto)), args.repeticoes
+        )
+
+    base = resultados["dict + json"][0]
+    print(f"{args.municipios} municípios x {args.vertices} vértices, zoom {args.zoom}, mediana de {args.repeticoes}")
+    for nome, (tempo, saida) in resultados.items():
+        print(f"  {nome:<30} {tempo * 1000:9.1f} ms  {len(saida) / 1e6:6.2f} MB  {base / tempo:5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,278 @@
+"""
+Limite de requisições e disjuntor (circuit breaker) por fonte externa do dashboard.
+
+Cada fonte (API do Google Sheets, export CSV/gviz, GeoJSON, coordenadas) tem:
+- um balde de fichas: `por_minuto` requisições por minuto, com rajadas de até `rajada`.
+  Sem ficha disponível, a requisição espera até `espera_ficha` segundos e depois desiste
+  (LimiteExcedido) em vez de estourar a cota da fonte;
+- um disjuntor: depois de `limite_falhas` falhas seguidas da fonte (erro de rede, timeout,
+  HTTP 429 ou 5xx) ele abre e as requisições falham na hora (CircuitoAberto), sem ir à
+  rede, por `espera_abertura` segundos. Passado esse tempo, uma requisição de teste é
+  liberada (meio-aberto): se der certo o disjuntor fecha; se falhar, reabre pelo dobro do
+  tempo (até `espera_maxima_abertura`).
+
+Respostas 4xx que não sejam 429 (ex.: 400/404 de um ID ou aba candidata errada) mostram
+que a fonte está no ar e não contam como falha. Enquanto o disjuntor está aberto, o app
+serve a última versão boa dos dados (agendador em segundo plano ou obter_dados).
+
+    resposta = fonte("sheets_csv").chamar(requests.get, url, timeout=30)
+
+Estado e contadores por fonte: status(); mudanças de estado vão para o log `dashboard.fontes`.
+"""
+
+import logging
+import threading
+import time
+
+import requests
+
+logger = logging.getLogger("dashboard.fontes")
+
+FECHADO = "fechado"
+ABERTO = "aberto"
+MEIO_ABERTO = "meio-aberto"
+
+# Padrões por fonte. A cota de leitura da API do Sheets é de 60 requisições por minuto por usuário
+LIMITES_PADRAO = {
+    "sheets_api": {"por_minuto": 60, "rajada": 10},
+    "sheets_csv": {"por_minuto": 60, "rajada": 10},
+    "geojson": {"por_minuto": 30, "rajada": 5},
+    "geojson_ibge": {"por_minuto": 30, "rajada": 5},
+    "coordenadas": {"por_minuto": 30, "rajada": 5},
+}
+
+_lock = threading.Lock()
+_fontes = {}
+
+
+class FonteIndisponivel(Exception):
+    """A requisição não foi feita: a fonte está protegida pelo limite ou pelo disjuntor."""
+
+
+class CircuitoAberto(FonteIndisponivel):
+    pass
+
+
+class LimiteExcedido(FonteIndisponivel):
+    pass
+
+
+def _status_http(erro):
+    """Status HTTP de uma exceção (requests/gspread: .response; urllib: .code), se houver."""
+    resposta = getattr(erro, "response", None)
+    status = getattr(resposta, "status_code", None)
+    if status is None:
+        status = getattr(erro, "code", None)
+    return status if isinstance(status, int) else None
+
+
+def _status_de_falha(status):
+    return status == 429 or status >= 500
+
+
+def falha_da_fonte(erro):
+    """True se a exceção indica problema na fonte (rede, timeout, 429/5xx), não na requisição."""
+    if isinstance(erro, FonteIndisponivel):
+        return False
+    status = _status_http(erro)
+    if status is not None:
+        return _status_de_falha(status)
+    # requests.ConnectionError/Timeout; urllib.error.URLError, socket.timeout e afins são OSError
+    return isinstance(erro, (requests.ConnectionError, requests.Timeout, OSError))
+
+
+class BaldeFichas:
+    """Balde de fichas: `por_minuto` fichas por minuto, acumulando até `rajada`."""
+
+    def __init__(self, por_minuto, rajada):
+        self.por_segundo = por_minuto / 60.0
+        self.rajada = max(1, rajada)
+        self.fichas = float(self.rajada)
+        self._atualizado_em = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _repor(self, agora):
+        self.fichas = min(self.rajada, self.fichas + (agora - self._atualizado_em) * self.por_segundo)
+        self._atualizado_em = agora
+
+    def adquirir(self, espera_maxima):
+        """Consome uma ficha, esperando por ela até `espera_maxima` segundos. Retorna a espera (s) ou None."""
+        inicio = time.monotonic()
+        while True:
+            with self._lock:
+                agora = time.monotonic()
+                self._repor(agora)
+                if self.fichas >= 1:
+                    self.fichas -= 1
+                    return agora - inicio
+                falta = (1 - self.fichas) / self.por_segundo if self.por_segundo > 0 else float("inf")
+            if agora - inicio + falta > espera_maxima:
+                return None
+            time.sleep(min(falta, 0.5))
+
+
+class Disjuntor:
+    """Estado do disjuntor de uma fonte (ver docstring do módulo). Use com FonteProtegida."""
+
+    def __init__(self, limite_falhas=5, espera_abertura=30, espera_maxima_abertura=600):
+        self.limite_falhas = limite_falhas
+        self.espera_abertura = espera_abertura
+        self.espera_maxima_abertura = espera_maxima_abertura
+        self.estado = FECHADO
+        self.falhas_seguidas = 0
+        self.aberturas_seguidas = 0
+        self.reabre_em = 0.0
+        self._teste_em_andamento = False
+
+    def permitir(self, agora):
+        """True se a requisição pode seguir (no meio-aberto, só uma de teste por vez)."""
+        if self.estado == FECHADO:
+            return True
+        if self.estado == ABERTO:
+            if agora < self.reabre_em:
+                return False
+            self.estado = MEIO_ABERTO
+            self._teste_em_andamento = False
+        if self._teste_em_andamento:
+            return False
+        self._teste_em_andamento = True
+        return True
+
+    def sucesso(self):
+        self.estado = FECHADO
+        self.falhas_seguidas = 0
+        self.aberturas_seguidas = 0
+        self._teste_em_andamento = False
+
+    def falha(self, agora):
+        """Registra uma falha; True se o disjuntor abriu (ou reabriu) com ela."""
+        self.falhas_seguidas += 1
+        self._teste_em_andamento = False
+        if self.estado == MEIO_ABERTO or self.falhas_seguidas >= self.limite_falhas:
+            espera = min(self.espera_maxima_abertura, self.espera_abertura * 2 ** self.aberturas_seguidas)
+            self.aberturas_seguidas += 1
+            self.estado = ABERTO
+            self.reabre_em = agora + espera
+            return True
+        return False
+
+    def liberar(self):
+        """A requisição de teste terminou sem dizer nada sobre a fonte: libera outra."""
+        self._teste_em_andamento = False
+
+
+class FonteProtegida:
+    """Balde de fichas + disjuntor + contadores de uma fonte."""
+
+    def __init__(self, nome, por_minuto=60, rajada=10, espera_ficha=5.0, limite_falhas=5,
+                 espera_abertura=30, espera_maxima_abertura=600):
+        self.nome = nome
+        self.espera_ficha = espera_ficha
+        self.balde = BaldeFichas(por_minuto, rajada)
+        self.disjuntor = Disjuntor(limite_falhas, espera_abertura, espera_maxima_abertura)
+        self.contadores = {
+            "requisicoes": 0, "falhas": 0, "rejeitadas_circuito": 0, "rejeitadas_limite": 0,
+            "aberturas": 0, "espera_limite_s": 0.0,
+        }
+        self.ultimo_erro = None
+        self._lock = threading.Lock()
+
+    def configurar(self, por_minuto=None, rajada=None, espera_ficha=None, limite_falhas=None, espera_abertura=None):
+        """Ajusta os limites sem perder o estado atual (pode ser chamado a cada rerun)."""
+        with self._lock:
+            if por_minuto is not None:
+                self.balde.por_segundo = por_minuto / 60.0
+            if rajada is not None:
+                self.balde.rajada = max(1, rajada)
+            if espera_ficha is not None:
+                self.espera_ficha = espera_ficha
+            if limite_falhas is not None:
+                self.disjuntor.limite_falhas = limite_falhas
+            if espera_abertura is not None:
+                self.disjuntor.espera_abertura = espera_abertura
+
+    def chamar(self, funcao, *args, **kwargs):
+        """
+        Executa a requisição funcao(*args, **kwargs) se o disjuntor e o limite deixarem;
+        senão levanta CircuitoAberto/LimiteExcedido sem chamar a função. Exceções e
+        respostas com status_code 429/5xx contam como falha da fonte.
+        """
+        with self._lock:
+            if not self.disjuntor.permitir(time.monotonic()):
+                self.contadores["rejeitadas_circuito"] += 1
+                raise CircuitoAberto(f"{self.nome}: disjuntor aberto ({self.ultimo_erro})")
+        espera = self.balde.adquirir(self.espera_ficha)
+        if espera is None:
+            with self._lock:
+                self.contadores["rejeitadas_limite"] += 1
+                self.disjuntor.liberar()
+            raise LimiteExcedido(f"{self.nome}: limite de requisições por minuto atingido")
+
+        try:
+            resultado = funcao(*args, **kwargs)
+        except Exception as e:
+            self._registrar(espera, e if falha_da_fonte(e) else None, com_resposta=_status_http(e) is not None)
+            raise
+        except BaseException:
+            with self._lock:
+                self.disjuntor.liberar()
+            raise
+        status = getattr(resultado, "status_code", None)
+        falha = f"HTTP {status}" if isinstance(status, int) and _status_de_falha(status) else None
+        self._registrar(espera, falha, com_resposta=True)
+        return resultado
+
+    def _registrar(self, espera, falha, com_resposta):
+        with self._lock:
+            self.contadores["requisicoes"] += 1
+            self.contadores["espera_limite_s"] += espera
+            if falha is None:
+                if com_resposta:
+                    if self.disjuntor.estado != FECHADO:
+                        logger.warning("%s: disjuntor fechado, a fonte voltou a responder", self.nome)
+                    self.disjuntor.sucesso()
+                else:
+                    # Erro local (ex.: ao interpretar a resposta): não diz nada sobre a fonte
+                    self.disjuntor.liberar()
+                return
+            self.contadores["falhas"] += 1
+            self.ultimo_erro = str(falha)[:200]
+            if self.disjuntor.falha(time.monotonic()):
+                self.contadores["aberturas"] += 1
+                logger.warning(
+                    "%s: disjuntor aberto por %.0f s após %d falha(s) seguida(s): %s",
+                    self.nome, self.disjuntor.reabre_em - time.monotonic(),
+                    self.disjuntor.falhas_seguidas, self.ultimo_erro,
+                )
+
+    def status(self):
+        with self._lock:
+            disjuntor = self.disjuntor
+            estado = disjuntor.estado
+            if estado == ABERTO and time.monotonic() >= disjuntor.reabre_em:
+                estado = MEIO_ABERTO
+            return dict(
+                self.contadores,
+                espera_limite_s=round(self.contadores["espera_limite_s"], 2),
+                estado=estado,
+                falhas_seguidas=disjuntor.falhas_seguidas,
+                reabre_em_s=round(max(0.0, disjuntor.reabre_em - time.monotonic()), 1) if estado == ABERTO else None,
+                fichas=round(self.balde.fichas, 1),
+                ultimo_erro=self.ultimo_erro,
+            )
+
+
+def fonte(nome):
+    """Proteção da fonte `nome`, uma por processo (criada com LIMITES_PADRAO na primeira vez)."""
+    with _lock:
+        protegida = _fontes.get(nome)
+        if protegida is None:
+            protegida = _fontes[nome] = FonteProtegida(nome, **LIMITES_PADRAO.get(nome, {}))
+        return protegida
+
+
+def status():
+    """Estado do disjuntor e contadores de cada fonte já usada."""
+    with _lock:
+        fontes = list(_fontes.values())
+    return {protegida.nome: protegida.status() for protegida in fontes}
@@ -0,0 +1,134 @@
+"""
+Limpeza das abas carregadas do Google Sheets (cabeçalho e linhas-lixo).
+
+O export do Sheets às vezes traz linhas com todos os dados concatenados no início,
+o cabeçalho como primeira linha de dados (colunas 0..N) ou repetido no meio da aba,
+além de milhares de linhas em branco no fim. Aqui todos esses casos são detectados
+em uma única passada sobre a primeira coluna (máscaras vetorizadas) e as linhas são
+descartadas de uma vez, sem remover uma linha por iteração nem reindexar a cada passo.
+Usado pelo app (por carga, dentro dos carregadores cacheados) e pelo
+download_sheets_data.py. Inclui também a normalização dos códigos IBGE.
+"""
+
+import numpy as np
+import pandas as pd
+
+# Colunas da aba "Base | Atores MG", usadas quando o cabeçalho não pode ser recuperado
+COLUNAS_BASE_ATORES = [
+    'Nome do Ator', 'Categoria', 'Cidade', 'Regiao Sebrae', 'Site',
+    'Descrição Resumida', 'Setor', 'Tags', 'Ano de Fundação',
+    'Tamanho da Equipe', 'Marco Legal', 'Relação com Beta-i',
+]
+
+# Palavras que indicam que uma linha é o cabeçalho da aba
+PALAVRAS_CABECALHO = ['nome', 'name', 'categoria', 'category', 'ator', 'actor', 'cidade', 'city']
+
+# Valores da primeira coluna que são cabeçalho repetido (comparação exata, minúsculas)
+VALORES_CABECALHO = ['name', 'nome', 'nome do ator', 'categoria', 'category']
+
+
+def _colunas_posicionais(colunas):
+    """True quando o DataFrame foi lido sem cabeçalho (colunas 0, 1, 2...)."""
+    if len(colunas) == 0:
+        return False
+    primeira_col = colunas[0]
+    return isinstance(primeira_col, (int, np.integer)) or (isinstance(primeira_col, str) and primeira_col.isdigit())
+
+
+def _nomes_padrao(nomes_padrao, num_cols):
+    """Nomes padrão ajustados ao número de colunas ("Coluna N" para as extras)."""
+    nomes = list(nomes_padrao)[:num_cols]
+    while len(nomes) < num_cols:
+        nomes.append(f'Coluna {len(nomes) + 1}')
+    return nomes
+
+
+def _e_cabecalho_duplicado(valor):
+    """Critérios restritivos para não confundir um nome de ator curto com o cabeçalho."""
+    return (
+        len(valor) < 30 and  # Cabeçalhos são curtos
+        any(palavra in valor for palavra in ['nome do ator', 'name', 'categoria', 'category']) and
+        not any(char.isdigit() for char in valor) and  # Não tem números
+        len(valor.split()) <= 3  # Muito poucas palavras
+    )
+
+
+def limpar_dados_planilha(df, nomes_padrao=None):
+    """
+    Recupera o cabeçalho e remove as linhas-lixo de uma aba, em uma única passada.
+
+    - linhas iniciais com os dados concatenados na primeira célula (> 200 caracteres
+      contendo "Nome do Ator");
+    - sem cabeçalho (colunas numéricas): usa a primeira linha restante se ela parecer
+      um cabeçalho; senão, `nomes_padrao` (se informado);
+    - nomes de coluna concatenados com dados (primeiro nome > 50 caracteres): usa
+      `nomes_padrao` e descarta a primeira linha se for um cabeçalho duplicado;
+    - linhas com a primeira coluna vazia (inclui as totalmente vazias) e cabeçalhos
+      repetidos no meio dos dados (valor exato da primeira coluna).
+
+    Retorna um novo DataFrame com índice 0..n-1.
+    """
+    if len(df.columns) == 0:
+        return df
+
+    n = len(df)
+    primeira = df.iloc[:, 0]
+    # Texto da primeira coluna calculado uma única vez (NaN -> "")
+    texto = primeira.where(primeira.notna(), "").astype(str).str.strip()
+
+    manter = np.ones(n, dtype=bool)
+
+    # Linhas concatenadas: só as que formam um bloco contínuo no início da aba
+    concatenada = ((texto.str.len() > 200) & texto.str.contains("Nome do Ator", regex=False)).to_numpy()
+    inicio = int(np.cumprod(concatenada).sum()) if n else 0
+    manter[:inicio] = False
+
+    # Cabeçalho
+    colunas = list(df.columns)
+    if _colunas_posicionais(df.columns):
+        if inicio < n:
+            linha = df.iloc[inicio]
+            linha_str = ' '.join(linha.astype(str).tolist()).lower()
+        else:
+            linha_str = ""
+        if any(palavra in linha_str for palavra in PALAVRAS_CABECALHO):
+            # A primeira linha é o cabeçalho - usa ela como nomes das colunas
+            colunas = [str(col).strip() if pd.notna(col) else f'Coluna_{i}' for i, col in enumerate(linha)]
+            manter[inicio] = False
+            inicio += 1
+        elif nomes_padrao is not None:
+            colunas = _nomes_padrao(nomes_padrao, len(colunas))
+        else:
+            colunas = [str(col) if col is not None else f'Coluna_{i}' for i, col in enumerate(colunas)]
+    else:
+        colunas = [str(col).strip() if col is not None else f'Coluna_{i}' for i, col in enumerate(colunas)]
+
+    # Nomes de coluna concatenados com dados
+    if nomes_padrao is not None and len(colunas[0]) > 50:
+        colunas = _nomes_padrao(nomes_padrao, len(colunas))
+        if inicio < n and _e_cabecalho_duplicado(texto.iat[inicio].lower()):
+            manter[inicio] = False
+
+    # Primeira coluna vazia e cabeçalhos repetidos (match exato)
+    manter &= (texto != "").to_numpy()
+    manter &= ~texto.str.lower().isin(VALORES_CABECALHO).to_numpy()
+
+    limpo = df.iloc[manter].reset_index(drop=True)
+    limpo.columns = colunas
+    return limpo
+
+
+def normalize_codigo_ibge(series: pd.Series) -> pd.Series:
+    """Normaliza série com códigos IBGE para strings de sete dígitos."""
+    def _normalize(value):
+        if pd.isna(value):
+            return np.nan
+        try:
+            return f"{int(float(value)):07d}"
+        except (ValueError, TypeError):
+            value_str = str(value).strip()
+            if value_str == "":
+                return np.nan
+            value_str = value_str.split('.')[0]
+            return value_str.zfill(7)
+    return series.apply(_normalize)
@@ -0,0 +1,223 @@
+"""
+Relatório de qualidade dos dados do dashboard.
+
+Roda uma vez por versão dos dados (o app guarda o resultado em cache pela versão
+publicada pelo agendador) e aponta:
+- códigos IBGE da aba "Municípios e Regiões" sem município correspondente no GeoJSON;
+- categorias de atores fora da lista conhecida;
+- anos de fundação malformados;
+- atores duplicados (mesmo nome, ignorando acentos e maiúsculas).
+
+O relatório é um dicionário simples (serializável em JSON), exibido no app com
+DASHBOARD_DATA_QUALITY=1 ou gerado pela linha de comando:
+
+    python data_quality.py dados_base_atores_mg.csv --municipios municipios.csv --geojson mg.json
+"""
+
+import argparse
+import json
+import sys
+import unicodedata
+from datetime import datetime
+
+import pandas as pd
+
+from data_cleaning import normalize_codigo_ibge
+from geometry_store import GeometriaCompacta
+
+# Categorias usadas pelo mapa e pela tabela
+CATEGORIAS_CONHECIDAS = [
+    "Startup",
+    "Empresa Âncora",
+    "Fundos e Investidores",
+    "Hubs, Incubadoras e Parques Tecnológicos",
+    "Universidades e ICTs",
+    "Órgãos Públicos e Apoio",
+]
+
+# Faixa aceita para o ano de fundação
+ANO_MINIMO = 1800
+
+# Máximo de ocorrências listadas por problema (o resumo traz o total)
+LIMITE_ITENS = 200
+
+POSSIVEIS_NOMES_IBGE = ['codigo_ibge', 'código_ibge', 'codigo ibge', 'código ibge', 'ibge']
+POSSIVEIS_NOMES_MUNICIPIO = ['nome_municipio', 'municipio', 'município', 'cidade', 'city']
+
+
+def _sem_acentos(texto):
+    texto = unicodedata.normalize("NFKD", str(texto))
+    return "".join(ch for ch in texto if not unicodedata.combining(ch)).strip().lower()
+
+
+def _encontrar_coluna(df, possiveis_nomes):
+    """Primeira coluna cujo nome (sem acentos/minúsculas) contém algum dos nomes."""
+    for col in df.columns:
+        col_norm = _sem_acentos(col)
+        if any(_sem_acentos(nome) in col_norm for nome in possiveis_nomes):
+            return col
+    return None
+
+
+def _coluna_exata(df, candidatos):
+    for nome in candidatos:
+        if nome in df.columns:
+            return nome
+    return None
+
+
+def _texto(series):
+    """Série como texto sem espaços nas pontas (NaN -> "")."""
+    return series.where(series.notna(), "").astype(str).str.strip()
+
+
+def codigos_geojson(geometria):
+    """Conjunto de códigos IBGE (7 dígitos) presentes na geometria (GeometriaCompacta)."""
+    return {codigo for codigo in (geometria.codigos if geometria else []) if codigo is not None}
+
+
+def validar_codigos_ibge(df_municipios, geojson):
+    """Municípios da planilha cujo código IBGE não existe no GeoJSON (GeometriaCompacta)."""
+    coluna_ibge = _encontrar_coluna(df_municipios, POSSIVEIS_NOMES_IBGE)
+    if coluna_ibge is None:
+        return [], "Aba de municípios sem coluna de código IBGE (o mapa usa o nome do município)."
+    if not geojson:
+        return [], "GeoJSON indisponível: códigos IBGE não verificados."
+
+    coluna_municipio = _encontrar_coluna(df_municipios, POSSIVEIS_NOMES_MUNICIPIO)
+    codigos = normalize_codigo_ibge(df_municipios[coluna_ibge])
+    sem_match = codigos.notna() & ~codigos.astype(str).isin(codigos_geojson(geojson))
+    municipios = df_municipios.loc[sem_match, coluna_municipio] if coluna_municipio else pd.Series("", index=codigos[sem_match].index)
+    return [
+        {"municipio": str(municipio), "codigo_ibge": str(codigo)}
+        for municipio, codigo in zip(municipios, codigos[sem_match])
+    ], None
+
+
+def validar_categorias(df_atores, categorias_conhecidas):
+    """Categorias preenchidas que não estão na lista conhecida, com a quantidade de atores."""
+    coluna = _coluna_exata(df_atores, ['Categoria', 'categoria', 'tipo', 'tipo_ator', 'categoria_ator', 'actor_type', 'type'])
+    if coluna is None:
+        return [], "Aba de atores sem coluna de categoria."
+    categorias = _texto(df_atores[coluna])
+    desconhecidas = categorias[(categorias != "") & ~categorias.isin(categorias_conhecidas)]
+    contagem = desconhecidas.value_counts()
+    return [{"categoria": str(cat), "quantidade": int(qtd)} for cat, qtd in contagem.items()], None
+
+
+def validar_anos(df_atores, coluna_nome):
+    """Anos de fundação preenchidos que não são um ano inteiro entre ANO_MINIMO e o ano atual."""
+    coluna = _coluna_exata(df_atores, ['Ano de Fundação', 'Ano de Fundacao', 'foundationYear'])
+    if coluna is None:
+        coluna = next((c for c in df_atores.columns if 'ano' in _sem_acentos(c) and 'fundac' in _sem_acentos(c)), None)
+    if coluna is None:
+        return [], "Aba de atores sem coluna de ano de fundação."
+    valores = _texto(df_atores[coluna])
+    anos = pd.to_numeric(valores, errors='coerce')
+    validos = anos.notna() & (anos % 1 == 0) & (anos >= ANO_MINIMO) & (anos <= datetime.now().year)
+    invalidos = (valores != "") & ~validos
+    atores = _texto(df_atores[coluna_nome]) if coluna_nome else pd.Series("", index=df_atores.index)
+    return [
+        {"ator": ator, "valor": valor}
+        for ator, valor in zip(atores[invalidos], valores[invalidos])
+    ], None
+
+
+def validar_duplicados(df_atores, coluna_nome):
+    """Atores com o mesmo nome (sem acentos, maiúsculas e espaços extras) mais de uma vez."""
+    if coluna_nome is None:
+        return [], "Aba de atores sem coluna de nome."
+    nomes = _texto(df_atores[coluna_nome])
+    chaves = nomes.map(_sem_acentos).str.split().str.join(" ")
+    repetidos = chaves.duplicated(keep=False) & (chaves != "")
+    if not repetidos.any():
+        return [], None
+    coluna_cidade = _coluna_exata(df_atores, ['Cidade', 'cidade', 'city'])
+    cidades = _texto(df_atores[coluna_cidade]) if coluna_cidade else pd.Series("", index=df_atores.index)
+    grupos = pd.DataFrame({"chave": chaves[repetidos], "ator": nomes[repetidos], "cidade": cidades[repetidos]}).groupby("chave", sort=True)
+    return [
+        {
+            "ator": grupo["ator"].iloc[0],
+            "ocorrencias": int(len(grupo)),
+            "cidades": sorted(c for c in grupo["cidade"].unique() if c),
+        }
+        for _, grupo in grupos
+    ], None
+
+
+def gerar_relatorio_qualidade(df_municipios=None, df_atores=None, geojson=None, categorias_conhecidas=CATEGORIAS_CONHECIDAS):
+    """
+    Executa todas as verificações e devolve o relatório:
+    {"gerado_em", "resumo": {problema: total}, problema: [itens...], "avisos": [...]}.
+    Verificações cujos dados não estão disponíveis ficam vazias e geram um aviso.
+    """
+    relatorio = {"gerado_em": datetime.now().isoformat(timespec="seconds"), "avisos": []}
+    verificacoes = {}
+
+    if df_municipios is not None and not df_municipios.empty:
+        verificacoes["codigos_ibge_sem_geojson"] = validar_codigos_ibge(df_municipios, geojson)
+    else:
+        verificacoes["codigos_ibge_sem_geojson"] = ([], "Aba de municípios não carregada.")
+
+    if df_atores is not None and not df_atores.empty:
+        coluna_nome = _coluna_exata(df_atores, ['Nome do Ator', 'Nome', 'name'])
+        verificacoes["categorias_desconhecidas"] = validar_categorias(df_atores, categorias_conhecidas)
+        verificacoes["anos_invalidos"] = validar_anos(df_atores, coluna_nome)
+        verificacoes["atores_duplicados"] = validar_duplicados(df_atores, coluna_nome)
+    else:
+        for problema in ("categorias_desconhecidas", "anos_invalidos", "atores_duplicados"):
+            verificacoes[problema] = ([], "Aba de atores não carregada.")
+
+    relatorio["resumo"] = {}
+    for problema, (itens, aviso) in verificacoes.items():
+        # Categorias agrupam vários atores: o total é a soma das quantidades
+        total = sum(item["quantidade"] for item in itens) if problema == "categorias_desconhecidas" else len(itens)
+        relatorio["resumo"][problema] = total
+        relatorio[problema] = itens[:LIMITE_ITENS]
+        if aviso and aviso not in relatorio["avisos"]:
+            relatorio["avisos"].append(aviso)
+    return relatorio
+
+
+def total_problemas(relatorio):
+    return sum(relatorio.get("resumo", {}).values())
+
+
+def _carregar_tabela(caminho):
+    return pd.read_csv(caminho, dtype=str, encoding='utf-8-sig')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Relatório de qualidade dos dados do dashboard")
+    parser.add_argument("atores", help="CSV da aba 'Base | Atores MG' (ex.: saída de download_sheets_data.py)")
+    parser.add_argument("--municipios", help="CSV da aba 'Municípios e Regiões'")
+    parser.add_argument("--geojson", help="Arquivo GeoJSON dos municípios de MG")
+    parser.add_argument("--json", action="store_true", help="Imprime o relatório completo em JSON")
+    args = parser.parse_args(argv)
+
+    df_atores = _carregar_tabela(args.atores)
+    df_municipios = _carregar_tabela(args.municipios) if args.municipios else None
+    geojson = None
+    if args.geojson:
+        with open(args.geojson, encoding='utf-8') as arquivo:
+            geojson = GeometriaCompacta.de_geojson(json.load(arquivo))
+
+    relatorio = gerar_relatorio_qualidade(df_municipios, df_atores, geojson)
+
+    if args.json:
+        print(json.dumps(relatorio, ensure_ascii=False, indent=2))
+    else:
+        print(f"Relatório de qualidade ({relatorio['gerado_em']})")
+        for problema, total in relatorio["resumo"].items():
+            print(f"  {problema}: {total}")
+            for item in relatorio[problema][:10]:
+                print(f"    - {item}")
+        for aviso in relatorio["avisos"]:
+            print(f"  ⚠️ {aviso}")
+
+    # Código de saída diferente de zero quando há problemas (útil em CI/agendamentos)
+    return 1 if total_problemas(relatorio) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
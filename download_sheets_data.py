@@ -2,9 +2,11 @@
 Script para baixar e salvar o CSV do Google Sheets para verificação
 """
 import pandas as pd
-from urllib.parse import quote
 import sys
 
+from data_cleaning import COLUNAS_BASE_ATORES, limpar_dados_planilha
+from sheets_csv import url_export_csv, url_gviz_csv
+
 def download_sheets_data():
     """
     Baixa dados da aba "Base | Atores MG" do Google Sheets e salva como CSV
@@ -18,8 +20,7 @@ def download_sheets_data():
         
         # Método 1: Tenta com a URL de export CSV direta usando o nome da aba
         try:
-            encoded_sheet_name = quote(sheet_name, safe="")
-            sheet_url = f"https://docs.google.com/spreadsheets/d/{sheet_id}/gviz/tq?tqx=out:csv&sheet={encoded_sheet_name}"
+            sheet_url = url_gviz_csv(sheet_id, sheet_name)
             print(f"\nTentando URL: {sheet_url}")
             
             # Tenta diferentes encodings
@@ -41,25 +42,14 @@ def download_sheets_data():
             print(f"\nErro no método 1: {str(e)}")
             # Método 2: Tenta com export direto
             try:
-                sheet_url = f"https://docs.google.com/spreadsheets/d/{sheet_id}/export?format=csv"
+                sheet_url = url_export_csv(sheet_id)
                 print(f"\nTentando método alternativo: {sheet_url}")
                 df = pd.read_csv(sheet_url, encoding='utf-8')
             except:
                 df = pd.read_csv(sheet_url, encoding='latin-1')
         
-        # Remove linhas completamente vazias
-        df = df.dropna(how='all')
-        
-        # Remove espaços dos nomes das colunas
-        df.columns = df.columns.str.strip()
-        
-        # Remove linhas onde a primeira coluna está vazia
-        if len(df) > 0 and len(df.columns) > 0:
-            primeira_col = df.columns[0]
-            if primeira_col in df.columns:
-                mask = df[primeira_col].notna() & (df[primeira_col].astype(str).str.strip() != '')
-                df = df[mask]
-                df = df[~df[primeira_col].astype(str).str.contains('^name$|^Name$|^NAME$', case=False, na=False, regex=True)]
+        # Cabeçalho e linhas-lixo: mesma limpeza usada pelo app
+        df = limpar_dados_planilha(df, COLUNAS_BASE_ATORES)
         
         # Salva o CSV
         output_file = "dados_base_atores_mg.csv"
@@ -0,0 +1,328 @@
+"""
+Armazenamento compacto da geometria dos municípios de MG.
+
+O GeoJSON carregado é convertido uma única vez em arrays NumPy:
+- vértices quantizados (RESOLUCAO graus, ~0,1 m) em int32, codificados em delta
+  dentro de cada anel (o primeiro vértice do anel guarda a posição relativa à origem);
+- arrays de offsets: vértices por anel, anéis por polígono e polígonos por feature;
+- código IBGE, propriedades e limites (bbox) de cada feature.
+
+Comparado às listas aninhadas de floats do GeoJSON, a geometria ocupa uma fração da
+memória e é barata de copiar/serializar no cache. O GeoJSON só é reconstruído sob
+demanda (uma feature, um subconjunto ou a coleção inteira), e os bytes serializados
+ficam em cache por (códigos, tolerância) — repetir uma figura é só reutilizar os bytes.
+"""
+
+import hashlib
+import json
+import threading
+import weakref
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+try:
+    import orjson
+except ImportError:  # Opcional: serialização mais rápida
+    orjson = None
+
+from data_cleaning import normalize_codigo_ibge
+
+# Graus por unidade das coordenadas quantizadas (6 casas decimais)
+RESOLUCAO = 1e-6
+
+# Máximo de serializações (bytes) mantidas em cache
+MAX_SERIALIZACOES = 128
+
+# Geometrias vivas do processo (para o orçamento de memória medir e limpar as serializações)
+_geometrias = weakref.WeakSet()
+
+
+def bytes_em_cache():
+    """Bytes das serializações em cache de todas as geometrias vivas do processo."""
+    return sum(geometria.bytes_serializados for geometria in list(_geometrias))
+
+
+def limpar_caches():
+    """Descarta as serializações em cache de todas as geometrias vivas do processo."""
+    for geometria in list(_geometrias):
+        geometria.limpar_serializacoes()
+
+
+def _codigo_feature(feature):
+    props = feature.get('properties') or {}
+    return props.get('codigo_ibge') or props.get('id') or feature.get('id') or props.get('CD_MUN') or props.get('codigo')
+
+
+def _poligonos(geometria):
+    """Lista de polígonos (listas de anéis) de um Polygon/MultiPolygon; [] para os demais tipos."""
+    if not geometria or not geometria.get('coordinates'):
+        return []
+    if geometria.get('type') == 'Polygon':
+        return [geometria['coordinates']]
+    if geometria.get('type') == 'MultiPolygon':
+        return geometria['coordinates']
+    return []
+
+
+def _simplificar_anel(anel, tolerancia):
+    """
+    Contorno grosseiro de um anel (vértices inteiros, n x 2): encaixa os vértices numa
+    grade de `tolerancia` unidades e mantém só o primeiro vértice de cada célula visitada
+    em sequência. Anéis que colapsam viram um quadrilátero com vértices do próprio anel.
+    """
+    if len(anel) <= 4:
+        return anel
+    celulas = np.floor_divide(anel, tolerancia)
+    muda = np.ones(len(anel), dtype=bool)
+    muda[1:] = np.any(celulas[1:] != celulas[:-1], axis=1)
+    reduzido = anel[muda]
+    if len(reduzido) < 4:
+        reduzido = anel[np.linspace(0, len(anel) - 1, 4).astype(int)[:3]]
+    # Mantém o anel fechado
+    if not np.array_equal(reduzido[0], reduzido[-1]):
+        reduzido = np.vstack([reduzido, reduzido[:1]])
+    return reduzido
+
+
+class GeometriaCompacta:
+    """
+    Geometria das features em arrays (ver o docstring do módulo). Uso:
+
+        geometria = GeometriaCompacta.de_geojson(geojson)
+        geometria.limites_por_codigo()             # {codigo: (min_lon, min_lat, max_lon, max_lat)}
+        geometria.feature("3106200")               # Feature GeoJSON (dict), decodificada na hora
+        geometria.geojson_bytes(codigos, 0.001)    # FeatureCollection serializada (em cache)
+
+    É avaliada como falsa quando não há features, como um GeoJSON vazio.
+    """
+
+    def __init__(self, codigos, propriedades, tipos, deltas, origem, offsets_aneis, offsets_poligonos, offsets_features):
+        self.codigos = codigos                      # list[str | None], um por feature
+        self.propriedades = propriedades            # list[dict]
+        self.tipos = tipos                          # list[str]: "Polygon" / "MultiPolygon"
+        self.deltas = deltas                        # int32 (n_vertices x 2)
+        self.origem = origem                        # int64 (2,): canto inferior esquerdo, em unidades
+        self.offsets_aneis = offsets_aneis          # int64: vértice inicial de cada anel (+ total)
+        self.offsets_poligonos = offsets_poligonos  # int64: anel inicial de cada polígono (+ total)
+        self.offsets_features = offsets_features    # int64: polígono inicial de cada feature (+ total)
+        self._posicoes = {c: i for i, c in enumerate(codigos) if c is not None}
+        self.limites = self._calcular_limites()
+        self.assinatura = hashlib.sha1(
+            self.limites.tobytes() + ",".join(c or "" for c in codigos).encode("utf-8")
+        ).hexdigest()[:16]
+        self._serializacoes = OrderedDict()
+        self._lock = threading.Lock()
+        _geometrias.add(self)
+
+    # --- Construção ---
+
+    @classmethod
+    def de_geojson(cls, geojson):
+        """
+        Converte um GeoJSON (FeatureCollection) no armazenamento compacto. O código IBGE de
+        cada feature é normalizado (7 dígitos) e gravado em properties.codigo_ibge.
+        """
+        features = (geojson or {}).get('features', [])
+        codigos = normalize_codigo_ibge(pd.Series([_codigo_feature(f) for f in features], dtype=object))
+        codigos = [str(c) if pd.notna(c) else None for c in codigos]
+
+        propriedades, tipos, aneis = [], [], []
+        tamanhos_aneis, aneis_por_poligono, poligonos_por_feature = [], [], []
+        for feature, codigo in zip(features, codigos):
+            props = dict(feature.get('properties') or {})
+            if codigo is not None:
+                props['codigo_ibge'] = codigo
+            propriedades.append(props)
+            geometria = feature.get('geometry') or {}
+            tipos.append(geometria.get('type') if geometria.get('type') in ('Polygon', 'MultiPolygon') else 'Polygon')
+
+            n_poligonos = 0
+            for poligono in _poligonos(geometria):
+                n_aneis = 0
+                for anel in poligono:
+                    try:
+                        pontos = np.asarray(anel, dtype=float)[:, :2]
+                    except (TypeError, ValueError, IndexError):
+                        continue
+                    if not len(pontos):
+                        continue
+                    aneis.append(pontos)
+                    tamanhos_aneis.append(len(pontos))
+                    n_aneis += 1
+                if n_aneis:
+                    aneis_por_poligono.append(n_aneis)
+                    n_poligonos += 1
+            poligonos_por_feature.append(n_poligonos)
+
+        if aneis:
+            inteiros = np.round(np.concatenate(aneis) / RESOLUCAO).astype(np.int64)
+            origem = inteiros.min(axis=0)
+            inteiros -= origem
+        else:
+            inteiros = np.zeros((0, 2), dtype=np.int64)
+            origem = np.zeros(2, dtype=np.int64)
+
+        offsets_aneis = np.concatenate([[0], np.cumsum(tamanhos_aneis, dtype=np.int64)])
+        # Delta dentro de cada anel; o primeiro vértice do anel fica absoluto (relativo à origem)
+        deltas = inteiros.copy()
+        deltas[1:] -= inteiros[:-1]
+        deltas[offsets_aneis[:-1]] = inteiros[offsets_aneis[:-1]]
+
+        return cls(
+            codigos,
+            propriedades,
+            tipos,
+            deltas.astype(np.int32),
+            origem,
+            offsets_aneis,
+            np.concatenate([[0], np.cumsum(aneis_por_poligono, dtype=np.int64)]),
+            np.concatenate([[0], np.cumsum(poligonos_por_feature, dtype=np.int64)]),
+        )
+
+    def __getstate__(self):
+        # Cache de bytes e lock ficam fora da cópia (st.cache_data serializa o objeto)
+        estado = self.__dict__.copy()
+        estado['_serializacoes'] = OrderedDict()
+        del estado['_lock']
+        return estado
+
+    def __setstate__(self, estado):
+        self.__dict__.update(estado)
+        self._lock = threading.Lock()
+        _geometrias.add(self)
+
+    def __len__(self):
+        return len(self.codigos)
+
+    @property
+    def bytes_serializados(self):
+        """Bytes das FeatureCollections serializadas em cache (geojson_bytes)."""
+        with self._lock:
+            return sum(len(serializado) for serializado in self._serializacoes.values())
+
+    def limpar_serializacoes(self):
+        """Descarta as FeatureCollections serializadas (são refeitas sob demanda)."""
+        with self._lock:
+            self._serializacoes.clear()
+
+    @property
+    def nbytes(self):
+        """Bytes ocupados pelos arrays da geometria (sem propriedades e caches)."""
+        return int(self.deltas.nbytes + self.origem.nbytes + self.offsets_aneis.nbytes
+                   + self.offsets_poligonos.nbytes + self.offsets_features.nbytes + self.limites.nbytes)
+
+    # --- Decodificação ---
+
+    def _intervalo_vertices(self, i):
+        p0, p1 = self.offsets_features[i], self.offsets_features[i + 1]
+        a0, a1 = self.offsets_poligonos[p0], self.offsets_poligonos[p1]
+        return self.offsets_aneis[a0], self.offsets_aneis[a1]
+
+    def _vertices(self, inicio, fim):
+        """Vértices inteiros absolutos (relativos à origem) de um intervalo de anéis completos."""
+        deltas = self.deltas[inicio:fim].astype(np.int64)
+        soma = np.cumsum(deltas, axis=0)
+        # Zera o acumulado ao começar cada anel (cumsum único em vez de um por anel)
+        inicios = self.offsets_aneis[(self.offsets_aneis >= inicio) & (self.offsets_aneis < fim)] - inicio
+        base = np.zeros_like(soma[inicios])
+        base[1:] = soma[inicios[1:] - 1]
+        return soma - np.repeat(base, np.diff(np.append(inicios, fim - inicio)), axis=0)
+
+    def _calcular_limites(self):
+        """(min_lon, min_lat, max_lon, max_lat) de cada feature, em graus (NaN sem geometria)."""
+        limites = np.full((len(self.codigos), 4), np.nan)
+        if not len(self.deltas):
+            return limites
+        vertices = self._vertices(0, len(self.deltas))
+        primeiro_vertice = self.offsets_aneis[self.offsets_poligonos[self.offsets_features]]
+        inicios, fins = primeiro_vertice[:-1], primeiro_vertice[1:]
+        com_geometria = fins > inicios
+        if com_geometria.any():
+            # Os vértices de cada feature são contíguos: reduceat sobre os inícios não vazios
+            posicoes = inicios[com_geometria]
+            minimos = np.minimum.reduceat(vertices, posicoes, axis=0)
+            maximos = np.maximum.reduceat(vertices, posicoes, axis=0)
+            graus = (np.hstack([minimos, maximos]) + np.tile(self.origem, 2)) * RESOLUCAO
+            limites[com_geometria] = graus
+        return limites
+
+    def limites_por_codigo(self):
+        """{codigo: (min_lon, min_lat, max_lon, max_lat)} das features com código e geometria."""
+        return {
+            codigo: tuple(float(v) for v in self.limites[i])
+            for codigo, i in self._posicoes.items()
+            if not np.isnan(self.limites[i, 0])
+        }
+
+    def posicao(self, codigo):
+        """Índice da feature com o código IBGE, ou None."""
+        return self._posicoes.get(str(codigo))
+
+    def geometria(self, i, tolerancia=None):
+        """
+        Geometria GeoJSON (dict) da feature i. Com `tolerancia` (graus), cada anel é
+        simplificado para essa resolução.
+        """
+        inicio, fim = self._intervalo_vertices(i)
+        if fim <= inicio:
+            return None
+        vertices = self._vertices(inicio, fim)
+        passo = max(int(tolerancia / RESOLUCAO), 1) if tolerancia else None
+
+        poligonos = []
+        p0, p1 = self.offsets_features[i], self.offsets_features[i + 1]
+        for p in range(p0, p1):
+            aneis = []
+            for a in range(self.offsets_poligonos[p], self.offsets_poligonos[p + 1]):
+                anel = vertices[self.offsets_aneis[a] - inicio:self.offsets_aneis[a + 1] - inicio]
+                if passo:
+                    anel = _simplificar_anel(anel, passo)
+                aneis.append(np.round((anel + self.origem) * RESOLUCAO, 6).tolist())
+            poligonos.append(aneis)
+
+        if self.tipos[i] == 'MultiPolygon':
+            return {"type": "MultiPolygon", "coordinates": poligonos}
+        return {"type": "Polygon", "coordinates": poligonos[0]}
+
+    def feature(self, codigo, tolerancia=None):
+        """Feature GeoJSON (dict) pelo código IBGE, ou None se não existir."""
+        i = self.posicao(codigo)
+        if i is None:
+            return None
+        return {"type": "Feature", "properties": self.propriedades[i], "geometry": self.geometria(i, tolerancia)}
+
+    def geojson(self, codigos=None, tolerancia=None):
+        """FeatureCollection (dict) com as features dos códigos informados (todas se None)."""
+        if codigos is None:
+            indices = range(len(self.codigos))
+        else:
+            indices = [i for i in (self.posicao(c) for c in codigos) if i is not None]
+        features = [
+            {"type": "Feature", "properties": self.propriedades[i], "geometry": self.geometria(i, tolerancia)}
+            for i in indices
+        ]
+        return {"type": "FeatureCollection", "features": features}
+
+    def geojson_bytes(self, codigos=None, tolerancia=None):
+        """
+        FeatureCollection serializada (JSON em UTF-8). O resultado fica em cache por
+        (conjunto de códigos, tolerância): repetir o pedido devolve os mesmos bytes.
+        """
+        chave = (None if codigos is None else tuple(sorted({str(c) for c in codigos})), tolerancia)
+        with self._lock:
+            serializado = self._serializacoes.get(chave)
+            if serializado is not None:
+                self._serializacoes.move_to_end(chave)
+                return serializado
+        colecao = self.geojson(None if chave[0] is None else chave[0], tolerancia)
+        if orjson is not None:
+            serializado = orjson.dumps(colecao)
+        else:
+            serializado = json.dumps(colecao, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        with self._lock:
+            self._serializacoes[chave] = serializado
+            while len(self._serializacoes) > MAX_SERIALIZACOES:
+                self._serializacoes.popitem(last=False)
+        return serializado
@@ -0,0 +1,258 @@
+"""
+Geometria do mapa de municípios: limites (bounding boxes) e enquadramento (viewport).
+
+Os limites de cada município são calculados uma vez, quando o GeoJSON é carregado no
+armazenamento compacto (geometry_store.GeometriaCompacta). A partir deles
+a tabela de viewports (centro, zoom e limites de cada região e de cada município) é
+montada uma vez por versão dos dados; ao selecionar uma região ou um município o mapa
+só consulta essa tabela.
+
+O IndiceEspacial (grade regular sobre os bbox) recorta a geometria enviada ao mapa ao
+aproximar numa região ou num município: as features que intersectam a área visível (com
+MARGEM_RECORTE, já que a largura real do gráfico varia) vão com contornos que aguentam
+FOLGA_ZOOM_DETALHE níveis de zoom do cliente, e as demais vão só como contorno grosseiro
+(RECUO_ZOOM_CONTORNO), para o arrasto e o zoom de afastar não mostrarem buracos.
+"""
+
+import math
+import weakref
+
+import numpy as np
+import pandas as pd
+
+# Área útil do mapa em pixels (coluna do mapa no layout "wide" e MAP_HEIGHT do app)
+LARGURA_MAPA_PX = 820
+ALTURA_MAPA_PX = 680
+
+# Fração da área do mapa ocupada pela geometria enquadrada (o resto é margem)
+PREENCHIMENTO = 0.85
+
+# Limites do zoom calculado
+ZOOM_MINIMO = 4.5
+ZOOM_MAXIMO = 10.5
+
+# Tamanho do tile do Mapbox GL: no zoom 0 o mundo inteiro tem 512 px
+TAMANHO_TILE_PX = 512
+
+# Área do recorte além da visível, em fração da largura/altura de cada lado
+MARGEM_RECORTE = 0.5
+
+# Níveis de zoom do cliente (roda do mouse) que as features visíveis suportam sem serrilhar
+FOLGA_ZOOM_DETALHE = 3
+
+# Níveis abaixo do zoom atual usados no contorno grosseiro das features fora do recorte
+RECUO_ZOOM_CONTORNO = 1
+
+# Bytes estimados por vértice das features decodificadas em cache ([lon, lat] em floats)
+BYTES_POR_VERTICE = 136
+
+# Índices vivos do processo (para o orçamento de memória medir e limpar os caches deles)
+_indices = weakref.WeakSet()
+
+
+def unir_limites(lista_limites):
+    """Menor retângulo que contém todos os limites da lista (None se vazia)."""
+    lista_limites = [l for l in lista_limites if l is not None]
+    if not lista_limites:
+        return None
+    arr = np.asarray(lista_limites, dtype=float)
+    return (float(arr[:, 0].min()), float(arr[:, 1].min()), float(arr[:, 2].max()), float(arr[:, 3].max()))
+
+
+_INICIO_COLECAO = b'{"type":"FeatureCollection","features":['
+_FIM_COLECAO = b']}'
+
+
+def juntar_colecoes(*colecoes):
+    """Junta FeatureCollections serializadas (GeometriaCompacta.geojson_bytes) numa só."""
+    features = [c[len(_INICIO_COLECAO):-len(_FIM_COLECAO)] for c in colecoes]
+    return _INICIO_COLECAO + b",".join(f for f in features if f) + _FIM_COLECAO
+
+
+def _n_vertices(feature):
+    geometria = (feature or {}).get('geometry') or {}
+    coordenadas = geometria.get('coordinates') or []
+    poligonos = [coordenadas] if geometria.get('type') == 'Polygon' else coordenadas
+    return sum(len(anel) for poligono in poligonos for anel in poligono)
+
+
+def bytes_em_cache():
+    """Bytes estimados das features em cache de todos os índices vivos do processo."""
+    return sum(indice.bytes_em_cache for indice in list(_indices))
+
+
+def limpar_caches():
+    """Descarta as features em cache de todos os índices vivos do processo."""
+    for indice in list(_indices):
+        indice.limpar_cache()
+
+
+def _mercator_y(lat):
+    lat = max(min(lat, 85.0), -85.0)
+    return math.log(math.tan(math.pi / 4 + math.radians(lat) / 2))
+
+
+def viewport_de_limites(limites, largura_px=LARGURA_MAPA_PX, altura_px=ALTURA_MAPA_PX, preenchimento=PREENCHIMENTO):
+    """
+    Centro e zoom do Mapbox que enquadram os limites na área do mapa (projeção de Mercator).
+    Retorna {"center": {"lat", "lon"}, "zoom", "bounds": {"west", "south", "east", "north"}}.
+    """
+    min_lon, min_lat, max_lon, max_lat = limites
+    # Centro no meio da projeção (e não da latitude), para o enquadramento ficar simétrico
+    y_centro = (_mercator_y(min_lat) + _mercator_y(max_lat)) / 2
+    centro_lat = math.degrees(2 * math.atan(math.exp(y_centro)) - math.pi / 2)
+    centro_lon = (min_lon + max_lon) / 2
+
+    zooms = []
+    extensao_lon = max_lon - min_lon
+    if extensao_lon > 0:
+        zooms.append(math.log2(largura_px * preenchimento * 360 / (TAMANHO_TILE_PX * extensao_lon)))
+    extensao_y = _mercator_y(max_lat) - _mercator_y(min_lat)
+    if extensao_y > 0:
+        zooms.append(math.log2(altura_px * preenchimento * 2 * math.pi / (TAMANHO_TILE_PX * extensao_y)))
+    zoom = min(zooms) if zooms else ZOOM_MAXIMO
+    zoom = max(ZOOM_MINIMO, min(ZOOM_MAXIMO, zoom))
+
+    return {
+        "center": {"lat": centro_lat, "lon": centro_lon},
+        "zoom": round(zoom, 2),
+        "bounds": {"west": min_lon, "south": min_lat, "east": max_lon, "north": max_lat},
+    }
+
+
+def calcular_viewports(geometria, df_regions, coluna_regiao='regiao_final', coluna_municipio=None):
+    """
+    Tabela de viewports a partir da geometria real dos municípios (bbox das features):
+    {"regioes": {regiao: viewport}, "municipios": {municipio: viewport}}.
+    Municípios sem geometria no GeoJSON ficam fora da tabela.
+    """
+    limites_por_codigo = geometria.limites_por_codigo() if geometria else {}
+
+    tabela = {"regioes": {}, "municipios": {}}
+    if df_regions is None or df_regions.empty or 'codigo_ibge' not in df_regions.columns:
+        return tabela
+
+    limites = df_regions['codigo_ibge'].astype(str).map(limites_por_codigo)
+    com_geometria = limites.notna()
+    df = df_regions.loc[com_geometria]
+    limites = limites[com_geometria]
+
+    if coluna_regiao in df.columns:
+        for regiao, indices in df.groupby(coluna_regiao).groups.items():
+            uniao = unir_limites(limites.loc[indices].tolist())
+            if uniao is not None:
+                tabela["regioes"][regiao] = viewport_de_limites(uniao)
+
+    if coluna_municipio and coluna_municipio in df.columns:
+        for municipio, limite in zip(df[coluna_municipio], limites):
+            if pd.notna(municipio):
+                tabela["municipios"][municipio] = viewport_de_limites(limite)
+    return tabela
+
+
+def graus_por_pixel(zoom):
+    """Graus de longitude por pixel no zoom dado (Mapbox GL, tiles de 512 px)."""
+    return 360.0 / (TAMANHO_TILE_PX * 2 ** zoom)
+
+
+def limites_visiveis(centro, zoom, largura_px=LARGURA_MAPA_PX, altura_px=ALTURA_MAPA_PX, margem=0.0):
+    """
+    (min_lon, min_lat, max_lon, max_lat) da área visível do mapa para um centro e zoom,
+    ampliada em `margem` (fração da largura/altura) de cada lado.
+    """
+    meia_largura = largura_px * (0.5 + margem) * graus_por_pixel(zoom)
+    meia_altura_y = altura_px * (0.5 + margem) * 2 * math.pi / (TAMANHO_TILE_PX * 2 ** zoom)
+    y_centro = _mercator_y(centro["lat"])
+
+    def _lat(y):
+        return math.degrees(2 * math.atan(math.exp(y)) - math.pi / 2)
+
+    return (
+        centro["lon"] - meia_largura,
+        _lat(y_centro - meia_altura_y),
+        centro["lon"] + meia_largura,
+        _lat(y_centro + meia_altura_y),
+    )
+
+
+def _intersecta(a, b):
+    return a[0] <= b[2] and b[0] <= a[2] and a[1] <= b[3] and b[1] <= a[3]
+
+
+class IndiceEspacial:
+    """
+    Índice em grade regular sobre os bbox das features (chave: código IBGE), montado a
+    partir da GeometriaCompacta.
+
+    consultar(limites) devolve os códigos cujas features intersectam a área; feature()
+    devolve a geometria completa ou, para um nível de zoom, a versão simplificada com
+    tolerância de meio pixel (visualmente igual, bem menor no JSON da figura). As
+    features decodificadas são guardadas por (código, nível); limpar_cache() as descarta.
+    """
+
+    def __init__(self, geometria, tamanho_celula=0.25):
+        self.tamanho_celula = tamanho_celula
+        self.geometria = geometria
+        self.limites = geometria.limites_por_codigo() if geometria else {}
+        self.grade = {}
+        self._features = {}
+        self._bytes_features = 0
+        for codigo, limites in self.limites.items():
+            for celula in self._celulas(limites):
+                self.grade.setdefault(celula, []).append(codigo)
+        _indices.add(self)
+
+    def _celulas(self, limites):
+        x0, y0 = math.floor(limites[0] / self.tamanho_celula), math.floor(limites[1] / self.tamanho_celula)
+        x1, y1 = math.floor(limites[2] / self.tamanho_celula), math.floor(limites[3] / self.tamanho_celula)
+        return ((x, y) for x in range(x0, x1 + 1) for y in range(y0, y1 + 1))
+
+    def consultar(self, limites):
+        """Códigos das features cujo bbox intersecta `limites`."""
+        if not self.limites:
+            return set()
+        # A área visível pode ser bem maior que o estado: limita a busca à extensão do índice
+        extensao = unir_limites(self.limites.values())
+        if not _intersecta(limites, extensao):
+            return set()
+        recorte = (max(limites[0], extensao[0]), max(limites[1], extensao[1]),
+                   min(limites[2], extensao[2]), min(limites[3], extensao[3]))
+        candidatos = set()
+        for celula in self._celulas(recorte):
+            candidatos.update(self.grade.get(celula, ()))
+        return {codigo for codigo in candidatos if _intersecta(self.limites[codigo], limites)}
+
+    def feature(self, codigo, nivel_zoom=None):
+        """Feature pelo código; com nivel_zoom, a geometria simplificada para esse nível."""
+        chave = (codigo, nivel_zoom)
+        feature = self._features.get(chave)
+        if feature is None and codigo in self.limites:
+            tolerancia = graus_por_pixel(nivel_zoom) / 2 if nivel_zoom is not None else None
+            feature = self.geometria.feature(codigo, tolerancia)
+            self._features[chave] = feature
+            self._bytes_features += _n_vertices(feature) * BYTES_POR_VERTICE
+        return feature
+
+    @property
+    def bytes_em_cache(self):
+        """Bytes estimados das features decodificadas em cache."""
+        return self._bytes_features
+
+    def limpar_cache(self):
+        """Descarta as features decodificadas (são refeitas sob demanda)."""
+        self._features = {}
+        self._bytes_features = 0
+
+    def geojson_bytes(self, codigos, nivel_zoom=None, contorno=(), nivel_contorno=None):
+        """
+        FeatureCollection serializada com as features dos códigos (simplificadas para o
+        nível de zoom), vinda do cache de bytes da GeometriaCompacta. As features de
+        `contorno` entram na mesma coleção, simplificadas para `nivel_contorno`.
+        """
+        tolerancia = graus_por_pixel(nivel_zoom) / 2 if nivel_zoom is not None else None
+        serializado = self.geometria.geojson_bytes([c for c in codigos if c in self.limites], tolerancia)
+        contorno = [c for c in contorno if c in self.limites]
+        if not contorno:
+            return serializado
+        tolerancia = graus_por_pixel(nivel_contorno) / 2 if nivel_contorno is not None else None
+        return juntar_colecoes(serializado, self.geometria.geojson_bytes(contorno, tolerancia))
@@ -0,0 +1,62 @@
+"""
+Serialização rápida das figuras Plotly do mapa.
+
+O st.plotly_chart converte a figura com figure.to_dict() (cópia profunda de todos os
+traces, inclusive do GeoJSON de cada região) e plotly.io.to_json. Com o orjson
+instalado o Plotly já usa esse motor (arrays NumPy codificados nativamente); o que
+ainda pesa é copiar e recodificar os polígonos a cada render.
+
+FiguraMapa guarda a geometria de cada trace à parte, como bytes já serializados (o
+cache da GeometriaCompacta), e só os encaixa na saída com orjson.Fragment: a cada
+render apenas os valores (locations, z, customdata, layout) são codificados. Sem
+orjson, ou em versões sem Fragment, a geometria volta a ser um dicionário comum.
+"""
+
+import json
+
+import plotly.graph_objects as go
+import plotly.io as pio
+
+try:
+    import orjson
+except ImportError:  # Opcional: sem ele o Plotly usa o módulo json
+    orjson = None
+
+# orjson.Fragment (orjson >= 3.9) insere JSON já serializado sem recodificar
+FRAGMENTOS_DISPONIVEIS = orjson is not None and hasattr(orjson, "Fragment")
+
+
+def _geojson_serializado(dados):
+    # Fragment só é entendido pelo orjson: respeita um motor "json" configurado no Plotly
+    if FRAGMENTOS_DISPONIVEIS and pio.json.config.default_engine in ("orjson", "auto"):
+        return orjson.Fragment(dados)
+    return json.loads(dados)
+
+
+class FiguraMapa(go.Figure):
+    """
+    go.Figure cujos traces podem receber a geometria como bytes já serializados:
+
+        fig = FiguraMapa()
+        fig.add_trace(go.Choroplethmapbox(locations=..., z=..., featureidkey=...))
+        fig.definir_geojson(len(fig.data) - 1, geometria.geojson_bytes(codigos))
+        st.plotly_chart(fig)
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._geojson_bytes = {}
+
+    def definir_geojson(self, indice_trace, geojson_bytes):
+        """Geometria (FeatureCollection serializada em JSON) do trace de índice `indice_trace`."""
+        self._geojson_bytes[indice_trace] = geojson_bytes
+
+    def tamanho_geometria(self):
+        """Total de bytes da geometria guardada à parte."""
+        return sum(len(dados) for dados in self._geojson_bytes.values())
+
+    def to_dict(self):
+        figura = super().to_dict()
+        for indice, dados in self._geojson_bytes.items():
+            figura["data"][indice]["geojson"] = _geojson_serializado(dados)
+        return figura
@@ -0,0 +1,244 @@
+"""
+Instrumentação do tempo de render do dashboard (opcional, DASHBOARD_PROFILE=1).
+
+Cada rerun do app abre um registro com:
+- tempo por trecho/função (medir(nome) ou @cronometrado) — trechos aninhados contam
+  também no trecho de fora;
+- acertos e falhas de cache de cada carregador com st.cache_data (cache_instrumentado);
+- tamanho em bytes do payload de cada gráfico/tabela (registrar_payload).
+
+Ao fim do rerun o registro vai para o log (logger "dashboard.perfil", uma linha JSON
+por rerun) e para um histórico curto exibido no painel do app. Reruns de fragmentos
+(que não passam pelo main) viram registros próprios, abertos pela primeira medição.
+
+Desligado, medir() devolve um contexto nulo compartilhado e os decoradores só testam
+uma flag antes de chamar a função: o custo é desprezível.
+"""
+
+import functools
+import json
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import nullcontext
+from datetime import datetime
+
+logger = logging.getLogger("dashboard.perfil")
+
+# Reruns mantidos no histórico do processo
+HISTORICO_MAXIMO = 50
+
+_ativo = False
+_local = threading.local()
+_NULO = nullcontext()
+_historico = deque(maxlen=HISTORICO_MAXIMO)
+_lock = threading.Lock()
+_contadores_cache = {}  # nome -> {"acertos", "falhas"} desde o início do processo
+
+
+def ativar(ativo=True):
+    """
+    Liga ou desliga a instrumentação (vale para o processo inteiro). Ligada, garante
+    que o log "dashboard.perfil" seja emitido (nível INFO, stderr se não houver handler).
+    """
+    global _ativo
+    _ativo = bool(ativo)
+    if _ativo:
+        logger.setLevel(logging.INFO)
+        if not logger.handlers:
+            handler = logging.StreamHandler()
+            handler.setFormatter(logging.Formatter("%(asctime)s %(name)s %(message)s"))
+            logger.addHandler(handler)
+
+
+def ativo():
+    return _ativo
+
+
+class RegistroRerun:
+    """Medições de um rerun (ou de um rerun de fragmento)."""
+
+    def __init__(self, tipo):
+        self.tipo = tipo
+        self.quando = datetime.now().isoformat(timespec="seconds")
+        self.inicio = time.perf_counter()
+        self.total = None
+        self.tempos = {}  # nome -> [segundos, chamadas]
+        self.cache = {}  # nome -> {"acertos", "falhas"}
+        self.payloads = {}  # nome -> bytes
+
+    def adicionar_tempo(self, nome, segundos):
+        tempo = self.tempos.setdefault(nome, [0.0, 0])
+        tempo[0] += segundos
+        tempo[1] += 1
+
+    def como_dict(self):
+        total = self.total if self.total is not None else time.perf_counter() - self.inicio
+        return {
+            "tipo": self.tipo,
+            "quando": self.quando,
+            "total_ms": round(total * 1000, 2),
+            "tempos": {
+                nome: {"ms": round(segundos * 1000, 2), "chamadas": chamadas}
+                for nome, (segundos, chamadas) in self.tempos.items()
+            },
+            "cache": {nome: dict(contagem) for nome, contagem in self.cache.items()},
+            "payloads": dict(self.payloads),
+        }
+
+
+def registro_atual():
+    """Registro aberto na thread do rerun atual (None se não houver)."""
+    return getattr(_local, "registro", None)
+
+
+def _abrir(tipo):
+    registro = RegistroRerun(tipo)
+    _local.registro = registro
+    return registro
+
+
+def _fechar(registro):
+    registro.total = time.perf_counter() - registro.inicio
+    _local.registro = None
+    dados = registro.como_dict()
+    with _lock:
+        _historico.append(dados)
+    logger.info(json.dumps(dados, ensure_ascii=False))
+
+
+class _Rerun:
+    def __init__(self, tipo):
+        self.tipo = tipo
+        self.registro = None
+
+    def __enter__(self):
+        self.registro = _abrir(self.tipo)
+        return self.registro
+
+    def __exit__(self, *exc):
+        _fechar(self.registro)
+        return False
+
+
+def rerun(tipo="rerun"):
+    """Contexto que delimita um rerun: `with rerun() as registro: main()` (registro None se desligado)."""
+    if not _ativo:
+        return _NULO
+    return _Rerun(tipo)
+
+
+class _Medicao:
+    def __init__(self, nome):
+        self.nome = nome
+        self.proprio = None
+
+    def __enter__(self):
+        # Fora de um rerun aberto (ex.: rerun de fragmento): a medição abre o próprio registro
+        if registro_atual() is None:
+            self.proprio = _abrir("fragmento")
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        registro = registro_atual()
+        if registro is not None:
+            registro.adicionar_tempo(self.nome, time.perf_counter() - self.inicio)
+        if self.proprio is not None:
+            _fechar(self.proprio)
+        return False
+
+
+def medir(nome):
+    """Contexto que soma o tempo do bloco em `nome` no registro do rerun."""
+    if not _ativo:
+        return _NULO
+    return _Medicao(nome)
+
+
+def cronometrado(nome=None):
+    """Decorador: mede cada chamada da função (nome padrão: nome da função)."""
+    def decorar(funcao):
+        rotulo = nome or funcao.__name__
+
+        @functools.wraps(funcao)
+        def chamar(*args, **kwargs):
+            if not _ativo:
+                return funcao(*args, **kwargs)
+            with _Medicao(rotulo):
+                return funcao(*args, **kwargs)
+        return chamar
+    return decorar
+
+
+def contar_cache(nome, acerto):
+    """Conta um acerto (ou falha) de cache de `nome` no rerun e no total do processo."""
+    if not _ativo:
+        return
+    chave = "acertos" if acerto else "falhas"
+    with _lock:
+        contagem = _contadores_cache.setdefault(nome, {"acertos": 0, "falhas": 0})
+        contagem[chave] += 1
+    registro = registro_atual()
+    if registro is not None:
+        registro.cache.setdefault(nome, {"acertos": 0, "falhas": 0})[chave] += 1
+
+
+def cache_instrumentado(decorador_cache, nome=None):
+    """
+    Aplica um decorador de cache (ex.: st.cache_data(ttl=300)) contando acertos e falhas:
+
+        @cache_instrumentado(st.cache_data(ttl=300))
+        def load_data(...): ...
+
+    Falha = a função original executou dentro da chamada. A função devolvida mantém
+    __wrapped__ (função original, sem o cache nem outros decoradores) e clear() do cache.
+    """
+    def decorar(funcao):
+        rotulo = nome or funcao.__name__
+
+        @functools.wraps(funcao)
+        def executar(*args, **kwargs):
+            pendentes = getattr(_local, "chamadas_cache", None)
+            if pendentes:
+                pendentes[-1] = True
+            return funcao(*args, **kwargs)
+
+        cacheada = decorador_cache(executar)
+
+        @functools.wraps(funcao)
+        def chamar(*args, **kwargs):
+            if not _ativo:
+                return cacheada(*args, **kwargs)
+            pendentes = _local.__dict__.setdefault("chamadas_cache", [])
+            pendentes.append(False)
+            with _Medicao(rotulo):
+                try:
+                    return cacheada(*args, **kwargs)
+                finally:
+                    contar_cache(rotulo, acerto=not pendentes.pop())
+
+        chamar.__wrapped__ = getattr(funcao, "__wrapped__", funcao)
+        chamar.clear = cacheada.clear
+        return chamar
+    return decorar
+
+
+def registrar_payload(nome, n_bytes):
+    """Tamanho (bytes) do conteúdo enviado ao navegador por um gráfico/tabela."""
+    registro = registro_atual() if _ativo else None
+    if registro is not None:
+        registro.payloads[nome] = registro.payloads.get(nome, 0) + int(n_bytes)
+
+
+def historico():
+    """Últimos reruns registrados no processo (mais recente por último)."""
+    with _lock:
+        return list(_historico)
+
+
+def resumo_cache():
+    """Acertos e falhas de cada carregador desde o início do processo."""
+    with _lock:
+        return {nome: dict(contagem) for nome, contagem in _contadores_cache.items()}
@@ -0,0 +1,364 @@
+"""
+Memória por sessão do dashboard e limites de memória do processo.
+
+- Contabilidade por sessão (ao fim de cada rerun, inclusive de fragmentos): tamanho
+  estimado do st.session_state (DataFrames pela memória profunda, listas e dicionários
+  percorridos), as chaves mais pesadas e, com o tracemalloc ligado, a memória alocada no
+  rerun que continuou retida no fim dele (frames e cópias que sobreviveram ao rerun) e o
+  pico do rerun. O tracemalloc mede o processo inteiro: com reruns simultâneos de outras
+  sessões, os números de uma sessão incluem as alocações das outras (é uma amostra).
+- Despejo de sessões ociosas: sessões sem rerun há mais de `ociosidade_segundos` são
+  encerradas pelo runtime do Streamlit (liberam o session_state e os caches da sessão) e
+  o websocket é fechado; a aba, ao reconectar, recomeça com os filtros padrão.
+- Orçamento de memória do processo: com o RSS acima de `orcamento_mb`, limpa os caches
+  registrados (registrar_cache para st.cache_data, registrar_descartavel para os demais
+  caches do processo, com o tamanho medido por eles) do mais pesado para o mais leve até
+  a estimativa voltar ao orçamento. O orçamento deve ficar acima do RSS do processo sem caches; abaixo disso
+  os caches são descartados a cada verificação.
+
+Despejo e orçamento rodam no fim dos reruns, no máximo a cada INTERVALO_MANUTENCAO
+segundos. Sem nada configurado, rerun_sessao() devolve um contexto nulo.
+"""
+
+import asyncio
+import functools
+import gc
+import logging
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+
+import pandas as pd
+
+logger = logging.getLogger("dashboard.memoria")
+
+# Intervalo mínimo (segundos) entre verificações de ociosidade e do orçamento
+INTERVALO_MANUTENCAO = 30
+# Chaves do session_state listadas por sessão no resumo
+CHAVES_PRINCIPAIS = 5
+
+_config = {"contabilizar": False, "tracemalloc": False, "ociosidade_segundos": 0, "orcamento_mb": 0}
+_lock = threading.Lock()
+_local = threading.local()
+_NULO = nullcontext()
+_sessoes = {}  # session_id -> dict com a contabilidade da sessão
+_caches = {}  # nome -> (limpar(), tamanho() ou None: bytes pelas estatísticas do st.cache_data)
+_eventos = {"sessoes_despejadas": 0, "caches_descartados": 0, "ultimo_descarte": None}
+_ultima_manutencao = 0.0
+
+
+def configurar(contabilizar=False, tracemalloc_ativo=False, ociosidade_segundos=0, orcamento_mb=0):
+    """
+    Liga a contabilidade por sessão (implícita com tracemalloc, despejo ou orçamento),
+    o tracemalloc (caro: cada alocação passa a ser rastreada), o despejo de sessões
+    ociosas e o orçamento de memória do processo (0 desliga os dois últimos).
+    """
+    _config.update(
+        contabilizar=bool(contabilizar or tracemalloc_ativo or ociosidade_segundos or orcamento_mb),
+        tracemalloc=bool(tracemalloc_ativo),
+        ociosidade_segundos=max(0, ociosidade_segundos or 0),
+        orcamento_mb=max(0, orcamento_mb or 0),
+    )
+    if _config["tracemalloc"] and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+def ativo():
+    return _config["contabilizar"]
+
+
+def registrar_cache(funcao, nome=None):
+    """
+    Registra um cache descartável pelo orçamento: função com st.cache_data (tem clear()).
+    O tamanho vem das estatísticas do próprio Streamlit (bytes serializados por função).
+    """
+    _caches[nome or funcao.__name__] = (funcao.clear, None)
+    return funcao
+
+
+def registrar_descartavel(nome, limpar, tamanho):
+    """
+    Registra outro cache descartável pelo orçamento (ex.: st.cache_resource, caches de
+    bytes mantidos pelos objetos do processo): limpar() o descarta e tamanho() devolve os
+    bytes que ele ocupa agora.
+    """
+    _caches[nome] = (limpar, tamanho)
+
+
+def tamanho_objeto(valor, _vistos=None):
+    """Bytes estimados de um objeto: DataFrames/Series pela memória profunda, contêineres percorridos."""
+    vistos = _vistos if _vistos is not None else set()
+    if id(valor) in vistos:
+        return 0
+    vistos.add(id(valor))
+    if isinstance(valor, pd.DataFrame):
+        return int(valor.memory_usage(index=True, deep=True).sum())
+    if isinstance(valor, (pd.Series, pd.Index)):
+        return int(valor.memory_usage(deep=True))
+    tamanho = sys.getsizeof(valor, 0)
+    if isinstance(valor, dict):
+        tamanho += sum(tamanho_objeto(k, vistos) + tamanho_objeto(v, vistos) for k, v in valor.items())
+    elif isinstance(valor, (list, tuple, set, frozenset)):
+        tamanho += sum(tamanho_objeto(item, vistos) for item in valor)
+    return tamanho
+
+
+def rss_processo_mb():
+    """RSS atual do processo (MB), de /proc; None se indisponível."""
+    try:
+        with open("/proc/self/status", encoding="ascii") as arquivo:
+            for linha in arquivo:
+                if linha.startswith("VmRSS:"):
+                    return int(linha.split()[1]) / 1024
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def _contexto_script():
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+    except ImportError:
+        return None
+    return get_script_run_ctx()
+
+
+def _medir_estado(estado):
+    """(bytes totais, [(chave, bytes)] das mais pesadas) do session_state."""
+    vistos = set()
+    por_chave = []
+    try:
+        itens = estado.filtered_state.items()
+    except Exception:
+        return 0, []
+    for chave, valor in itens:
+        try:
+            por_chave.append((str(chave), tamanho_objeto(valor, vistos)))
+        except Exception:
+            continue
+    por_chave.sort(key=lambda item: item[1], reverse=True)
+    return sum(n for _, n in por_chave), por_chave[:CHAVES_PRINCIPAIS]
+
+
+@contextmanager
+def _rerun(session_id, estado):
+    _local.aberto = True
+    rastreando = _config["tracemalloc"] and tracemalloc.is_tracing()
+    if rastreando:
+        inicio_alocado = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+    try:
+        yield
+    finally:
+        _local.aberto = False
+        bytes_estado, chaves = _medir_estado(estado)
+        with _lock:
+            sessao = _sessoes.setdefault(session_id, {"reruns": 0, "retido_acumulado": 0})
+            sessao["ultimo_rerun"] = time.time()
+            sessao["reruns"] += 1
+            sessao["bytes_estado"] = bytes_estado
+            sessao["chaves"] = chaves
+            if rastreando:
+                atual, pico = tracemalloc.get_traced_memory()
+                sessao["retido_rerun"] = atual - inicio_alocado
+                sessao["retido_acumulado"] += atual - inicio_alocado
+                sessao["pico_rerun"] = pico - inicio_alocado
+        manutencao(sessao_atual=session_id)
+
+
+def rerun_sessao():
+    """
+    Contexto de um rerun (do app ou de um fragmento): contabiliza a sessão no fim e roda a
+    manutenção. Aninhado (fragmento dentro do rerun do app), só o de fora conta.
+    """
+    if not _config["contabilizar"] or getattr(_local, "aberto", False):
+        return _NULO
+    contexto = _contexto_script()
+    if contexto is None:
+        return _NULO
+    return _rerun(contexto.session_id, contexto.session_state)
+
+
+def contabilizado(funcao):
+    """Decorador: cada chamada de `funcao` (ex.: um fragmento) é um rerun_sessao()."""
+    @functools.wraps(funcao)
+    def chamar(*args, **kwargs):
+        with rerun_sessao():
+            return funcao(*args, **kwargs)
+    return chamar
+
+
+def sessao_atual():
+    """Contabilidade da sessão do rerun atual até o rerun anterior (None se ainda não há)."""
+    contexto = _contexto_script()
+    if contexto is None:
+        return None
+    with _lock:
+        sessao = _sessoes.get(contexto.session_id)
+        return dict(sessao) if sessao else None
+
+
+def _runtime():
+    try:
+        from streamlit.runtime import Runtime
+    except ImportError:
+        return None
+    return Runtime.instance() if Runtime.exists() else None
+
+
+def _encerrar_sessao(runtime, session_id):
+    """
+    Encerra a sessão na thread do event loop do runtime (close_session não é thread-safe)
+    e fecha o websocket dela: o navegador reconecta e recebe uma sessão nova.
+    """
+    try:
+        loop = runtime._get_async_objs().eventloop
+    except Exception:
+        return False
+    # Servidor starlette: o cliente guarda o websocket; tornado: o cliente é o próprio websocket
+    cliente = runtime.get_client(session_id)
+    websocket = getattr(cliente, "_websocket", cliente)
+
+    def encerrar():
+        runtime.close_session(session_id)
+        fechar = getattr(websocket, "close", None)
+        if fechar is None:
+            return
+        try:
+            resultado = fechar()
+            if asyncio.iscoroutine(resultado):
+                asyncio.ensure_future(resultado)
+        except Exception:
+            pass
+
+    loop.call_soon_threadsafe(encerrar)
+    return True
+
+
+def despejar_ociosas(sessao_atual=None, agora=None):
+    """Encerra as sessões sem rerun há mais de `ociosidade_segundos`; devolve quantas."""
+    limite = _config["ociosidade_segundos"]
+    runtime = _runtime()
+    if not limite or runtime is None:
+        return 0
+    agora = agora or time.time()
+    with _lock:
+        ociosas = [
+            sid for sid, sessao in _sessoes.items()
+            if sid != sessao_atual and agora - sessao["ultimo_rerun"] > limite
+        ]
+    despejadas = 0
+    for sid in ociosas:
+        if _encerrar_sessao(runtime, sid):
+            despejadas += 1
+        with _lock:
+            _sessoes.pop(sid, None)
+    if despejadas:
+        _eventos["sessoes_despejadas"] += despejadas
+        logger.warning("%d sessão(ões) ociosa(s) há mais de %ss encerrada(s)", despejadas, limite)
+    return despejadas
+
+
+def tamanhos_caches():
+    """
+    {nome registrado: bytes}: o tamanho medido pelos descartáveis e, para as funções com
+    st.cache_data, a soma das entradas do cache de cada uma.
+    """
+    tamanhos = dict.fromkeys(_caches, 0)
+    for nome, (_, tamanho) in list(_caches.items()):
+        if tamanho is not None:
+            try:
+                tamanhos[nome] = int(tamanho())
+            except Exception:
+                pass
+    try:
+        from streamlit.runtime.caching.cache_data_api import get_data_cache_stats_provider
+
+        estatisticas = get_data_cache_stats_provider().get_stats()
+    except Exception:
+        return tamanhos
+    for familia in estatisticas.values():
+        for estatistica in familia:
+            nome = estatistica.cache_name.rsplit(".", 1)[-1]
+            if nome in tamanhos and _caches[nome][1] is None:
+                tamanhos[nome] += estatistica.byte_length
+    return tamanhos
+
+
+def aplicar_orcamento(rss_mb=None):
+    """
+    Com o RSS acima do orçamento, limpa os caches registrados do mais pesado para o mais
+    leve até o excesso estimado ser coberto. Devolve os nomes limpos.
+    """
+    orcamento = _config["orcamento_mb"]
+    rss_mb = rss_mb if rss_mb is not None else rss_processo_mb()
+    if not orcamento or rss_mb is None or rss_mb <= orcamento:
+        return []
+    excesso = (rss_mb - orcamento) * 1024 * 1024
+    limpos = []
+    for nome, n_bytes in sorted(tamanhos_caches().items(), key=lambda item: item[1], reverse=True):
+        if excesso <= 0 or n_bytes <= 0:
+            break
+        try:
+            _caches[nome][0]()
+        except Exception:
+            continue
+        limpos.append(nome)
+        excesso -= n_bytes
+    if limpos:
+        gc.collect()
+        _eventos["caches_descartados"] += len(limpos)
+        _eventos["ultimo_descarte"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+        logger.warning(
+            "RSS de %.0f MB acima do orçamento de %s MB: caches descartados: %s",
+            rss_mb, orcamento, ", ".join(limpos),
+        )
+    return limpos
+
+
+def _esquecer_encerradas():
+    """Tira da contabilidade as sessões que o runtime já não tem ativas (abas fechadas)."""
+    runtime = _runtime()
+    if runtime is None:
+        return
+    with _lock:
+        for sid in [sid for sid in _sessoes if not runtime.is_active_session(sid)]:
+            del _sessoes[sid]
+
+
+def manutencao(sessao_atual=None, forcar=False):
+    """
+    Limpeza da contabilidade, despejo de ociosas e orçamento, no máximo a cada
+    INTERVALO_MANUTENCAO segundos.
+    """
+    global _ultima_manutencao
+    agora = time.monotonic()
+    with _lock:
+        if not forcar and agora - _ultima_manutencao < INTERVALO_MANUTENCAO:
+            return
+        _ultima_manutencao = agora
+    _esquecer_encerradas()
+    despejar_ociosas(sessao_atual)
+    aplicar_orcamento()
+
+
+def resumo():
+    """Contabilidade por sessão, memória do processo, caches registrados e eventos."""
+    agora = time.time()
+    with _lock:
+        sessoes = {
+            sid: dict(sessao, ocioso_segundos=round(agora - sessao["ultimo_rerun"], 1))
+            for sid, sessao in _sessoes.items()
+        }
+    rastreado = tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else None
+    return {
+        "sessoes": sessoes,
+        "rss_mb": rss_processo_mb(),
+        "tracemalloc_mb": rastreado / 1024 / 1024 if rastreado is not None else None,
+        "orcamento_mb": _config["orcamento_mb"] or None,
+        "ociosidade_segundos": _config["ociosidade_segundos"] or None,
+        "caches": tamanhos_caches(),
+        "eventos": dict(_eventos),
+    }
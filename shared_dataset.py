@@ -0,0 +1,332 @@
+"""
+Dados do dashboard compartilhados entre processos (Arrow IPC mapeado em memória).
+
+Com vários processos do Streamlit atrás de um balanceador, cada um baixaria e guardaria
+a sua cópia das planilhas, do GeoJSON e das coordenadas. Aqui um processo publica cada
+versão de cada fonte como arquivos Arrow IPC (formato de arquivo, sem compressão) num
+diretório compartilhado — de preferência em memória, ex.: /dev/shm — e os outros mapeiam
+esses arquivos: os buffers das tabelas apontam para as páginas do arquivo (uma cópia
+física para todos os processos) e trocar de versão não reinterpreta nada (sem CSV/JSON).
+
+Layout do diretório:
+
+    <diretorio>/<fonte>/ATUAL                  nome da versão atual (trocado com os.replace)
+    <diretorio>/<fonte>/<versão>/manifesto.json
+    <diretorio>/<fonte>/<versão>/*.arrow
+
+Cada versão é gravada num diretório temporário e renomeada só quando completa; o
+ponteiro ATUAL é trocado depois, de forma atômica: um leitor vê a versão antiga ou a
+nova, nunca uma versão pela metade.
+
+Valores publicáveis: DataFrame, dicionário {nome: DataFrame} (as planilhas) e
+GeometriaCompacta (arrays da geometria em colunas Arrow, lidos sem cópia).
+
+Publicador: o processo que segura a trava do diretório (fcntl.flock em .publicador). Se
+ele cair, a trava é liberada e outro processo assume na próxima tentativa. Sem fcntl
+(Windows), todo processo publica. O publicador mantém as últimas MANTER_VERSOES de cada
+fonte; apagar uma versão ainda mapeada por um leitor não invalida o mapeamento (POSIX).
+
+pyarrow é opcional: sem ele disponivel() é falso e cada processo carrega os seus dados.
+"""
+
+import json
+import math
+import os
+import shutil
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as pa_ipc
+except ImportError:  # Opcional: sem pyarrow, sem compartilhamento
+    pa = None
+    pa_ipc = None
+
+try:
+    import fcntl
+except ImportError:  # Windows: sem trava de publicador
+    fcntl = None
+
+from geometry_store import GeometriaCompacta
+
+ARQUIVO_PONTEIRO = "ATUAL"
+ARQUIVO_MANIFESTO = "manifesto.json"
+ARQUIVO_TRAVA = ".publicador"
+
+# Versões mantidas por fonte (a atual e as anteriores ainda mapeadas por leitores lentos)
+MANTER_VERSOES = 3
+
+# Arrays da GeometriaCompacta gravados como colunas (um arquivo por array)
+ARRAYS_GEOMETRIA = ("offsets_aneis", "offsets_poligonos", "offsets_features")
+
+
+def disponivel():
+    """True se o pyarrow está instalado."""
+    return pa is not None
+
+
+# --- Arrow IPC ---
+
+def _gravar_tabela(tabela, caminho):
+    with pa.OSFile(caminho, "wb") as arquivo:
+        with pa_ipc.new_file(arquivo, tabela.schema) as escritor:
+            escritor.write_table(tabela)
+
+
+def _ler_tabela(caminho):
+    """Tabela com os buffers no arquivo mapeado (sem cópia)."""
+    return pa_ipc.open_file(pa.memory_map(caminho, "r")).read_all()
+
+
+def _para_texto(valor):
+    if valor is None or (isinstance(valor, float) and math.isnan(valor)):
+        return None
+    return str(valor)
+
+
+def _tabela_de_dataframe(df):
+    try:
+        return pa.Table.from_pandas(df, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # Colunas object com tipos misturados (ex.: códigos numéricos e texto) viram texto
+        df = df.copy()
+        for coluna in df.columns[df.dtypes == object]:
+            df[coluna] = df[coluna].map(_para_texto)
+        return pa.Table.from_pandas(df, preserve_index=False)
+
+
+def _dataframe_de_tabela(tabela):
+    # split_blocks: uma coluna por bloco, sem consolidar (e copiar) colunas do mesmo tipo
+    return tabela.to_pandas(split_blocks=True)
+
+
+def _array_numpy(tabela):
+    """Primeira coluna como array NumPy somente leitura sobre o arquivo mapeado."""
+    coluna = tabela.column(0)
+    coluna = coluna.chunk(0) if coluna.num_chunks == 1 else coluna.combine_chunks()
+    if pa.types.is_fixed_size_list(coluna.type):
+        return coluna.flatten().to_numpy(zero_copy_only=True).reshape(-1, coluna.type.list_size)
+    return coluna.to_numpy(zero_copy_only=True)
+
+
+def _gravar_valor(valor, pasta):
+    """Grava `valor` em `pasta` e devolve o manifesto (tipo e arquivos)."""
+    if isinstance(valor, pd.DataFrame):
+        _gravar_tabela(_tabela_de_dataframe(valor), os.path.join(pasta, "dados.arrow"))
+        return {"tipo": "dataframe", "arquivo": "dados.arrow"}
+
+    if isinstance(valor, dict) and all(isinstance(df, pd.DataFrame) for df in valor.values()):
+        tabelas = {}
+        for i, (nome, df) in enumerate(valor.items()):
+            tabelas[nome] = f"tabela_{i}.arrow"
+            _gravar_tabela(_tabela_de_dataframe(df), os.path.join(pasta, tabelas[nome]))
+        return {"tipo": "planilhas", "tabelas": tabelas}
+
+    if isinstance(valor, GeometriaCompacta):
+        deltas = np.ascontiguousarray(valor.deltas, dtype=np.int32)
+        _gravar_tabela(
+            pa.table({"valores": pa.FixedSizeListArray.from_arrays(pa.array(deltas.reshape(-1)), 2)}),
+            os.path.join(pasta, "deltas.arrow"),
+        )
+        for nome in ARRAYS_GEOMETRIA:
+            _gravar_tabela(
+                pa.table({"valores": pa.array(np.asarray(getattr(valor, nome), dtype=np.int64))}),
+                os.path.join(pasta, f"{nome}.arrow"),
+            )
+        _gravar_tabela(
+            pa.table({
+                "codigo": pa.array(valor.codigos, type=pa.string()),
+                "tipo": pa.array(valor.tipos, type=pa.string()),
+                "propriedades": pa.array([json.dumps(p, ensure_ascii=False) for p in valor.propriedades]),
+            }),
+            os.path.join(pasta, "features.arrow"),
+        )
+        return {"tipo": "geometria", "origem": [int(c) for c in valor.origem]}
+
+    raise TypeError(f"tipo não publicável: {type(valor).__name__}")
+
+
+def _ler_valor(pasta):
+    with open(os.path.join(pasta, ARQUIVO_MANIFESTO), encoding="utf-8") as arquivo:
+        manifesto = json.load(arquivo)
+    tipo = manifesto["tipo"]
+    if tipo == "dataframe":
+        return _dataframe_de_tabela(_ler_tabela(os.path.join(pasta, manifesto["arquivo"])))
+    if tipo == "planilhas":
+        return {
+            nome: _dataframe_de_tabela(_ler_tabela(os.path.join(pasta, arquivo)))
+            for nome, arquivo in manifesto["tabelas"].items()
+        }
+    if tipo == "geometria":
+        features = _ler_tabela(os.path.join(pasta, "features.arrow"))
+        offsets = {nome: _array_numpy(_ler_tabela(os.path.join(pasta, f"{nome}.arrow"))) for nome in ARRAYS_GEOMETRIA}
+        return GeometriaCompacta(
+            features.column("codigo").to_pylist(),
+            [json.loads(p) for p in features.column("propriedades").to_pylist()],
+            features.column("tipo").to_pylist(),
+            _array_numpy(_ler_tabela(os.path.join(pasta, "deltas.arrow"))),
+            np.array(manifesto["origem"], dtype=np.int64),
+            offsets["offsets_aneis"],
+            offsets["offsets_poligonos"],
+            offsets["offsets_features"],
+        )
+    raise ValueError(f"tipo desconhecido no manifesto: {tipo}")
+
+
+def _copiar(valor):
+    """
+    DataFrames são copiados porque o app altera colunas no lugar; as colunas de texto
+    (Arrow) são imutáveis e a cópia delas não duplica os buffers mapeados.
+    """
+    if isinstance(valor, pd.DataFrame):
+        return valor.copy()
+    if isinstance(valor, dict):
+        return {chave: _copiar(item) for chave, item in valor.items()}
+    return valor
+
+
+def _tamanho_pasta(pasta):
+    try:
+        return sum(entrada.stat().st_size for entrada in os.scandir(pasta) if entrada.is_file())
+    except OSError:
+        return 0
+
+
+class DatasetCompartilhado:
+    """
+    Publicação e leitura das fontes num diretório compartilhado. Uso:
+
+        dados = DatasetCompartilhado("/dev/shm/dashboard")
+        if dados.publicador():
+            dados.publicar("planilhas", {"base_atores": df, ...})
+        planilhas = dados.obter("planilhas")   # None enquanto nada foi publicado
+    """
+
+    def __init__(self, diretorio, intervalo_verificacao=5.0, manter_versoes=MANTER_VERSOES):
+        self.diretorio = diretorio
+        self.intervalo_verificacao = intervalo_verificacao
+        self.manter_versoes = max(1, manter_versoes)
+        os.makedirs(diretorio, exist_ok=True)
+        self._mapeadas = {}  # fonte -> (versão, valor)
+        self._verificado_em = {}  # fonte -> time.monotonic() da última leitura do ponteiro
+        self._lock = threading.Lock()
+        self._trava = None
+        self._tentativa_trava = None
+
+    # --- Publicação ---
+
+    def publicador(self):
+        """
+        True se este processo publica: segura a trava ou acabou de obtê-la (tenta no
+        máximo a cada `intervalo_verificacao` segundos).
+        """
+        if fcntl is None or self._trava is not None:
+            return True
+        agora = time.monotonic()
+        with self._lock:
+            if self._trava is not None:
+                return True
+            if self._tentativa_trava is not None and agora - self._tentativa_trava < self.intervalo_verificacao:
+                return False
+            self._tentativa_trava = agora
+            arquivo = open(os.path.join(self.diretorio, ARQUIVO_TRAVA), "a+")
+            try:
+                fcntl.flock(arquivo.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                arquivo.close()
+                return False
+            self._trava = arquivo
+            return True
+
+    def publicar(self, fonte, valor):
+        """Grava `valor` como nova versão de `fonte`, troca o ponteiro e devolve o nome da versão."""
+        pasta_fonte = os.path.join(self.diretorio, fonte)
+        os.makedirs(pasta_fonte, exist_ok=True)
+        # Nomes ordenáveis pelo horário de publicação
+        versao = f"v{time.time_ns():020d}-{os.getpid()}"
+        temporario = os.path.join(pasta_fonte, f".tmp-{versao}")
+        os.makedirs(temporario)
+        try:
+            manifesto = _gravar_valor(valor, temporario)
+            manifesto.update(versao=versao, publicado_em=time.time())
+            with open(os.path.join(temporario, ARQUIVO_MANIFESTO), "w", encoding="utf-8") as arquivo:
+                json.dump(manifesto, arquivo, ensure_ascii=False)
+            os.rename(temporario, os.path.join(pasta_fonte, versao))
+        except Exception:
+            shutil.rmtree(temporario, ignore_errors=True)
+            raise
+
+        ponteiro = os.path.join(pasta_fonte, ARQUIVO_PONTEIRO)
+        temporario_ponteiro = f"{ponteiro}.tmp-{os.getpid()}"
+        with open(temporario_ponteiro, "w", encoding="utf-8") as arquivo:
+            arquivo.write(versao)
+        os.replace(temporario_ponteiro, ponteiro)
+        self._podar(pasta_fonte, versao)
+        return versao
+
+    def _podar(self, pasta_fonte, atual):
+        versoes = sorted(nome for nome in os.listdir(pasta_fonte) if nome.startswith("v"))
+        for nome in versoes[:-self.manter_versoes]:
+            if nome != atual:
+                shutil.rmtree(os.path.join(pasta_fonte, nome), ignore_errors=True)
+
+    # --- Leitura ---
+
+    def versao_publicada(self, fonte):
+        """Versão apontada por ATUAL (None se a fonte ainda não foi publicada)."""
+        try:
+            with open(os.path.join(self.diretorio, fonte, ARQUIVO_PONTEIRO), encoding="utf-8") as arquivo:
+                return arquivo.read().strip() or None
+        except OSError:
+            return None
+
+    def versao(self, fonte):
+        """Versão mapeada por este processo (None se nenhuma)."""
+        mapeada = self._mapeadas.get(fonte)
+        return mapeada[0] if mapeada else None
+
+    def obter(self, fonte):
+        """
+        Valor da versão atual de `fonte`, mapeado em memória (DataFrames copiados). Confere
+        o ponteiro no máximo a cada `intervalo_verificacao` segundos; None enquanto nada
+        foi publicado. Se a versão nova não puder ser lida, continua servindo a anterior.
+        """
+        agora = time.monotonic()
+        mapeada = self._mapeadas.get(fonte)
+        verificado_em = self._verificado_em.get(fonte)
+        if mapeada is None or verificado_em is None or agora - verificado_em >= self.intervalo_verificacao:
+            with self._lock:
+                self._verificado_em[fonte] = agora
+                versao = self.versao_publicada(fonte)
+                mapeada = self._mapeadas.get(fonte)
+                if versao and (mapeada is None or mapeada[0] != versao):
+                    try:
+                        mapeada = (versao, _ler_valor(os.path.join(self.diretorio, fonte, versao)))
+                    except Exception:
+                        # Versão podada entre a leitura do ponteiro e a abertura: tenta de novo depois
+                        pass
+                    else:
+                        self._mapeadas[fonte] = mapeada
+        if mapeada is None:
+            return None
+        return _copiar(mapeada[1])
+
+    def status(self):
+        """Por fonte: versão publicada, versão mapeada e bytes da versão mapeada; e o papel do processo."""
+        fontes = {}
+        try:
+            nomes = sorted(e.name for e in os.scandir(self.diretorio) if e.is_dir())
+        except OSError:
+            nomes = []
+        for fonte in nomes:
+            mapeada = self.versao(fonte)
+            fontes[fonte] = {
+                "publicada": self.versao_publicada(fonte),
+                "mapeada": mapeada,
+                "bytes": _tamanho_pasta(os.path.join(self.diretorio, fonte, mapeada)) if mapeada else 0,
+            }
+        return {"publicador": self._trava is not None or fcntl is None, "fontes": fontes}
@@ -0,0 +1,101 @@
+"""
+Projeção de colunas nas leituras das abas do Google Sheets.
+
+Em vez de baixar a aba inteira (inclusive colunas de texto livre que nenhuma visão usa),
+o carregador pede só as colunas declaradas pelas visões. A declaração é uma lista de
+termos comparados com o cabeçalho da aba sem acentos e em minúsculas (o cabeçalho casa
+se contém algum termo), do mesmo jeito que as visões procuram as suas colunas; termos
+em `excluir` tiram colunas pesadas da carga, para serem lidas sob demanda.
+
+- API: um intervalo A1 por bloco de colunas contíguas ('Aba'!A:E, 'Aba'!G:G), todos
+  no mesmo values:batchGet, remontados numa matriz só (juntar_blocos);
+- CSV (gviz): consulta "SELECT A, B, E".
+
+A projeção precisa do cabeçalho da aba: a primeira carga lê a aba inteira e o guarda em
+memória no processo por VALIDADE_CABECALHO segundos; as seguintes pedem só as colunas
+projetadas. Se a aba mudar antes disso, o cabeçalho devolvido na leitura não confere com
+o guardado e a aba é relida inteira (colunas novas no fim aparecem quando ele expira).
+A primeira coluna vai sempre (as linhas sem ela são descartadas na limpeza).
+"""
+
+import unicodedata
+
+VALIDADE_CABECALHO = 3600
+
+
+def normalizar(nome):
+    """Nome sem acentos, sem espaços nas pontas e em minúsculas (para comparação)."""
+    nome = unicodedata.normalize("NFKD", str(nome))
+    return "".join(ch for ch in nome if not unicodedata.combining(ch)).strip().lower()
+
+
+def letra_coluna(indice):
+    """Índice 0-based -> letra da coluna (0 -> A, 26 -> AA)."""
+    letras = ""
+    indice += 1
+    while indice:
+        indice, resto = divmod(indice - 1, 26)
+        letras = chr(ord("A") + resto) + letras
+    return letras
+
+
+def colunas_projetadas(cabecalho, termos, excluir=()):
+    """
+    Índices das colunas do cabeçalho que casam com algum termo e com nenhum de `excluir`
+    (mais a primeira coluna). None se a projeção não serve (cabeçalho vazio ou nenhuma
+    coluna além da primeira casou, ex.: cabeçalho ilegível): o chamador lê a aba inteira.
+    """
+    if not cabecalho:
+        return None
+    termos = [normalizar(t) for t in termos]
+    excluir = [normalizar(t) for t in excluir]
+    indices = [0]
+    for i, nome in enumerate(cabecalho[1:], start=1):
+        nome = normalizar(nome)
+        if nome and any(t in nome for t in termos) and not any(t in nome for t in excluir):
+            indices.append(i)
+    return indices if len(indices) > 1 else None
+
+
+def blocos(indices):
+    """Índices ordenados -> blocos contíguos [(inicio, fim exclusivo)]."""
+    resultado = []
+    for i in indices:
+        if resultado and resultado[-1][1] == i:
+            resultado[-1] = (resultado[-1][0], i + 1)
+        else:
+            resultado.append((i, i + 1))
+    return resultado
+
+
+def intervalos_a1(titulo_aba, indices):
+    """Um intervalo A1 (colunas inteiras) por bloco contíguo: ["'Aba'!A:E", "'Aba'!G:G"]."""
+    aba = "'" + titulo_aba.replace("'", "''") + "'"
+    return [f"{aba}!{letra_coluna(i0)}:{letra_coluna(i1 - 1)}" for i0, i1 in blocos(indices)]
+
+
+def consulta_gviz(indices):
+    """Consulta gviz com as colunas projetadas: "SELECT A, B, E"."""
+    return "SELECT " + ", ".join(letra_coluna(i) for i in indices)
+
+
+def juntar_blocos(matrizes, indices):
+    """
+    Remonta as matrizes de valores devolvidas por bloco (intervalos_a1) numa matriz só.
+    A API omite linhas vazias no fim de cada intervalo e células vazias no fim das linhas,
+    então cada bloco é completado com "" até a sua largura e até o número de linhas do maior.
+    """
+    larguras = [i1 - i0 for i0, i1 in blocos(indices)]
+    n_linhas = max((len(m) for m in matrizes), default=0)
+    linhas = [[] for _ in range(n_linhas)]
+    for matriz, largura in zip(matrizes, larguras):
+        for i in range(n_linhas):
+            linha = list(matriz[i][:largura]) if i < len(matriz) else []
+            linhas[i].extend(linha + [""] * (largura - len(linha)))
+    return linhas
+
+
+def confere_cabecalho(primeira_linha, cabecalho, indices):
+    """True se a primeira linha lida traz os nomes esperados nas colunas projetadas."""
+    esperado = [normalizar(cabecalho[i]) if i < len(cabecalho) else "" for i in indices]
+    return [normalizar(v) for v in list(primeira_linha)[:len(indices)]] == esperado
@@ -0,0 +1,285 @@
+"""
+Cliente do Google Sheets (gspread) reutilizado entre cargas.
+
+Antes, cada carga autenticava o service account, abria a planilha testando os IDs
+candidatos e listava as abas de novo. Aqui a sessão autorizada, a planilha resolvida
+e o índice de abas ficam guardados por processo; o token é renovado antes de expirar.
+Depois da primeira carga, ler uma aba custa uma única requisição de valores.
+
+Com uma projeção (termos, excluir) só as colunas que as visões usam são pedidas, um
+intervalo por bloco de colunas contíguas (ver sheet_projection.py); o cabeçalho de cada
+aba, necessário para isso, também fica em memória.
+"""
+
+import os
+import threading
+import time
+import unicodedata
+from datetime import datetime, timedelta
+
+import requests
+
+import circuit_breaker
+import sheet_projection
+
+# Tenta importar gspread para API do Google Sheets
+try:
+    import gspread
+    from gspread.utils import fill_gaps
+    from google.auth.transport.requests import AuthorizedSession, Request
+    from google.oauth2.service_account import Credentials
+    GSPREAD_AVAILABLE = True
+except ImportError:
+    GSPREAD_AVAILABLE = False
+
+SCOPES = [
+    'https://spreadsheets.google.com/feeds',
+    'https://www.googleapis.com/auth/drive'
+]
+
+# Renova o token quando faltar menos que isso para expirar
+MARGEM_RENOVACAO_TOKEN = timedelta(minutes=5)
+
+URL_API_GOOGLE = "https://sheets.googleapis.com/v4/spreadsheets"
+
+# API de valores alternativa (ex.: o servidor local de benchmarks/planilhas_locais.py,
+# base ".../v4/spreadsheets"): requisições sem autenticação, sem credentials.json
+URL_API_SHEETS = (os.getenv("DASHBOARD_SHEETS_API_URL") or "").rstrip("/") or None
+
+
+def api_disponivel(credentials_path):
+    """True se a API do Sheets pode ser usada: gspread instalado e credenciais ou API alternativa."""
+    return GSPREAD_AVAILABLE and (URL_API_SHEETS is not None or os.path.exists(credentials_path))
+
+
+class _SessaoApiAlternativa(requests.Session):
+    """Sessão do gspread que troca a URL da API do Google pela de URL_API_SHEETS."""
+
+    def request(self, method, url, *args, **kwargs):
+        if url.startswith(URL_API_GOOGLE):
+            url = URL_API_SHEETS + url[len(URL_API_GOOGLE):]
+        # Mesma cota e disjuntor da API do Google (circuit_breaker.py)
+        return circuit_breaker.fonte("sheets_api").chamar(super().request, method, url, *args, **kwargs)
+
+
+if GSPREAD_AVAILABLE:
+    class _SessaoAutorizada(AuthorizedSession):
+        """Sessão autorizada do gspread em que cada requisição passa pelo limite e pelo disjuntor da API."""
+
+        def request(self, method, url, *args, **kwargs):
+            return circuit_breaker.fonte("sheets_api").chamar(super().request, method, url, *args, **kwargs)
+
+
+def normalizar_nome_aba(nome):
+    """Nome da aba sem acentos, sem espaços nas pontas e em minúsculas (para comparação)."""
+    try:
+        nome = unicodedata.normalize("NFKD", str(nome))
+        nome = "".join(ch for ch in nome if not unicodedata.combining(ch))
+        return nome.strip().lower()
+    except Exception:
+        return str(nome).strip().lower()
+
+
+class SheetsClient:
+    """
+    Sessão autorizada + planilha resolvida + índice de abas (título normalizado -> aba).
+    Seguro para uso por várias threads (sessões do Streamlit e agendador em segundo plano).
+    """
+
+    def __init__(self, credentials_path, sheet_id_candidates):
+        self.credentials_path = credentials_path
+        self.sheet_id_candidates = list(sheet_id_candidates)
+        self.sheet_id = None
+        self._creds = None
+        self._client = None
+        self._spreadsheet = None
+        self._abas = None
+        self._cabecalhos = {}
+        self._lock = threading.RLock()
+
+    def _garantir_token(self):
+        """Autoriza na primeira chamada e renova o token proativamente perto da expiração."""
+        if URL_API_SHEETS is not None:
+            if self._client is None:
+                self._client = gspread.Client(auth=None, session=_SessaoApiAlternativa())
+            return
+        if self._client is None:
+            self._creds = Credentials.from_service_account_file(self.credentials_path, scopes=SCOPES)
+            # gspread.Client(auth=, session=) existe no 5.x e no 6.x (authorize(session=) só no 6.x)
+            self._client = gspread.Client(auth=self._creds, session=_SessaoAutorizada(self._creds))
+        expiry = getattr(self._creds, "expiry", None)
+        # expiry do google-auth é um datetime UTC "naive"
+        if not self._creds.valid or (expiry is not None and expiry - datetime.utcnow() < MARGEM_RENOVACAO_TOKEN):
+            self._creds.refresh(Request())
+
+    def planilha(self):
+        """Planilha aberta (tenta os IDs candidatos só na primeira vez)."""
+        with self._lock:
+            self._garantir_token()
+            if self._spreadsheet is None:
+                last_err = None
+                for sid in self.sheet_id_candidates:
+                    try:
+                        self._spreadsheet = self._client.open_by_key(sid)
+                        self.sheet_id = sid
+                        break
+                    except Exception as e:
+                        last_err = e
+                if self._spreadsheet is None:
+                    raise last_err if last_err else Exception("Não foi possível abrir a planilha por ID")
+            return self._spreadsheet
+
+    def aba(self, sheet_name, sheet_name_candidates=()):
+        """
+        Aba pelo nome (ou variações dele), usando o índice de abas em memória.
+        Se não encontrar, relista as abas uma vez (a aba pode ter sido criada/renomeada).
+        """
+        with self._lock:
+            spreadsheet = self.planilha()
+            nomes = [sheet_name] + [c for c in sheet_name_candidates if c != sheet_name]
+            for tentativa in range(2):
+                if self._abas is None or tentativa == 1:
+                    self._abas = {normalizar_nome_aba(ws.title): ws for ws in spreadsheet.worksheets()}
+                for nome in nomes:
+                    worksheet = self._abas.get(normalizar_nome_aba(nome))
+                    if worksheet is not None:
+                        return worksheet
+            raise Exception(f"Aba '{sheet_name}' não encontrada. Abas disponíveis: {[ws.title for ws in self._abas.values()]}")
+
+    def _cabecalho_em_cache(self, titulo):
+        with self._lock:
+            lido_em, cabecalho = self._cabecalhos.get(titulo, (None, None))
+        if lido_em is None or time.monotonic() - lido_em >= sheet_projection.VALIDADE_CABECALHO:
+            return None
+        return cabecalho
+
+    def _guardar_cabecalho(self, titulo, cabecalho):
+        with self._lock:
+            self._cabecalhos[titulo] = (time.monotonic(), [str(nome) for nome in cabecalho])
+
+    def cabecalho(self, sheet_name, sheet_name_candidates=()):
+        """
+        Primeira linha da aba (nomes das colunas): a guardada na última leitura (válida por
+        sheet_projection.VALIDADE_CABECALHO segundos) ou uma requisição da linha 1.
+        """
+        worksheet = self.aba(sheet_name, sheet_name_candidates)
+        cabecalho = self._cabecalho_em_cache(worksheet.title)
+        if cabecalho is not None:
+            return cabecalho
+        with self._lock:
+            spreadsheet = self.planilha()
+        aba = "'" + worksheet.title.replace("'", "''") + "'"
+        resposta = spreadsheet.values_get(f"{aba}!1:1", params={"valueRenderOption": "UNFORMATTED_VALUE"})
+        cabecalho = (resposta.get("values") or [[]])[0]
+        self._guardar_cabecalho(worksheet.title, cabecalho)
+        return cabecalho
+
+    def valores(self, sheet_name, sheet_name_candidates=(), projecao=None):
+        """
+        Valores calculados (UNFORMATTED_VALUE) da aba: uma requisição por chamada
+        depois que a planilha e o índice de abas estão em memória.
+        projecao=(termos, excluir): só as colunas projetadas (ver valores_em_lote).
+        """
+        worksheet = self.aba(sheet_name, sheet_name_candidates)
+        if projecao is not None:
+            return self._ler([worksheet], [projecao])[0]
+        with self._lock:
+            self._garantir_token()
+        try:
+            # IMPORTANTE: usar valores calculados (não fórmulas), senão colunas como `qtd_startups`
+            # podem vir como "=COUNTIFS(...)" e virarem 0 no pd.to_numeric(errors='coerce').
+            return worksheet.get_values(value_render_option="UNFORMATTED_VALUE")
+        except TypeError:
+            # Versão do gspread sem suporte ao parâmetro
+            return worksheet.get_all_values()
+        except Exception:
+            # Qualquer outro problema: tenta o método padrão
+            try:
+                return worksheet.get_all_values()
+            except Exception:
+                # Planilha/aba pode ter mudado: descarta os handles para resolver de novo na próxima carga
+                self.invalidar()
+                raise
+
+    def valores_em_lote(self, sheet_names, projecoes=None):
+        """
+        Valores de várias abas em uma única requisição values:batchGet (UNFORMATTED_VALUE).
+        Retorna uma matriz por aba, na mesma ordem de sheet_names, com as linhas
+        completadas com "" (a API omite células vazias no fim das linhas).
+        projecoes: {nome da aba: (termos, excluir)}; dessas abas vêm só as colunas
+        projetadas, na ordem da planilha (a aba inteira se a projeção não se aplica).
+        """
+        projecoes = projecoes or {}
+        abas = [self.aba(nome) for nome in sheet_names]
+        return self._ler(abas, [projecoes.get(nome) for nome in sheet_names])
+
+    def _ler(self, abas, projecoes):
+        # Sem o cabeçalho guardado (primeira leitura), a aba projetada vem inteira e é cortada
+        # aqui; a leitura guarda o cabeçalho para as próximas. Se o cabeçalho lido não confere
+        # com o guardado (colunas inseridas/renomeadas), lê de novo a aba inteira.
+        for tentativa in range(2):
+            indices = [
+                sheet_projection.colunas_projetadas(self._cabecalho_em_cache(ws.title), *projecao)
+                if projecao is not None and tentativa == 0 else None
+                for ws, projecao in zip(abas, projecoes)
+            ]
+            # Intervalo = aba inteira ou um por bloco de colunas; aspas simples no título são escapadas dobrando
+            ranges_por_aba = [
+                sheet_projection.intervalos_a1(ws.title, cols) if cols is not None
+                else ["'" + ws.title.replace("'", "''") + "'"]
+                for ws, cols in zip(abas, indices)
+            ]
+            ranges = [r for rs in ranges_por_aba for r in rs]
+            with self._lock:
+                spreadsheet = self.planilha()
+            try:
+                resposta = spreadsheet.values_batch_get(ranges, params={"valueRenderOption": "UNFORMATTED_VALUE"})
+            except Exception:
+                self.invalidar()
+                raise
+            value_ranges = resposta.get("valueRanges", [])
+            if len(value_ranges) != len(ranges):
+                raise Exception(f"Resposta do batchGet com {len(value_ranges)} intervalos (esperados {len(ranges)})")
+
+            matrizes, conferem = [], True
+            for ws, projecao, cols, rs in zip(abas, projecoes, indices, ranges_por_aba):
+                blocos, value_ranges = value_ranges[:len(rs)], value_ranges[len(rs):]
+                if cols is not None:
+                    matriz = sheet_projection.juntar_blocos([vr.get("values") or [] for vr in blocos], cols)
+                    conferem = conferem and bool(matriz) and sheet_projection.confere_cabecalho(
+                        matriz[0], self._cabecalho_em_cache(ws.title) or [], cols
+                    )
+                    matrizes.append(matriz)
+                    continue
+                matriz = fill_gaps(blocos[0]["values"]) if blocos[0].get("values") else []
+                if projecao is not None and matriz:
+                    self._guardar_cabecalho(ws.title, matriz[0])
+                    cols = sheet_projection.colunas_projetadas(matriz[0], *projecao)
+                    if cols is not None:
+                        matriz = [[linha[i] for i in cols] for linha in matriz]
+                matrizes.append(matriz)
+            if conferem:
+                return matrizes
+        raise Exception("Cabeçalho da aba mudou durante a leitura projetada")
+
+    def invalidar(self):
+        """Descarta planilha e índice de abas (mantém a sessão autorizada)."""
+        with self._lock:
+            self._spreadsheet = None
+            self._abas = None
+            self._cabecalhos = {}
+
+
+_clientes = {}
+_clientes_lock = threading.Lock()
+
+
+def obter_cliente_sheets(credentials_path, sheet_id_candidates):
+    """Cliente compartilhado pelo processo para o par (credenciais, IDs candidatos)."""
+    chave = (credentials_path, tuple(sheet_id_candidates))
+    with _clientes_lock:
+        cliente = _clientes.get(chave)
+        if cliente is None:
+            cliente = SheetsClient(credentials_path, sheet_id_candidates)
+            _clientes[chave] = cliente
+        return cliente
@@ -0,0 +1,223 @@
+"""
+Leitura em streaming do CSV exportado pelo Google Sheets (fallback sem a API).
+
+O download é lido em blocos pelo pd.read_csv (chunksize) enquanto chega, e para assim
+que os dados acabam (bloco inteiro vazio ou contagem esperada atingida). A completude é
+decidida pela contagem de linhas informada pela própria planilha (consulta gviz
+"SELECT COUNT(A)"), e não por baixar a mesma aba de novo com outros parâmetros.
+
+Com carregar_csv_projetado só as colunas que as visões usam são exportadas (consulta gviz
+"SELECT A, B, E", ver sheet_projection.py); o cabeçalho de cada aba fica em memória.
+"""
+
+import io
+import os
+import threading
+import time
+from urllib.parse import quote
+
+import pandas as pd
+import requests
+
+import circuit_breaker
+import sheet_projection
+
+TAMANHO_BLOCO_LINHAS = 5000
+TAMANHO_BLOCO_BYTES = 64 * 1024
+ENCODINGS = ("utf-8", "latin-1")
+
+# Base das URLs de export (gviz e export?format=csv). Pode apontar para um servidor
+# local que imita o Google Sheets (benchmarks/planilhas_locais.py)
+URL_BASE_PLANILHAS = (os.getenv("DASHBOARD_SHEETS_URL") or "https://docs.google.com").rstrip("/")
+
+# (sheet_id, aba) -> (lido em, nomes das colunas da linha de rótulos do gviz), por processo
+_cabecalhos = {}
+_cabecalhos_lock = threading.Lock()
+
+
+def url_gviz_csv(sheet_id, sheet_name, consulta=None, intervalo=None):
+    """URL do export CSV (gviz) de uma aba, opcionalmente com uma consulta (tq) e um intervalo."""
+    url = f"{URL_BASE_PLANILHAS}/spreadsheets/d/{sheet_id}/gviz/tq?tqx=out:csv&sheet={quote(sheet_name, safe='')}"
+    if intervalo:
+        url += f"&range={intervalo}"
+    if consulta:
+        url += f"&tq={quote(consulta, safe='')}"
+    return url
+
+
+def url_export_csv(sheet_id, gid=None):
+    """URL do export direto em CSV (primeira aba, ou a aba `gid`)."""
+    url = f"{URL_BASE_PLANILHAS}/spreadsheets/d/{sheet_id}/export?format=csv"
+    if gid is not None:
+        url += f"&gid={gid}"
+    return url
+
+
+class _RespostaComoArquivo(io.RawIOBase):
+    """Adapta o iter_content do requests para um arquivo binário legível pelo pd.read_csv."""
+
+    def __init__(self, iterador):
+        self._iterador = iterador
+        self._resto = b""
+        self.bytes_lidos = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while not self._resto:
+            try:
+                self._resto = next(self._iterador)
+            except StopIteration:
+                return 0
+        n = min(len(buffer), len(self._resto))
+        buffer[:n] = self._resto[:n]
+        self._resto = self._resto[n:]
+        self.bytes_lidos += n
+        return n
+
+
+def contar_linhas_gviz(sheet_id, sheet_name, timeout=15):
+    """
+    Quantidade de linhas de dados da aba (células preenchidas na coluna A, sem o
+    cabeçalho), segundo a própria planilha. Retorna None se a consulta falhar.
+    """
+    try:
+        resposta = circuit_breaker.fonte("sheets_csv").chamar(
+            requests.get, url_gviz_csv(sheet_id, sheet_name, "SELECT COUNT(A)"), timeout=timeout
+        )
+        if resposta.status_code != 200:
+            return None
+        # Resposta: linha de rótulo + linha com o valor, ex.: "count Nome do Ator"\n"1234"
+        linhas = [l for l in resposta.text.strip().splitlines() if l.strip()]
+        return int(float(linhas[-1].strip().strip('"')))
+    except Exception:
+        return None
+
+
+def cabecalho_em_cache(sheet_id, sheet_name):
+    """Cabeçalho da aba guardado (se ainda válido, ver sheet_projection.VALIDADE_CABECALHO), ou None."""
+    with _cabecalhos_lock:
+        lido_em, cabecalho = _cabecalhos.get((sheet_id, sheet_name), (None, None))
+    if lido_em is None or time.monotonic() - lido_em >= sheet_projection.VALIDADE_CABECALHO:
+        return None
+    return cabecalho
+
+
+def guardar_cabecalho(sheet_id, sheet_name, cabecalho):
+    """Guarda o cabeçalho lido junto com os dados."""
+    with _cabecalhos_lock:
+        _cabecalhos[(sheet_id, sheet_name)] = (time.monotonic(), [str(nome) for nome in cabecalho])
+
+
+def cabecalho_gviz(sheet_id, sheet_name, timeout=15):
+    """
+    Nomes das colunas da aba: o guardado, ou a linha de rótulos da consulta gviz
+    "SELECT * LIMIT 0". Retorna None se a consulta falhar.
+    """
+    cabecalho = cabecalho_em_cache(sheet_id, sheet_name)
+    if cabecalho is not None:
+        return cabecalho
+    try:
+        resposta = circuit_breaker.fonte("sheets_csv").chamar(
+            requests.get, url_gviz_csv(sheet_id, sheet_name, "SELECT * LIMIT 0"), timeout=timeout
+        )
+        if resposta.status_code != 200:
+            return None
+        primeira = pd.read_csv(io.StringIO(resposta.text), header=None, dtype=str, nrows=1, keep_default_na=False)
+        cabecalho = primeira.iloc[0].tolist() if len(primeira) else []
+    except Exception:
+        return None
+    guardar_cabecalho(sheet_id, sheet_name, cabecalho)
+    return cabecalho
+
+
+def carregar_csv_projetado(sheet_id, sheet_name, termos, excluir=(), linhas_esperadas=None):
+    """
+    Como carregar_csv_streaming(url_gviz_csv(sheet_id, sheet_name), ...), mas exportando só
+    as colunas projetadas (termos/excluir, ver sheet_projection.colunas_projetadas) quando o
+    cabeçalho da aba já é conhecido. Sem ele (primeira carga), ou se o cabeçalho lido não
+    confere (a aba mudou), lê a aba inteira e guarda o cabeçalho para as próximas cargas:
+    nesse caso o chamador projeta depois de ler. Retorna (df, completo).
+    """
+    cabecalho = cabecalho_em_cache(sheet_id, sheet_name)
+    indices = sheet_projection.colunas_projetadas(cabecalho, termos, excluir)
+    if indices is not None:
+        url = url_gviz_csv(sheet_id, sheet_name, sheet_projection.consulta_gviz(indices))
+        df, completo = carregar_csv_streaming(url, linhas_esperadas)
+        if sheet_projection.confere_cabecalho(df.iloc[0].fillna("").tolist(), cabecalho, indices):
+            return df, completo
+    df, completo = carregar_csv_streaming(url_gviz_csv(sheet_id, sheet_name), linhas_esperadas)
+    guardar_cabecalho(sheet_id, sheet_name, df.iloc[0].fillna("").tolist())
+    return df, completo
+
+
+def iterar_csv(url, tamanho_bloco=TAMANHO_BLOCO_LINHAS, encoding="utf-8", timeout=30, **read_csv_kwargs):
+    """
+    Gera DataFrames de até `tamanho_bloco` linhas à medida que o download avança.
+    O iterador só mantém um bloco por vez (o que o consumidor guarda é com ele); a conexão é fechada ao final ou se o
+    consumidor parar a iteração.
+    """
+    resposta = circuit_breaker.fonte("sheets_csv").chamar(requests.get, url, stream=True, timeout=timeout)
+    try:
+        resposta.raise_for_status()
+        bruto = _RespostaComoArquivo(resposta.iter_content(TAMANHO_BLOCO_BYTES))
+        texto = io.TextIOWrapper(io.BufferedReader(bruto, TAMANHO_BLOCO_BYTES), encoding=encoding, newline="")
+        leitor = pd.read_csv(texto, chunksize=tamanho_bloco, **read_csv_kwargs)
+        try:
+            for bloco in leitor:
+                yield bloco
+        finally:
+            leitor.close()
+    finally:
+        resposta.close()
+
+
+def carregar_csv_streaming(url, linhas_esperadas=None, tamanho_bloco=TAMANHO_BLOCO_LINHAS, timeout=30):
+    """
+    Baixa e lê o CSV de uma aba em blocos (header=None, como o fallback CSV do app).
+
+    Para de ler quando um bloco inteiro vem vazio (fim real dos dados; o Sheets
+    costuma exportar milhares de linhas em branco no fim) ou quando `linhas_esperadas`
+    linhas com a primeira coluna preenchida já foram lidas.
+
+    De cada bloco só ficam o cabeçalho e as linhas com a primeira coluna preenchida (as
+    outras seriam descartadas na limpeza): a memória usada é a dos dados mais um bloco,
+    não a da aba exportada com as linhas em branco.
+
+    Retorna (df, completo): completo é False apenas quando a contagem esperada é
+    conhecida e não foi atingida (ex.: export truncado).
+    """
+    ultimo_erro = None
+    for encoding in ENCODINGS:
+        blocos = []
+        linhas_preenchidas = 0
+        try:
+            for bloco in iterar_csv(url, tamanho_bloco, encoding=encoding, timeout=timeout,
+                                    header=None, dtype=str):
+                preenchidas = bloco.iloc[:, 0].notna() & (bloco.iloc[:, 0].str.strip() != "")
+                manter = preenchidas.copy()
+                if not blocos:
+                    # A primeira linha do primeiro bloco é o cabeçalho
+                    preenchidas.iloc[0] = False
+                    manter.iloc[0] = True
+                elif not bloco.notna().any(axis=None):
+                    break
+                # Só as linhas com a primeira coluna preenchida (as demais são descartadas na
+                # limpeza): as linhas em branco do export não ficam em memória até o fim
+                blocos.append(bloco[manter])
+                linhas_preenchidas += int(preenchidas.sum())
+                if linhas_esperadas is not None and linhas_preenchidas >= linhas_esperadas:
+                    break
+        except UnicodeDecodeError as e:
+            # Raro no export do Sheets (sempre UTF-8): relê com latin-1
+            ultimo_erro = e
+            continue
+
+        if not blocos:
+            raise ValueError(f"CSV vazio: {url}")
+        df = pd.concat(blocos, ignore_index=True) if len(blocos) > 1 else blocos[0].reset_index(drop=True)
+        completo = linhas_esperadas is None or linhas_preenchidas >= linhas_esperadas
+        return df, completo
+
+    raise ultimo_erro
@@ -0,0 +1,165 @@
+"""
+Coalescência de cargas concorrentes (single-flight) para os carregadores do dashboard.
+
+Quando o cache de um carregador expira com várias sessões abertas, todas podem pedir a
+mesma fonte no mesmo instante. Aqui só a primeira chamada para uma chave (função +
+argumentos) executa a carga; as demais esperam por ela e recebem o mesmo resultado
+(copiado, ver `copiar`) ou a mesma exceção. Nada fica guardado depois que a carga
+termina: erros não são cacheados, a próxima chamada tenta de novo.
+
+- Quem espera desiste após `espera_maxima` segundos (TempoEsgotado, ou o valor de
+  `ao_esgotar`); a carga em andamento continua e quem chegar depois ainda se junta a ela.
+- Se a carga é interrompida sem uma exceção comum (ex.: o Streamlit parou o rerun da
+  sessão que carregava), quem esperava não herda a interrupção: uma delas assume a carga.
+- `ao_esperar` é chamado periodicamente durante a espera (ex.: para o Streamlit poder
+  interromper o rerun de quem espera).
+
+O registro das cargas em andamento é do processo (este módulo), não do script do app,
+que é executado de novo a cada rerun.
+"""
+
+import functools
+import threading
+import time
+
+INTERVALO_ESPERA = 0.1
+
+_lock = threading.Lock()
+# chave -> _Carga em andamento
+_cargas = {}
+# nome -> contadores (ver status())
+_contadores = {}
+
+
+class TempoEsgotado(TimeoutError):
+    """A espera por uma carga em andamento passou de `espera_maxima`."""
+
+
+class _Carga:
+    def __init__(self):
+        self.concluida = threading.Event()
+        self.thread = threading.get_ident()
+        self.iniciada_em = time.monotonic()
+        self.resultado = None
+        self.erro = None
+        self.interrompida = False
+
+
+def _contar(nome, campo, n=1):
+    with _lock:
+        contadores = _contadores.setdefault(nome, {
+            "execucoes": 0, "compartilhadas": 0, "erros": 0, "esgotadas": 0, "interrompidas": 0,
+        })
+        contadores[campo] += n
+
+
+def executar(nome, funcao, args=(), kwargs=None, espera_maxima=None, copiar=None, ao_esperar=None):
+    """
+    Executa funcao(*args, **kwargs), ou espera pela execução já em andamento com os mesmos
+    `nome`, args e kwargs. Argumentos que não são hashable não são coalescidos.
+    """
+    kwargs = kwargs or {}
+    try:
+        chave = (nome, args, tuple(sorted(kwargs.items())))
+        hash(chave)
+    except TypeError:
+        _contar(nome, "execucoes")
+        return funcao(*args, **kwargs)
+
+    inicio = time.monotonic()
+    while True:
+        with _lock:
+            carga = _cargas.get(chave)
+            # A própria thread pedindo a mesma chave dentro da carga: executa direto
+            reentrante = carga is not None and carga.thread == threading.get_ident()
+            lider = carga is None
+            if lider:
+                carga = _cargas[chave] = _Carga()
+        if reentrante:
+            return funcao(*args, **kwargs)
+        if lider:
+            return _liderar(nome, chave, carga, funcao, args, kwargs)
+
+        _aguardar(nome, carga, inicio, espera_maxima, ao_esperar)
+        if carga.interrompida:
+            # Quem carregava foi interrompido: tenta de novo (uma das que esperavam assume)
+            continue
+        if carga.erro is not None:
+            raise carga.erro
+        _contar(nome, "compartilhadas")
+        return copiar(carga.resultado) if copiar is not None else carga.resultado
+
+
+def _liderar(nome, chave, carga, funcao, args, kwargs):
+    _contar(nome, "execucoes")
+    try:
+        carga.resultado = funcao(*args, **kwargs)
+        return carga.resultado
+    except Exception as e:
+        carga.erro = e
+        _contar(nome, "erros")
+        raise
+    except BaseException:
+        carga.interrompida = True
+        _contar(nome, "interrompidas")
+        raise
+    finally:
+        with _lock:
+            if _cargas.get(chave) is carga:
+                del _cargas[chave]
+        carga.concluida.set()
+
+
+def _aguardar(nome, carga, inicio, espera_maxima, ao_esperar):
+    while not carga.concluida.wait(INTERVALO_ESPERA):
+        if ao_esperar is not None:
+            ao_esperar()
+        if espera_maxima is not None and time.monotonic() - inicio >= espera_maxima:
+            _contar(nome, "esgotadas")
+            raise TempoEsgotado(
+                f"{nome}: carga em andamento há {time.monotonic() - carga.iniciada_em:.1f} s "
+                f"(espera máxima: {espera_maxima:g} s)"
+            )
+
+
+def coalescer(nome=None, espera_maxima=None, copiar=None, ao_esperar=None, ao_esgotar=None):
+    """
+    Decorador: chamadas concorrentes da função com os mesmos argumentos executam uma vez só.
+
+        @coalescer(espera_maxima=60, copiar=copiar_valor)
+        @st.cache_data(ttl=300)
+        def load_data(...): ...
+
+    Aplicado por fora do st.cache_data, coalesce as falhas de cache e, nos acertos, não
+    custa mais que uma trava. copiar(valor): cópia entregue a quem esperou (o app altera
+    DataFrames no lugar). ao_esgotar(): valor devolvido em vez de TempoEsgotado.
+    A função devolvida mantém __wrapped__ (função original, sem cache) e clear().
+    """
+    def decorar(funcao):
+        rotulo = nome or funcao.__name__
+
+        @functools.wraps(funcao)
+        def coalescida(*args, **kwargs):
+            try:
+                return executar(rotulo, funcao, args, kwargs, espera_maxima, copiar, ao_esperar)
+            except TempoEsgotado:
+                if ao_esgotar is None:
+                    raise
+                return ao_esgotar()
+
+        coalescida.__wrapped__ = getattr(funcao, "__wrapped__", funcao)
+        if hasattr(funcao, "clear"):
+            coalescida.clear = funcao.clear
+        return coalescida
+    return decorar
+
+
+def status():
+    """Contadores por carregador: execuções, chamadas que esperaram e compartilharam o resultado,
+    erros, esperas esgotadas, cargas interrompidas e quantas estão em andamento agora."""
+    with _lock:
+        resumo = {nome: dict(contadores, em_andamento=0) for nome, contadores in _contadores.items()}
+        for nome, *_ in _cargas:
+            if nome in resumo:
+                resumo[nome]["em_andamento"] += 1
+    return resumo
@@ -0,0 +1,319 @@
+"""
+Servidor local de vector tiles (MVT) dos municípios de MG.
+
+Modo opcional do mapa (DASHBOARD_VECTOR_TILES=1): em vez de embutir o GeoJSON em cada
+figura do Plotly, o mapa referencia camadas de vector tiles servidas por este processo
+(thread HTTP em segundo plano) e a figura leva só a tabela de valores por município.
+Tudo roda localmente, sem provedor externo de tiles.
+
+Os tiles são gerados a partir do mesmo IndiceEspacial usado pelo mapa: para cada tile
+(z, x, y) cada município é codificado uma única vez (geometria simplificada para o zoom)
+e guardado em cache (os MAX_TILES tiles usados mais recentemente). O mapa colore os
+municípios por grupos (região + faixa de intensidade): um grupo é um conjunto de códigos
+IBGE registrado no servidor, e o tile de um grupo é montado concatenando as features já
+codificadas dos seus municípios.
+"""
+
+import hashlib
+import math
+import re
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from map_geometry import unir_limites
+
+# Nome da camada dentro dos tiles (sourcelayer no Plotly)
+CAMADA_MVT = "municipios"
+
+# Resolução interna do tile (padrão da especificação MVT)
+EXTENT = 4096
+
+# Margem em torno do tile ao selecionar municípios (fração do tile)
+MARGEM_TILE = 1 / 16
+
+# Zooms gerados antecipadamente ao iniciar (visão do estado e das regiões)
+ZOOMS_PREGERADOS = range(4, 9)
+
+# Máximo de grupos registrados mantidos em memória
+MAX_GRUPOS = 512
+
+# Máximo de tiles (features codificadas de um (z, x, y)) mantidos em memória; os menos
+# usados saem primeiro. Cobre com folga os tiles pré-gerados (ZOOMS_PREGERADOS).
+MAX_TILES = 2048
+
+_ROTA_TILE = re.compile(r"^/tiles/(?P<grupo>[0-9a-f]+)/(?P<z>\d+)/(?P<x>\d+)/(?P<y>\d+)\.pbf$")
+
+
+# --- Codificação protobuf mínima (apenas o necessário para MVT) ---
+
+def _varint(valor):
+    partes = bytearray()
+    while True:
+        byte = valor & 0x7F
+        valor >>= 7
+        if valor:
+            partes.append(byte | 0x80)
+        else:
+            partes.append(byte)
+            return bytes(partes)
+
+
+def _campo_bytes(numero, conteudo):
+    return _varint((numero << 3) | 2) + _varint(len(conteudo)) + conteudo
+
+
+def _campo_varint(numero, valor):
+    return _varint(numero << 3) + _varint(valor)
+
+
+def _zigzag(n):
+    return (n << 1) ^ (n >> 63)
+
+
+# --- Projeção ---
+
+def limites_tile(z, x, y):
+    """(min_lon, min_lat, max_lon, max_lat) do tile z/x/y (Web Mercator)."""
+    n = 2 ** z
+
+    def _lat(yy):
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * yy / n))))
+
+    return (x / n * 360 - 180, _lat(y + 1), (x + 1) / n * 360 - 180, _lat(y))
+
+
+def tiles_cobrindo(limites, z):
+    """Tiles (x, y) do zoom z que cobrem os limites (min_lon, min_lat, max_lon, max_lat)."""
+    n = 2 ** z
+
+    def _xy(lon, lat):
+        lat_r = math.radians(max(min(lat, 85.0), -85.0))
+        return (int((lon + 180) / 360 * n),
+                int((1 - math.log(math.tan(lat_r) + 1 / math.cos(lat_r)) / math.pi) / 2 * n))
+
+    x0, y0 = _xy(limites[0], limites[3])
+    x1, y1 = _xy(limites[2], limites[1])
+    return [(x, y) for x in range(x0, x1 + 1) for y in range(y0, y1 + 1)]
+
+
+def _para_tile(pontos, z, x, y):
+    """Converte lon/lat (array n x 2) para coordenadas inteiras do tile."""
+    n = 2 ** z
+    lon = pontos[:, 0]
+    lat_r = np.radians(np.clip(pontos[:, 1], -85.0, 85.0))
+    px = (lon + 180) / 360 * n
+    py = (1 - np.log(np.tan(lat_r) + 1 / np.cos(lat_r)) / np.pi) / 2 * n
+    return np.round(np.column_stack(((px - x) * EXTENT, (py - y) * EXTENT))).astype(np.int64)
+
+
+def _comandos_anel(anel, exterior, cursor):
+    """Comandos MoveTo/LineTo/ClosePath de um anel, ou [] se ele colapsar no tile."""
+    # Remove pontos repetidos e o ponto de fechamento
+    muda = np.ones(len(anel), dtype=bool)
+    muda[1:] = np.any(anel[1:] != anel[:-1], axis=1)
+    anel = anel[muda]
+    if len(anel) > 1 and np.array_equal(anel[0], anel[-1]):
+        anel = anel[:-1]
+    if len(anel) < 3:
+        return []
+
+    # Orientação exigida pela especificação: exterior com área positiva (horário na tela)
+    xs, ys = anel[:, 0], anel[:, 1]
+    area = np.sum(xs * np.roll(ys, -1) - np.roll(xs, -1) * ys)
+    if area == 0:
+        return []
+    if (area > 0) != exterior:
+        anel = anel[::-1]
+
+    deltas = np.diff(np.vstack([cursor, anel]), axis=0)
+    cursor[:] = anel[-1]
+    comandos = [(1 & 7) | (1 << 3), _zigzag(int(deltas[0, 0])), _zigzag(int(deltas[0, 1]))]
+    comandos.append((2 & 7) | ((len(anel) - 1) << 3))
+    for dx, dy in deltas[1:].tolist():
+        comandos.append(_zigzag(dx))
+        comandos.append(_zigzag(dy))
+    comandos.append((7 & 7) | (1 << 3))
+    return comandos
+
+
+def codificar_feature(codigo, geometria, z, x, y):
+    """Mensagem Feature (MVT) de um Polygon/MultiPolygon no tile z/x/y, ou None se vazia."""
+    if geometria.get('type') == 'Polygon':
+        poligonos = [geometria['coordinates']]
+    elif geometria.get('type') == 'MultiPolygon':
+        poligonos = geometria['coordinates']
+    else:
+        return None
+
+    cursor = np.zeros(2, dtype=np.int64)
+    comandos = []
+    for poligono in poligonos:
+        for i, anel in enumerate(poligono):
+            if len(anel) < 4:
+                continue
+            comandos_anel = _comandos_anel(_para_tile(np.asarray(anel, dtype=float)[:, :2], z, x, y), i == 0, cursor)
+            if not comandos_anel and i == 0:
+                break  # Exterior colapsou: ignora os buracos deste polígono
+            comandos.extend(comandos_anel)
+    if not comandos:
+        return None
+
+    geometria_bytes = b"".join(_varint(c) for c in comandos)
+    conteudo = _campo_varint(1, int(codigo)) + _campo_varint(3, 3) + _campo_bytes(4, geometria_bytes)
+    return _campo_bytes(2, conteudo)
+
+
+def montar_tile(features_codificadas):
+    """Tile MVT com uma camada (CAMADA_MVT) a partir de features já codificadas."""
+    camada = (
+        _campo_varint(15, 2)
+        + _campo_bytes(1, CAMADA_MVT.encode("utf-8"))
+        + b"".join(features_codificadas)
+        + _campo_varint(5, EXTENT)
+    )
+    return _campo_bytes(3, camada)
+
+
+class ServidorTiles:
+    """
+    Servidor HTTP local de vector tiles. Uso:
+
+        servidor = ServidorTiles(porta=8765)
+        servidor.iniciar()
+        servidor.atualizar_indice(indice_espacial)
+        url = servidor.url_tiles(codigos)  # template {z}/{x}/{y} para uma camada do mapa
+    """
+
+    def __init__(self, host="127.0.0.1", porta=8765, url_base=None):
+        self.host = host
+        self.porta = porta
+        self.url_base = (url_base or f"http://localhost:{porta}").rstrip("/")
+        self._indice = None
+        self._features = OrderedDict()  # (z, x, y) -> {codigo: bytes}
+        self._grupos = OrderedDict()  # id -> frozenset de códigos
+        self._lock = threading.Lock()
+        self._http = None
+
+    def atualizar_indice(self, indice):
+        """Troca a geometria servida (nova versão do GeoJSON) e descarta os tiles gerados."""
+        if indice is self._indice:
+            return
+        with self._lock:
+            self._indice = indice
+            self._features = OrderedDict()
+        threading.Thread(target=self.pregerar, name="vector-tiles-pregerar", daemon=True).start()
+
+    def pregerar(self, zooms=ZOOMS_PREGERADOS):
+        """Gera antecipadamente os tiles que cobrem o estado nos zooms dados."""
+        indice = self._indice
+        if indice is None or not indice.limites:
+            return
+        extensao = unir_limites(indice.limites.values())
+        for z in zooms:
+            for x, y in tiles_cobrindo(extensao, z):
+                if self._indice is not indice:
+                    return  # Índice trocado no meio: a próxima geração assume
+                self._features_tile(z, x, y)
+
+    def _features_tile(self, z, x, y):
+        chave = (z, x, y)
+        with self._lock:
+            features = self._features.get(chave)
+            if features is not None:
+                self._features.move_to_end(chave)
+                return features
+        indice = self._indice
+        features = {}
+        if indice is not None:
+            lon0, lat0, lon1, lat1 = limites_tile(z, x, y)
+            margem_lon, margem_lat = (lon1 - lon0) * MARGEM_TILE, (lat1 - lat0) * MARGEM_TILE
+            for codigo in indice.consultar((lon0 - margem_lon, lat0 - margem_lat, lon1 + margem_lon, lat1 + margem_lat)):
+                feature = indice.feature(codigo, z)
+                if feature is None or not feature.get('geometry'):
+                    continue
+                codificada = codificar_feature(codigo, feature['geometry'], z, x, y)
+                if codificada is not None:
+                    features[codigo] = codificada
+        with self._lock:
+            if self._indice is indice:
+                self._features[chave] = features
+                self._features.move_to_end(chave)
+                while len(self._features) > MAX_TILES:
+                    self._features.popitem(last=False)
+        return features
+
+    @property
+    def bytes_em_cache(self):
+        """Bytes das features codificadas nos tiles em cache."""
+        with self._lock:
+            tiles = list(self._features.values())
+        return sum(len(codificada) for features in tiles for codificada in features.values())
+
+    def limpar_cache(self):
+        """Descarta os tiles em cache (são refeitos sob demanda)."""
+        with self._lock:
+            self._features = OrderedDict()
+
+    def registrar_grupo(self, codigos):
+        """Registra um conjunto de códigos IBGE e devolve o id do grupo (estável para o mesmo conjunto)."""
+        conjunto = frozenset(str(c) for c in codigos)
+        grupo = hashlib.sha1(",".join(sorted(conjunto)).encode("utf-8")).hexdigest()[:16]
+        with self._lock:
+            self._grupos[grupo] = conjunto
+            self._grupos.move_to_end(grupo)
+            while len(self._grupos) > MAX_GRUPOS:
+                self._grupos.popitem(last=False)
+        return grupo
+
+    def url_tiles(self, codigos):
+        """URL template ({z}/{x}/{y}) dos tiles com apenas os municípios informados."""
+        return f"{self.url_base}/tiles/{self.registrar_grupo(codigos)}/{{z}}/{{x}}/{{y}}.pbf"
+
+    def tile(self, grupo, z, x, y):
+        """Bytes do tile do grupo, ou None se o grupo não existir."""
+        codigos = self._grupos.get(grupo)
+        if codigos is None:
+            return None
+        features = self._features_tile(z, x, y)
+        return montar_tile(features[c] for c in sorted(codigos) if c in features)
+
+    def iniciar(self):
+        """Sobe o servidor HTTP numa thread daemon (idempotente). Levanta OSError se a porta estiver em uso."""
+        if self._http is not None:
+            return
+        servidor = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                rota = _ROTA_TILE.match(self.path.split("?")[0])
+                corpo = None
+                if rota:
+                    corpo = servidor.tile(rota["grupo"], int(rota["z"]), int(rota["x"]), int(rota["y"]))
+                if corpo is None:
+                    self.send_response(404)
+                    self.send_header("Access-Control-Allow-Origin", "*")
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-protobuf")
+                self.send_header("Content-Length", str(len(corpo)))
+                self.send_header("Access-Control-Allow-Origin", "*")
+                self.send_header("Cache-Control", "public, max-age=300")
+                self.end_headers()
+                self.wfile.write(corpo)
+
+            def log_message(self, *args):
+                pass  # Sem log por requisição
+
+        self._http = ThreadingHTTPServer((self.host, self.porta), _Handler)
+        self._http.daemon_threads = True
+        threading.Thread(target=self._http.serve_forever, name="vector-tiles", daemon=True).start()
+
+    def parar(self):
+        if self._http is not None:
+            self._http.shutdown()
+            self._http.server_close()
+            self._http = None